@@ -0,0 +1,2 @@
+"""Benchmarks del ensamblador: generador de programas sintéticos, medición
+por fase y comparación contra una línea base (python -m benchmarks)."""
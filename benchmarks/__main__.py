@@ -0,0 +1,97 @@
+# benchmarks/__main__.py
+from __future__ import annotations
+import argparse, os, sys
+from typing import List, Optional
+
+from src.rv32i_asm.sim import MODES
+
+from . import bench
+from .generator import write_program
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m benchmarks",
+                                 description="benchmarks del ensamblador RV32I")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    g = sub.add_parser("generate", help="escribe un programa sintético")
+    g.add_argument("lines", help="número de líneas (admite 1k, 10M...)")
+    g.add_argument("-o", "--output", default="-", help="archivo de salida ('-' = stdout)")
+    g.add_argument("--seed", type=int, default=0)
+
+    r = sub.add_parser("run", help="mide cada fase y guarda los resultados en JSON")
+    r.add_argument("--sizes", default="1k,10k,100k",
+                   help="tamaños en líneas separados por comas (por defecto 1k,10k,100k; hasta 10M)")
+    r.add_argument("--seed", type=int, default=0)
+    r.add_argument("--repeat", type=int, default=3, help="repeticiones por tamaño (se toma el mínimo)")
+    r.add_argument("-o", "--output", default=None, help="archivo JSON de resultados")
+    r.add_argument("--save-baseline", action="store_true",
+                   help=f"guardar además como línea base en {os.path.relpath(BASELINE)} "
+                        "(no está en el repositorio: los tiempos dependen de la máquina)")
+
+    c = sub.add_parser("compare", help="marca regresiones frente a una línea base")
+    c.add_argument("current", help="resultados de 'run'")
+    c.add_argument("--baseline", required=True,
+                   help="línea base, obligatoria: el repositorio no incluye ninguna porque los "
+                        "tiempos dependen de la máquina (run --save-baseline la deja en "
+                        f"{os.path.relpath(BASELINE)})")
+    c.add_argument("--threshold", type=float, default=0.10,
+                   help="fracción de empeoramiento tolerada (por defecto 0.10)")
+    c.add_argument("--min-delta", type=float, default=0.002,
+                   help="diferencia mínima en segundos para contar (por defecto 0.002)")
+
+    s = sub.add_parser("sim", help="instrucciones por segundo del simulador en bucles cerrados")
+    s.add_argument("--iterations", type=int, default=50_000, help="vueltas del bucle")
+    s.add_argument("--repeat", type=int, default=3, help="repeticiones (se toma la más rápida)")
+    s.add_argument("--modes", default=",".join(MODES),
+                   help=f"modos a medir separados por comas (por defecto {','.join(MODES)})")
+    s.add_argument("--trace", action="store_true",
+                   help="mide también cada modo con la traza de ejecución activa")
+
+    args = ap.parse_args(argv)
+    if args.cmd == "generate":
+        n = bench.parse_size(args.lines)
+        if args.output == "-":
+            write_program(sys.stdout, n, seed=args.seed)
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                write_program(f, n, seed=args.seed)
+        return 0
+
+    if args.cmd == "run":
+        sizes = [bench.parse_size(s) for s in args.sizes.split(",") if s.strip()]
+        doc = bench.run(sizes, seed=args.seed, repeat=args.repeat, log=sys.stderr)
+        print(bench.format_results(doc))
+        if args.output:
+            bench.save(doc, args.output)
+        if args.save_baseline:
+            bench.save(doc, BASELINE)
+        return 0
+
+    if args.cmd == "sim":
+        modes = tuple(m.strip() for m in args.modes.split(",") if m.strip())
+        bad = [m for m in modes if m not in MODES]
+        if bad:
+            print(f"ERROR: modo desconocido: {', '.join(bad)}", file=sys.stderr)
+            return 2
+        for r in bench.measure_sim_modes(args.iterations, repeat=args.repeat, modes=modes,
+                                           trace=args.trace):
+            print(bench.format_sim(r))
+        return 0
+
+    try:
+        baseline, current = bench.load(args.baseline), bench.load(args.current)
+    except (OSError, ValueError) as ex:
+        print(f"ERROR: {ex}", file=sys.stderr)
+        return 2
+    rows = bench.compare(baseline, current, threshold=args.threshold, min_delta=args.min_delta)
+    print(bench.format_comparison(rows))
+    n_reg = sum(r["regression"] for r in rows)
+    if n_reg:
+        print(f"{n_reg} regresiones por encima del {args.threshold:.0%}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,231 @@
+# benchmarks/bench.py
+from __future__ import annotations
+import json, os, platform, tempfile, time
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
+
+from src.rv32i_asm import __version__
+from src.rv32i_asm.assembler import assemble_text
+from src.rv32i_asm.data import build_data_image
+from src.rv32i_asm.elf import write_elf
+from src.rv32i_asm.sim import MODES, Simulator
+from src.rv32i_asm.stats import Stats
+from src.rv32i_asm.trace import Trace
+from src.rv32i_asm.writers import write_hex_bin, write_raw
+
+from .generator import generate
+
+# ---------------- Medición por fase ----------------
+#
+# Cada tamaño se ensambla 'repeat' veces con un stats.Stats; de cada fase se
+# guarda el mínimo (el menos afectado por ruido). Las fases son las de
+# assemble_text (parse, expand, first_pass, encode, data) más los writers.
+
+STAGES = ("parse", "expand", "first_pass", "encode", "data",
+          "write_hex_bin", "write_raw", "write_elf")
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+
+def parse_size(s: str) -> int:
+    """'1k' -> 1000, '10M' -> 10_000_000, '2500' -> 2500."""
+    s = s.strip()
+    mult = {"k": 1_000, "K": 1_000, "m": 1_000_000, "M": 1_000_000}.get(s[-1:], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+def measure(lines: int, *, seed: int = 0, repeat: int = 3,
+            workdir: Optional[str] = None) -> dict:
+    """Mide todas las fases sobre un programa de 'lines' líneas."""
+    t0 = time.perf_counter()
+    text = generate(lines, seed=seed)
+    gen_s = time.perf_counter() - t0
+    best: Dict[str, Tuple[float, float]] = {}
+    counts: Dict[str, int] = {}
+    with tempfile.TemporaryDirectory(dir=workdir) as tmp:
+        out = os.path.join(tmp, "bench")
+        for _ in range(repeat):
+            stats = Stats()
+            _, diags, link, enc = assemble_text(text, stats=stats)
+            if any(d.severity == "error" for d in diags):
+                raise RuntimeError(f"el programa generado tiene errores: {diags[0]}")
+            image = build_data_image(link)
+            with stats.phase("write_hex_bin"):
+                write_hex_bin(enc, out + ".hex", out + ".bin")
+            with stats.phase("write_raw"):
+                write_raw(enc, out + ".raw")
+            with stats.phase("write_elf"):
+                write_elf(out + ".elf", enc, link, data=image)
+            for name, t in stats.phases.items():
+                w, c = best.get(name, (t.wall, t.cpu))
+                best[name] = (min(w, t.wall), min(c, t.cpu))
+            counts = dict(stats.counts)
+    return {
+        "lines": lines,
+        "generate_s": gen_s,
+        "counts": counts,
+        "phases": {k: {"wall_s": w, "cpu_s": c} for k, (w, c) in best.items()},
+    }
+
+def run(sizes=DEFAULT_SIZES, *, seed: int = 0, repeat: int = 3,
+        log=None) -> dict:
+    """Mide cada tamaño y devuelve el documento de resultados (JSON)."""
+    try:
+        import numpy  # noqa: F401  (sólo para dejar constancia en los metadatos)
+        has_numpy = True
+    except ImportError:
+        has_numpy = False
+    results = {}
+    for n in sizes:
+        if log:
+            print(f"{n} líneas...", file=log, flush=True)
+        results[str(n)] = measure(n, seed=seed, repeat=repeat)
+    return {
+        "meta": {"version": __version__, "python": platform.python_version(),
+                 "implementation": platform.python_implementation(),
+                 "platform": platform.platform(), "machine": platform.machine(),
+                 "numpy": has_numpy, "seed": seed, "repeat": repeat,
+                 "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "sizes": results,
+    }
+
+# ---------------- Simulador ----------------
+#
+# Instrucciones por segundo del simulador sobre bucles cerrados, en cada
+# modo (bloques traducidos, intérprete con caché e intérprete que decodifica
+# en cada paso). SIM_LOOP mezcla ALU, carga/almacenamiento en pila y un
+# salto condicional por iteración; SIM_ALU sólo opera con registros. Con
+# trace=True el simulador además vuelca la traza de ejecución (a os.devnull,
+# así que se mide el registro y la codificación, no el disco).
+
+SIM_LOOP = """    .text
+_start:
+    li   t0, {iterations}
+    li   t1, 0
+    addi sp, sp, -16
+loop:
+    addi t1, t1, 3
+    xor  t2, t1, t0
+    sw   t2, 0(sp)
+    lw   t3, 0(sp)
+    add  t1, t1, t3
+    addi t0, t0, -1
+    bnez t0, loop
+    andi a0, t1, 0xff
+    li   a7, 93
+    ecall
+"""
+
+SIM_ALU = """    .text
+_start:
+    li   t0, {iterations}
+    li   t1, 0
+    li   t2, 7
+loop:
+    add  t1, t1, t2
+    xori t1, t1, 0x55
+    slli t3, t1, 3
+    srli t4, t3, 5
+    sub  t1, t1, t4
+    addi t0, t0, -1
+    bnez t0, loop
+    andi a0, t1, 0xff
+    li   a7, 93
+    ecall
+"""
+
+SIM_KERNELS = {"pila": SIM_LOOP, "alu": SIM_ALU}
+
+def measure_sim(iterations: int = 200_000, *, repeat: int = 3, mode: str = "blocks",
+                kernel: str = "pila", trace: bool = False) -> dict:
+    """Ejecuta el núcleo 'kernel' 'repeat' veces en 'mode' y se queda con la
+    más rápida."""
+    text = SIM_KERNELS[kernel].format(iterations=iterations)
+    best = None
+    for _ in range(repeat):
+        with Trace(stream=os.devnull) if trace else nullcontext() as tr:
+            res = Simulator.from_text(text, mode=mode, trace=tr).run()
+        if res.reason != "exit":
+            raise RuntimeError(f"el bucle de prueba no terminó: {res.reason}")
+        if best is None or res.seconds < best.seconds:
+            best = res
+    return {"kernel": kernel, "mode": mode, "trace": trace, "iterations": iterations,
+            "instructions": best.steps, "seconds": best.seconds, "ips": best.ips}
+
+def measure_sim_modes(iterations: int = 50_000, *, repeat: int = 3,
+                      modes: Tuple[str, ...] = MODES, trace: bool = False) -> List[dict]:
+    """measure_sim para cada núcleo y modo; 'speedup' es frente a "naive"
+    (si se ha medido). Con 'trace' cada modo se mide también con traza y
+    'slowdown' es cuánto más lento va con ella."""
+    rows = []
+    for kernel in SIM_KERNELS:
+        got = [measure_sim(iterations, repeat=repeat, mode=m, kernel=kernel) for m in modes]
+        naive = next((r["ips"] for r in got if r["mode"] == "naive"), None)
+        for r in got:
+            r["speedup"] = r["ips"] / naive if naive else None
+        rows += got
+        if trace:
+            for r in got:
+                t = measure_sim(iterations, repeat=repeat, mode=r["mode"], kernel=kernel,
+                                trace=True)
+                t["slowdown"] = r["ips"] / t["ips"]
+                rows.append(t)
+    return rows
+
+def format_sim(r: dict) -> str:
+    speedup = f" (x{r['speedup']:.1f} sobre naive)" if r.get("speedup") else ""
+    if r.get("trace"):
+        speedup = f" (x{r['slowdown']:.2f} más lento con traza)" if r.get("slowdown") else ""
+    mode = r["mode"] + ("+traza" if r.get("trace") else "")
+    return (f"{r['kernel']:<5} {mode:<16} {r['iterations']} iteraciones: "
+            f"{r['instructions']} instrucciones en {r['seconds'] * 1e3:.1f} ms → "
+            f"{r['ips'] / 1e6:.2f} M instr/s{speedup}")
+
+# ---------------- Comparación ----------------
+
+def compare(baseline: dict, current: dict, *, threshold: float = 0.10,
+            min_delta: float = 0.002) -> List[dict]:
+    """Compara tiempos de pared fase a fase en los tamaños comunes.
+
+    Una fila es regresión si el tiempo crece más de 'threshold' (fracción)
+    y además más de 'min_delta' segundos, para no saltar por ruido en fases
+    de microsegundos."""
+    rows = []
+    for size, cur in current["sizes"].items():
+        base = baseline["sizes"].get(size)
+        if base is None:
+            continue
+        for stage, t in cur["phases"].items():
+            b = base["phases"].get(stage)
+            if b is None:
+                continue
+            old, new = b["wall_s"], t["wall_s"]
+            ratio = new / old if old > 0 else float("inf")
+            rows.append({"size": int(size), "stage": stage, "baseline_s": old, "current_s": new,
+                         "ratio": ratio,
+                         "regression": ratio > 1 + threshold and new - old > min_delta,
+                         "improvement": ratio < 1 - threshold and old - new > min_delta})
+    return rows
+
+def format_comparison(rows: List[dict]) -> str:
+    out = [f"{'líneas':>10} {'fase':<14}{'base (ms)':>12}{'actual (ms)':>13}{'ratio':>8}"]
+    for r in rows:
+        mark = "  REGRESIÓN" if r["regression"] else ("  mejora" if r["improvement"] else "")
+        out.append(f"{r['size']:>10} {r['stage']:<14}{r['baseline_s'] * 1e3:>12.2f}"
+                   f"{r['current_s'] * 1e3:>13.2f}{r['ratio']:>8.2f}{mark}")
+    return "\n".join(out)
+
+def format_results(doc: dict) -> str:
+    stages = [s for s in STAGES if any(s in r["phases"] for r in doc["sizes"].values())]
+    out = [f"{'líneas':>10} " + "".join(f"{s:>14}" for s in stages) + "   (ms, pared)"]
+    for size, r in doc["sizes"].items():
+        out.append(f"{int(size):>10} " + "".join(
+            f"{r['phases'][s]['wall_s'] * 1e3:>14.2f}" if s in r["phases"] else f"{'-':>14}"
+            for s in stages))
+    return "\n".join(out)
+
+def load(path: str) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save(doc: dict, path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,171 @@
+# benchmarks/generator.py
+from __future__ import annotations
+import random
+from typing import Iterator, List, TextIO
+
+# ---------------- Generador de programas RV32I sintéticos ----------------
+#
+# Produce exactamente 'lines' líneas de fuente, reproducibles con 'seed':
+#   - .text: funciones fN (hasta MAX_FUNC líneas, así las ramas B siempre
+#     llegan) con etiquetas locales, ramas hacia delante y hacia atrás,
+#     todas las formas R/I/S/B/U/J/SYS/FENCE y las pseudos li/la/call/j/mv...
+#   - .data: tablas tabK de .word/.half/.byte/.asciz con referencias
+#     simbólicas a otras tablas y reservas .space;
+#   - .bss: búferes bufK.
+# Las líneas se generan en streaming (iter_lines): 10M líneas no necesitan
+# tener el programa entero en memoria para escribirlo a disco.
+
+MAX_FUNC = 200           # líneas por función (≤ 400 palabras: ramas en rango)
+TABLE_LINES = 64         # líneas por tabla de .data
+BSS_LINES = 4
+
+REGS = ["zero", "ra", "sp", "gp", "tp", "t0", "t1", "t2", "s0", "s1", "a0", "a1", "a2",
+        "a3", "a4", "a5", "a6", "a7", "s2", "s3", "s4", "s5", "s6", "s7", "s8", "s9",
+        "s10", "s11", "t3", "t4", "t5", "t6", "x5", "x10", "x31"]
+R_OPS = ["add", "sub", "sll", "slt", "sltu", "xor", "srl", "sra", "or", "and"]
+I_OPS = ["addi", "slti", "sltiu", "xori", "ori", "andi"]
+SH_OPS = ["slli", "srli", "srai"]
+LOADS = ["lb", "lh", "lw", "lbu", "lhu"]
+STORES = ["sb", "sh", "sw"]
+BRANCHES = ["beq", "bne", "blt", "bge", "bltu", "bgeu", "bgt", "ble", "bgtu", "bleu"]
+BRANCHES_Z = ["beqz", "bnez", "blez", "bgez", "bltz", "bgtz"]
+MOVES = ["mv", "not", "neg", "seqz", "snez", "sltz", "sgtz"]
+
+class _Gen:
+    def __init__(self, seed: int) -> None:
+        self.rnd = random.Random(seed)
+
+    def reg(self) -> str:
+        return self.rnd.choice(REGS)
+
+    def statement(self, fn: int, labels: List[str], n_funcs: int, n_tables: int) -> str:
+        r, reg = self.rnd, self.reg
+        k = r.random()
+        if k < 0.20:
+            return f"{r.choice(R_OPS)} {reg()}, {reg()}, {reg()}"
+        if k < 0.36:
+            return f"{r.choice(I_OPS)} {reg()}, {reg()}, {r.randint(-2048, 2047)}"
+        if k < 0.40:
+            return f"{r.choice(SH_OPS)} {reg()}, {reg()}, {r.randint(0, 31)}"
+        if k < 0.48:
+            return f"{r.choice(LOADS)} {reg()}, {r.randint(-2048, 2047)}({reg()})"
+        if k < 0.54:
+            return f"{r.choice(STORES)} {reg()}, {r.randint(-2048, 2047)}({reg()})"
+        if k < 0.64 and labels:
+            return f"{r.choice(BRANCHES)} {reg()}, {reg()}, {r.choice(labels)}"
+        if k < 0.67 and labels:
+            return f"{r.choice(BRANCHES_Z)} {reg()}, {r.choice(labels)}"
+        if k < 0.69 and labels:
+            return r.choice(["jal ra, ", "j "]) + r.choice(labels)
+        if k < 0.71:
+            return f"{r.choice(['lui', 'auipc'])} {reg()}, {r.randint(0, 0x7FFFF):#x}"
+        if k < 0.72:
+            return f"jalr {reg()}, {r.randint(-64, 64)}({reg()})"
+        if k < 0.78:
+            big = r.random() < 0.5
+            return f"li {reg()}, {r.randint(-2**31, 2**31 - 1) if big else r.randint(-2048, 2047)}"
+        if k < 0.82 and n_tables:
+            return f"la {reg()}, tab{r.randrange(n_tables)}"
+        if k < 0.84 and n_tables:
+            return f"{r.choice(LOADS)} {reg()}, tab{r.randrange(n_tables)}"
+        if k < 0.88:
+            return f"call f{r.randint(0, max(0, n_funcs - 1))}"
+        if k < 0.94:
+            return f"{r.choice(MOVES)} {reg()}, {reg()}"
+        if k < 0.95:
+            return r.choice(["ecall", "ebreak", "fence", "fence.i", "ret"])
+        return "nop"
+
+    def function(self, fn: int, size: int, n_funcs: int, n_tables: int) -> Iterator[str]:
+        """Función fN de exactamente 'size' líneas."""
+        r = self.rnd
+        if size < 3:
+            yield from [f"f{fn}:"] + ["    nop"] * (size - 1)
+            return
+        body = size - 2
+        n_labels = min(body, max(1, body // 12))
+        where = set(r.sample(range(body), n_labels))
+        labels = [f"f{fn}_{i}" for i in range(n_labels)]
+        yield f"f{fn}:"
+        li = 0
+        for i in range(body):
+            stmt = self.statement(fn, labels, n_funcs, n_tables)
+            if i in where:
+                # la mitad de las etiquetas van solas en su línea
+                if r.random() < 0.5:
+                    yield f"{labels[li]}:"
+                else:
+                    yield f"{labels[li]}: {stmt}"
+                li += 1
+            else:
+                yield f"    {stmt}"
+        yield "    ret"
+
+    def table_line(self, t: int, i: int, n_tables: int) -> str:
+        r = self.rnd
+        if i == 0:
+            return f"tab{t}: .word " + ", ".join(str(r.randint(-2**31, 2**31 - 1)) for _ in range(8))
+        k = r.random()
+        if k < 0.55:
+            return "    .word " + ", ".join(str(r.randint(0, 2**32 - 1)) for _ in range(8))
+        if k < 0.65:
+            return f"    .word tab{r.randrange(n_tables)}, tab{r.randrange(n_tables)}"
+        if k < 0.75:
+            return "    .half " + ", ".join(str(r.randint(0, 65535)) for _ in range(8))
+        if k < 0.85:
+            return "    .byte " + ", ".join(str(r.randint(0, 255)) for _ in range(16))
+        if k < 0.92:
+            return f'    .asciz "cadena {t}.{i}"'
+        if k < 0.97:
+            return "    .align 2"
+        return f"    .space {r.choice((16, 64, 256))}"
+
+def iter_lines(lines: int, *, seed: int = 0, data_ratio: float = 0.2) -> Iterator[str]:
+    """Las 'lines' líneas del programa, sin '\\n'."""
+    g = _Gen(seed)
+    n_data = int(lines * data_ratio) if lines >= 16 else 0
+    n_tables = max(1, n_data // TABLE_LINES) if n_data else 0
+    n_bss = BSS_LINES if lines >= 64 else 0
+    n_text = lines - n_data - n_bss - 3 * (n_data > 0) - (n_bss > 0)
+    # cabecera (2 líneas) + funciones
+    head = ["    .text", "    .globl f0"]
+    yield from head[:max(0, min(2, lines))]
+    left = n_text - 2
+    fn = 0
+    while left > 0:
+        size = min(left, g.rnd.randint(MAX_FUNC // 4, MAX_FUNC))
+        yield from g.function(fn, size, fn + 1, n_tables)
+        left -= size
+        fn += 1
+    if n_data:
+        yield "    .data"
+        yield "    .align 2"
+        for i in range(n_data):
+            t, j = divmod(i, TABLE_LINES)
+            if t >= n_tables:  # el resto se añade a la última tabla
+                t, j = n_tables - 1, TABLE_LINES
+            yield g.table_line(t, j, n_tables)
+        yield "    .align 2"
+    if n_bss:
+        yield "    .bss"
+        for i in range(n_bss):
+            yield f"buf{i}: .space {g.rnd.choice((256, 1024, 4096))}"
+
+def generate(lines: int, *, seed: int = 0, data_ratio: float = 0.2) -> str:
+    """Programa completo como texto (una línea por elemento de iter_lines)."""
+    return "\n".join(iter_lines(lines, seed=seed, data_ratio=data_ratio)) + "\n"
+
+def write_program(f: TextIO, lines: int, *, seed: int = 0, data_ratio: float = 0.2) -> int:
+    """Escribe el programa en 'f' por bloques; devuelve las líneas escritas."""
+    n = 0
+    buf: List[str] = []
+    for line in iter_lines(lines, seed=seed, data_ratio=data_ratio):
+        buf.append(line)
+        if len(buf) >= 65536:
+            f.write("\n".join(buf) + "\n")
+            n += len(buf)
+            buf.clear()
+    if buf:
+        f.write("\n".join(buf) + "\n")
+        n += len(buf)
+    return n
@@ -1,58 +1,465 @@
 from __future__ import annotations
-import argparse, sys
-from typing import Tuple
+import io, os, sys
+from array import array
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
 
-from .parser import parse
-from .pseudo import expand
-from .linker import first_pass
-from .encoding import encode
-from .writers import write_hex, write_bin
+from .parser import parse, parse_iter
+from .pseudo import expand, expand_iter
+from .ast import Instruction
+from .linker import LinkResult, first_pass
+from .stats import no_phase
+from .cli import build_arg_parser, build_batch_parser
+from .diagnostics import Diagnostic
 
-def assemble_text(text: str, *, filename: str | None = None) -> Tuple[list, list, object, object]:
+# El arranque de la CLI domina en archivos pequeños: aquí sólo se importa el
+# frente (parser, pseudos, pasada 1). Codificador, imagen de .data, writers,
+# ELF, objetos reubicables, caché y estadísticas se importan en la función
+# que los usa, la primera vez que hacen falta (y argparse sólo al parsear
+# argumentos). test_startup.py vigila el presupuesto con -X importtime.
+if TYPE_CHECKING:
+    import argparse
+    from .encoding import Encoded, EncodeResult
+    from .data import DataImage
+    from .cache import BuildCache, CachedBuild
+    from .stats import Stats
+    from .objfile import ObjectFile
+
+def assemble_text(text: str, *, filename: str | None = None,
+                  relocatable: bool = False, stats: Optional[Stats] = None,
+                  **layout: int) -> Tuple[list, list, object, object]:
     """Parsea, expande pseudos, hace PASADA 1 y PASADA 2.
-    Devuelve (nodes_expandidos, diagnostics_totales, link_result, enc_result)."""
-    nodes, diags_parse = parse(text, filename=filename)
-    nodes_e = expand(nodes)
-    link = first_pass(nodes_e)
-    enc = encode(nodes_e, link.symtab, text_base=link.text_base)
-    diags = list(diags_parse) + list(link.diagnostics) + list(enc.diagnostics)
+    Devuelve (nodes_expandidos, diagnostics_totales, link_result, enc_result).
+    'layout' son opciones de first_pass (base_text, base_data, align_text...).
+    Con relocatable=True las secciones empiezan en 0 y el último elemento es
+    un objfile.ObjectFile (para enlazar después con objfile.link_objects).
+    Si se pasa 'stats' (stats.Stats) se rellena con tiempos y contadores."""
+    if relocatable:
+        from .objfile import build_object
+        phase = stats.phase if stats is not None else no_phase
+        nodes_e, diags_parse = _parse_expand(text, filename, stats)
+        with phase("first_pass"):
+            link = first_pass(nodes_e, **{**layout, "base_text": 0, "base_data": 0})
+        with phase("object"):
+            obj = build_object(nodes_e, link, name=filename)
+        return nodes_e, list(diags_parse) + obj.diagnostics, link, obj
+    nodes_e, diags, link, enc, _ = _assemble(text, filename, stats, layout)
     return nodes_e, diags, link, enc
 
-def main(argv=None) -> int:
-    ap = argparse.ArgumentParser(description="RV32I two-pass assembler")
-    ap.add_argument("source", help="archivo .asm/.s de entrada")
-    ap.add_argument("out_hex", help="archivo de salida con palabras en hexadecimal")
-    ap.add_argument("out_bin", help="archivo de salida con palabras en binario ASCII")
-    args = ap.parse_args(argv)
+def _parse_expand(text: str, filename: str | None, stats: Optional[Stats]) -> Tuple[list, list]:
+    if stats is None:
+        nodes, diags = parse(text, filename=filename)
+        return expand(nodes), diags
+    with stats.phase("parse"):
+        nodes, diags = parse(text, filename=filename)
+    with stats.phase("expand"):
+        nodes_e = expand(nodes)
+    stats.count("lines", text.count("\n") + (not text.endswith("\n")))
+    stats.count("nodes", len(nodes))
+    stats.count("instructions", sum(1 for n in nodes if type(n) is Instruction))
+    stats.count("expanded_instructions", sum(1 for n in nodes_e if type(n) is Instruction))
+    return nodes_e, diags
+
+def _assemble(text: str, filename: str | None, stats: Optional[Stats],
+              layout: dict) -> Tuple[list, list, LinkResult, EncodeResult, DataImage]:
+    """Cuerpo de assemble_text(); devuelve además la imagen de .data."""
+    from .encoding import encode
+    from .data import build_data_image
+    phase = stats.phase if stats is not None else no_phase
+    nodes_e, diags_parse = _parse_expand(text, filename, stats)
+    with phase("first_pass"):
+        link = first_pass(nodes_e, **layout)
+    with phase("encode"):
+        enc = encode(nodes_e, link.symtab, text_base=link.text_base)
+    with phase("data"):
+        image = build_data_image(link)
+    diags = (list(diags_parse) + list(link.diagnostics) + list(image.diagnostics)
+             + list(enc.diagnostics))
+    if stats is not None:
+        stats.count("symbols", len(link.symtab))
+        stats.count("words", len(enc.buffer))
+        stats.count("data_bytes", image.size)
+        stats.count("bss_bytes", link.bss_size)
+        stats.count("diagnostics", len(diags))
+    return nodes_e, diags, link, enc, image
+
+def _collect(words: Iterable[Encoded], buf: array) -> Iterator[Encoded]:
+    """Deja pasar las palabras guardando además su valor en 'buf'."""
+    for w in words:
+        buf.append(w.word)
+        yield w
+
+def assemble_stream(src: TextIO, out_hex: str, out_bin: str, *,
+                    filename: str | None = None,
+                    out_raw: Optional[str] = None,
+                    out_elf: Optional[str] = None,
+                    out_data_raw: Optional[str] = None,
+                    out_data_hex: Optional[str] = None) -> Tuple[List[Diagnostic], object, int]:
+    """Ensambla el archivo 'src' (abierto en modo texto, con seek) en streaming.
 
+    PASADA 1 recorre el archivo línea a línea y sólo conserva la tabla de
+    símbolos y los contadores de layout; PASADA 2 vuelve a leerlo y escribe
+    cada palabra en cuanto se codifica. Si se pasa out_raw también se escribe
+    la imagen binaria cruda (little-endian) y con out_elf un ejecutable ELF32
+    (los objetos ET_REL salen de write_outputs). out_data_raw/out_data_hex vuelcan la
+    imagen de .data (dispersa: las reservas no se escriben). Las salidas van
+    a temporales y sólo reemplazan a las definitivas si no hubo errores.
+    Devuelve (diagnostics_totales, link_result, n_palabras).
+    """
+    from .encoding import encode_iter
+    from .data import build_data_image
+    from .writers import write_hex_bin, write_image_hex, write_image_raw
+    diags: List[Diagnostic] = []
+    link = first_pass(expand_iter(parse_iter(src, filename=filename, diags=diags)))
+    diags.extend(link.diagnostics)
+    image = build_data_image(link)
+    diags.extend(image.diagnostics)
+
+    src.seek(0)
+    # Los diagnósticos de parseo ya se recogieron en la pasada 1
+    nodes = expand_iter(parse_iter(src, filename=filename, diags=[]))
+    enc_diags: List[Diagnostic] = []
+    words: Iterable[Encoded] = encode_iter(nodes, link.symtab, text_base=link.text_base, diags=enc_diags)
+    text = array('I')
+    if out_elf:
+        words = _collect(words, text)  # el ELF se escribe al final, con .text completo
+    outs = [out_hex, out_bin, out_raw, out_elf, out_data_raw, out_data_hex]
+    tmps = [p + ".tmp" if p else None for p in outs]
     try:
-        with open(args.source, "r", encoding="utf-8") as f:
-            text = f.read()
-    except Exception as ex:
-        print(f"ERROR: no pude leer {args.source}: {ex}", file=sys.stderr)
-        return 2
+        n = write_hex_bin(words, tmps[0], tmps[1], tmps[2])
+        diags.extend(enc_diags)
+        if any(d.severity == "error" for d in diags):
+            return diags, link, 0
+        if out_elf:
+            from .elf import write_elf
+            write_elf(tmps[3], text, link, data=image)
+        if out_data_raw:
+            write_image_raw(image, tmps[4])
+        if out_data_hex:
+            write_image_hex(image, tmps[5])
+        for tmp, final in zip(tmps, outs):
+            if tmp:
+                os.replace(tmp, final)
+    finally:
+        for p in tmps:
+            if p and os.path.exists(p):
+                os.remove(p)
+    return diags, link, n
+
+def assemble_cached(text: str, cache: BuildCache, *, filename: str | None = None,
+                    includes: Iterable[str] = (), stats: Optional[Stats] = None,
+                    **layout: int) -> Tuple[CachedBuild, bool]:
+    """assemble_text() con caché en disco. En un acierto no se parsea ni se
+    ensambla nada. Devuelve (resultado, acierto)."""
+    from .cache import CachedBuild
+    with (stats.phase("cache") if stats is not None else no_phase("cache")):
+        key = cache.key(text.encode("utf-8"), includes=includes,
+                        options={**layout, "filename": filename})
+        build = cache.get(key)
+    if build is not None:
+        return build, True
+    _, diags, link, enc, image = _assemble(text, filename, stats, layout)
+    build = CachedBuild(words=enc.buffer, image=image, link=link, diagnostics=diags)
+    cache.put(key, build)
+    return build, False
+
+def write_outputs(build: CachedBuild, out_hex: str, out_bin: str, *,
+                  out_raw: Optional[str] = None,
+                  out_elf: Optional[str] = None,
+                  elf_object: Optional[ObjectFile] = None,
+                  out_data_raw: Optional[str] = None,
+                  out_data_hex: Optional[str] = None) -> int:
+    """Escribe las salidas directamente desde los buffers de 'build' (vía
+    temporales, como assemble_stream). Si se pasa 'elf_object' (el objeto
+    del que sale 'build'), out_elf es ese objeto como ELF ET_REL.
+    Devuelve el número de palabras."""
+    from .writers import write_hex_bin, write_image_hex, write_image_raw
+    outs = [out_hex, out_bin, out_raw, out_elf, out_data_raw, out_data_hex]
+    tmps = [p + ".tmp" if p else None for p in outs]
+    try:
+        n = write_hex_bin(build.words, tmps[0], tmps[1], tmps[2])
+        if out_elf and elf_object is not None:
+            from .elf import write_elf_object
+            write_elf_object(tmps[3], elf_object)
+        elif out_elf:
+            from .elf import write_elf
+            write_elf(tmps[3], build.words, build.link, data=build.image)
+        if out_data_raw:
+            write_image_raw(build.image, tmps[4])
+        if out_data_hex:
+            write_image_hex(build.image, tmps[5])
+        for tmp, final in zip(tmps, outs):
+            if tmp:
+                os.replace(tmp, final)
+    finally:
+        for p in tmps:
+            if p and os.path.exists(p):
+                os.remove(p)
+    return n
+
+def run(args: argparse.Namespace, *, stdout: Optional[TextIO] = None,
+        stderr: Optional[TextIO] = None, cache=None,
+        text: Optional[str] = None, cwd: Optional[str] = None) -> Tuple[int, List[Diagnostic]]:
+    """Cuerpo de la CLI sobre argumentos ya parseados.
+
+    'cache' (BuildCache o MemoryCache) sustituye a --cache-dir; 'text' es el
+    fuente ya leído (args.source queda sólo como nombre). Con 'cwd' las
+    rutas relativas se resuelven desde ahí sin cambiar el directorio del
+    proceso; los mensajes muestran las rutas tal como se pasaron.
+    Devuelve (código de salida, diagnósticos).
+    """
+    out = stdout or sys.stdout
+    err = stderr or sys.stderr
 
-    nodes, diags, link, enc = assemble_text(text, filename=args.source)
+    def at(p: Optional[str]) -> Optional[str]:
+        return os.path.join(cwd, p) if cwd and p else p
+
+    stats: Optional[Stats] = None
+    if getattr(args, "stats", False) or getattr(args, "stats_json", None):
+        from .stats import Stats
+        stats = Stats(memory=getattr(args, "stats_memory", False))
+        stats.start()
+    # con '--stats-json -' stdout queda sólo para el JSON
+    try:
+        code, diags = _run(args, err if getattr(args, "stats_json", None) == "-" else out,
+                           err, cache, text, at, stats)
+    finally:
+        if stats is not None:
+            stats.finish()  # también detiene tracemalloc y suelta su cerrojo
+    if stats is not None and code != 2:
+        if args.stats:
+            print(f"Estadísticas de {args.source}:", file=err)
+            print(stats.format_text(), file=err)
+        if args.stats_json == "-":
+            print(stats.to_json(), file=out)
+        elif args.stats_json:
+            try:
+                with open(at(args.stats_json), "w", encoding="utf-8") as f:
+                    f.write(stats.to_json() + "\n")
+            except OSError as ex:
+                print(f"ERROR: no pude escribir {args.stats_json}: {ex}", file=err)
+    return code, diags
+
+def _run(args: argparse.Namespace, out: TextIO, err: TextIO, cache, text: Optional[str],
+         at, stats: Optional[Stats]) -> Tuple[int, List[Diagnostic]]:
+    outputs = dict(out_raw=at(args.raw), out_elf=at(args.elf),
+                   out_data_raw=at(args.data_raw), out_data_hex=at(args.data_hex))
+    # --elf-type rel: todo el archivo se ensambla como objeto (secciones en 0,
+    # campos reubicables a cero, externos permitidos), en memoria y sin caché
+    relocatable = args.elf_type == "rel"
+    if cache is None and args.cache_dir:
+        from .cache import BuildCache, DEFAULT_MAX_BYTES
+        cache = BuildCache(at(args.cache_dir),
+                           max_bytes=args.cache_size << 20 if args.cache_size else DEFAULT_MAX_BYTES)
+
+    hit = False
+    if relocatable or cache is not None or stats is not None:
+        # con --stats se ensambla en memoria (no en streaming) para medir cada fase aparte
+        if text is None:
+            try:
+                with open(at(args.source), "rb") as fb:
+                    text = fb.read().decode("utf-8")
+            except (OSError, UnicodeDecodeError) as ex:
+                print(f"ERROR: no pude leer {args.source}: {ex}", file=err)
+                return 2, []
+        if relocatable:
+            from .cache import CachedBuild
+            _, diags, link, obj = assemble_text(text, filename=args.source, relocatable=True,
+                                                stats=stats)
+            build = CachedBuild(words=obj.text, image=obj.data, link=link, diagnostics=diags)
+            outputs["elf_object"] = obj
+        elif cache is not None:
+            build, hit = assemble_cached(text, cache, filename=args.source, stats=stats)
+        else:
+            from .cache import CachedBuild
+            _, diags, link, enc, image = _assemble(text, args.source, stats, {})
+            build = CachedBuild(words=enc.buffer, image=image, link=link, diagnostics=diags)
+        diags, n_words = build.diagnostics, 0
+        if not any(d.severity == "error" for d in diags):
+            try:
+                with (stats.phase("write") if stats is not None else no_phase("write")):
+                    n_words = write_outputs(build, at(args.out_hex), at(args.out_bin), **outputs)
+            except OSError as ex:
+                print(f"ERROR al escribir salidas: {ex}", file=err)
+                return 3, diags
+            if stats is not None:
+                for p in (args.out_hex, args.out_bin, args.raw, args.elf, args.data_raw, args.data_hex):
+                    if p:
+                        stats.output(p, os.path.getsize(at(p)))
+    else:
+        try:
+            f = open(at(args.source), "r", encoding="utf-8") if text is None else io.StringIO(text)
+        except Exception as ex:
+            print(f"ERROR: no pude leer {args.source}: {ex}", file=err)
+            return 2, []
+
+        with f:
+            try:
+                diags, link, n_words = assemble_stream(f, at(args.out_hex), at(args.out_bin),
+                                                       filename=args.source, **outputs)
+            except UnicodeDecodeError as ex:
+                print(f"ERROR: no pude leer {args.source}: {ex}", file=err)
+                return 2, []
+            except OSError as ex:
+                print(f"ERROR al escribir salidas: {ex}", file=err)
+                return 3, []
 
     had_error = False
     for d in diags:
         # imprimimos todo; si hay error, devolvemos código 1
-        print(d, file=sys.stderr)
+        print(d, file=err)
         if d.severity == "error":
             had_error = True
 
     if had_error:
-        return 1
+        return 1, diags
+
+    outs = ", ".join(p for p in (args.out_hex, args.out_bin, args.raw, args.elf,
+                                         args.data_raw, args.data_hex) if p)
+    print(f"OK: {n_words} instrucciones → {outs}" + (" (desde caché)" if hit else ""), file=out)
+    return 0, diags
 
+# ---------------- Modo por lotes ----------------
+
+# formato de --formats -> (opción de la CLI, extensión); hex y bin son posicionales
+_BATCH_FORMATS = {"raw": ("--raw", ".raw"), "elf": ("--elf", ".elf"),
+                  "data-raw": ("--data-raw", ".data.raw"), "data-hex": ("--data-hex", ".data.hex")}
+_OUTPUT_OPTS = {opt for opt, _ in _BATCH_FORMATS.values()}
+
+# argv de un trabajo: ['--opción=valor'..., '--', fuente, hex, bin]; con '=' y
+# tras '--', los nombres que empiezan por '-' no se confunden con opciones
+
+def _job_source(argv: List[str]) -> str:
+    return argv[-3]
+
+def _job_outputs(argv: List[str]) -> List[str]:
+    """Rutas que escribe un trabajo del lote (hex, bin y las de --formats)."""
+    opts = (a.split("=", 1) for a in argv[:-4])
+    return argv[-2:] + [value for opt, value in opts if opt in _OUTPUT_OPTS]
+
+def _run_argv(argv: List[str]) -> Tuple[int, str, str]:
+    """Un trabajo del lote (en un proceso del pool): la CLI normal con la
+    salida capturada. Devuelve (código, stdout, stderr)."""
+    from contextlib import redirect_stderr
+    out, err = io.StringIO(), io.StringIO()
+    try:
+        with redirect_stderr(err):  # uso y errores de argparse
+            args = build_arg_parser().parse_args(argv)
+        code = run(args, stdout=out, stderr=err)[0]
+    except SystemExit as ex:  # argparse: argumentos inválidos para este archivo
+        code = ex.code if isinstance(ex.code, int) else 2
+    except Exception as ex:  # un archivo no debe tumbar el lote
+        code = 2
+        print(f"ERROR inesperado con {_job_source(argv)}: {ex!r}", file=err)
+    return code, out.getvalue(), err.getvalue()
+
+def batch_jobs(args: argparse.Namespace) -> List[List[str]]:
+    """argv de la CLI para cada archivo del lote, en el orden dado.
+
+    Con --out-dir cada salida conserva la ruta de su fuente relativa a la
+    raíz común de todas (drv/a/main.s y drv/b/main.s -> OUT/a/main.*, OUT/b/main.*).
+    ValueError si dos trabajos escribirían el mismo archivo.
+    """
+    entries: List[List[str]] = [[s] for s in args.sources]
+    if args.manifest:
+        with open(args.manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                fields = line.split("#", 1)[0].split()
+                if fields:
+                    if len(fields) not in (1, 3):
+                        raise ValueError(f"línea de manifiesto inválida: {line.strip()}")
+                    entries.append(fields)
+    formats = [f.strip() for f in args.formats.split(",") if f.strip()]
+    unknown = [f for f in formats if f not in _BATCH_FORMATS and f not in ("hex", "bin")]
+    if unknown:
+        raise ValueError(f"formatos desconocidos: {', '.join(unknown)}")
+    root = ""
+    if args.out_dir and entries:
+        root = os.path.commonpath([os.path.dirname(os.path.abspath(e[0])) for e in entries])
+    jobs = []
+    written: Dict[str, str] = {}  # salida normalizada -> fuente que la escribe
+    for e in entries:
+        src = e[0]
+        if args.out_dir:
+            rel = os.path.relpath(os.path.abspath(src), root)
+            stem = os.path.join(args.out_dir, os.path.splitext(rel)[0])
+        else:
+            stem = os.path.splitext(src)[0]
+        argv = [f"{opt}={stem + ext}" for opt, ext in
+                (_BATCH_FORMATS[f] for f in formats if f in _BATCH_FORMATS)]
+        if args.cache_dir:
+            argv.append(f"--cache-dir={args.cache_dir}")
+        argv += ["--", src] + (e[1:] if len(e) == 3 else [stem + ".hex", stem + ".bin"])
+        for p in _job_outputs(argv):
+            key = os.path.normcase(os.path.abspath(p))
+            if key in written:
+                raise ValueError(f"{written[key]} y {src} escribirían la misma salida: {p}")
+            written[key] = src
+        jobs.append(argv)
+    return jobs
+
+def batch_main(argv: List[str]) -> int:
+    """--batch: ensambla todos los archivos con un ProcessPoolExecutor.
+
+    Los trabajos se lanzan de mayor a menor tamaño (el más lento no queda
+    para el final), pero la salida de cada archivo se imprime en el orden
+    dado. El código de salida es el peor de todos.
+    """
+    args = build_batch_parser().parse_args(argv)
     try:
-        write_hex(enc.words, args.out_hex)
-        write_bin(enc.words, args.out_bin)
-    except Exception as ex:
-        print(f"ERROR al escribir salidas: {ex}", file=sys.stderr)
-        return 3
-
-    print(f"OK: {len(enc.words)} instrucciones → {args.out_hex}, {args.out_bin}")
-    return 0
+        jobs = batch_jobs(args)
+    except (OSError, ValueError) as ex:
+        print(f"ERROR: {ex}", file=sys.stderr)
+        return 2
+    if not jobs:
+        print("ERROR: --batch sin archivos", file=sys.stderr)
+        return 2
+    if args.out_dir:
+        try:
+            for d in {os.path.dirname(p) for j in jobs for p in _job_outputs(j)}:
+                os.makedirs(d or ".", exist_ok=True)
+        except OSError as ex:
+            print(f"ERROR: {ex}", file=sys.stderr)
+            return 2
+
+    def size(i: int) -> int:
+        try:
+            return os.path.getsize(_job_source(jobs[i]))
+        except OSError:
+            return 0
+
+    worst = failed = 0
+
+    def report(result: Tuple[int, str, str]) -> None:
+        nonlocal worst, failed
+        code, out, err = result
+        sys.stdout.write(out)
+        sys.stderr.write(err)
+        worst = max(worst, code)
+        failed += code != 0
+
+    workers = min(args.jobs or os.cpu_count() or 1, len(jobs))
+    if workers <= 1:
+        for j in jobs:
+            report(_run_argv(j))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            order = sorted(range(len(jobs)), key=size, reverse=True)
+            futures = {i: pool.submit(_run_argv, jobs[i]) for i in order}
+            for i in range(len(jobs)):
+                report(futures[i].result())
+    print(f"Lote: {len(jobs)} archivos, {failed} con errores", file=sys.stderr if failed else sys.stdout)
+    return worst
+
+def main(argv=None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if "--batch" in argv:
+        return batch_main(argv)
+    args = build_arg_parser().parse_args(argv)
+    if args.watch:
+        from .watch import watch
+        return watch(args)
+    return run(args)[0]
 
 if __name__ == "__main__":
     raise SystemExit(main())
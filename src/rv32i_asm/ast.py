@@ -3,8 +3,12 @@ dataclases de AST (Instruction, Label, Directive, Operand)
 '''
 
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass
-from typing import List, Union, Optional, Literal
+from typing import Dict, Iterable, Iterator, List, Tuple, Union, Optional, Literal
+
+from .regs import ABI_TO_X
+from .isa import SPEC
 
 # ---- Nodos a nivel de fuente (AST/IR) ----
 
@@ -60,3 +64,261 @@ class Mem:
     offset: Imm
 
 Operand = Union[Reg, Imm, Sym, Mem]
+
+# ---- Operandos canónicos (flyweights) ----
+#
+# Los operandos son inmutables, así que parser, pseudo y encoder comparten
+# una única instancia por registro, inmediatos pequeños y nombres de símbolo.
+
+REGS: Tuple[Reg, ...] = tuple(Reg(name=f"x{i}", num=i) for i in range(32))
+
+# 'x0'..'x31' y todos los alias ABI apuntan al mismo objeto Reg
+REG_TABLE: Dict[str, Reg] = {r.name: r for r in REGS}
+REG_TABLE.update({abi: REGS[int(x[1:])] for abi, x in ABI_TO_X.items()})
+
+# Rango de inmediatos cacheados: cubre imm12 con signo y shamt
+_IMM_MIN, _IMM_MAX = -2048, 4095
+_IMM_CACHE: Dict[int, Imm] = {}
+# Símbolos cacheados como mucho: el servidor y --watch viven mucho tiempo y
+# cada etiqueta de cada petición (más sus variantes @pcrel_hi/@pcrel_lo)
+# se quedaría para siempre; al llenarse, la tabla vuelve a empezar
+SYM_CACHE_MAX = 1 << 16
+_SYM_CACHE: Dict[str, Sym] = {}
+
+IMM_SYMBOLIC_ZERO = Imm(0, origin="symbolic")
+
+def reg(num: int) -> Reg:
+    """Registro canónico xN."""
+    return REGS[num]
+
+def imm(value: int) -> Imm:
+    """Inmediato numérico; los valores pequeños se comparten."""
+    if _IMM_MIN <= value <= _IMM_MAX:
+        i = _IMM_CACHE.get(value)
+        if i is None:
+            i = _IMM_CACHE[value] = Imm(value)
+        return i
+    return Imm(value)
+
+def sym(name: str) -> Sym:
+    """Símbolo internado: un único Sym por nombre."""
+    s = _SYM_CACHE.get(name)
+    if s is None:
+        if len(_SYM_CACHE) >= SYM_CACHE_MAX:
+            _SYM_CACHE.clear()
+        s = _SYM_CACHE[name] = Sym(name)
+    return s
+
+# ---- IR compacta (struct-of-arrays) ----
+#
+# InstructionTable guarda el flujo de nodos en columnas 'array' en lugar de
+# un objeto dataclass por nodo. Las instrucciones bien formadas se codifican
+# en las columnas; directivas y operandos atípicos quedan en una lista
+# auxiliar. Los nodos dataclass se reconstruyen bajo demanda como vista.
+
+class StringPool:
+    """Pool de cadenas: cada cadena distinta se guarda una vez y se referencia por id."""
+
+    def __init__(self) -> None:
+        self.strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+
+    def intern(self, s: str) -> int:
+        i = self._ids.get(s)
+        if i is None:
+            i = self._ids[s] = len(self.strings)
+            self.strings.append(s)
+        return i
+
+    def get(self, s: str) -> Optional[int]:
+        return self._ids.get(s)
+
+    def __getitem__(self, i: int) -> str:
+        return self.strings[i]
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+# Tipos de fila
+ROW_INSTR, ROW_LABEL, ROW_DIRECTIVE, ROW_OPAQUE = 0, 1, 2, 3
+
+# Directivas que cambian de sección
+SECTION_NAMES: Tuple[str, ...] = (".text", ".data", ".bss")
+
+_SECTIONS: Tuple[Optional[str], ...] = (None,) + SECTION_NAMES
+_SECTION_ID: Dict[Optional[str], int] = {s: i for i, s in enumerate(_SECTIONS)}
+
+_I64_MIN, _I64_MAX = -(1 << 63), (1 << 63) - 1
+
+def _reg_roles(mnemonic: str) -> Tuple[str, ...]:
+    """Orden en que los operandos registro ocupan las columnas rd/rs1/rs2."""
+    sp = SPEC.get(mnemonic)
+    if sp is not None and sp.itype == "S":
+        return ("rs2",)          # sw rs2, off(rs1)
+    if sp is not None and sp.itype == "B":
+        return ("rs1", "rs2")    # beq rs1, rs2, off
+    return ("rd", "rs1", "rs2")
+
+class InstructionTable:
+    """Flujo de nodos en columnas compactas.
+
+    Columnas (una entrada por nodo):
+      - kind: ROW_INSTR / ROW_LABEL / ROW_DIRECTIVE / ROW_OPAQUE
+      - mnem: id en 'mnemonics'; sig: id de la firma de operandos en 'signatures'
+        ('R' registro, 'I' inmediato, 'S' símbolo, 'M' imm(rs1), 'm' sym(rs1))
+      - rd, rs1, rs2: números de registro; imm: inmediato; sym: id en 'symbols'
+        (para etiquetas, su nombre)
+      - line, col, section; aux: índice en 'extra' (directivas y filas opacas)
+    """
+
+    def __init__(self) -> None:
+        self.kind = array('B')
+        self.mnem = array('H')
+        self.sig = array('B')
+        self.rd = array('B')
+        self.rs1 = array('B')
+        self.rs2 = array('B')
+        self.imm = array('q')
+        self.sym = array('i')
+        self.line = array('I')
+        self.col = array('I')
+        self.section = array('B')
+        self.aux = array('i')
+        self.mnemonics = StringPool()
+        self.symbols = StringPool()
+        self.signatures = StringPool()
+        self.extra: List[Union[Directive, Instruction]] = []
+        self._roles: Dict[int, Tuple[str, ...]] = {}
+
+    @classmethod
+    def from_nodes(cls, nodes: Iterable[Union[Label, Directive, Instruction]]) -> "InstructionTable":
+        t = cls()
+        for n in nodes:
+            t.append(n)
+        return t
+
+    def __len__(self) -> int:
+        return len(self.kind)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes ocupados por las columnas (sin pools ni 'extra')."""
+        cols = (self.kind, self.mnem, self.sig, self.rd, self.rs1, self.rs2,
+                self.imm, self.sym, self.line, self.col, self.section, self.aux)
+        return sum(c.itemsize * len(c) for c in cols)
+
+    def roles(self, mnem_id: int) -> Tuple[str, ...]:
+        r = self._roles.get(mnem_id)
+        if r is None:
+            r = self._roles[mnem_id] = _reg_roles(self.mnemonics[mnem_id])
+        return r
+
+    def _push(self, kind: int, line: int, col: int, section: Optional[str], *,
+              mnem: int = 0, sig: int = 0, rd: int = 0, rs1: int = 0, rs2: int = 0,
+              imm_v: int = 0, sym_id: int = -1, aux: int = -1) -> None:
+        self.kind.append(kind)
+        self.mnem.append(mnem)
+        self.sig.append(sig)
+        self.rd.append(rd)
+        self.rs1.append(rs1)
+        self.rs2.append(rs2)
+        self.imm.append(imm_v)
+        self.sym.append(sym_id)
+        self.line.append(line)
+        self.col.append(col)
+        self.section.append(_SECTION_ID[section])
+        self.aux.append(aux)
+
+    def _push_extra(self, kind: int, n: Union[Directive, Instruction]) -> None:
+        self.extra.append(n)
+        self._push(kind, n.line, n.col, n.section, aux=len(self.extra) - 1)
+
+    def append(self, n: Union[Label, Directive, Instruction]) -> None:
+        if isinstance(n, Directive):
+            self._push_extra(ROW_DIRECTIVE, n)
+            return
+        if n.section not in _SECTION_ID:
+            self._push_extra(ROW_OPAQUE, n)
+            return
+        if isinstance(n, Label):
+            self._push(ROW_LABEL, n.line, n.col, n.section, sym_id=self.symbols.intern(n.name))
+            return
+        mnem = self.mnemonics.intern(n.mnemonic)
+        if mnem > 0xFFFF:
+            self._push_extra(ROW_OPAQUE, n)
+            return
+        roles = self.roles(mnem)
+        fields = {"rd": 0, "rs1": 0, "rs2": 0}
+        used = set()
+        nreg = 0
+        imm_v, sym_id = 0, -1
+        sig = []
+        for op in n.operands:
+            if isinstance(op, Reg):
+                role = roles[nreg] if nreg < len(roles) else None
+                nreg += 1
+                k = "R"
+            elif isinstance(op, Mem) and op.offset.origin == "numeric" and "imm" not in used:
+                role, k, imm_v = "rs1", "M", op.offset.value
+                used.add("imm")
+                op = op.base
+            elif isinstance(op, Mem) and op.offset == IMM_SYMBOLIC_ZERO and "imm" not in used:
+                role, k = "rs1", "m"
+                used.add("imm")
+                op = op.base
+            elif isinstance(op, Imm) and op.origin == "numeric":
+                role, k, imm_v = "imm", "I", op.value
+            elif isinstance(op, Sym):
+                role, k, sym_id = "imm", "S", self.symbols.intern(op.name)
+            else:
+                role = None
+            if (role is None or role in used
+                    or (role != "imm" and not (0 <= op.num < 32 and REGS[op.num] == op))):
+                self._push_extra(ROW_OPAQUE, n)
+                return
+            used.add(role)
+            if role != "imm":
+                fields[role] = op.num
+            sig.append(k)
+        if not (_I64_MIN <= imm_v <= _I64_MAX) or len(self.mnemonics) > 0xFFFF:
+            self._push_extra(ROW_OPAQUE, n)
+            return
+        self._push(ROW_INSTR, n.line, n.col, n.section, mnem=mnem,
+                   sig=self.signatures.intern("".join(sig)),
+                   rd=fields["rd"], rs1=fields["rs1"], rs2=fields["rs2"],
+                   imm_v=imm_v, sym_id=sym_id)
+
+    def operands(self, i: int) -> List[Operand]:
+        """Reconstruye la lista de operandos de la fila de instrucción i."""
+        roles = self.roles(self.mnem[i])
+        cols = {"rd": self.rd[i], "rs1": self.rs1[i], "rs2": self.rs2[i]}
+        ops: List[Operand] = []
+        nreg = 0
+        for k in self.signatures[self.sig[i]]:
+            if k == "R":
+                ops.append(REGS[cols[roles[nreg]]])
+                nreg += 1
+            elif k == "I":
+                ops.append(imm(self.imm[i]))
+            elif k == "S":
+                ops.append(sym(self.symbols[self.sym[i]]))
+            elif k == "M":
+                ops.append(Mem(base=REGS[self.rs1[i]], offset=imm(self.imm[i])))
+            else:
+                ops.append(Mem(base=REGS[self.rs1[i]], offset=IMM_SYMBOLIC_ZERO))
+        return ops
+
+    def node(self, i: int) -> Union[Label, Directive, Instruction]:
+        """Vista dataclass de la fila i (para tests y diagnósticos)."""
+        kind = self.kind[i]
+        if kind == ROW_DIRECTIVE or kind == ROW_OPAQUE:
+            return self.extra[self.aux[i]]
+        section = _SECTIONS[self.section[i]]
+        if kind == ROW_LABEL:
+            return Label(name=self.symbols[self.sym[i]], line=self.line[i], col=self.col[i], section=section)
+        return Instruction(mnemonic=self.mnemonics[self.mnem[i]], operands=self.operands(i),
+                           line=self.line[i], col=self.col[i], section=section)
+
+    def __iter__(self) -> Iterator[Union[Label, Directive, Instruction]]:
+        for i in range(len(self.kind)):
+            yield self.node(i)
@@ -0,0 +1,226 @@
+# src/rv32i_asm/cache.py
+from __future__ import annotations
+import hashlib, marshal, os, sys, tempfile, threading
+from array import array
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from . import __version__
+from .linker import LinkResult
+from .data import DataImage
+from .diagnostics import Diagnostic
+
+# ---------------- Caché de compilación en disco ----------------
+#
+# Cada entrada guarda el resultado completo de un ensamblado (palabras de
+# .text, imagen de .data, symtab/layout y diagnósticos) bajo la clave
+# sha256 de todo lo que lo determina: versión del paquete, opciones de
+# layout, bytes del fuente y de los archivos incluidos. Una entrada nunca
+# cambia: si cambia algo de la entrada, cambia la clave.
+#
+# La antigüedad LRU es la mtime del archivo (get() la actualiza); put()
+# expulsa las entradas más antiguas mientras el total supere max_bytes.
+
+CACHE_MAGIC = b"RV32BLD\x01"
+CACHE_SUFFIX = ".rvc"
+DEFAULT_MAX_BYTES = 256 << 20
+
+@dataclass(frozen=True)
+class CachedBuild:
+    """Resultado de ensamblado guardable: todo lo que necesitan las salidas."""
+    words: array                # array('I') con .text
+    image: DataImage            # .data (dispersa)
+    link: LinkResult            # symtab, secciones y layout (sin data_chunks)
+    diagnostics: List[Diagnostic]
+
+def _pack(build: CachedBuild) -> bytes:
+    words = array('I', build.words)
+    if sys.byteorder == "big":
+        words.byteswap()
+    lk = build.link
+    payload = (
+        words.tobytes(),
+        build.image.base, build.image.size,
+        [(off, bytes(seg)) for off, seg in build.image.segments],
+        dict(lk.symtab), dict(lk.sections), sorted(lk.global_symbols),
+        (lk.text_base, lk.data_base, lk.text_size, lk.data_size, lk.bss_base, lk.bss_size),
+        [(d.severity, d.message, d.line, d.col, d.hint, d.file) for d in build.diagnostics],
+    )
+    return CACHE_MAGIC + marshal.dumps(payload)
+
+def _unpack(raw: bytes) -> Optional[CachedBuild]:
+    if not raw.startswith(CACHE_MAGIC):
+        return None
+    try:
+        (words_raw, base, size, segs, symtab, sections, globals_,
+         layout, diags) = marshal.loads(raw[len(CACHE_MAGIC):])
+    except (EOFError, ValueError, TypeError):
+        return None
+    words = array('I', words_raw)
+    if sys.byteorder == "big":
+        words.byteswap()
+    text_base, data_base, text_size, data_size, bss_base, bss_size = layout
+    link = LinkResult(symtab=symtab, text_base=text_base, data_base=data_base,
+                      text_size=text_size, data_size=data_size, diagnostics=[],
+                      sections=sections, bss_base=bss_base, bss_size=bss_size,
+                      global_symbols=set(globals_))
+    image = DataImage(base=base, size=size,
+                      segments=[(off, bytearray(seg)) for off, seg in segs], diagnostics=[])
+    return CachedBuild(words=words, image=image, link=link,
+                       diagnostics=[Diagnostic(*d) for d in diags])
+
+def cache_key(source: bytes, *, includes: Iterable[str] = (),
+              options: Optional[Dict[str, object]] = None) -> str:
+    """Clave sha256 de versión + opciones + fuente + archivos incluidos."""
+    h = hashlib.sha256()
+    h.update(CACHE_MAGIC + __version__.encode() + b"\0")
+    h.update(repr(sorted((options or {}).items())).encode() + b"\0")
+    h.update(len(source).to_bytes(8, "little") + source)
+    for path in includes:
+        with open(path, "rb") as f:
+            content = f.read()
+        h.update(os.fsencode(path) + b"\0" + len(content).to_bytes(8, "little") + content)
+    return h.hexdigest()
+
+class BuildCache:
+    """Caché direccionada por contenido en 'directory', acotada a max_bytes."""
+
+    def __init__(self, directory: str, *, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, source: bytes, *, includes: Iterable[str] = (),
+            options: Optional[Dict[str, object]] = None) -> str:
+        return cache_key(source, includes=includes, options=options)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key + CACHE_SUFFIX)
+
+    def get(self, key: str) -> Optional[CachedBuild]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                raw = f.read()
+        except OSError:
+            self.misses += 1
+            return None
+        build = _unpack(raw)
+        if build is None:
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)  # uso reciente (LRU)
+        except OSError:
+            pass
+        self.hits += 1
+        return build
+
+    def put(self, key: str, build: CachedBuild) -> bool:
+        """Guarda la entrada (escritura atómica) y aplica el límite de tamaño.
+        La caché es un atajo: si no se puede escribir devuelve False."""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_pack(build))
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            return False
+        self.evict()
+        return True
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        out: List[Tuple[float, int, str]] = []
+        try:
+            subdirs = list(os.scandir(self.directory))
+        except OSError:
+            return out
+        for sub in subdirs:
+            if not sub.is_dir():
+                continue
+            for e in os.scandir(sub.path):
+                if e.name.endswith(CACHE_SUFFIX):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue  # otro proceso la expulsó
+                    out.append((st.st_mtime, st.st_size, e.path))
+        return out
+
+    def size(self) -> int:
+        """Bytes ocupados por las entradas."""
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self) -> int:
+        """Borra las entradas menos usadas hasta quedar en max_bytes.
+        Devuelve los bytes liberados."""
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            freed += size
+        return freed
+
+class MemoryCache:
+    """Caché LRU en memoria con la misma interfaz que BuildCache (key/get/put),
+    opcionalmente respaldada por una BuildCache en disco. Segura entre hilos:
+    la usa el modo servidor, donde los resultados quedan calientes entre
+    peticiones."""
+
+    def __init__(self, *, max_entries: int = 256, backing: Optional[BuildCache] = None) -> None:
+        self.max_entries = max_entries
+        self.backing = backing
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedBuild]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def key(self, source: bytes, *, includes: Iterable[str] = (),
+            options: Optional[Dict[str, object]] = None) -> str:
+        return cache_key(source, includes=includes, options=options)
+
+    def _remember(self, key: str, build: CachedBuild) -> None:
+        with self._lock:
+            self._entries[key] = build
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, key: str) -> Optional[CachedBuild]:
+        with self._lock:
+            build = self._entries.get(key)
+            if build is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return build
+        build = self.backing.get(key) if self.backing is not None else None
+        if build is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        self._remember(key, build)
+        with self._lock:
+            self.hits += 1
+        return build
+
+    def put(self, key: str, build: CachedBuild) -> bool:
+        self._remember(key, build)
+        if self.backing is not None:
+            return self.backing.put(key, build)
+        return True
@@ -0,0 +1,58 @@
+# src/rv32i_asm/cli.py
+from __future__ import annotations
+import os
+from typing import TYPE_CHECKING
+
+# Sólo la definición de argumentos: la importan tanto assembler.main como
+# el cliente ligero del modo servidor, que no debe cargar el ensamblador.
+# argparse se importa al construir el parser, no al importar el módulo.
+if TYPE_CHECKING:
+    import argparse
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    import argparse
+    ap = argparse.ArgumentParser(description="RV32I two-pass assembler")
+    ap.add_argument("source", help="archivo .asm/.s de entrada")
+    ap.add_argument("out_hex", help="archivo de salida con palabras en hexadecimal")
+    ap.add_argument("out_bin", help="archivo de salida con palabras en binario ASCII")
+    ap.add_argument("--raw", metavar="ARCHIVO", default=None,
+                    help="además, imagen binaria cruda (4 bytes little-endian por palabra)")
+    ap.add_argument("--elf", metavar="ARCHIVO", default=None,
+                    help="además, objeto ELF32 RISC-V (.text/.data/.bss/.symtab/.strtab)")
+    ap.add_argument("--elf-type", choices=("exec", "rel"), default="exec",
+                    help="tipo de ELF: ejecutable (exec, por defecto) o reubicable (rel)")
+    ap.add_argument("--data-raw", metavar="ARCHIVO", default=None,
+                    help="además, imagen cruda de .data (las reservas quedan como huecos)")
+    ap.add_argument("--data-hex", metavar="ARCHIVO", default=None,
+                    help="además, imagen de .data en hex con saltos '@dirección' sobre las reservas")
+    ap.add_argument("--cache-dir", metavar="DIR", default=os.environ.get("RV32I_ASM_CACHE"),
+                    help="caché de compilación en disco (por defecto $RV32I_ASM_CACHE)")
+    ap.add_argument("--cache-size", metavar="MiB", type=int, default=None,
+                    help="tamaño máximo de la caché (por defecto 256); se expulsan las entradas menos usadas")
+    ap.add_argument("--stats", action="store_true",
+                    help="tiempos por fase, contadores y bytes de salida (texto, en stderr)")
+    ap.add_argument("--stats-json", metavar="ARCHIVO", default=None,
+                    help="las mismas estadísticas en JSON ('-' para stdout)")
+    ap.add_argument("--stats-memory", action="store_true",
+                    help="con --stats/--stats-json, pico de memoria con tracemalloc (ralentiza el ensamblado)")
+    ap.add_argument("--watch", action="store_true",
+                    help="seguir vigilando el fuente y reensamblar (incrementalmente) al guardarlo")
+    return ap
+
+def build_batch_parser() -> argparse.ArgumentParser:
+    import argparse
+    ap = argparse.ArgumentParser(description="RV32I: ensamblado de muchos archivos en paralelo")
+    ap.add_argument("--batch", action="store_true", required=True,
+                    help="modo por lotes (en lugar de 'source out_hex out_bin')")
+    ap.add_argument("sources", nargs="*", help="archivos .s a ensamblar")
+    ap.add_argument("--manifest", metavar="ARCHIVO", default=None,
+                    help="lista de trabajos: 'fuente [out_hex out_bin]' por línea ('#' comenta)")
+    ap.add_argument("--out-dir", metavar="DIR", default=None,
+                    help="directorio de salida (por defecto, junto a cada fuente)")
+    ap.add_argument("--formats", default="hex,bin",
+                    help="salidas por archivo: hex,bin,raw,elf,data-raw,data-hex (por defecto hex,bin)")
+    ap.add_argument("-j", "--jobs", type=int, default=None,
+                    help="procesos en paralelo (por defecto, nº de CPUs)")
+    ap.add_argument("--cache-dir", metavar="DIR", default=os.environ.get("RV32I_ASM_CACHE"),
+                    help="caché de compilación en disco compartida por los procesos")
+    return ap
@@ -0,0 +1,89 @@
+# src/rv32i_asm/client.py
+from __future__ import annotations
+import os, sys
+from typing import List, Optional
+
+from .cli import build_arg_parser
+
+# ---------------- Cliente del modo servidor ----------------
+#
+# 'python -m rv32i_asm <args de la CLI>' sólo parsea los argumentos, envía
+# la petición al servidor (server.py) y reproduce stdout/stderr y el código
+# de salida: no importa el ensamblador salvo si no hay servidor, en cuyo
+# caso ensambla en el propio proceso.
+#
+# Protocolo: una línea JSON por petición y otra por respuesta.
+#   petición:  {"args": {...argumentos de la CLI...}, "cwd": "...", "text": "..."?}
+#   respuesta: {"code": n, "stdout": "...", "stderr": "...", "diagnostics": [...]}
+#
+# Sin servidor (el caso normal) el arranque cuenta: si el socket no existe
+# no se llega a importar socket ni json.
+#
+# El socket no va en una ruta fija de /tmp (cualquiera podría crearlo antes
+# y recibir los fuentes): por defecto vive en $XDG_RUNTIME_DIR o en un
+# directorio 0700 del usuario, el servidor lo crea con umask 077 y el
+# cliente sólo habla con un socket que sea del usuario actual.
+
+SOCKET_NAME = "rv32i_asm.sock"
+
+def private_socket_dir() -> str:
+    """Directorio privado del usuario para el socket: $XDG_RUNTIME_DIR o,
+    si no hay, rv32i_asm-UID bajo el temporal del sistema (server.py lo
+    crea con modo 0700 y rechaza uno ajeno)."""
+    run_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if run_dir:
+        return run_dir
+    import tempfile
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    return os.path.join(tempfile.gettempdir(), f"rv32i_asm-{uid}")
+
+def default_socket() -> str:
+    return os.environ.get("RV32I_ASM_SOCKET") or os.path.join(private_socket_dir(), SOCKET_NAME)
+
+def owned_by_user(st: os.stat_result) -> bool:
+    """True si el archivo es del usuario actual (siempre, sin uids)."""
+    return not hasattr(os, "getuid") or st.st_uid == os.getuid()
+
+def request(job: dict, path: Optional[str] = None) -> dict:
+    """Envía una petición al servidor y devuelve la respuesta (OSError si no hay)."""
+    import json, socket
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(path or default_socket())
+        s.sendall(json.dumps(job).encode("utf-8") + b"\n")
+        with s.makefile("rb") as f:
+            line = f.readline()
+    if not line:
+        raise ConnectionError("el servidor cerró la conexión sin responder")
+    return json.loads(line)
+
+def client_main(argv: Optional[List[str]] = None, *, socket_path: Optional[str] = None) -> int:
+    """Sustituto de assembler.main: mismos argumentos, salida y código."""
+    args = build_arg_parser().parse_args(argv)
+    if args.watch:
+        from .watch import watch  # el estado incremental vive en este proceso
+        return watch(args)
+    path = socket_path or default_socket()
+    try:
+        if not owned_by_user(os.stat(path)):
+            print(f"AVISO: ignoro {path}: el socket no es del usuario actual", file=sys.stderr)
+            raise PermissionError(path)
+        reply = request({"args": vars(args), "cwd": os.getcwd()}, path)
+    except OSError:
+        from .assembler import run  # sin servidor: en el propio proceso
+        return run(args)[0]
+    sys.stdout.write(reply["stdout"])
+    sys.stderr.write(reply["stderr"])
+    return reply["code"]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if argv[:1] == ["serve"]:
+        from .server import serve
+        return serve(argv[1:])
+    if "--batch" in argv:
+        from .assembler import batch_main  # el lote ya reparte el trabajo en procesos
+        return batch_main(argv)
+    return client_main(argv)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
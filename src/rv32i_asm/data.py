@@ -0,0 +1,84 @@
+# src/rv32i_asm/data.py
+from __future__ import annotations
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from .linker import LinkResult
+from .diagnostics import Diagnostic, error
+
+# ---------------- Emisión de la sección .data ----------------
+
+# Las reservas (.space/.skip) de al menos este tamaño quedan como huecos;
+# las menores se materializan junto a los datos vecinos.
+SPARSE_MIN = 4096
+
+@dataclass(frozen=True)
+class DataImage:
+    """Imagen dispersa de .data: sólo los tramos con contenido ocupan memoria.
+
+    'segments' son (offset, bytes) ordenados y disjuntos; todo lo que queda
+    fuera de ellos hasta 'size' son ceros (reservas .space/.skip).
+    """
+    base: int
+    size: int
+    segments: List[Tuple[int, bytearray]]
+    diagnostics: List[Diagnostic]
+
+    @property
+    def data(self) -> bytearray:
+        """Imagen contigua completa (materializa los huecos)."""
+        out = bytearray(self.size)
+        for off, seg in self.segments:
+            out[off:off + len(seg)] = seg
+        return out
+
+    def materialized(self) -> int:
+        """Bytes realmente reservados en memoria."""
+        return sum(len(seg) for _, seg in self.segments)
+
+def _segments(link: LinkResult) -> List[Tuple[int, bytearray]]:
+    segs: List[Tuple[int, bytearray]] = []
+    start = 0
+    for off, size in link.data_holes:
+        if size < SPARSE_MIN:
+            continue
+        if off > start:
+            segs.append((start, bytearray(off - start)))
+        start = off + size
+    if link.data_size > start:
+        segs.append((start, bytearray(link.data_size - start)))
+    return segs
+
+def build_data_image(link: LinkResult, *, resolve: bool = True) -> DataImage:
+    """Construye la imagen de .data a partir de los DataChunk de la pasada 1.
+
+    Cada tramo sin huecos grandes se reserva una sola vez como bytearray
+    (relleno con ceros: alineaciones y .space pequeños no necesitan
+    escribirse) y cada directiva se copia con una asignación de slice desde
+    su buffer ya parseado. Los valores simbólicos (p.ej. '.word etiqueta')
+    se resuelven aquí con la symtab; con resolve=False quedan a cero (objetos
+    reubicables: los rellena el enlazador).
+    """
+    segs = _segments(link)
+    diags: List[Diagnostic] = []
+    symtab = link.symtab
+    k = 0
+    for ch in link.data_chunks:
+        src = memoryview(ch.payload).cast("B")
+        if not len(src):
+            continue
+        # los chunks van en orden y nunca caen dentro de un hueco
+        while segs[k][0] + len(segs[k][1]) <= ch.offset:
+            k += 1
+        seg_off, buf = segs[k]
+        at = ch.offset - seg_off
+        buf[at:at + len(src)] = src
+        if not resolve:
+            continue
+        for rel, width, name in ch.fixups:
+            value = symtab.get(name)
+            if value is None:
+                diags.append(error(f"Símbolo no definido en datos: {name}", line=ch.line, col=ch.col))
+                continue
+            buf[at + rel:at + rel + width] = (value & ((1 << (8 * width)) - 1)).to_bytes(width, "little")
+    return DataImage(base=link.data_base, size=link.data_size, segments=segs, diagnostics=diags)
@@ -0,0 +1,267 @@
+# src/rv32i_asm/elf.py
+from __future__ import annotations
+import struct
+from typing import Dict, List, Optional, Tuple, Union
+
+from .linker import LinkResult
+from .data import DataImage, build_data_image
+from .objfile import ObjectFile, R_RISCV_PCREL_LO12_I
+from .writers import Words, _chunks, _raw_bytes
+
+# ---------------- Constantes ELF32 ----------------
+
+ET_REL, ET_EXEC = 1, 2
+EM_RISCV = 243
+EV_CURRENT = 1
+
+SHT_NULL, SHT_PROGBITS, SHT_SYMTAB, SHT_STRTAB, SHT_RELA, SHT_NOBITS = 0, 1, 2, 3, 4, 8
+SHF_WRITE, SHF_ALLOC, SHF_EXECINSTR, SHF_INFO_LINK = 0x1, 0x2, 0x4, 0x40
+SHN_UNDEF, SHN_ABS = 0, 0xFFF1
+
+STB_LOCAL, STB_GLOBAL = 0, 1
+STT_NOTYPE, STT_SECTION = 0, 3
+
+PT_LOAD = 1
+PF_X, PF_W, PF_R = 0x1, 0x2, 0x4
+
+IDENT = b"\x7fELF" + bytes([1, 1, EV_CURRENT, 0]) + bytes(8)  # ELFCLASS32, ELFDATA2LSB
+
+PAGE = 0x1000  # alineación de los segmentos cargables en ejecutables
+
+EHDR = struct.Struct("<16sHHIIIIIHHHHHH")   # 52 bytes
+PHDR = struct.Struct("<IIIIIIII")           # 32 bytes
+SHDR = struct.Struct("<IIIIIIIIII")         # 40 bytes
+SYM = struct.Struct("<IIIBBH")              # 16 bytes
+RELA = struct.Struct("<IIi")                # 12 bytes
+
+# Índices fijos de sección (en ET_REL, .rela.text y .rela.data van tras .bss)
+SEC_TEXT, SEC_DATA, SEC_BSS, SEC_SYMTAB, SEC_STRTAB, SEC_SHSTRTAB = range(1, 7)
+REL_RELA_TEXT, REL_RELA_DATA, REL_SYMTAB, REL_STRTAB, REL_SHSTRTAB = range(4, 9)
+_SEC_INDEX = {".text": SEC_TEXT, ".data": SEC_DATA, ".bss": SEC_BSS}
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+class StrTab:
+    """Tabla de cadenas ELF (con la cadena vacía en el offset 0)."""
+
+    def __init__(self) -> None:
+        self.data = bytearray(b"\0")
+        self._offsets: Dict[str, int] = {"": 0}
+
+    def add(self, name: str) -> int:
+        off = self._offsets.get(name)
+        if off is None:
+            off = len(self.data)
+            self.data += name.encode("utf-8") + b"\0"
+            self._offsets[name] = off
+        return off
+
+def _section_symbols() -> bytearray:
+    out = bytearray(SYM.size)  # símbolo nulo
+    for idx in (SEC_TEXT, SEC_DATA, SEC_BSS):
+        out += SYM.pack(0, 0, 0, STB_LOCAL << 4 | STT_SECTION, 0, idx)
+    return out
+
+def _symbols(link: LinkResult, strtab: StrTab) -> Tuple[bytearray, int]:
+    """Contenido de .symtab y número de símbolos locales (sh_info)."""
+    out = _section_symbols()
+    # ELF exige los símbolos locales antes que los globales
+    for bind in (STB_LOCAL, STB_GLOBAL):
+        for name, value in link.symtab.items():
+            if (name in link.global_symbols) != (bind == STB_GLOBAL):
+                continue
+            sec = link.sections.get(name)
+            shndx = _SEC_INDEX.get(sec, SHN_ABS) if sec else SHN_ABS
+            out += SYM.pack(strtab.add(name), value & 0xFFFFFFFF, 0,
+                            bind << 4 | STT_NOTYPE, 0, shndx)
+        if bind == STB_LOCAL:
+            n_local = len(out) // SYM.size
+    return out, n_local
+
+def write_elf(
+    path: str,
+    words: Words,
+    link: LinkResult,
+    *,
+    data: Union[DataImage, Buffer, None] = None,
+    bss_size: Optional[int] = None,
+) -> int:
+    """Escribe un ejecutable ELF32 RISC-V little-endian (ET_EXEC) con .text,
+    .data, .bss, .symtab y .strtab (más .shstrtab).
+
+    'words' es cualquier fuente de palabras de writers (EncodeResult, buffer
+    o iterable de Encoded) y se vuelca por bloques sin copias; 'data' es la
+    imagen de .data (por defecto, data.build_data_image(link)): los huecos
+    de una DataImage se saltan con seek, así que el archivo queda disperso.
+    .bss (NOBITS, por defecto link.bss_size) no ocupa bytes en el archivo.
+    Hay un PT_LOAD para .text y otro para .data/.bss. Devuelve el tamaño del
+    archivo en bytes. Los objetos reubicables se escriben con write_elf_object().
+    """
+    if data is None:
+        data = build_data_image(link)
+    if isinstance(data, DataImage):
+        data_len, data_segs = data.size, data.segments
+    else:
+        view = memoryview(data).cast("B")
+        data_len, data_segs = len(view), [(0, view)]
+    if bss_size is None:
+        bss_size = link.bss_size
+    text_base, data_base = link.text_base, link.data_base
+    has_data_seg = data_len > 0 or bss_size > 0
+    phnum = 1 + has_data_seg
+
+    def place(cur: int, vaddr: int) -> int:
+        return cur + ((vaddr - cur) % PAGE)  # offset ≡ vaddr (mod PAGE)
+
+    with open(path, "wb") as f:
+        def pad_to(off: int) -> None:
+            cur = f.tell()
+            if off > cur:
+                f.write(bytes(off - cur))
+
+        pad_to(EHDR.size + phnum * PHDR.size)
+
+        # .text (en streaming: el tamaño se conoce al terminar)
+        text_off = place(f.tell(), text_base)
+        pad_to(text_off)
+        text_size = 0
+        for chunk in _chunks(words):
+            text_size += f.write(_raw_bytes(chunk))
+
+        # .data (+ .bss, sin bytes en el archivo)
+        data_off = place(f.tell(), data_base)
+        pad_to(data_off)
+        for off, seg in data_segs:
+            f.seek(data_off + off)
+            f.write(seg)
+        f.seek(data_off + data_len)
+
+        # .symtab / .strtab / .shstrtab
+        strtab = StrTab()
+        symtab, n_local = _symbols(link, strtab)
+        shstr = StrTab()
+        names = [shstr.add(n) for n in ("", ".text", ".data", ".bss", ".symtab", ".strtab", ".shstrtab")]
+
+        symtab_off = (f.tell() + 3) & ~3
+        pad_to(symtab_off)
+        f.write(symtab)
+        strtab_off = f.tell()
+        f.write(strtab.data)
+        shstr_off = f.tell()
+        f.write(shstr.data)
+        shoff = (f.tell() + 3) & ~3
+        pad_to(shoff)
+
+        sections = [
+            (0, SHT_NULL, 0, 0, 0, 0, 0, 0, 0, 0),
+            (names[1], SHT_PROGBITS, SHF_ALLOC | SHF_EXECINSTR, text_base, text_off, text_size, 0, 0, 4, 0),
+            (names[2], SHT_PROGBITS, SHF_ALLOC | SHF_WRITE, data_base, data_off, data_len, 0, 0, 4, 0),
+            (names[3], SHT_NOBITS, SHF_ALLOC | SHF_WRITE, data_base + data_len,
+             data_off + data_len, bss_size, 0, 0, 4, 0),
+            (names[4], SHT_SYMTAB, 0, 0, symtab_off, len(symtab), SEC_STRTAB, n_local, 4, SYM.size),
+            (names[5], SHT_STRTAB, 0, 0, strtab_off, len(strtab.data), 0, 0, 1, 0),
+            (names[6], SHT_STRTAB, 0, 0, shstr_off, len(shstr.data), 0, 0, 1, 0),
+        ]
+        for sh in sections:
+            f.write(SHDR.pack(*sh))
+        total = f.tell()
+
+        # Cabeceras al principio del archivo
+        phdrs = [PHDR.pack(PT_LOAD, text_off, text_base, text_base, text_size, text_size,
+                           PF_R | PF_X, PAGE)]
+        if has_data_seg:
+            phdrs.append(PHDR.pack(PT_LOAD, data_off, data_base, data_base, data_len,
+                                   data_len + bss_size, PF_R | PF_W, PAGE))
+        entry = link.symtab["_start"] if link.sections.get("_start") == ".text" else text_base
+        f.seek(0)
+        f.write(EHDR.pack(IDENT, ET_EXEC, EM_RISCV, EV_CURRENT, entry & 0xFFFFFFFF, EHDR.size,
+                          shoff, 0, EHDR.size, PHDR.size, phnum, SHDR.size, len(sections),
+                          SEC_SHSTRTAB))
+        for ph in phdrs:
+            f.write(ph)
+    return total
+
+# ---------------- Objetos reubicables ----------------
+
+def write_elf_object(path: str, obj: ObjectFile) -> int:
+    """Escribe el objeto 'obj' (objfile.build_object) como ELF32 ET_REL.
+
+    Las secciones tienen dirección 0 y los campos dependientes de la
+    posición van a cero en .text/.data; .rela.text y .rela.data llevan sus
+    reubicaciones R_RISCV_* (addend 0) y los símbolos externos quedan como
+    globales SHN_UNDEF. Como pide el psABI, cada R_RISCV_PCREL_LO12_I apunta
+    a una etiqueta local en su auipc (.Lpcrel_hiN), no al símbolo.
+    Devuelve el tamaño del archivo en bytes.
+    """
+    local: List[Tuple[str, int, int]] = []
+    glob: List[Tuple[str, int, int]] = []
+    for name, s in obj.symbols.items():
+        shndx = _SEC_INDEX.get(s.section, SHN_ABS) if s.section else SHN_ABS
+        (glob if s.binding == "global" else local).append((name, s.value, shndx))
+    pcrel_hi: Dict[int, str] = {}  # offset del auipc -> su etiqueta
+    for r in obj.relocations:
+        if r.type == R_RISCV_PCREL_LO12_I and r.pair not in pcrel_hi:
+            pcrel_hi[r.pair] = f".Lpcrel_hi{len(pcrel_hi)}"
+            local.append((pcrel_hi[r.pair], r.pair, SEC_TEXT))
+    glob += [(name, 0, SHN_UNDEF) for name in obj.undefined]
+
+    strtab = StrTab()
+    symtab = _section_symbols()
+    index: Dict[str, int] = {}
+    for bind, entries in ((STB_LOCAL, local), (STB_GLOBAL, glob)):
+        if bind == STB_GLOBAL:
+            n_local = len(symtab) // SYM.size
+        for name, value, shndx in entries:
+            index[name] = len(symtab) // SYM.size
+            symtab += SYM.pack(strtab.add(name), value & 0xFFFFFFFF, 0,
+                               bind << 4 | STT_NOTYPE, 0, shndx)
+
+    rela = {".text": bytearray(), ".data": bytearray()}
+    for r in obj.relocations:
+        target = pcrel_hi[r.pair] if r.type == R_RISCV_PCREL_LO12_I else r.symbol
+        rela[r.section] += RELA.pack(r.offset, index[target] << 8 | r.type, 0)
+
+    shstr = StrTab()
+    names = [shstr.add(n) for n in ("", ".text", ".data", ".bss", ".rela.text", ".rela.data",
+                                    ".symtab", ".strtab", ".shstrtab")]
+    with open(path, "wb") as f:
+        def put(blob: Buffer, align: int = 4) -> int:
+            off = f.tell()
+            off += -off % align
+            f.seek(off)
+            f.write(blob)
+            return off
+
+        f.write(bytes(EHDR.size))
+        text_off = put(_raw_bytes(obj.text))
+        # .data dispersa: sólo se escriben sus segmentos, los huecos se saltan con seek
+        data_off = put(b"")
+        for off, seg in obj.data.segments:
+            f.seek(data_off + off)
+            f.write(seg)
+        f.seek(data_off + obj.data.size)
+        rela_text_off = put(rela[".text"])
+        rela_data_off = put(rela[".data"])
+        symtab_off = put(symtab)
+        strtab_off = put(strtab.data, 1)
+        shstr_off = put(shstr.data, 1)
+        sections = [
+            (0, SHT_NULL, 0, 0, 0, 0, 0, 0, 0, 0),
+            (names[1], SHT_PROGBITS, SHF_ALLOC | SHF_EXECINSTR, 0, text_off, 4 * len(obj.text), 0, 0, 4, 0),
+            (names[2], SHT_PROGBITS, SHF_ALLOC | SHF_WRITE, 0, data_off, obj.data.size, 0, 0, 4, 0),
+            (names[3], SHT_NOBITS, SHF_ALLOC | SHF_WRITE, 0, data_off + obj.data.size, obj.bss_size,
+             0, 0, 4, 0),
+            (names[4], SHT_RELA, SHF_INFO_LINK, 0, rela_text_off, len(rela[".text"]),
+             REL_SYMTAB, SEC_TEXT, 4, RELA.size),
+            (names[5], SHT_RELA, SHF_INFO_LINK, 0, rela_data_off, len(rela[".data"]),
+             REL_SYMTAB, SEC_DATA, 4, RELA.size),
+            (names[6], SHT_SYMTAB, 0, 0, symtab_off, len(symtab), REL_STRTAB, n_local, 4, SYM.size),
+            (names[7], SHT_STRTAB, 0, 0, strtab_off, len(strtab.data), 0, 0, 1, 0),
+            (names[8], SHT_STRTAB, 0, 0, shstr_off, len(shstr.data), 0, 0, 1, 0),
+        ]
+        shoff = put(b"".join(SHDR.pack(*sh) for sh in sections))
+        total = f.tell()
+        f.seek(0)
+        f.write(EHDR.pack(IDENT, ET_REL, EM_RISCV, EV_CURRENT, 0, 0, shoff, 0,
+                          EHDR.size, PHDR.size, 0, SHDR.size, len(sections), REL_SHSTRTAB))
+    return total
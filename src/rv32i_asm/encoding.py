@@ -1,10 +1,15 @@
 # src/rv32i_asm/encoding.py
 from __future__ import annotations
+from array import array
+from bisect import bisect_right
+from collections.abc import Sequence
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Union
+from itertools import chain
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
-from .ast import Instruction, Directive, Label, Reg, Imm, Sym, Mem, Operand
-from .isa import spec as isa_spec
+from .ast import (Instruction, Directive, Label, Reg, Imm, Sym, Mem, Operand,
+                  InstructionTable, ROW_INSTR, ROW_LABEL, SECTION_NAMES)
+from .isa import ISpec, SPEC
 from .utils import u32, is_signed_nbit, is_unsigned_nbit
 from .diagnostics import Diagnostic, error, warning
 
@@ -18,10 +23,123 @@ class Encoded:
     col: int
     mnemonic: str
 
+class LineTable:
+    """Tabla de líneas compacta (estilo programa de líneas DWARF).
+
+    Un tramo por cada cambio de (línea, columna): 'start' es el índice de la
+    primera palabra del tramo. Las palabras de una misma línea de fuente
+    (p.ej. la expansión de 'li' o 'la') comparten un único tramo.
+    """
+
+    def __init__(self) -> None:
+        self.start = array('I')
+        self.line = array('I')
+        self.col = array('I')
+
+    def add(self, index: int, line: int, col: int) -> None:
+        """Registra que la palabra 'index' viene de (line, col)."""
+        if not self.start or self.line[-1] != line or self.col[-1] != col:
+            self.start.append(index)
+            self.line.append(line)
+            self.col.append(col)
+
+    def lookup(self, index: int) -> Tuple[int, int]:
+        """(línea, columna) de la palabra 'index'."""
+        k = bisect_right(self.start, index) - 1
+        if k < 0:
+            raise IndexError(index)
+        return self.line[k], self.col[k]
+
+    def expand(self, count: int) -> Iterator[Tuple[int, int]]:
+        """(línea, columna) de las palabras 0..count-1, en orden."""
+        starts = self.start
+        for k in range(len(starts)):
+            end = starts[k + 1] if k + 1 < len(starts) else count
+            lc = (self.line[k], self.col[k])
+            for _ in range(max(0, min(end, count) - starts[k])):
+                yield lc
+
+    def __len__(self) -> int:
+        return len(self.start)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, LineTable):
+            return NotImplemented
+        return (self.start, self.line, self.col) == (other.start, other.line, other.col)
+
+    def __repr__(self) -> str:
+        return f"LineTable({len(self)} tramos)"
+
+    def nbytes(self) -> int:
+        return sum(c.itemsize * len(c) for c in (self.start, self.line, self.col))
+
+class EncodedWords(Sequence):
+    """Vista de sólo lectura de Encoded sobre el buffer de palabras.
+
+    Los objetos Encoded se crean bajo demanda al indexar o iterar; el PC es
+    implícito (text_base + 4*i).
+    """
+
+    def __init__(self, buffer: array, mnems: array, lines: LineTable, text_base: int) -> None:
+        self.buffer = buffer
+        self.mnems = mnems
+        self.lines = lines
+        self.text_base = text_base
+
+    def __len__(self) -> int:
+        return len(self.buffer)
+
+    def _make(self, i: int, line: int, col: int) -> Encoded:
+        return Encoded(word=self.buffer[i], pc=self.text_base + 4 * i, line=line, col=col,
+                       mnemonic=MNEMONICS[self.mnems[i]])
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[k] for k in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("índice de palabra fuera de rango")
+        return self._make(i, *self.lines.lookup(i))
+
+    def __iter__(self) -> Iterator[Encoded]:
+        for i, (line, col) in enumerate(self.lines.expand(len(self.buffer))):
+            yield self._make(i, line, col)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (EncodedWords, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"EncodedWords({list(self)!r})"
+
 @dataclass(frozen=True)
 class EncodeResult:
-    words: List[Encoded]
+    """Resultado de la PASADA 2.
+
+    'buffer' guarda las palabras u32 contiguas (array('I')), 'mnems' el id
+    de mnemónico de cada una (array('B'), índice en MNEMONICS) y 'lines' la
+    correspondencia palabra -> fuente. 'words' ofrece la vista clásica de
+    Encoded, construida perezosamente.
+    """
+    buffer: array
+    mnems: array
+    lines: LineTable
     diagnostics: List[Diagnostic]
+    text_base: int = 0
+
+    @property
+    def words(self) -> EncodedWords:
+        return EncodedWords(self.buffer, self.mnems, self.lines, self.text_base)
+
+    @property
+    def view(self) -> memoryview:
+        """Las palabras como memoryview (sin copia)."""
+        return memoryview(self.buffer)
+
+    def __len__(self) -> int:
+        return len(self.buffer)
 
 # ---------------- Helpers de empaquetado de bits ----------------
 
@@ -98,16 +216,294 @@ def _base_sym(name: str) -> Tuple[str, Optional[str]]:
         return (name[:-9], "lo")
     return (name, None)
 
+# ---------------- Plantillas precomputadas ----------------
+#
+# Para cada mnemónico del ISA se calcula una sola vez la palabra base
+# (opcode|funct3|funct7 ya combinados) y dos codificadores especializados:
+#   - _fo_*: sobre la lista de operandos de un Instruction
+#   - _ff_*: sobre las columnas de una InstructionTable
+# Ambos sólo cubren la forma bien construida y dentro de rango; si devuelven
+# None se usa el camino general, que genera los diagnósticos.
+
+LOAD_MNEMS = ("lb", "lh", "lw", "lbu", "lhu")
+SHIFT_MNEMS = ("slli", "srli", "srai")
+
+def _off_ok_B(off: int) -> bool:
+    return off & 1 == 0 and -4096 <= off <= 4094
+
+def _off_ok_J(off: int) -> bool:
+    return off & 1 == 0 and -(1 << 20) <= off <= (1 << 20) - 2
+
+def _bits_B(off: int) -> int:
+    return (((off >> 12) & 0x1) << 31 | ((off >> 5) & 0x3F) << 25 |
+            ((off >> 1) & 0xF) << 8 | ((off >> 11) & 0x1) << 7)
+
+def _bits_J(off: int) -> int:
+    return (((off >> 20) & 0x1) << 31 | ((off >> 12) & 0xFF) << 12 |
+            ((off >> 11) & 0x1) << 20 | ((off >> 1) & 0x3FF) << 21)
+
+def _target(op: Operand, pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    """Offset relativo de una rama/salto, o None si requiere el camino general."""
+    t = type(op)
+    if t is Imm:
+        return op.value
+    if t is Sym and "@" not in op.name:
+        addr = symtab.get(op.name)
+        if addr is not None:
+            return addr - pc
+    return None
+
+# --- sobre operandos de Instruction ---
+
+def _fo_R(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 3:
+        rd, rs1, rs2 = ops
+        if type(rd) is Reg and type(rs1) is Reg and type(rs2) is Reg:
+            return base | (rd.num & 0x1F) << 7 | (rs1.num & 0x1F) << 15 | (rs2.num & 0x1F) << 20
+    return None
+
+def _fo_I(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 3:
+        rd, rs1, im = ops
+        if type(rd) is Reg and type(rs1) is Reg and type(im) is Imm and -2048 <= im.value <= 2047:
+            return base | (rd.num & 0x1F) << 7 | (rs1.num & 0x1F) << 15 | (im.value & 0xFFF) << 20
+    return None
+
+def _fo_SH(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 3:
+        rd, rs1, im = ops
+        if type(rd) is Reg and type(rs1) is Reg and type(im) is Imm and 0 <= im.value <= 31:
+            return base | (rd.num & 0x1F) << 7 | (rs1.num & 0x1F) << 15 | im.value << 20
+    return None
+
+def _fo_LD(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 2:
+        rd, m = ops
+        if type(rd) is Reg and type(m) is Mem and type(m.offset) is Imm and m.offset.origin == "numeric":
+            v = m.offset.value
+            if -2048 <= v <= 2047:
+                return base | (rd.num & 0x1F) << 7 | (m.base.num & 0x1F) << 15 | (v & 0xFFF) << 20
+    return None
+
+def _fo_JALR(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 3:
+        return _fo_I(base, ops, pc, symtab)
+    if len(ops) == 2:
+        rd, m = ops
+        if type(rd) is Reg and type(m) is Mem and type(m.offset) is Imm:
+            v = m.offset.value
+            if -2048 <= v <= 2047:
+                return base | (rd.num & 0x1F) << 7 | (m.base.num & 0x1F) << 15 | (v & 0xFFF) << 20
+    return None
+
+def _fo_S(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 2:
+        rs2, m = ops
+        if type(rs2) is Reg and type(m) is Mem and type(m.offset) is Imm and m.offset.origin == "numeric":
+            v = m.offset.value
+            if -2048 <= v <= 2047:
+                return (base | ((v >> 5) & 0x7F) << 25 | (rs2.num & 0x1F) << 20 |
+                        (m.base.num & 0x1F) << 15 | (v & 0x1F) << 7)
+    return None
+
+def _fo_B(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 3:
+        rs1, rs2, target = ops
+        if type(rs1) is Reg and type(rs2) is Reg:
+            off = _target(target, pc, symtab)
+            if off is not None and _off_ok_B(off):
+                return base | (rs1.num & 0x1F) << 15 | (rs2.num & 0x1F) << 20 | _bits_B(off)
+    return None
+
+def _fo_U(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 2:
+        rd, im = ops
+        if type(rd) is Reg and type(im) is Imm and -(1 << 19) <= im.value < (1 << 19):
+            return base | (rd.num & 0x1F) << 7 | (im.value & 0xFFFFF) << 12
+    return None
+
+def _fo_J(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 2:
+        rd, target = ops
+        if type(rd) is Reg:
+            off = _target(target, pc, symtab)
+            if off is not None and _off_ok_J(off):
+                return base | (rd.num & 0x1F) << 7 | _bits_J(off)
+    return None
+
+def _fo_FIXED(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    return base
+
+def _fo_FENCE(base: int, ops: List[Operand], pc: int, symtab: Dict[str, int]) -> Optional[int]:
+    if len(ops) == 1 and isinstance(ops[0], Imm):
+        return base | (ops[0].value & 0xFFF) << 20
+    return base | 0xFF << 20  # succ=0xF, pred=0xF, fm=0
+
+# --- sobre columnas de InstructionTable (firma + campos) ---
+
+def _ff_R(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if sig == "RRR":
+        return base | rd << 7 | rs1 << 15 | rs2 << 20
+    return None
+
+def _ff_I(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if sig == "RRI" and -2048 <= imm <= 2047:
+        return base | rd << 7 | rs1 << 15 | (imm & 0xFFF) << 20
+    return None
+
+def _ff_SH(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if sig == "RRI" and 0 <= imm <= 31:
+        return base | rd << 7 | rs1 << 15 | imm << 20
+    return None
+
+def _ff_LD(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if sig == "RM" and -2048 <= imm <= 2047:
+        return base | rd << 7 | rs1 << 15 | (imm & 0xFFF) << 20
+    return None
+
+def _ff_JALR(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if (sig == "RRI" or sig == "RM") and -2048 <= imm <= 2047:
+        return base | rd << 7 | rs1 << 15 | (imm & 0xFFF) << 20
+    return None
+
+def _ff_S(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if sig == "RM" and -2048 <= imm <= 2047:
+        return base | ((imm >> 5) & 0x7F) << 25 | rs2 << 20 | rs1 << 15 | (imm & 0x1F) << 7
+    return None
+
+def _ff_target(sig_last, imm, sym_name, pc, symtab):
+    if sig_last == "I":
+        return imm
+    if sig_last == "S" and "@" not in sym_name:
+        addr = symtab.get(sym_name)
+        if addr is not None:
+            return addr - pc
+    return None
+
+def _ff_B(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if sig == "RRI" or sig == "RRS":
+        off = _ff_target(sig[2], imm, sym_name, pc, symtab)
+        if off is not None and _off_ok_B(off):
+            return base | rs1 << 15 | rs2 << 20 | _bits_B(off)
+    return None
+
+def _ff_U(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if sig == "RI" and -(1 << 19) <= imm < (1 << 19):
+        return base | rd << 7 | (imm & 0xFFFFF) << 12
+    return None
+
+def _ff_J(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if sig == "RI" or sig == "RS":
+        off = _ff_target(sig[1], imm, sym_name, pc, symtab)
+        if off is not None and _off_ok_J(off):
+            return base | rd << 7 | _bits_J(off)
+    return None
+
+def _ff_FIXED(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    return base
+
+def _ff_FENCE(base, sig, rd, rs1, rs2, imm, sym_name, pc, symtab):
+    if sig == "I":
+        return base | (imm & 0xFFF) << 20
+    return base | 0xFF << 20
+
+_ENCODERS = {
+    "R": (_fo_R, _ff_R), "I": (_fo_I, _ff_I), "SH": (_fo_SH, _ff_SH),
+    "LD": (_fo_LD, _ff_LD), "JALR": (_fo_JALR, _ff_JALR), "S": (_fo_S, _ff_S),
+    "B": (_fo_B, _ff_B), "U": (_fo_U, _ff_U), "J": (_fo_J, _ff_J),
+    "FIXED": (_fo_FIXED, _ff_FIXED), "FENCE": (_fo_FENCE, _ff_FENCE),
+}
+
+@dataclass(frozen=True)
+class Template:
+    """Plantilla de codificación de un mnemónico."""
+    mnemonic: str
+    spec: ISpec
+    base: int      # opcode|funct3|funct7 (y campos fijos) ya combinados
+    kind: str      # clave en _ENCODERS
+    fast_ops: Callable[..., Optional[int]]
+    fast_fields: Callable[..., Optional[int]]
+
+def _template(name: str, sp: ISpec) -> Template:
+    base = sp.opcode | (sp.funct3 or 0) << 12
+    if sp.itype == "R":
+        kind = "R"
+        base |= (sp.funct7 or 0) << 25
+    elif sp.itype == "I":
+        if name in LOAD_MNEMS:
+            kind = "LD"
+        elif name == "jalr":
+            kind = "JALR"
+        elif name in SHIFT_MNEMS:
+            kind = "SH"
+            base |= (sp.funct7 or 0) << 25
+        else:
+            kind = "I"
+    elif sp.itype in ("S", "B", "U", "J"):
+        kind = sp.itype
+    elif sp.itype == "SYS":
+        kind = "FIXED"
+        base = sp.opcode | (1 << 20 if name == "ebreak" else 0)
+    elif name == "fence":
+        kind = "FENCE"
+    else:  # fence.i
+        kind = "FIXED"
+    fo, ff = _ENCODERS[kind]
+    return Template(name, sp, base, kind, fo, ff)
+
+TEMPLATES: Dict[str, Template] = {name: _template(name, sp) for name, sp in SPEC.items()}
+
+# Identificador compacto (1 byte) de cada mnemónico, para EncodeResult.mnems
+MNEMONICS: Tuple[str, ...] = tuple(TEMPLATES)
+MNEMONIC_ID: Dict[str, int] = {m: i for i, m in enumerate(MNEMONICS)}
+
 # ---------------- Codificador principal ----------------
 
 def encode(
-    nodes: List[Union[Label, Directive, Instruction]],
+    nodes: Union[Iterable[Union[Label, Directive, Instruction]], InstructionTable],
     symtab: Dict[str, int],
     *,
     text_base: int = 0x0000_0000,
 ) -> EncodeResult:
     diags: List[Diagnostic] = []
-    words: List[Encoded] = []
+    buf, mnems = array('I'), array('B')
+    lines = LineTable()
+    ids = MNEMONIC_ID
+    last_line = last_col = -1
+    for word, line, col, mnem in _encode_words(nodes, symtab, text_base, diags):
+        if line != last_line or col != last_col:
+            lines.add(len(buf), line, col)
+            last_line, last_col = line, col
+        buf.append(word)
+        mnems.append(ids[mnem])
+    return EncodeResult(buffer=buf, mnems=mnems, lines=lines, diagnostics=diags, text_base=text_base)
+
+def encode_iter(
+    nodes: Union[Iterable[Union[Label, Directive, Instruction]], InstructionTable],
+    symtab: Dict[str, int],
+    *,
+    text_base: int = 0x0000_0000,
+    diags: Optional[List[Diagnostic]] = None,
+) -> Iterator[Encoded]:
+    """PASADA 2 en streaming: produce cada palabra en cuanto se codifica.
+    Acepta también una InstructionTable (sus filas se recorren como vista).
+    Los diagnósticos se añaden a 'diags' si se pasa."""
+    pc = text_base
+    for word, line, col, mnem in _encode_words(nodes, symtab, text_base,
+                                               [] if diags is None else diags):
+        yield Encoded(word=word, pc=pc, line=line, col=col, mnemonic=mnem)
+        pc += 4
+
+Row = Tuple[int, int, int, str]  # (word, line, col, mnemonic)
+
+def _encode_words(
+    nodes: Union[Iterable[Union[Label, Directive, Instruction]], InstructionTable],
+    symtab: Dict[str, int],
+    text_base: int,
+    diags: List[Diagnostic],
+) -> Iterator[Row]:
+    """Núcleo de la PASADA 2: produce (word, line, col, mnemonic) por palabra;
+    el PC de cada una es implícito (text_base + 4*i)."""
 
     section: Optional[str] = None
     pc = text_base    # LC de .text en bytes
@@ -220,28 +616,8 @@ def encode(
         imm12 = _imm12(mem.offset.value, line=ins.line, col=ins.col)
         return _pack_S(imm12, rs2=rs2.num, rs1=rs1.num, f3=f3, opc=opc)
 
-    # --- recorrido principal ---
-    for n in nodes:
-        if isinstance(n, Directive):
-            if n.name in (".text", ".data"):
-                section = n.name
-            continue
-        if isinstance(n, Label):
-            continue
-        if not isinstance(n, Instruction):
-            continue
-
-        if section != ".text":
-            diags.append(error("Instrucción fuera de .text", line=n.line, col=n.col))
-            continue
-
-        mnem = n.mnemonic.lower()
-        try:
-            sp = isa_spec(mnem)
-        except KeyError:
-            diags.append(error(f"Instrucción no válida (¿falta expandir pseudo?): {mnem}", line=n.line, col=n.col))
-            continue
-
+    def _slow(n: Instruction, mnem: str, sp: ISpec) -> Optional[int]:
+        """Camino general: cubre cualquier forma de operandos y emite diagnósticos."""
         word: Optional[int] = None
 
         # ---- Tipos por mnemónico / categoría ----
@@ -385,9 +761,273 @@ def encode(
         else:
             diags.append(error(f"Tipo de instrucción no soportado: {sp.itype}", line=n.line, col=n.col))
 
-        # Registrar palabra y avanzar PC
-        if word is not None:
-            words.append(Encoded(word=word, pc=pc, line=n.line, col=n.col, mnemonic=mnem))
-            pc += 4
+        return word
+
+    def _instruction(n: Instruction) -> Optional[Row]:
+        nonlocal pc
+        if section != ".text":
+            diags.append(error("Instrucción fuera de .text", line=n.line, col=n.col))
+            return None
+        tpl = templates.get(n.mnemonic)
+        if tpl is None:
+            mnem = n.mnemonic.lower()
+            tpl = templates.get(mnem)
+            if tpl is None:
+                diags.append(error(f"Instrucción no válida (¿falta expandir pseudo?): {mnem}", line=n.line, col=n.col))
+                return None
+        word = tpl.fast_ops(tpl.base, n.operands, pc, symtab)
+        if word is None:
+            word = _slow(n, tpl.mnemonic, tpl.spec)
+            if word is None:
+                return None
+        pc += 4
+        return (word, n.line, n.col, tpl.mnemonic)
+
+    # --- recorrido principal ---
+    templates = TEMPLATES
+    if isinstance(nodes, InstructionTable):
+        # IR compacta: las filas bien formadas se codifican desde las columnas
+        t = nodes
+        row_tpl = [templates.get(m.lower()) for m in t.mnemonics.strings]
+        kinds, mn, sg, sigs = t.kind, t.mnem, t.sig, t.signatures.strings
+        rd, rs1, rs2, imm, sy, names = t.rd, t.rs1, t.rs2, t.imm, t.sym, t.symbols.strings
+        for i in range(len(kinds)):
+            k = kinds[i]
+            if k == ROW_INSTR:
+                tpl = row_tpl[mn[i]]
+                if tpl is None or section != ".text":
+                    enc = _instruction(t.node(i))
+                else:
+                    si = sy[i]
+                    word = tpl.fast_fields(tpl.base, sigs[sg[i]], rd[i], rs1[i], rs2[i], imm[i],
+                                           names[si] if si >= 0 else None, pc, symtab)
+                    if word is None:
+                        enc = _instruction(t.node(i))
+                    else:
+                        enc = (word, t.line[i], t.col[i], tpl.mnemonic)
+                        pc += 4
+                if enc is not None:
+                    yield enc
+            elif k == ROW_LABEL:
+                continue
+            else:
+                n = t.extra[t.aux[i]]
+                if isinstance(n, Directive):
+                    if n.name in SECTION_NAMES:
+                        section = n.name
+                elif isinstance(n, Instruction):
+                    enc = _instruction(n)
+                    if enc is not None:
+                        yield enc
+        return
+
+    for n in nodes:
+        if type(n) is Instruction and section == ".text":
+            # camino rápido en línea: plantilla + codificador especializado
+            tpl = templates.get(n.mnemonic)
+            if tpl is not None:
+                word = tpl.fast_ops(tpl.base, n.operands, pc, symtab)
+                if word is not None:
+                    yield (word, n.line, n.col, tpl.mnemonic)
+                    pc += 4
+                    continue
+        if isinstance(n, Directive):
+            if n.name in SECTION_NAMES:
+                section = n.name
+            continue
+        if isinstance(n, Label):
+            continue
+        if not isinstance(n, Instruction):
+            continue
+        enc = _instruction(n)
+        if enc is not None:
+            yield enc
+
+# ---------------- Codificación por lotes (NumPy opcional) ----------------
+#
+# Tras la pasada 1 todos los operandos son conocidos: se recogen los campos
+# de cada instrucción en columnas y las palabras se calculan con desplazamientos
+# y máscaras vectorizados. Las formas que sólo resuelve el camino general
+# (errores de forma, símbolos no definidos, pcrel_lo sin auipc...) hacen que
+# se use encode() completo, así el resultado es siempre idéntico al escalar.
+
+_BF_R, _BF_I, _BF_SH, _BF_S, _BF_B, _BF_U, _BF_J = range(7)   # formato de palabra
+_BC_NONE, _BC_IMM12, _BC_SHAMT, _BC_PCLO, _BC_IMM20, _BC_B, _BC_J = range(7)  # comprobación
+_BATCH_LIMIT = 1 << 62  # los inmediatos deben caber holgadamente en int64
+
+BatchRow = Tuple[int, int, int, int, int, int]  # (formato, rd, rs1, rs2, imm, comprobación)
+
+def _batch_pcrel_lo(name: str, rd: int, symtab: Dict[str, int],
+                    last_auipc: Dict[Tuple[int, str], Tuple[int, int]]) -> Optional[int]:
+    base, suf = _base_sym(name)
+    ctx = last_auipc.get((rd, base))
+    if suf != "lo" or ctx is None:
+        return None
+    pc_hi, hi20 = ctx
+    return symtab.get(base, 0) - pc_hi - (hi20 << 12)
+
+def _batch_fields(tpl: Template, ops: List[Operand], pc: int, symtab: Dict[str, int],
+                  last_auipc: Dict[Tuple[int, str], Tuple[int, int]]) -> Optional[BatchRow]:
+    """Campos de una instrucción para encode_batch (sin comprobar rangos),
+    o None si su forma requiere el camino general."""
+    kind = tpl.kind
+    n = len(ops)
+    if kind == "R":
+        if n == 3 and type(ops[0]) is Reg and type(ops[1]) is Reg and type(ops[2]) is Reg:
+            return (_BF_R, ops[0].num, ops[1].num, ops[2].num, 0, _BC_NONE)
+        return None
+    if n == 3 and kind in ("I", "SH", "JALR"):
+        rd, rs1, im = ops
+        if type(rd) is not Reg or type(rs1) is not Reg:
+            return None
+        if type(im) is Imm:
+            if kind == "SH":
+                return (_BF_SH, rd.num, rs1.num, 0, im.value, _BC_SHAMT)
+            return (_BF_I, rd.num, rs1.num, 0, im.value, _BC_IMM12)
+        if type(im) is Sym and (kind == "JALR" or tpl.mnemonic == "addi"):
+            lo12 = _batch_pcrel_lo(im.name, rd.num, symtab, last_auipc)
+            if lo12 is not None:
+                return (_BF_I, rd.num, rs1.num, 0, lo12, _BC_PCLO)
+        return None
+    if n == 2 and kind in ("LD", "S", "JALR"):
+        r, m = ops
+        if (type(r) is Reg and type(m) is Mem and type(m.offset) is Imm
+                and (kind == "JALR" or m.offset.origin == "numeric")):
+            if kind == "S":
+                return (_BF_S, 0, m.base.num, r.num, m.offset.value, _BC_IMM12)
+            return (_BF_I, r.num, m.base.num, 0, m.offset.value, _BC_IMM12)
+        return None
+    if kind == "B":
+        if n == 3 and type(ops[0]) is Reg and type(ops[1]) is Reg:
+            off = _target(ops[2], pc, symtab)
+            if off is not None:
+                return (_BF_B, 0, ops[0].num, ops[1].num, off, _BC_B)
+        return None
+    if kind == "U":
+        if n == 2 and type(ops[0]) is Reg:
+            rd, im = ops
+            if type(im) is Imm:
+                return (_BF_U, rd.num, 0, 0, im.value, _BC_IMM20)
+            if type(im) is Sym and tpl.mnemonic == "auipc":
+                name, suf = _base_sym(im.name)
+                addr = symtab.get(name)
+                if suf == "hi" and addr is not None:
+                    hi20 = (addr - pc + 0x800) >> 12
+                    last_auipc[(rd.num, name)] = (pc, hi20)
+                    return (_BF_U, rd.num, 0, 0, hi20, _BC_NONE)
+        return None
+    if kind == "J":
+        if n == 2 and type(ops[0]) is Reg:
+            off = _target(ops[1], pc, symtab)
+            if off is not None:
+                return (_BF_J, ops[0].num, 0, 0, off, _BC_J)
+        return None
+    if kind == "FENCE":
+        fm = ops[0].value if n == 1 and isinstance(ops[0], Imm) else 0xFF
+        return (_BF_I, 0, 0, 0, fm, _BC_NONE)
+    if kind == "FIXED":
+        return (_BF_I, 0, 0, 0, 0, _BC_NONE)
+    return None
+
+# Comprobaciones de rango en el orden en que las emite el camino escalar
+_BATCH_CHECKS = (
+    (_BC_IMM12, "Inmediato de 12 bits con signo fuera de rango (−2048..2047)"),
+    (_BC_SHAMT, "shamt fuera de rango (0..31 para RV32I)"),
+    (_BC_PCLO, "pcrel_lo fuera de rango"),
+    (_BC_IMM20, "Inmediato de 20 bits (U-type) fuera de rango (±2^19)"),
+    (_BC_B, "Offset de branch debe ser múltiplo de 2 bytes"),
+    (_BC_B, "Offset de branch fuera de rango (±4096 bytes, paso 2)"),
+    (_BC_J, "Offset de JAL debe ser múltiplo de 2 bytes"),
+    (_BC_J, "Offset de JAL fuera de rango (±1 MiB, paso 2)"),
+)
+
+def encode_batch(
+    nodes: Union[Iterable[Union[Label, Directive, Instruction]], InstructionTable],
+    symtab: Dict[str, int],
+    *,
+    text_base: int = 0x0000_0000,
+) -> EncodeResult:
+    """PASADA 2 vectorizada: mismo resultado que encode(), bit a bit.
+
+    Recoge (formato, rd, rs1, rs2, imm, pc) de todas las instrucciones en
+    arrays de NumPy y calcula las palabras y las comprobaciones de rango en
+    bloque; las filas fuera de rango se traducen a diagnósticos con su línea.
+    Sin NumPy, o si el programa contiene formas que sólo cubre el camino
+    general, se delega en encode()."""
+    try:
+        import numpy as np
+    except ImportError:
+        return encode(nodes, symtab, text_base=text_base)
+    if not isinstance(nodes, (list, tuple, InstructionTable)):
+        nodes = list(nodes)
+
+    templates = TEMPLATES
+    section: Optional[str] = None
+    pc = text_base
+    last_auipc: Dict[Tuple[int, str], Tuple[int, int]] = {}
+    rows: List[BatchRow] = []
+    ins: List[Instruction] = []
+    tpls: List[Template] = []
+
+    for n in nodes:
+        if not isinstance(n, Instruction):
+            if isinstance(n, Directive) and n.name in SECTION_NAMES:
+                section = n.name
+            continue
+        tpl = templates.get(n.mnemonic) or templates.get(n.mnemonic.lower())
+        if section != ".text" or tpl is None:
+            return encode(nodes, symtab, text_base=text_base)
+        f = _batch_fields(tpl, n.operands, pc, symtab, last_auipc)
+        if f is None or not -_BATCH_LIMIT <= f[4] < _BATCH_LIMIT:
+            return encode(nodes, symtab, text_base=text_base)
+        rows.append(f)
+        ins.append(n)
+        tpls.append(tpl)
+        pc += 4
+
+    if not rows:
+        return EncodeResult(buffer=array('I'), mnems=array('B'), lines=LineTable(),
+                            diagnostics=[], text_base=text_base)
+
+    cols = np.fromiter(chain.from_iterable(rows), dtype=np.int64, count=6 * len(rows))
+    fmt, rd, rs1, rs2, imm, chk = cols.reshape(-1, 6).T
+    rdf, rs1f, rs2f = rd << 7, rs1 << 15, rs2 << 20
+    word = np.select(
+        [fmt == _BF_R, fmt == _BF_I, fmt == _BF_SH, fmt == _BF_S, fmt == _BF_B, fmt == _BF_U],
+        [rdf | rs1f | rs2f,
+         rdf | rs1f | (imm & 0xFFF) << 20,
+         rdf | rs1f | (imm & 0x1F) << 20,
+         ((imm >> 5) & 0x7F) << 25 | rs2f | rs1f | (imm & 0x1F) << 7,
+         (rs1f | rs2f | ((imm >> 12) & 0x1) << 31 | ((imm >> 5) & 0x3F) << 25 |
+          ((imm >> 1) & 0xF) << 8 | ((imm >> 11) & 0x1) << 7),
+         rdf | (imm & 0xFFFFF) << 12],
+        default=(rdf | ((imm >> 20) & 0x1) << 31 | ((imm >> 12) & 0xFF) << 12 |
+                 ((imm >> 11) & 0x1) << 20 | ((imm >> 1) & 0x3FF) << 21),
+    ) | np.array([t.base for t in tpls], dtype=np.int64)
+
+    # Comprobaciones de rango vectorizadas (una máscara por mensaje)
+    odd = (imm & 1) == 1
+    half = imm >> 1  # == off // 2
+    masks = (
+        (imm < -2048) | (imm > 2047),
+        (imm < 0) | (imm > 31),
+        (imm < -2048) | (imm > 2047),
+        (imm < -(1 << 19)) | (imm >= 1 << 19),
+        odd,
+        (half < -2048) | (half > 2047),
+        odd,
+        (half < -(1 << 19)) | (half >= 1 << 19),
+    )
+    bad: List[Tuple[int, int]] = []
+    for order, ((check, _msg), mask) in enumerate(zip(_BATCH_CHECKS, masks)):
+        for r in np.flatnonzero((chk == check) & mask).tolist():
+            bad.append((r, order))
+    bad.sort()
+    diags = [error(_BATCH_CHECKS[order][1], line=ins[r].line, col=ins[r].col) for r, order in bad]
 
-    return EncodeResult(words=words, diagnostics=diags)
+    buf = array('I', word.astype(np.uint32).tobytes())
+    mnems = array('B', [MNEMONIC_ID[t.mnemonic] for t in tpls])
+    lines = LineTable()
+    for i, n in enumerate(ins):
+        lines.add(i, n.line, n.col)
+    return EncodeResult(buffer=buf, mnems=mnems, lines=lines, diagnostics=diags, text_base=text_base)
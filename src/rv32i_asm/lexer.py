@@ -1,7 +1,10 @@
 from __future__ import annotations
 import re
+from sys import intern
 
-COMMENT_SPLIT_RE = re.compile(r"(#|//)")
+from .utils import LazyRegex
+
+COMMENT_SPLIT_RE = LazyRegex(r"(#|//)")
 
 def strip_comment(line: str) -> str:
     """Remove comments starting with '#' or '//'"""
@@ -12,7 +15,7 @@ def strip_comment(line: str) -> str:
         return ""
     return m[0].strip()
 
-LABEL_RE = re.compile(r"^([A-Za-z_][A-Za-z0-9_]*):\s*(.*)$")
+LABEL_RE = LazyRegex(r"^([A-Za-z_][A-Za-z0-9_]*):\s*(.*)$")
 
 def split_label(line: str):
     """Return (label, rest) if line has 'label:', else (None, line)."""
@@ -58,3 +61,80 @@ def split_operands(op_str: str):
     if s:
         out.append(s)
     return out
+
+# ---------------- Tokenizador de una sola pasada ----------------
+#
+# Una única regex maestra separa por línea: etiqueta, cabeza (mnemónico o
+# directiva) y la cola de operandos, cortando en el primer '#' o '//'.
+# Equivale exactamente a strip_comment + split_label + split_mnemonic_operands.
+# Además captura directamente hasta 3 operandos "simples" (p.ej. 'a0', '-4',
+# '8(sp)'); si queda resto sin consumir se recurre a fast_split_operands.
+
+_OP = r"[^,\s\#/()]+(?:\([^,\s\#/()]*\))?"
+
+LINE_RE = re.compile(r"""
+    \s*
+    (?:(?P<label>[A-Za-z_][A-Za-z0-9_]*):\s*)?
+    (?P<head>(?=[^\s\#])(?!//)[^\s\#/]*(?:/(?!/)[^\s\#/]*)*)?
+    \s*
+    (?P<ops>
+      (?:(?P<o1>OP)\s*
+        (?:,\s*(?P<o2>OP)\s*
+          (?:,\s*(?P<o3>OP)\s*)?
+        )?
+      )?
+      (?P<rest>[^\#/]*(?:/(?!/)[^\#/]*)*)
+    )
+""".replace("OP", _OP), re.VERBOSE)
+
+# Operandos con paréntesis de un solo nivel, p.ej. '8(x1)' o '%lo(s)(x1)'
+_SIMPLE_PARENS_RE = LazyRegex(r"[^()]*(?:\([^()]*\)[^()]*)*")
+_OPERAND_RE = LazyRegex(r"(?:[^,()]|\([^()]*\))+")
+
+def fast_split_operands(op_str: str):
+    """Igual que split_operands, pero sin recorrer la cadena carácter a carácter."""
+    if '(' not in op_str:
+        return [t for t in map(str.strip, op_str.split(',')) if t]
+    if _SIMPLE_PARENS_RE.fullmatch(op_str) is None:
+        # anidamiento o paréntesis desbalanceados: camino lento exacto
+        return split_operands(op_str)
+    return [t for t in map(str.strip, _OPERAND_RE.findall(op_str)) if t]
+
+def tokenize(lines, first_line: int = 1):
+    """Itera (lineno, label, head, operands, col) sobre las líneas no vacías.
+
+    - head: mnemónico o directiva en minúsculas ('' si sólo hay etiqueta)
+    - operands: tokens por espacios para directivas, por comas para instrucciones
+    - col: columna (base 1) del primer token de la línea
+    'first_line' es el número de la primera línea (para trozos de un archivo).
+    """
+    match = LINE_RE.match
+    lineno = first_line - 1
+    for raw in lines:
+        lineno += 1
+        m = match(raw)
+        label, head, ops, o1, o2, o3, rest = m.groups()
+        if head is None:
+            if label is not None:
+                yield lineno, label, "", [], m.start(1) + 1
+            continue
+        if head[0] == '.':
+            operands = ops.split()
+        elif rest:
+            operands = fast_split_operands(ops)
+        elif o3 is not None:
+            operands = [o1, o2, o3]
+        elif o2 is not None:
+            operands = [o1, o2]
+        elif o1 is not None:
+            operands = [o1]
+        else:
+            operands = []
+        # mnemónicos internados: todas las instrucciones comparten la misma cadena
+        yield lineno, label, intern(head.lower()), operands, m.start(1 if label is not None else 2) + 1
+
+def tokenize_line(line: str):
+    """Devuelve (label, head, operands, col) de una línea, o None si no tiene contenido."""
+    for tok in tokenize((line,)):
+        return tok[1:]
+    return None
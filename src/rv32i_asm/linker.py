@@ -1,13 +1,31 @@
 # src/rv32i_asm/linker.py
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple, Union
+import operator, sys
+from array import array
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
 
-from .ast import Label, Directive, Instruction
+from .ast import (Label, Directive, Instruction, InstructionTable, ROW_INSTR, ROW_LABEL,
+                  SECTION_NAMES)
 from .diagnostics import Diagnostic, error, warning
+from .utils import LazyRegex
 
 # ---------- Resultados de la pasada 1 ----------
 
+@dataclass(frozen=True)
+class DataChunk:
+    """Contenido de una directiva de datos, parseado una sola vez en la pasada 1.
+
+    'payload' son los bytes little-endian (array o bytes) que se copian tal
+    cual a la imagen de .data; 'fixups' son los valores simbólicos que se
+    resuelven al emitir: (offset relativo, ancho en bytes, símbolo).
+    """
+    offset: int
+    payload: Union[array, bytes]
+    fixups: Tuple[Tuple[int, int, str], ...] = ()
+    line: int = 0
+    col: int = 0
+
 @dataclass(frozen=True)
 class LinkResult:
     symtab: Dict[str, int]
@@ -16,6 +34,17 @@ class LinkResult:
     text_size: int
     data_size: int
     diagnostics: List[Diagnostic]
+    # sección de cada símbolo de symtab ('.text'/'.data'/'.bss'; None para .equ)
+    sections: Dict[str, Optional[str]] = field(default_factory=dict)
+    # contenido de .data en orden de aparición (ver data.build_data_image)
+    data_chunks: List[DataChunk] = field(default_factory=list)
+    # reservas .space/.skip dentro de .data como extents (offset, tamaño): no se materializan
+    data_holes: List[Tuple[int, int]] = field(default_factory=list)
+    # .bss va justo después de .data y sólo ocupa espacio de direcciones
+    bss_base: int = 0
+    bss_size: int = 0
+    # nombres declarados con .globl/.global (visibles al enlazar objetos)
+    global_symbols: Set[str] = field(default_factory=set)
 
 # ---------- Helpers internos ----------
 
@@ -34,6 +63,10 @@ def _csv_from_tokens(tokens: List[Union[str, int, bytes]]) -> str:
     """
     if not tokens:
         return ""
+    try:
+        return " ".join(tokens)  # caso habitual: todos son str
+    except TypeError:
+        pass
     parts: List[str] = []
     for t in tokens:
         if isinstance(t, (int, bytes)):
@@ -47,6 +80,9 @@ def _split_csv(s: str) -> List[str]:
     Divide por comas respetando comillas dobles.
     Ej: '1, 2, "hola, mundo", 0x10' -> ["1","2","\"hola, mundo\"","0x10"]
     """
+    if '"' not in s:
+        # sin cadenas: basta con str.split (caso de las tablas numéricas)
+        return [t for t in (tok.strip() for tok in s.split(",")) if t]
     out, cur, q = [], [], False
     i = 0
     while i < len(s):
@@ -91,6 +127,91 @@ def _parse_scalar(tok: str) -> Union[int, bytes]:
     # entero (permite +/-, 0x..)
     return int(tok, 0)
 
+_EXPR_TOKEN_RE = LazyRegex(r"\s*(?:(0[xX][0-9a-fA-F]+|\d+)|([A-Za-z_][A-Za-z0-9_]*)|(<<|>>|[-+*/%&|^~()]))")
+# operadores binarios por nivel de precedencia (de menor a mayor), como en C
+_EXPR_LEVELS = (("|",), ("^",), ("&",), ("<<", ">>"), ("+", "-"), ("*", "/", "%"))
+_EXPR_OPS = {"|": operator.or_, "^": operator.xor, "&": operator.and_, "<<": operator.lshift,
+             ">>": operator.rshift, "+": operator.add, "-": operator.sub, "*": operator.mul}
+
+def _const_expr(text: str, symtab: Dict[str, int], sections: Dict[str, Optional[str]]) -> int:
+    """
+    Evalúa una expresión entera constante: literales dec/hex, constantes .equ
+    ya definidas, paréntesis, unarios - + ~ y los binarios de _EXPR_LEVELS.
+    '/' y '%' truncan hacia cero (como GNU as). ValueError con el motivo si
+    no es una expresión constante válida.
+    """
+    toks: List[Tuple[str, str]] = []  # ('num'|'sym'|'op', texto)
+    pos, end = 0, len(text.rstrip())
+    while pos < end:
+        m = _EXPR_TOKEN_RE.match(text, pos)
+        if m is None:
+            raise ValueError(f"carácter inesperado '{text[pos:].strip()[0]}'")
+        num, name, op = m.groups()
+        toks.append(("num", num) if num else ("sym", name) if name else ("op", op))
+        pos = m.end()
+    i = 0
+
+    def peek() -> Optional[str]:
+        return toks[i][1] if i < len(toks) and toks[i][0] == "op" else None
+
+    def binary(level: int) -> int:
+        nonlocal i
+        if level == len(_EXPR_LEVELS):
+            return unary()
+        left = binary(level + 1)
+        while peek() in _EXPR_LEVELS[level]:
+            op = toks[i][1]
+            i += 1
+            right = binary(level + 1)
+            if op in ("/", "%") and right == 0:
+                raise ValueError("división por cero")
+            if op in ("<<", ">>") and right < 0:
+                raise ValueError("desplazamiento negativo")
+            if op == "/":
+                q = abs(left) // abs(right)
+                left = q if (left < 0) == (right < 0) else -q
+            elif op == "%":
+                r = abs(left) % abs(right)
+                left = -r if left < 0 else r
+            else:
+                left = _EXPR_OPS[op](left, right)
+        return left
+
+    def unary() -> int:
+        nonlocal i
+        if i == len(toks):
+            raise ValueError("expresión incompleta")
+        kind, tok = toks[i]
+        i += 1
+        if kind == "num":
+            return int(tok, 0)
+        if kind == "sym":
+            if tok not in symtab:
+                raise ValueError(f"símbolo no definido: {tok}")
+            if sections.get(tok) is not None:
+                raise ValueError(f"'{tok}' es una etiqueta, no una constante .equ")
+            return symtab[tok]
+        if tok == "-":
+            return -unary()
+        if tok == "+":
+            return unary()
+        if tok == "~":
+            return ~unary()
+        if tok == "(":
+            v = binary(0)
+            if peek() != ")":
+                raise ValueError("falta ')'")
+            i += 1
+            return v
+        raise ValueError(f"operador inesperado '{tok}'")
+
+    if not toks:
+        raise ValueError("expresión vacía")
+    value = binary(0)
+    if i != len(toks):
+        raise ValueError(f"sobra '{toks[i][1]}'")
+    return value
+
 def _items_from_args(args: List[Union[str, int, bytes]]) -> List[Union[int, bytes]]:
     if not args:
         return []
@@ -107,6 +228,49 @@ def _items_from_args(args: List[Union[str, int, bytes]]) -> List[Union[int, byte
         out.append(_parse_scalar(tok))
     return out
 
+SYMBOL_RE = LazyRegex(r"^[A-Za-z_][A-Za-z0-9_]*$")
+_TYPECODES = {1: "B", 2: "H", 4: "I", 8: "Q"}
+
+def _sized_chunk(d: str, size: int, n: Directive, offset: int,
+                 diags: List[Diagnostic]) -> DataChunk:
+    """Parsea los valores de .byte/.half/.word/.dword a un array del ancho
+    del elemento. Cada valor debe caber con o sin signo en ese ancho
+    (-2**(bits-1)..2**bits-1); si no, error (y se guarda truncado)."""
+    csv = _csv_from_tokens(n.args)
+    mask = (1 << (8 * size)) - 1
+    lo = -(1 << (8 * size - 1))
+    typecode = _TYPECODES[size]
+    fixups: List[Tuple[int, int, str]] = []
+    try:
+        if '"' in csv:
+            raise ValueError(csv)
+        # int() ya ignora los espacios alrededor de cada valor
+        ints = [int(t, 0) for t in csv.split(",")] if csv else []
+        low = min(ints) if ints else 0
+        if low < lo or (ints and max(ints) > mask):
+            raise ValueError(csv)  # fuera de rango: el camino lento da el diagnóstico
+        vals = array(typecode, ints if low >= 0 else [v & mask for v in ints])
+    except ValueError:
+        # hay símbolos, cadenas o tokens inválidos: camino elemento a elemento
+        vals = array(typecode)
+        for t in _split_csv(csv):
+            try:
+                v = int(t, 0)
+                if not lo <= v <= mask:
+                    diags.append(error(f"{d} valor fuera de rango ({lo}..{mask}): {t}",
+                                       line=n.line, col=n.col))
+                v &= mask
+            except ValueError:
+                v = 0
+                if SYMBOL_RE.match(t):
+                    fixups.append((len(vals) * size, size, t))
+                else:
+                    diags.append(error(f"{d} argumento no válido: {t}", line=n.line, col=n.col))
+            vals.append(v)
+    if sys.byteorder == "big":
+        vals.byteswap()
+    return DataChunk(offset=offset, payload=vals, fixups=tuple(fixups), line=n.line, col=n.col)
+
 # ---------- Pasada 1 (símbolos y layout de secciones) ----------
 
 DATA_DIRS_SIZED = {
@@ -117,10 +281,11 @@ DATA_DIRS_SIZED = {
 DATA_DIRS_TEXT = {".ascii", ".asciz"}
 DATA_DIRS_SPACE = {".space", ".skip"}
 ALIGN_DIRS = {".align", ".balign", ".p2align"}
-IGNORED_DIRS = {".globl", ".global", ".type", ".size", ".section"}
+GLOBAL_DIRS = {".globl", ".global"}
+IGNORED_DIRS = {".type", ".size", ".section"}
 
 def first_pass(
-    nodes: List[Union[Label, Directive, Instruction]],
+    nodes: Union[Iterable[Union[Label, Directive, Instruction]], InstructionTable],
     *,
     base_text: int = 0x0000_0000,
     base_data: int = 0x1000_0000,
@@ -129,11 +294,17 @@ def first_pass(
     auto_align_types: bool = True,  # alinear .word a 4, .half a 2, .dword a 8
 ) -> LinkResult:
     symtab: Dict[str, int] = {}
+    sections: Dict[str, Optional[str]] = {}
+    chunks: List[DataChunk] = []
+    holes: List[Tuple[int, int]] = []
+    bss_labels: Dict[str, int] = {}  # etiquetas de .bss -> offset (se fijan al final)
+    globals_: Set[str] = set()
     diags: List[Diagnostic] = []
 
     section: Optional[str] = None
     lc_text = 0
     lc_data = 0
+    lc_bss = 0
 
     def cur_base() -> int:
         return base_text if section == ".text" else base_data
@@ -147,153 +318,212 @@ def first_pass(
         if section is None:
             section = ".text"
 
-    for n in nodes:
+    def on_label(name: str, line: int, col: int) -> None:
+        ensure_section_for_code()
+        addr = (base_text + lc_text) if section == ".text" else (base_data + lc_data)
+        if _is_pcrel_suffix(name):
+            diags.append(warning(f"No definas etiquetas con sufijo PC-relative: '{name}'", line=line, col=col))
+        if name in symtab:
+            diags.append(error(f"Etiqueta/constante redefinida: {name}", line=line, col=col))
+        else:
+            if section == ".bss":
+                bss_labels[name] = lc_bss
+                addr = lc_bss  # provisional: la base de .bss se conoce al final
+            symtab[name] = addr
+            sections[name] = section
+
+    def on_instruction(line: int, col: int) -> None:
+        nonlocal lc_text
+        ensure_section_for_code()
+        if section != ".text":
+            # Muchos ensambladores no permiten instrucciones en .data
+            diags.append(error("Instrucción fuera de la sección .text", line=line, col=col))
+            # aún así no contamos para .data
+            return
+        # Cada instrucción RV32I ocupa 4 bytes
+        lc_text += 4
+
+    def on_directive(n: Directive) -> None:
+        nonlocal section, lc_text, lc_data, lc_bss
         # Directivas que cambian sección
-        if isinstance(n, Directive) and n.name in (".text", ".data"):
+        if n.name in SECTION_NAMES:
             section = n.name
             # Alinear contador al entrar si se configuró align_* > 1
             if section == ".text" and align_text > 1:
                 lc_text = _align_up(lc_text, align_text)
             if section == ".data" and align_data > 1:
                 lc_data = _align_up(lc_data, align_data)
-            continue
-
-        # Etiquetas
-        if isinstance(n, Label):
-            ensure_section_for_code()
-            addr = (base_text + lc_text) if section == ".text" else (base_data + lc_data)
-            name = n.name
-            if _is_pcrel_suffix(name):
-                diags.append(warning(f"No definas etiquetas con sufijo PC-relative: '{name}'", line=n.line, col=n.col))
-            if name in symtab:
-                diags.append(error(f"Etiqueta/constante redefinida: {name}", line=n.line, col=n.col))
-            else:
-                symtab[name] = addr
-            continue
+            if section == ".bss" and align_data > 1:
+                lc_bss = _align_up(lc_bss, align_data)
+            return
 
         # Directivas de datos/constantes
-        if isinstance(n, Directive):
-            d = n.name
-            # .equ NAME, VALUE
-            if d == ".equ":
-                if len(n.args) >= 2 and isinstance(n.args[0], str):
-                    name = n.args[0]
-                    try:
-                        value = int(n.args[1]) if isinstance(n.args[1], str) else int(n.args[1])
-                    except Exception:
-                        diags.append(error(".equ con valor inválido", line=n.line, col=n.col))
-                        continue
-                    if name in symtab:
-                        diags.append(error(f"Constante/etiqueta redefinida: {name}", line=n.line, col=n.col))
-                    else:
-                        symtab[name] = value
-                else:
-                    diags.append(error(".equ requiere nombre y valor", line=n.line, col=n.col))
-                continue
-
-            # ignoradas (metadatos)
-            if d in IGNORED_DIRS:
-                continue
-
-            # Alineaciones
-            if d in ALIGN_DIRS:
-                ensure_section_for_code()
-                items = _items_from_args(n.args)
-                if not items:
-                    diags.append(error(f"{d} requiere un argumento", line=n.line, col=n.col)); continue
+        d = n.name
+        # .equ NAME, VALUE
+        if d == ".equ":
+            if len(n.args) >= 2 and isinstance(n.args[0], str):
+                name = n.args[0]
                 try:
-                    val = int(items[0])  # bytes o potencia según directiva
+                    value = int(n.args[1]) if isinstance(n.args[1], str) else int(n.args[1])
                 except Exception:
-                    diags.append(error(f"{d} argumento inválido", line=n.line, col=n.col)); continue
-
-                if d == ".balign":
-                    a = max(1, val)
-                elif d == ".p2align":
-                    a = 1 << max(0, val)
-                else:  # ".align" (estilo GNU para RISC-V: potencia de 2)
-                    a = 1 << max(0, val)
-
-                if section == ".text":
-                    lc_text = _align_up(lc_text, a)
+                    diags.append(error(".equ con valor inválido", line=n.line, col=n.col))
+                    return
+                if name in symtab:
+                    diags.append(error(f"Constante/etiqueta redefinida: {name}", line=n.line, col=n.col))
                 else:
-                    lc_data = _align_up(lc_data, a)
-                continue
-
-            # Reservas de espacio (.space/.skip)
-            if d in DATA_DIRS_SPACE:
-                ensure_section_for_code()
-                items = _items_from_args(n.args)
-                if not items:
-                    diags.append(error(f"{d} requiere tamaño en bytes", line=n.line, col=n.col)); continue
-                try:
-                    sz = int(items[0])
-                except Exception:
-                    diags.append(error(f"{d} tamaño inválido", line=n.line, col=n.col)); continue
-                if section == ".text":
-                    diags.append(error(f"{d} no permitido en .text", line=n.line, col=n.col))
+                    symtab[name] = value
+                    sections[name] = None
+            else:
+                diags.append(error(".equ requiere nombre y valor", line=n.line, col=n.col))
+            return
+
+        # .globl a, b: sólo marca visibilidad; el símbolo puede definirse después
+        if d in GLOBAL_DIRS:
+            names = _split_csv(_csv_from_tokens(n.args))
+            if not names:
+                diags.append(error(f"{d} requiere al menos un símbolo", line=n.line, col=n.col))
+            for name in names:
+                if SYMBOL_RE.match(name):
+                    globals_.add(name)
                 else:
-                    lc_data += max(0, sz)
-                continue
-
-            # Datos con tamaño fijo (.byte/.half/.word/.dword/alias)
-            if d in DATA_DIRS_SIZED:
-                ensure_section_for_code()
-                if section != ".data":
-                    diags.append(error(f"{d} sólo permitido en .data", line=n.line, col=n.col))
-                    continue
-                size = DATA_DIRS_SIZED[d]
-                items = _items_from_args(n.args)
-                if auto_align_types:
-                    lc_data = _align_up(lc_data, size)
-                lc_data += size * len(items)
-                continue
-
-            # Texto de bytes (.ascii/.asciz)
-            if d in DATA_DIRS_TEXT:
-                ensure_section_for_code()
-                if section != ".data":
-                    diags.append(error(f"{d} sólo permitido en .data", line=n.line, col=n.col))
-                    continue
-                items = _items_from_args(n.args)
-                if not items:
-                    continue
-                total = 0
-                for it in items:
-                    if isinstance(it, bytes):
-                        total += len(it)
-                    elif isinstance(it, int):
-                        total += 1
-                    else:
-                        diags.append(error(f"{d} argumento no válido", line=n.line, col=n.col))
-                if d == ".asciz":
-                    total += 1  # terminador NUL
-                lc_data += total
-                continue
-
-            # Otras directivas: ignorar pero mantener compatibilidad
-            continue
+                    diags.append(error(f"{d} nombre de símbolo inválido: {name}", line=n.line, col=n.col))
+            return
+
+        # ignoradas (metadatos)
+        if d in IGNORED_DIRS:
+            return
 
-        # Instrucciones
-        if isinstance(n, Instruction):
+        # Alineaciones
+        if d in ALIGN_DIRS:
             ensure_section_for_code()
-            if section != ".text":
-                # Muchos ensambladores no permiten instrucciones en .data
-                diags.append(error("Instrucción fuera de la sección .text", line=n.line, col=n.col))
-                # aún así no contamos para .data
-                continue
-            # Cada instrucción RV32I ocupa 4 bytes
-            lc_text += 4
-            continue
+            items = _split_csv(_csv_from_tokens(n.args))
+            if not items:
+                diags.append(error(f"{d} requiere un argumento", line=n.line, col=n.col)); return
+            try:
+                val = _const_expr(items[0], symtab, sections)  # bytes o potencia según directiva
+            except ValueError as ex:
+                diags.append(error(f"{d} argumento inválido: {ex}", line=n.line, col=n.col)); return
+
+            if d == ".balign":
+                a = max(1, val)
+            elif d == ".p2align":
+                a = 1 << max(0, val)
+            else:  # ".align" (estilo GNU para RISC-V: potencia de 2)
+                a = 1 << max(0, val)
 
-        # Si llega aquí, es un nodo desconocido (no debería)
-        diags.append(warning("Nodo de AST desconocido en linker",))
+            if section == ".text":
+                lc_text = _align_up(lc_text, a)
+            elif section == ".bss":
+                lc_bss = _align_up(lc_bss, a)
+            else:
+                lc_data = _align_up(lc_data, a)
+            return
+
+        # Reservas de espacio (.space/.skip)
+        if d in DATA_DIRS_SPACE:
+            ensure_section_for_code()
+            items = _split_csv(_csv_from_tokens(n.args))
+            if not items:
+                diags.append(error(f"{d} requiere tamaño en bytes", line=n.line, col=n.col)); return
+            try:
+                sz = _const_expr(items[0], symtab, sections)  # p.ej. 64*1024*1024 o N*4 con .equ
+            except ValueError as ex:
+                diags.append(error(f"{d} tamaño inválido: {ex}", line=n.line, col=n.col)); return
+            if section == ".text":
+                diags.append(error(f"{d} no permitido en .text", line=n.line, col=n.col))
+            elif section == ".bss":
+                lc_bss += max(0, sz)
+            elif sz > 0:
+                # extent de ceros: sólo se anota, nunca se materializa
+                holes.append((lc_data, sz))
+                lc_data += sz
+            return
+
+        # Datos con tamaño fijo (.byte/.half/.word/.dword/alias)
+        if d in DATA_DIRS_SIZED:
+            ensure_section_for_code()
+            if section != ".data":
+                diags.append(error(f"{d} sólo permitido en .data", line=n.line, col=n.col))
+                return
+            size = DATA_DIRS_SIZED[d]
+            if auto_align_types:
+                lc_data = _align_up(lc_data, size)
+            chunk = _sized_chunk(d, size, n, lc_data, diags)
+            chunks.append(chunk)
+            lc_data += len(chunk.payload) * size
+            return
+
+        # Texto de bytes (.ascii/.asciz)
+        if d in DATA_DIRS_TEXT:
+            ensure_section_for_code()
+            if section != ".data":
+                diags.append(error(f"{d} sólo permitido en .data", line=n.line, col=n.col))
+                return
+            items = _items_from_args(n.args)
+            if not items:
+                return
+            parts: List[bytes] = []
+            for it in items:
+                if isinstance(it, bytes):
+                    parts.append(it)
+                elif isinstance(it, int):
+                    parts.append(bytes((it & 0xFF,)))
+                else:
+                    diags.append(error(f"{d} argumento no válido", line=n.line, col=n.col))
+            if d == ".asciz":
+                parts.append(b"\0")  # terminador NUL
+            payload = b"".join(parts)
+            chunks.append(DataChunk(offset=lc_data, payload=payload, line=n.line, col=n.col))
+            lc_data += len(payload)
+            return
+
+        # Otras directivas: ignorar pero mantener compatibilidad
+
+    if isinstance(nodes, InstructionTable):
+        # IR compacta: etiquetas e instrucciones se leen de las columnas
+        kinds, lines, cols, names = nodes.kind, nodes.line, nodes.col, nodes.symbols
+        for i in range(len(kinds)):
+            k = kinds[i]
+            if k == ROW_INSTR:
+                on_instruction(lines[i], cols[i])
+            elif k == ROW_LABEL:
+                on_label(names[nodes.sym[i]], lines[i], cols[i])
+            else:
+                obj = nodes.extra[nodes.aux[i]]
+                if isinstance(obj, Directive):
+                    on_directive(obj)
+                elif isinstance(obj, Label):
+                    on_label(obj.name, obj.line, obj.col)
+                else:
+                    on_instruction(obj.line, obj.col)
+    else:
+        for n in nodes:
+            if isinstance(n, Directive):
+                on_directive(n)
+            elif isinstance(n, Label):
+                on_label(n.name, n.line, n.col)
+            elif isinstance(n, Instruction):
+                on_instruction(n.line, n.col)
+            else:
+                # Si llega aquí, es un nodo desconocido (no debería)
+                diags.append(warning("Nodo de AST desconocido en linker",))
 
     # Resultado final
+    data_size = _align_up(lc_data, align_data) if align_data > 1 else lc_data
+    bss_base = base_data + data_size
+    for name, off in bss_labels.items():
+        symtab[name] = bss_base + off
     res = LinkResult(
         symtab=symtab,
         text_base=base_text, data_base=base_data,
         text_size=_align_up(lc_text, align_text) if align_text > 1 else lc_text,
-        data_size=_align_up(lc_data, align_data) if align_data > 1 else lc_data,
+        data_size=data_size,
         diagnostics=diags,
+        sections=sections,
+        data_chunks=chunks,
+        data_holes=holes,
+        bss_base=bss_base,
+        bss_size=_align_up(lc_bss, align_data) if align_data > 1 else lc_bss,
+        global_symbols=globals_,
     )
     return res
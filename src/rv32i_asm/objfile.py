@@ -0,0 +1,398 @@
+# src/rv32i_asm/objfile.py
+from __future__ import annotations
+import argparse, marshal, sys
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Literal, Optional, Sequence, Tuple, Union
+
+from .ast import Label, Directive, Instruction, Reg, Sym, SECTION_NAMES, imm
+from .isa import SPEC
+from .linker import LinkResult, _align_up
+from .encoding import encode, _base_sym, _bits_B, _bits_J, _off_ok_B, _off_ok_J
+from .data import DataImage, build_data_image
+from .diagnostics import Diagnostic, error
+
+# ---------------- Compilación separada ----------------
+#
+# Un objeto reubicable es el resultado de ensamblar un solo archivo con sus
+# secciones en 0: las palabras de .text ya codificadas, la imagen de .data,
+# el tamaño de .bss, sus símbolos (locales o .globl) y las reubicaciones de
+# todo lo que depende de la posición final. link_objects() concatena varios
+# objetos, resuelve los símbolos y parchea los campos en los buffers.
+
+# Tipos de reubicación (mismos números que R_RISCV_* del psABI)
+R_RISCV_32 = 1
+R_RISCV_64 = 2
+R_RISCV_BRANCH = 16
+R_RISCV_JAL = 17
+R_RISCV_PCREL_HI20 = 23
+R_RISCV_PCREL_LO12_I = 24
+R_RISCV_SET8 = 54
+R_RISCV_SET16 = 55
+
+# ancho de un valor de .data -> tipo de reubicación absoluta
+_ABS_RELOC = {1: R_RISCV_SET8, 2: R_RISCV_SET16, 4: R_RISCV_32, 8: R_RISCV_64}
+_ABS_WIDTH = {t: w for w, t in _ABS_RELOC.items()}
+
+SECTION_ALIGN = 16  # alineación de .data/.bss de cada objeto al enlazar
+
+OBJ_MAGIC = b"RV32OBJ\x01"
+
+@dataclass(frozen=True)
+class ObjSymbol:
+    """Símbolo definido en un objeto."""
+    section: Optional[str]              # '.text'/'.data'/'.bss'; None = absoluto (.equ)
+    value: int                          # offset dentro de la sección (o valor absoluto)
+    binding: Literal["local", "global"] = "local"
+
+@dataclass(frozen=True)
+class Relocation:
+    """Campo que se completa al enlazar.
+
+    'offset' es relativo a la sección del objeto; en PCREL_LO12_I 'pair' es
+    el offset del auipc emparejado (el valor se calcula respecto a su PC).
+    """
+    section: str
+    offset: int
+    type: int
+    symbol: str
+    pair: int = -1
+    line: int = 0
+    col: int = 0
+
+@dataclass(frozen=True)
+class ObjectFile:
+    """Objeto reubicable: secciones en 0 y campos dependientes de la posición a cero."""
+    name: Optional[str]
+    text: array                         # array('I'), palabras de .text
+    data: DataImage                     # imagen de .data con base 0
+    bss_size: int
+    symbols: Dict[str, ObjSymbol]
+    relocations: List[Relocation]
+    diagnostics: List[Diagnostic]
+
+    @property
+    def undefined(self) -> List[str]:
+        """Símbolos referenciados y no definidos aquí (externos), sin repetir."""
+        return list(dict.fromkeys(r.symbol for r in self.relocations
+                                  if r.symbol not in self.symbols))
+
+@dataclass(frozen=True)
+class Program:
+    """Resultado del enlazado: .text parcheado, imagen de .data y layout final.
+
+    'link' describe el programa como una pasada 1 (sirve a write_elf); su
+    symtab sólo contiene los símbolos globales.
+    """
+    text: array
+    data: DataImage
+    link: LinkResult
+    diagnostics: List[Diagnostic]
+
+# ---------------- Generación del objeto ----------------
+
+Node = Union[Label, Directive, Instruction]
+
+def _relocatable(nodes: Iterable[Node], link: LinkResult, relocs: List[Relocation],
+                 diags: List[Diagnostic]) -> Iterator[Node]:
+    """Sustituye por 0 los operandos simbólicos que sólo se conocen al enlazar
+    y anota su reubicación. Las referencias a etiquetas locales de .text no
+    cambian: .text se mueve como bloque y el offset relativo se mantiene."""
+    sections = link.sections
+    zero = imm(0)
+    section: Optional[str] = None
+    pc = 0
+    hi: Dict[Tuple[int, str], int] = {}  # (rd del auipc, símbolo) -> offset del auipc
+
+    for n in nodes:
+        if isinstance(n, Directive):
+            if n.name in SECTION_NAMES:
+                section = n.name
+            yield n
+            continue
+        if section is None:
+            section = ".text"  # como en la pasada 1
+        if not isinstance(n, Instruction) or section != ".text":
+            yield n
+            continue
+        at, pc = pc, pc + 4
+        ops = n.operands
+        sp = SPEC.get(n.mnemonic.lower())
+        if sp is None or not ops or not isinstance(ops[-1], Sym):
+            yield n
+            continue
+        name, part = _base_sym(ops[-1].name)
+        if sections.get(name, "") == ".text":
+            yield n
+            continue
+        kind, pair = None, -1
+        if part is None and sp.itype == "B":
+            kind = R_RISCV_BRANCH
+        elif part is None and sp.itype == "J":
+            kind = R_RISCV_JAL
+        elif part == "hi" and n.mnemonic.lower() == "auipc" and isinstance(ops[0], Reg):
+            kind = R_RISCV_PCREL_HI20
+            hi[(ops[0].num, name)] = at
+        elif part == "lo" and len(ops) == 3 and isinstance(ops[1], Reg):
+            kind = R_RISCV_PCREL_LO12_I
+            pair = hi.get((ops[1].num, name), -1)
+            if pair < 0:
+                diags.append(error(f"No se encontró AUIPC previo para {name}@pcrel_lo",
+                                   line=n.line, col=n.col))
+                kind = None
+        if kind is None:
+            yield n  # forma no reubicable: el codificador da el diagnóstico
+            continue
+        relocs.append(Relocation(".text", at, kind, name, pair, n.line, n.col))
+        yield Instruction(mnemonic=n.mnemonic, operands=list(ops[:-1]) + [zero],
+                          line=n.line, col=n.col, section=n.section)
+
+def build_object(nodes: List[Node], link: LinkResult, *, name: Optional[str] = None) -> ObjectFile:
+    """Construye el objeto a partir de nodos expandidos y su pasada 1.
+
+    'link' debe venir de first_pass(nodes, base_text=0, base_data=0): los
+    valores de los símbolos son entonces offsets de sección.
+    """
+    relocs: List[Relocation] = []
+    diags: List[Diagnostic] = []
+    enc = encode(list(_relocatable(nodes, link, relocs, diags)), link.symtab, text_base=0)
+    image = build_data_image(link, resolve=False)
+    for ch in link.data_chunks:
+        for rel, width, sym_name in ch.fixups:
+            relocs.append(Relocation(".data", ch.offset + rel, _ABS_RELOC[width], sym_name,
+                                     line=ch.line, col=ch.col))
+
+    symbols: Dict[str, ObjSymbol] = {}
+    for sym_name, value in link.symtab.items():
+        sec = link.sections.get(sym_name)
+        if sec == ".bss":
+            value -= link.bss_base
+        binding = "global" if sym_name in link.global_symbols else "local"
+        symbols[sym_name] = ObjSymbol(sec, value, binding)
+    return ObjectFile(name=name, text=enc.buffer, data=image, bss_size=link.bss_size,
+                      symbols=symbols, relocations=relocs,
+                      diagnostics=list(link.diagnostics) + diags + list(enc.diagnostics))
+
+# ---------------- Enlazado ----------------
+
+def link_objects(
+    objects: Sequence[ObjectFile],
+    *,
+    base_text: int = 0x0000_0000,
+    base_data: int = 0x1000_0000,
+) -> Program:
+    """Enlaza varios objetos en un programa.
+
+    .text se concatena en orden; .data y .bss de cada objeto se alinean a
+    SECTION_ALIGN. Cada reubicación se resuelve primero con los símbolos del
+    propio objeto y después con los globales; los campos se rellenan con OR
+    sobre las palabras (el objeto los dejó a cero).
+    """
+    diags: List[Diagnostic] = []
+    text_off: List[int] = []
+    data_off: List[int] = []
+    bss_off: List[int] = []
+    t = d = b = 0
+    for o in objects:
+        text_off.append(t)
+        t += 4 * len(o.text)
+        d = _align_up(d, SECTION_ALIGN)
+        data_off.append(d)
+        d += o.data.size
+    data_size = _align_up(d, SECTION_ALIGN)
+    bss_base = base_data + data_size
+    for o in objects:
+        b = _align_up(b, SECTION_ALIGN)
+        bss_off.append(b)
+        b += o.bss_size
+
+    def address(k: int, s: ObjSymbol) -> int:
+        if s.section == ".text":
+            return base_text + text_off[k] + s.value
+        if s.section == ".data":
+            return base_data + data_off[k] + s.value
+        if s.section == ".bss":
+            return bss_base + bss_off[k] + s.value
+        return s.value
+
+    # Símbolos globales
+    owner: Dict[str, int] = {}
+    symtab: Dict[str, int] = {}
+    sections: Dict[str, Optional[str]] = {}
+    for k, o in enumerate(objects):
+        for sym_name, s in o.symbols.items():
+            if s.binding != "global":
+                continue
+            if sym_name in owner:
+                diags.append(error(f"Símbolo global definido en varios objetos: {sym_name}",
+                                   file=o.name, hint=f"ya definido en {objects[owner[sym_name]].name}"))
+                continue
+            owner[sym_name] = k
+            symtab[sym_name] = address(k, s)
+            sections[sym_name] = s.section
+
+    def undefined(k: int, r: Relocation) -> Diagnostic:
+        hint = None
+        for o in objects:
+            if r.symbol in o.symbols:
+                hint = f"es local en {o.name}; declárelo con .globl"
+                break
+        return error(f"Símbolo no definido: {r.symbol}", line=r.line, col=r.col,
+                     file=objects[k].name, hint=hint)
+
+    # Secciones combinadas (copias: los objetos no se modifican)
+    text = array('I')
+    for o in objects:
+        text.extend(o.text)
+    segs: List[Tuple[int, bytearray]] = []
+    for k, o in enumerate(objects):
+        segs.extend((data_off[k] + off, bytearray(seg)) for off, seg in o.data.segments)
+    starts = [off for off, _ in segs]
+
+    for k, o in enumerate(objects):
+        for r in o.relocations:
+            s = o.symbols.get(r.symbol)
+            if s is not None:
+                value = address(k, s)
+            else:
+                value = symtab.get(r.symbol)
+                if value is None:
+                    diags.append(undefined(k, r))
+                    continue
+            if r.section == ".data":
+                at = data_off[k] + r.offset
+                width = _ABS_WIDTH[r.type]
+                seg_off, seg = segs[bisect_right(starts, at) - 1]
+                seg[at - seg_off:at - seg_off + width] = \
+                    (value & ((1 << (8 * width)) - 1)).to_bytes(width, "little")
+                continue
+            i = (text_off[k] + r.offset) >> 2
+            pc = base_text + text_off[k] + r.offset
+            if r.type == R_RISCV_BRANCH:
+                off = value - pc
+                if not _off_ok_B(off):
+                    diags.append(error("Offset de branch fuera de rango (±4096 bytes, paso 2)",
+                                       line=r.line, col=r.col, file=o.name))
+                text[i] |= _bits_B(off)
+            elif r.type == R_RISCV_JAL:
+                off = value - pc
+                if not _off_ok_J(off):
+                    diags.append(error("Offset de JAL fuera de rango (±1 MiB, paso 2)",
+                                       line=r.line, col=r.col, file=o.name))
+                text[i] |= _bits_J(off)
+            elif r.type == R_RISCV_PCREL_HI20:
+                text[i] |= (((value - pc + 0x800) >> 12) & 0xFFFFF) << 12
+            elif r.type == R_RISCV_PCREL_LO12_I:
+                rel = value - (base_text + text_off[k] + r.pair)
+                text[i] |= ((rel - (((rel + 0x800) >> 12) << 12)) & 0xFFF) << 20
+
+    data = DataImage(base=base_data, size=data_size, segments=segs, diagnostics=[])
+    link = LinkResult(symtab=symtab, text_base=base_text, data_base=base_data,
+                      text_size=t, data_size=data_size, diagnostics=diags,
+                      sections=sections, bss_base=bss_base, bss_size=_align_up(b, 4),
+                      global_symbols=set(symtab))
+    return Program(text=text, data=data, link=link, diagnostics=diags)
+
+# ---------------- Formato en disco ----------------
+#
+# OBJ_MAGIC seguido de una tupla marshal con tipos básicos; las palabras y
+# la imagen de .data van como bytes little-endian.
+
+def save_object(obj: ObjectFile, path: str) -> None:
+    text = array('I', obj.text)
+    if sys.byteorder == "big":
+        text.byteswap()
+    payload = (
+        obj.name, text.tobytes(), obj.data.size,
+        [(off, bytes(seg)) for off, seg in obj.data.segments], obj.bss_size,
+        [(n, s.section, s.value, s.binding) for n, s in obj.symbols.items()],
+        [(r.section, r.offset, r.type, r.symbol, r.pair, r.line, r.col) for r in obj.relocations],
+    )
+    with open(path, "wb") as f:
+        f.write(OBJ_MAGIC)
+        f.write(marshal.dumps(payload))
+
+def load_object(path: str) -> ObjectFile:
+    """Lee un objeto escrito por save_object (ValueError si no lo es)."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if not raw.startswith(OBJ_MAGIC):
+        raise ValueError(f"No es un objeto rv32i: {path}")
+    name, text_raw, data_size, segs, bss_size, syms, relocs = marshal.loads(raw[len(OBJ_MAGIC):])
+    text = array('I', text_raw)
+    if sys.byteorder == "big":
+        text.byteswap()
+    return ObjectFile(
+        name=name, text=text,
+        data=DataImage(base=0, size=data_size,
+                       segments=[(off, bytearray(seg)) for off, seg in segs], diagnostics=[]),
+        bss_size=bss_size,
+        symbols={n: ObjSymbol(sec, value, binding) for n, sec, value, binding in syms},
+        relocations=[Relocation(*r) for r in relocs],
+        diagnostics=[],
+    )
+
+# ---------------- CLI ----------------
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="RV32I: objetos reubicables y enlazado")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("compile", help="ensambla un archivo .s a un objeto reubicable")
+    c.add_argument("source", help="archivo .asm/.s de entrada")
+    c.add_argument("-o", dest="out", required=True, help="objeto de salida")
+    ln = sub.add_parser("link", help="enlaza objetos y escribe las salidas")
+    ln.add_argument("objects", nargs="+", help="objetos a enlazar (en orden)")
+    ln.add_argument("--hex", dest="out_hex", default=None, help="palabras de .text en hexadecimal")
+    ln.add_argument("--bin", dest="out_bin", default=None, help="palabras de .text en binario ASCII")
+    ln.add_argument("--raw", metavar="ARCHIVO", default=None, help="imagen cruda de .text")
+    ln.add_argument("--elf", metavar="ARCHIVO", default=None, help="ejecutable ELF32 RISC-V")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "compile":
+        from .assembler import assemble_text  # importación diferida: assembler usa este módulo
+        try:
+            with open(args.source, "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as ex:
+            print(f"ERROR: no pude leer {args.source}: {ex}", file=sys.stderr)
+            return 2
+        _, diags, _, obj = assemble_text(text, filename=args.source, relocatable=True)
+        for d in diags:
+            print(d, file=sys.stderr)
+        if any(d.severity == "error" for d in diags):
+            return 1
+        save_object(obj, args.out)
+        print(f"OK: {len(obj.text)} instrucciones, {len(obj.relocations)} reubicaciones → {args.out}")
+        return 0
+
+    from .writers import write_hex, write_bin, write_raw
+    from .elf import write_elf
+    try:
+        objects = [load_object(p) for p in args.objects]
+    except (OSError, ValueError, EOFError) as ex:
+        print(f"ERROR: {ex}", file=sys.stderr)
+        return 2
+    prog = link_objects(objects)
+    for d in prog.diagnostics:
+        print(d, file=sys.stderr)
+    if any(d.severity == "error" for d in prog.diagnostics):
+        return 1
+    try:
+        if args.out_hex:
+            write_hex(prog.text, args.out_hex)
+        if args.out_bin:
+            write_bin(prog.text, args.out_bin)
+        if args.raw:
+            write_raw(prog.text, args.raw)
+        if args.elf:
+            write_elf(args.elf, prog.text, prog.link, data=prog.data)
+    except OSError as ex:
+        print(f"ERROR al escribir salidas: {ex}", file=sys.stderr)
+        return 3
+    outs = ", ".join(p for p in (args.out_hex, args.out_bin, args.raw, args.elf) if p)
+    print(f"OK: {len(objects)} objetos, {len(prog.text)} instrucciones → {outs or '(sin salidas)'}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,35 +1,31 @@
 # src/rv32i_asm/parser.py
 from __future__ import annotations
-import re
-from typing import List, Tuple, Optional, Union
-
-from .lexer import (
-    strip_comment,
-    split_label,
-    split_mnemonic_operands,
-    split_operands,
-)
-from .ast import Label, Directive, Instruction, Reg, Imm, Sym, Mem, Operand
-from .regs import normalize_reg, reg_num
-from .diagnostics import error, Diagnostic
+from typing import Dict, Iterable, Iterator, List, Tuple, Optional, Union
+
+import gc
+from _thread import allocate_lock  # como threading.Lock, sin importar threading al arrancar
+from contextlib import contextmanager
+from sys import intern
 
-HEX_IMM_RE = re.compile(r"^[+-]?0x[0-9a-fA-F]+$")
-DEC_IMM_RE = re.compile(r"^[+-]?\d+$")
-SYMBOL_RE  = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
-MEM_RE     = re.compile(r"^(?P<off>[^(]+)?\(\s*(?P<base>[^)]+)\s*\)$")
+from .lexer import LINE_RE, fast_split_operands
+from .ast import (Label, Directive, Instruction, Reg, Mem, Operand,
+                  REGS, REG_TABLE, IMM_SYMBOLIC_ZERO, SECTION_NAMES, imm, sym)
+from .regs import normalize_reg
+from .diagnostics import error, Diagnostic
+from .utils import LazyRegex
 
-def _parse_imm(token: str) -> Union[Imm, Sym]:
-    t = token.strip()
-    if HEX_IMM_RE.match(t) or DEC_IMM_RE.match(t):
-        return Imm(int(t, 0), origin="numeric")
-    if SYMBOL_RE.match(t):
-        # Los operandos simbólicos se representan como Sym a nivel de instrucción
-        return Sym(t)
-    raise ValueError(f"Inmediato/símbolo inválido: {token}")
+# Se compilan en el primer uso (sólo las necesitan inmediatos, símbolos y operandos de memoria)
+HEX_IMM_RE = LazyRegex(r"^[+-]?0x[0-9a-fA-F]+$")
+DEC_IMM_RE = LazyRegex(r"^[+-]?\d+$")
+SYMBOL_RE  = LazyRegex(r"^[A-Za-z_][A-Za-z0-9_]*$")
+MEM_RE     = LazyRegex(r"^(?P<off>[^(]+)?\(\s*(?P<base>[^)]+)\s*\)$")
 
 def _parse_reg(token: str) -> Reg:
-    name = normalize_reg(token)
-    return Reg(name=name, num=reg_num(name))
+    r = REG_TABLE.get(token)
+    if r is not None:
+        return r
+    # mayúsculas, 'x05', espacios...: camino general (lanza ValueError si no es registro)
+    return REGS[int(normalize_reg(token)[1:])]
 
 def _parse_mem(token: str) -> Mem:
     m = MEM_RE.match(token.strip())
@@ -41,17 +37,190 @@ def _parse_mem(token: str) -> Mem:
 
     # offset puede ser numérico o simbólico; Mem.offset es Imm, por eso usamos Imm(origin="symbolic")
     if off_raw == '' or off_raw == '+':
-        off = Imm(0, origin="numeric")
+        off = imm(0)
     else:
         if HEX_IMM_RE.match(off_raw) or DEC_IMM_RE.match(off_raw):
-            off = Imm(int(off_raw, 0), origin="numeric")
+            off = imm(int(off_raw, 0))
         elif SYMBOL_RE.match(off_raw):
-            off = Imm(0, origin="symbolic")
+            off = IMM_SYMBOLIC_ZERO
         else:
             raise ValueError(f"Desplazamiento inválido en operando de memoria: '{off_raw}'")
     return Mem(base=base, offset=off)
 
-def parse(text: str, *, filename: Optional[str] = None) -> Tuple[List[Union[Label, Directive, Instruction]], List[Diagnostic]]:
+Node = Union[Label, Directive, Instruction]
+
+def _parse_directive(dname: str, args: List[str], lineno: int, section: Optional[str],
+                     filename: Optional[str], diags: List[Diagnostic]) -> Optional[Directive]:
+    """Construye el Directive de una directiva ya tokenizada (None si hubo error)."""
+    # .equ NAME, VALUE  o  .equ NAME VALUE
+    if dname == '.equ':
+        if len(args) < 2:
+            diags.append(error(".equ requiere nombre y valor", line=lineno, file=filename))
+            return None
+        name = args[0].rstrip(',')
+        if not SYMBOL_RE.match(name):
+            diags.append(error("Nombre de .equ inválido", line=lineno, file=filename))
+            return None
+        val_tok = args[1].rstrip(',')
+        try:
+            val = int(val_tok, 0)
+        except Exception:
+            diags.append(error("Valor de .equ inválido", line=lineno, file=filename))
+            return None
+        return Directive(name='.equ', args=[name, val], line=lineno, col=1, section=section)
+    # Otras directivas (datos, alineación, etc.) -> se pasan con args crudos
+    return Directive(name=dname, args=args, line=lineno, col=1, section=section)
+
+# ---- Clasificación de operandos ----
+#
+# Un operando es imm(rs1) si lleva paréntesis y acaba en ')'; si no, una
+# sola regex con un grupo por clase dice si es un número o un nombre, y un
+# nombre es registro (REG_TABLE, con mayúsculas o 'x05' como alternativa)
+# o símbolo. Los operandos son inmutables y los mismos textos se repiten
+# muchísimo (registros, inmediatos pequeños, etiquetas), así que el
+# resultado se guarda por texto: casi todos los operandos cuestan una
+# búsqueda en un dict. La tabla está acotada, como la de símbolos.
+
+_OPERAND_KIND_RE = LazyRegex(r"(?P<num>[+-]?(?:0x[0-9a-fA-F]+|\d+))|(?P<name>[A-Za-z_][A-Za-z0-9_]*)")
+OPERAND_CACHE_MAX = 1 << 16
+_OPERAND_CACHE: Dict[str, Operand] = {}
+_HEAD_CACHE: Dict[str, str] = {}  # cabeza tal cual -> en minúsculas e internada
+
+def _operand(tok: str) -> Operand:
+    """Clasifica un operando; ValueError con el texto del diagnóstico si no es válido."""
+    if '(' in tok and tok.endswith(')'):
+        try:
+            return _parse_mem(tok)
+        except ValueError:
+            raise
+        except Exception:
+            raise ValueError(f"Operando inválido: '{tok}'") from None
+    m = _OPERAND_KIND_RE.fullmatch(tok)
+    if m is not None:
+        if m.lastgroup == "name":
+            t = tok.lower()
+            r = REG_TABLE.get(t)
+            if r is not None:
+                return r
+            if t[0] == "x" and t[1:].isdigit() and int(t[1:]) <= 31:
+                return REGS[int(t[1:])]
+            return sym(tok)
+        try:
+            return imm(int(tok, 0))
+        except ValueError:
+            pass  # '010': ceros a la izquierda
+    raise ValueError(f"Operando inválido: '{tok}'")
+
+def _parse_operands(ops: List[str], lineno: int, filename: Optional[str],
+                    diags: List[Diagnostic]) -> List[Operand]:
+    operands: List[Operand] = []
+    cache = _OPERAND_CACHE
+    for tok in ops:
+        op = cache.get(tok)
+        if op is None:
+            try:
+                op = _operand(tok)
+            except ValueError as e:
+                diags.append(error(str(e), line=lineno, file=filename))
+                continue
+            if len(cache) >= OPERAND_CACHE_MAX:
+                cache.clear()
+            cache[tok] = op
+        operands.append(op)
+    return operands
+
+def parse_iter(lines: Iterable[str], *, filename: Optional[str] = None,
+               diags: Optional[List[Diagnostic]] = None,
+               first_line: int = 1, section: Optional[str] = None) -> Iterator[Node]:
+    """Versión en streaming de parse(): consume líneas (p.ej. un objeto archivo)
+    y produce nodos uno a uno. Los diagnósticos se añaden a 'diags' si se pasa.
+    Para parsear un trozo de archivo, 'first_line' y 'section' dan el número
+    de su primera línea y la sección activa en ese punto."""
+    if diags is None:
+        diags = []
+    # section: '.text', '.data' o '.bss'
+
+    # Una sola pasada por línea con la regex maestra del lexer (lo mismo que
+    # tokenize(), sin el generador intermedio): los operandos de hasta tres
+    # tokens simples salen de sus grupos o1..o3 y se resuelven con la tabla
+    # de operandos ya clasificados; sólo el resto pasa por _parse_operands.
+    # Los nodos conservan col=1 para no alterar la salida histórica de parse().
+    match = LINE_RE.match
+    op_get = _OPERAND_CACHE.get
+    heads = _HEAD_CACHE
+    lineno = first_line - 1
+    for raw in lines:
+        lineno += 1
+        label, head, ops, o1, o2, o3, rest = match(raw).groups()
+        # 1) 'label:' (posiblemente seguido de directiva o instrucción)
+        if label is not None:
+            yield Label(label, lineno, 1, section)
+        if head is None:
+            continue
+        name = heads.get(head)
+        if name is None:
+            # mnemónicos internados: todas las instrucciones comparten la misma cadena
+            name = intern(head.lower())
+            if len(heads) >= OPERAND_CACHE_MAX:
+                heads.clear()
+            heads[head] = name
+
+        # 2) Directiva
+        if name[0] == '.':
+            # Cambios de sección
+            if name in SECTION_NAMES:
+                section = name
+                yield Directive(name, [], lineno, 1, section)
+                continue
+            d = _parse_directive(name, ops.split(), lineno, section, filename, diags)
+            if d is not None:
+                yield d
+            continue
+
+        # 3) Instrucción: mnemónico + operandos
+        if rest:
+            operands = _parse_operands(fast_split_operands(ops), lineno, filename, diags)
+        elif o1 is None:
+            operands = []
+        elif o2 is None:
+            a = op_get(o1)
+            operands = [a] if a is not None else _parse_operands([o1], lineno, filename, diags)
+        elif o3 is None:
+            a, b = op_get(o1), op_get(o2)
+            operands = [a, b] if a is not None and b is not None \
+                else _parse_operands([o1, o2], lineno, filename, diags)
+        else:
+            a, b, c = op_get(o1), op_get(o2), op_get(o3)
+            operands = [a, b, c] if a is not None and b is not None and c is not None \
+                else _parse_operands([o1, o2, o3], lineno, filename, diags)
+        yield Instruction(name, operands, lineno, 1, section)
+
+# El recolector cíclico se dispara por número de asignaciones y recorre una
+# y otra vez la lista de nodos que no para de crecer, aunque los nodos no
+# formen ciclos: parse() lo pausa mientras construye la lista. gc.disable()
+# es global al proceso, así que las pausas se cuentan (el servidor parsea
+# en varios hilos) y sólo la última en salir lo vuelve a activar.
+_GC_LOCK = allocate_lock()
+_gc_pauses = 0
+_gc_was_enabled = False
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    global _gc_pauses, _gc_was_enabled
+    with _GC_LOCK:
+        if _gc_pauses == 0:
+            _gc_was_enabled = gc.isenabled()
+            gc.disable()
+        _gc_pauses += 1
+    try:
+        yield
+    finally:
+        with _GC_LOCK:
+            _gc_pauses -= 1
+            if _gc_pauses == 0 and _gc_was_enabled:
+                gc.enable()
+
+def parse(text: str, *, filename: Optional[str] = None) -> Tuple[List[Node], List[Diagnostic]]:
     """
     Devuelve (nodes, diagnostics) donde nodes es una lista de:
       - Directive(name, args, line, col, section)
@@ -64,106 +233,7 @@ def parse(text: str, *, filename: Optional[str] = None) -> Tuple[List[Union[Labe
       - Directivas: línea que empieza con '.' ('.text', '.data', '.equ', '.word', '.ascii', ...).
       - Instrucciones: resto (mnemónico + operandos).
     """
-    nodes: List[Union[Label, Directive, Instruction]] = []
     diags: List[Diagnostic] = []
-    section: Optional[str] = None  # '.text' o '.data'
-
-    def _handle_directive_line(core: str, lineno: int) -> bool:
-        nonlocal section
-        """Procesa una línea que empieza por '.' y genera un Directive en nodes.
-        Devuelve True si consumió la línea; False si no (no debería ocurrir)."""
-        parts = core.split()
-        if not parts:
-            return True
-        dname = parts[0].lower()
-        args = parts[1:]
-        # Cambios de sección
-        if dname in ('.text', '.data'):
-            nonlocal section
-            section = dname
-            nodes.append(Directive(name=dname, args=[], line=lineno, col=1, section=section))
-            return True
-        # .equ NAME, VALUE  o  .equ NAME VALUE
-        if dname == '.equ':
-            if len(args) < 2:
-                diags.append(error(".equ requiere nombre y valor", line=lineno, file=filename))
-                return True
-            name = args[0].rstrip(',')
-            if not SYMBOL_RE.match(name):
-                diags.append(error("Nombre de .equ inválido", line=lineno, file=filename))
-                return True
-            val_tok = args[1].rstrip(',')
-            try:
-                val = int(val_tok, 0)
-            except Exception:
-                diags.append(error("Valor de .equ inválido", line=lineno, file=filename))
-                return True
-            nodes.append(Directive(name='.equ', args=[name, val], line=lineno, col=1, section=section))
-            return True
-        # Otras directivas (datos, alineación, etc.) -> se pasan con args crudos
-        nodes.append(Directive(name=dname, args=args, line=lineno, col=1, section=section))
-        return True
-
-    lines = text.splitlines()
-    for lineno, raw in enumerate(lines, start=1):
-        core = strip_comment(raw)
-        if not core:
-            continue
-
-        # 1) Línea que comienza con .directiva
-        if core.startswith('.'):
-            _handle_directive_line(core, lineno)
-            continue
-
-        # 2) 'label:' y 'label: <resto>'
-        label, rest = split_label(core)
-        if label:
-            nodes.append(Label(name=label, line=lineno, col=1, section=section))
-            if not rest:
-                continue
-            core = rest
-
-            # >>> CAMBIO: si tras la etiqueta viene una directiva, manejarla como directiva
-            if core.startswith('.'):
-                _handle_directive_line(core, lineno)
-                continue
-            # <<< FIN CAMBIO
-
-        # 3) Instrucción: mnemónico + operandos
-        mnemonic, op_str = split_mnemonic_operands(core)
-        if not mnemonic:
-            continue
-
-        operands: List[Operand] = []
-        if op_str:
-            ops = split_operands(op_str)
-            for tok in ops:
-                tok_s = tok.strip()
-                if '(' in tok_s and tok_s.endswith(')'):
-                    try:
-                        operands.append(_parse_mem(tok_s))
-                        continue
-                    except ValueError as e:
-                        diags.append(error(str(e), line=lineno, file=filename))
-                        continue
-                    except Exception:
-                        diags.append(error(f"Operando inválido: '{tok_s}'", line=lineno, file=filename))
-                        continue
-                # registro
-                try:
-                    operands.append(_parse_reg(tok_s))
-                    continue
-                except Exception:
-                    pass
-                # inmediato o símbolo
-                try:
-                    val = _parse_imm(tok_s)
-                    operands.append(val)
-                    continue
-                except Exception:
-                    diags.append(error(f"Operando inválido: '{tok_s}'", line=lineno, file=filename))
-                    continue
-
-        nodes.append(Instruction(mnemonic=mnemonic.lower(), operands=operands, line=lineno, col=1, section=section))
-
+    with _gc_paused():
+        nodes = list(parse_iter(text.splitlines(), filename=filename, diags=diags))
     return nodes, diags
@@ -1,9 +1,10 @@
 from __future__ import annotations
-from typing import List, Union
-from .ast import Instruction, Label, Directive, Reg, Imm, Sym, Mem, Operand
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+from .ast import Instruction, Label, Directive, Reg, Imm, Sym, Mem, Operand, REGS, imm, sym
+from .isa import SPEC
 
-def _rx(n: int) -> Reg: return Reg(name=f"x{n}", num=n)
-X0=_rx(0); RA=_rx(1); T0=_rx(5); T1=_rx(6)
+X0=REGS[0]; RA=REGS[1]; T0=REGS[5]; T1=REGS[6]
+IMM0=imm(0); IMM1=imm(1); IMM_M1=imm(-1)
 
 LOADS={"lb","lh","lw","lbu","lhu"}
 STORES={"sb","sh","sw"}
@@ -11,7 +12,7 @@ STORES={"sb","sh","sw"}
 def _copy(ins: Instruction, mnemonic: str, ops: list[Operand]) -> Instruction:
     return Instruction(mnemonic=mnemonic, operands=ops, line=ins.line, col=ins.col, section=ins.section)
 
-def _sym_suffix(sym: Sym, suffix: str) -> Sym: return Sym(name=f"{sym.name}@{suffix}")
+def _sym_suffix(s: Sym, suffix: str) -> Sym: return sym(f"{s.name}@{suffix}")
 
 def _as_reg(op: Operand) -> Reg:
     assert isinstance(op, Reg), f"Se esperaba registro, obtuve {op!r}"
@@ -29,10 +30,10 @@ def _li_expand(ins: Instruction) -> list[Instruction]:
         return [_copy(ins,"auipc",[rd,_sym_suffix(op1,"pcrel_hi")]), _copy(ins,"addi",[rd,rd,_sym_suffix(op1,"pcrel_lo")])]
     assert isinstance(op1, Imm)
     v = op1.value
-    if _fits_i12(v): return [_copy(ins,"addi",[rd,X0,Imm(v)])]
+    if _fits_i12(v): return [_copy(ins,"addi",[rd,X0,imm(v)])]
     upper = (v + 0x800) >> 12
     low   = v - (upper << 12)
-    return [_copy(ins,"lui",[rd,Imm(upper)]), _copy(ins,"addi",[rd,rd,Imm(low)])]
+    return [_copy(ins,"lui",[rd,imm(upper)]), _copy(ins,"addi",[rd,rd,imm(low)])]
 
 def _la_expand(ins: Instruction) -> list[Instruction]:
     rd = _as_reg(ins.operands[0]); sym = ins.operands[1]
@@ -53,53 +54,132 @@ def _tail_expand(ins: Instruction) -> list[Instruction]:
     assert isinstance(op, Imm)
     return [_copy(ins,"jal",[X0,op])]
 
-def expand(nodes: list[Union[Label,Directive,Instruction]]) -> list[Union[Label,Directive,Instruction]]:
-    out: list[Union[Label,Directive,Instruction]] = []
+# ---------------- Registro de seudoinstrucciones ----------------
+#
+# (mnemónico, aridad) -> handler(ins) -> lista de instrucciones reales.
+# Un handler puede devolver [ins] para dejar la instrucción tal cual.
+
+PseudoHandler = Callable[[Instruction], List[Instruction]]
+
+_PSEUDOS: Dict[Tuple[str, int], PseudoHandler] = {}
+# Mnemónicos del ISA sin ninguna seudo registrada: pasan sin buscar en _PSEUDOS
+_PASSTHROUGH: Set[str] = set(SPEC)
+
+def register_pseudo(mnemonic: str, arity: int, handler: Optional[PseudoHandler] = None, *,
+                    replace: bool = False):
+    """Registra una seudoinstrucción (mnemónico, aridad) -> handler.
+
+    Se puede usar como decorador: @register_pseudo("inc", 1).
+    Lanza ValueError si ya existe y no se pasa replace=True.
+    """
+    def _register(fn: PseudoHandler) -> PseudoHandler:
+        key = (mnemonic.lower(), arity)
+        if key in _PSEUDOS and not replace:
+            raise ValueError(f"Seudoinstrucción ya registrada: {key[0]}/{arity}")
+        _PSEUDOS[key] = fn
+        _PASSTHROUGH.discard(key[0])
+        return fn
+    if handler is not None:
+        return _register(handler)
+    return _register
+
+def unregister_pseudo(mnemonic: str, arity: int) -> None:
+    """Elimina una seudoinstrucción registrada (KeyError si no existe)."""
+    m = mnemonic.lower()
+    del _PSEUDOS[(m, arity)]
+    if m in SPEC and not any(k[0] == m for k in _PSEUDOS):
+        _PASSTHROUGH.add(m)
+
+def _rr(mnemonic: str, order: str, extra: Optional[Operand] = None) -> PseudoHandler:
+    """Handler 'op rd, rs' -> real con operandos según 'order' (d=rd, s=rs, 0=x0, i=extra)."""
+    def h(n: Instruction) -> List[Instruction]:
+        rd, rs = _as_reg(n.operands[0]), _as_reg(n.operands[1])
+        pick = {"d": rd, "s": rs, "0": X0, "i": extra}
+        return [_copy(n, mnemonic, [pick[c] for c in order])]
+    return h
+
+def _bz(mnemonic: str, swap: bool) -> PseudoHandler:
+    """Handler 'bXXz rs, off' -> branch real contra x0."""
+    def h(n: Instruction) -> List[Instruction]:
+        rs, off = _as_reg(n.operands[0]), _as_imm_or_sym(n.operands[1])
+        return [_copy(n, mnemonic, [X0, rs, off] if swap else [rs, X0, off])]
+    return h
+
+def _bswap(mnemonic: str) -> PseudoHandler:
+    """Handler 'bgt rs, rt, off' -> 'blt rt, rs, off' (operandos intercambiados)."""
+    def h(n: Instruction) -> List[Instruction]:
+        rs, rt, off = _as_reg(n.operands[0]), _as_reg(n.operands[1]), _as_imm_or_sym(n.operands[2])
+        return [_copy(n, mnemonic, [rt, rs, off])]
+    return h
+
+def _load_sym(n: Instruction) -> List[Instruction]:
+    ops = n.operands
+    if not isinstance(ops[1], Sym):
+        return [n]
+    sym=ops[1]; rd=_as_reg(ops[0])
+    return _la_expand(_copy(n,"la",[rd,sym])) + [_copy(n,n.mnemonic.lower(),[rd,Mem(base=rd, offset=IMM0)])]
+
+def _store_sym(n: Instruction) -> List[Instruction]:
+    ops = n.operands
+    if not isinstance(ops[1], Sym):
+        return [n]
+    sym=ops[1]; rs2=_as_reg(ops[0])
+    return _la_expand(_copy(n,"la",[T0,sym])) + [_copy(n,n.mnemonic.lower(),[rs2,Mem(base=T0, offset=IMM0)])]
+
+register_pseudo("nop", 0, lambda n: [_copy(n,"addi",[X0,X0,IMM0])])
+register_pseudo("mv",   2, _rr("addi",  "dsi", IMM0))
+register_pseudo("not",  2, _rr("xori",  "dsi", IMM_M1))
+register_pseudo("neg",  2, _rr("sub",   "d0s"))
+register_pseudo("seqz", 2, _rr("sltiu", "dsi", IMM1))
+register_pseudo("snez", 2, _rr("sltu",  "d0s"))
+register_pseudo("sltz", 2, _rr("slt",   "ds0"))
+register_pseudo("sgtz", 2, _rr("slt",   "d0s"))
+
+register_pseudo("beqz", 2, _bz("beq", swap=False))
+register_pseudo("bnez", 2, _bz("bne", swap=False))
+register_pseudo("blez", 2, _bz("bge", swap=True))
+register_pseudo("bgez", 2, _bz("bge", swap=False))
+register_pseudo("bltz", 2, _bz("blt", swap=False))
+register_pseudo("bgtz", 2, _bz("blt", swap=True))
+
+register_pseudo("bgt",  3, _bswap("blt"))
+register_pseudo("ble",  3, _bswap("bge"))
+register_pseudo("bgtu", 3, _bswap("bltu"))
+register_pseudo("bleu", 3, _bswap("bgeu"))
+
+register_pseudo("j",    1, lambda n: [_copy(n,"jal",[X0,_as_imm_or_sym(n.operands[0])])])
+register_pseudo("jal",  1, lambda n: [_copy(n,"jal",[RA,_as_imm_or_sym(n.operands[0])])])
+register_pseudo("jr",   1, lambda n: [_copy(n,"jalr",[X0,_as_reg(n.operands[0]),IMM0])])
+register_pseudo("jalr", 1, lambda n: [_copy(n,"jalr",[RA,_as_reg(n.operands[0]),IMM0])])
+register_pseudo("ret",  0, lambda n: [_copy(n,"jalr",[X0,RA,IMM0])])
+
+register_pseudo("li",   2, _li_expand)
+register_pseudo("la",   2, _la_expand)
+register_pseudo("call", 1, _call_expand)
+register_pseudo("tail", 1, _tail_expand)
+
+for _m in LOADS:
+    register_pseudo(_m, 2, _load_sym)
+for _m in STORES:
+    register_pseudo(_m, 2, _store_sym)
+
+def expand_iter(nodes: Iterable[Union[Label,Directive,Instruction]]) -> Iterator[Union[Label,Directive,Instruction]]:
+    """Expande seudoinstrucciones en streaming (nodo a nodo)."""
+    passthrough = _PASSTHROUGH
+    pseudos = _PSEUDOS
     for n in nodes:
-        if not isinstance(n, Instruction): out.append(n); continue
-        m = n.mnemonic.lower(); ops = n.operands
-
-        if m == "nop" and len(ops) == 0: out.append(_copy(n,"addi",[X0,X0,Imm(0)])); continue
-        if m == "mv"  and len(ops) == 2: rd,rs=_as_reg(ops[0]),_as_reg(ops[1]); out.append(_copy(n,"addi",[rd,rs,Imm(0)])); continue
-        if m == "not" and len(ops) == 2: rd,rs=_as_reg(ops[0]),_as_reg(ops[1]); out.append(_copy(n,"xori",[rd,rs,Imm(-1)])); continue
-        if m == "neg" and len(ops) == 2: rd,rs=_as_reg(ops[0]),_as_reg(ops[1]); out.append(_copy(n,"sub",[rd,X0,rs])); continue
-        if m == "seqz" and len(ops)==2: rd,rs=_as_reg(ops[0]),_as_reg(ops[1]); out.append(_copy(n,"sltiu",[rd,rs,Imm(1)])); continue
-        if m == "snez" and len(ops)==2: rd,rs=_as_reg(ops[0]),_as_reg(ops[1]); out.append(_copy(n,"sltu",[rd,X0,rs])); continue
-        if m == "sltz" and len(ops)==2: rd,rs=_as_reg(ops[0]),_as_reg(ops[1]); out.append(_copy(n,"slt",[rd,rs,X0])); continue
-        if m == "sgtz" and len(ops)==2: rd,rs=_as_reg(ops[0]),_as_reg(ops[1]); out.append(_copy(n,"slt",[rd,X0,rs])); continue
-
-        if m == "beqz" and len(ops)==2: rs,off=_as_reg(ops[0]),_as_imm_or_sym(ops[1]); out.append(_copy(n,"beq",[rs,X0,off])); continue
-        if m == "bnez" and len(ops)==2: rs,off=_as_reg(ops[0]),_as_imm_or_sym(ops[1]); out.append(_copy(n,"bne",[rs,X0,off])); continue
-        if m == "blez" and len(ops)==2: rs,off=_as_reg(ops[0]),_as_imm_or_sym(ops[1]); out.append(_copy(n,"bge",[X0,rs,off])); continue
-        if m == "bgez" and len(ops)==2: rs,off=_as_reg(ops[0]),_as_imm_or_sym(ops[1]); out.append(_copy(n,"bge",[rs,X0,off])); continue
-        if m == "bltz" and len(ops)==2: rs,off=_as_reg(ops[0]),_as_imm_or_sym(ops[1]); out.append(_copy(n,"blt",[rs,X0,off])); continue
-        if m == "bgtz" and len(ops)==2: rs,off=_as_reg(ops[0]),_as_imm_or_sym(ops[1]); out.append(_copy(n,"blt",[X0,rs,off])); continue
-
-        if m == "bgt"  and len(ops)==3: rs,rt,off=_as_reg(ops[0]),_as_reg(ops[1]),_as_imm_or_sym(ops[2]); out.append(_copy(n,"blt",[rt,rs,off])); continue
-        if m == "ble"  and len(ops)==3: rs,rt,off=_as_reg(ops[0]),_as_reg(ops[1]),_as_imm_or_sym(ops[2]); out.append(_copy(n,"bge",[rt,rs,off])); continue
-        if m == "bgtu" and len(ops)==3: rs,rt,off=_as_reg(ops[0]),_as_reg(ops[1]),_as_imm_or_sym(ops[2]); out.append(_copy(n,"bltu",[rt,rs,off])); continue
-        if m == "bleu" and len(ops)==3: rs,rt,off=_as_reg(ops[0]),_as_reg(ops[1]),_as_imm_or_sym(ops[2]); out.append(_copy(n,"bgeu",[rt,rs,off])); continue
-
-        if m == "j"   and len(ops)==1: out.append(_copy(n,"jal",[X0,_as_imm_or_sym(ops[0]) ])); continue
-        if m == "jal" and len(ops)==1: out.append(_copy(n,"jal",[RA,_as_imm_or_sym(ops[0]) ])); continue
-        if m == "jr"  and len(ops)==1: rs=_as_reg(ops[0]); out.append(_copy(n,"jalr",[X0,rs,Imm(0)])); continue
-        if m == "jalr" and len(ops)==1: rs=_as_reg(ops[0]); out.append(_copy(n,"jalr",[RA,rs,Imm(0)])); continue
-        if m == "ret" and len(ops)==0: out.append(_copy(n,"jalr",[X0,RA,Imm(0)])); continue
-
-        if m == "li"  and len(ops)==2: out.extend(_li_expand(n)); continue
-        if m == "la"  and len(ops)==2: out.extend(_la_expand(n)); continue
-        if m == "call" and len(ops)==1: out.extend(_call_expand(n)); continue
-        if m == "tail" and len(ops)==1: out.extend(_tail_expand(n)); continue
-
-        if m in LOADS and len(ops)==2 and isinstance(ops[1], Sym):
-            sym=ops[1]; rd=_as_reg(ops[0])
-            out.extend(_la_expand(_copy(n,"la",[rd,sym])))
-            out.append(_copy(n,m,[rd,Mem(base=rd, offset=Imm(0))])); continue
-
-        if m in STORES and len(ops)==2 and isinstance(ops[1], Sym):
-            sym=ops[1]; rs2=_as_reg(ops[0])
-            out.extend(_la_expand(_copy(n,"la",[T0,sym])))
-            out.append(_copy(n,m,[rs2,Mem(base=T0, offset=Imm(0))])); continue
-
-        out.append(n)
-    return out
+        if not isinstance(n, Instruction):
+            yield n
+            continue
+        m = n.mnemonic
+        if m in passthrough:
+            yield n
+            continue
+        h = pseudos.get((m.lower(), len(n.operands)))
+        if h is None:
+            yield n
+        else:
+            yield from h(n)
+
+def expand(nodes: list[Union[Label,Directive,Instruction]]) -> list[Union[Label,Directive,Instruction]]:
+    return list(expand_iter(nodes))
@@ -0,0 +1,156 @@
+# src/rv32i_asm/server.py
+from __future__ import annotations
+import argparse, io, json, os, socket, socketserver, sys, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from .assembler import run
+from .cache import BuildCache, MemoryCache, DEFAULT_MAX_BYTES
+from .client import default_socket, owned_by_user, private_socket_dir
+
+# ---------------- Modo servidor ----------------
+#
+# 'python -m rv32i_asm serve' deja un proceso escuchando en un socket Unix
+# con las tablas del ISA ya importadas y una MemoryCache caliente. El
+# protocolo y el cliente están en client.py.
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                reply = self.server.handle_job(json.loads(line))
+            except (ValueError, TypeError, KeyError) as ex:
+                reply = {"code": 2, "stdout": "", "stderr": f"ERROR: petición inválida: {ex}\n",
+                         "diagnostics": []}
+            self.wfile.write(json.dumps(reply).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+class AssemblerServer(socketserver.UnixStreamServer):
+    """Servidor de ensamblado: cada conexión se atiende en un hilo del pool."""
+
+    def __init__(self, path: str, *, workers: Optional[int] = None,
+                 cache_dir: Optional[str] = None, cache_entries: int = 256) -> None:
+        if os.path.dirname(os.path.abspath(path)) == os.path.abspath(private_socket_dir()):
+            _check_private_dir(os.path.dirname(path))
+        self.pool = ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4)
+        self.cache_dir = cache_dir
+        self.cache_entries = cache_entries
+        self._caches: Dict[Tuple[Optional[str], int], MemoryCache] = {}
+        self._lock = threading.Lock()
+        _remove_stale(path)
+        super().__init__(path, _Handler)
+
+    def server_bind(self) -> None:
+        # sólo el usuario puede conectarse (connect() exige escritura en el socket)
+        old = os.umask(0o077)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(old)
+
+    def process_request(self, request, client_address) -> None:
+        self.pool.submit(self._process, request, client_address)
+
+    def _process(self, request, client_address) -> None:
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self) -> None:
+        super().server_close()
+        self.pool.shutdown(wait=True)
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+    def cache_for(self, cache_dir: Optional[str], size_mib: int) -> MemoryCache:
+        """Una MemoryCache por directorio de caché en disco (o sin disco)."""
+        cache_dir = cache_dir or self.cache_dir
+        k = (cache_dir, size_mib)
+        with self._lock:
+            cache = self._caches.get(k)
+            if cache is None:
+                backing = BuildCache(cache_dir, max_bytes=size_mib << 20) if cache_dir else None
+                cache = self._caches[k] = MemoryCache(max_entries=self.cache_entries,
+                                                      backing=backing)
+            return cache
+
+    def handle_job(self, job: dict) -> dict:
+        args = argparse.Namespace(**job["args"])
+        out, err = io.StringIO(), io.StringIO()
+        cwd = job.get("cwd")
+        cache_dir = args.cache_dir
+        if cache_dir and cwd:
+            cache_dir = os.path.join(cwd, cache_dir)
+        try:
+            code, diags = run(args, stdout=out, stderr=err, text=job.get("text"), cwd=cwd,
+                              cache=self.cache_for(cache_dir, args.cache_size or DEFAULT_MAX_BYTES >> 20))
+        except Exception as ex:  # el servidor no debe caer por una petición
+            code, diags = 2, []
+            print(f"ERROR interno del servidor: {ex!r}", file=err)
+        return {
+            "code": code, "stdout": out.getvalue(), "stderr": err.getvalue(),
+            "diagnostics": [{"severity": d.severity, "message": d.message, "line": d.line,
+                             "col": d.col, "hint": d.hint, "file": d.file} for d in diags],
+        }
+
+def _check_private_dir(path: str) -> None:
+    """Crea el directorio por defecto del socket (0700) o comprueba que el
+    que ya existe es del usuario y nadie más puede entrar en él."""
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    st = os.lstat(path)
+    if not os.path.isdir(path) or os.path.islink(path) or not owned_by_user(st) \
+            or st.st_mode & 0o077:
+        raise OSError(f"{path} no es un directorio privado del usuario (esperado modo 0700)")
+
+def _remove_stale(path: str) -> None:
+    """Borra el socket de un servidor que ya no existe (no el de uno vivo)."""
+    if not os.path.exists(path):
+        return
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(path)
+    except OSError:
+        os.unlink(path)
+        return
+    finally:
+        s.close()
+    raise OSError(f"ya hay un servidor escuchando en {path}")
+
+def serve(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="rv32i_asm serve",
+                                 description="servidor de ensamblado en un socket Unix")
+    ap.add_argument("--socket", default=default_socket(),
+                    help="ruta del socket (por defecto $RV32I_ASM_SOCKET, o rv32i_asm.sock en "
+                         "$XDG_RUNTIME_DIR o en un directorio 0700 bajo el temporal)")
+    ap.add_argument("--workers", type=int, default=None, help="hilos del pool (por defecto, nº de CPUs)")
+    ap.add_argument("--cache-dir", default=os.environ.get("RV32I_ASM_CACHE"),
+                    help="caché en disco bajo la caché en memoria")
+    ap.add_argument("--cache-entries", type=int, default=256,
+                    help="resultados que se conservan en memoria")
+    args = ap.parse_args(argv)
+    try:
+        server = AssemblerServer(args.socket, workers=args.workers, cache_dir=args.cache_dir,
+                                 cache_entries=args.cache_entries)
+    except OSError as ex:
+        print(f"ERROR: no pude escuchar en {args.socket}: {ex}", file=sys.stderr)
+        return 2
+    print(f"Escuchando en {args.socket}", file=sys.stderr)
+    with server:
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(serve())
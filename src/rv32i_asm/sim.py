@@ -0,0 +1,1182 @@
+# src/rv32i_asm/sim.py
+from __future__ import annotations
+import os, sys, time
+from array import array
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from .isa import SPEC, OP_SYSTEM
+from .encoding import SHIFT_MNEMS
+from .linker import LinkResult
+from .data import DataImage
+
+if TYPE_CHECKING:
+    from .trace import Trace
+
+# ---------------- Simulador RV32I ----------------
+#
+# Ejecuta directamente las palabras de EncodeResult y la imagen de .data,
+# sin pasar por archivos. Cada palabra se decodifica una sola vez (con las
+# tablas de isa.SPEC) a un manejador más una tupla de operandos ya
+# preparados: destinos de salto absolutos, inmediatos enmascarados, valor
+# de lui/auipc... Las entradas se guardan por PC, y una escritura en .text
+# o un fence.i las invalidan. El bucle de despacho sólo hace una búsqueda
+# en un dict y una llamada por instrucción.
+#
+# Los registros son enteros sin signo de 32 bits en la lista 'x'. x[32] es
+# un sumidero: las escrituras a x0 se dirigen ahí al predecodificar, así que
+# x[0] vale siempre 0 sin comprobarlo en cada instrucción.
+#
+# Por defecto (mode="blocks") no se despacha instrucción a instrucción: cada
+# bloque básico se traduce a una función Python generada (ver "Bloques
+# básicos" más abajo). "predecode" es el intérprete con caché por PC y
+# "naive" decodifica en cada paso; sirven de referencia y para medir.
+
+M32 = 0xFFFF_FFFF
+SIGN = 0x8000_0000
+STACK_TOP = 0x8000_0000   # sp inicial (la pila crece hacia abajo)
+STACK_SIZE = 1 << 20
+SINK = 32                 # índice del registro sumidero de las escrituras a x0
+MAX_BLOCK = 64            # instrucciones por bloque básico como mucho
+MODES = ("blocks", "predecode", "naive")
+
+class SimError(Exception):
+    """Fallo de la máquina simulada (instrucción ilegal, acceso inválido...)."""
+
+class _Halt(Exception):
+    """Parada ordenada: exit o ebreak. 'pc' es donde se reanudaría."""
+
+    def __init__(self, reason: str, pc: int) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.pc = pc
+
+# ---------------- Decodificación ----------------
+
+@dataclass(frozen=True)
+class Decoded:
+    """Campos de una palabra RV32I. 'imm' va con signo (en U, ya desplazado)."""
+    mnemonic: str
+    rd: int
+    rs1: int
+    rs2: int
+    imm: int
+
+def _decode_key(name: str, itype: str, opcode: int, funct3: Optional[int],
+                funct7: Optional[int]) -> Tuple[int, Optional[int], Optional[int]]:
+    if itype == "R" or name in SHIFT_MNEMS:
+        return opcode, funct3, funct7
+    if itype == "SYS":  # ecall/ebreak sólo se distinguen por imm[11:0]
+        return opcode, funct3, 1 if name == "ebreak" else 0
+    if itype in ("U", "J"):
+        return opcode, None, None
+    return opcode, funct3, None
+
+# (opcode, funct3, funct7 | imm de SYSTEM | None) -> (mnemónico, tipo)
+_DECODE: Dict[Tuple[int, Optional[int], Optional[int]], Tuple[str, str]] = {
+    _decode_key(name, sp.itype, sp.opcode, sp.funct3, sp.funct7): (name, sp.itype)
+    for name, sp in SPEC.items()
+}
+
+def _imm(word: int, itype: str) -> int:
+    if itype in ("I", "SYS", "FENCE"):
+        return ((word >> 20) ^ 0x800) - 0x800
+    if itype == "S":
+        return ((((word >> 25) << 5) | ((word >> 7) & 0x1F)) ^ 0x800) - 0x800
+    if itype == "B":
+        v = ((word >> 31) << 12 | ((word >> 7) & 1) << 11
+             | ((word >> 25) & 0x3F) << 5 | ((word >> 8) & 0xF) << 1)
+        return (v ^ 0x1000) - 0x1000
+    if itype == "U":
+        return ((word & 0xFFFF_F000) ^ SIGN) - SIGN
+    # J
+    v = ((word >> 31) << 20 | ((word >> 12) & 0xFF) << 12
+         | ((word >> 20) & 1) << 11 | ((word >> 21) & 0x3FF) << 1)
+    return (v ^ 0x10_0000) - 0x10_0000
+
+def decode(word: int) -> Decoded:
+    """Decodifica una palabra con las tablas de isa.SPEC (SimError si es ilegal)."""
+    opc, f3 = word & 0x7F, (word >> 12) & 7
+    hit = (_DECODE.get((opc, f3, word >> 20 if opc == OP_SYSTEM else word >> 25))
+           or _DECODE.get((opc, f3, None)) or _DECODE.get((opc, None, None)))
+    if hit is None:
+        raise SimError(f"instrucción ilegal 0x{word:08x}")
+    name, itype = hit
+    imm = (word >> 20) & 0x1F if name in SHIFT_MNEMS else _imm(word, itype)
+    return Decoded(name, (word >> 7) & 31, (word >> 15) & 31, (word >> 20) & 31, imm)
+
+# ---------------- Bloques básicos ----------------
+#
+# Un bloque es una racha de instrucciones que termina en un salto (tipos B
+# y J de isa.SPEC, jalr), en ecall/ebreak (SYS) o en fence.i. Se traduce a
+# una función 'blk(budget)' cuyo fuente se genera aquí: los registros que
+# usa se leen a variables locales al entrar y los escritos se devuelven a
+# 'x' al salir, las escrituras a x0 desaparecen (una carga a x0 se hace
+# igual, por si falla) y los inmediatos van como constantes. Devuelve
+# (siguiente pc, instrucciones ejecutadas).
+#
+# Si el salto final vuelve al inicio del bloque, el bucle se cierra dentro
+# de la función: los registros siguen en locales entre vueltas y sólo se
+# sale al no tomarse el salto o al agotar 'budget' instrucciones.
+#
+# Un almacén que toca .text (comprobado en línea con los límites de .text
+# como constantes) invalida los bloques afectados y sale del bloque en curso
+# justo detrás, por si se ha modificado a sí mismo. Un
+# SimError deja en sim._fault el pc de la instrucción que falló y cuántas
+# se completaron, con los registros ya devueltos a 'x'.
+
+_BRANCH_COND = {
+    "beq": "{a} == {b}", "bne": "{a} != {b}",
+    "blt": "{a} ^ 0x80000000 < {b} ^ 0x80000000", "bge": "{a} ^ 0x80000000 >= {b} ^ 0x80000000",
+    "bltu": "{a} < {b}", "bgeu": "{a} >= {b}",
+}
+
+_ALU_EXPR = {
+    "add": "({a} + {b}) & 0xffffffff", "sub": "({a} - {b}) & 0xffffffff",
+    "sll": "({a} << ({b} & 31)) & 0xffffffff",
+    "slt": "1 if {a} ^ 0x80000000 < {b} ^ 0x80000000 else 0", "sltu": "1 if {a} < {b} else 0",
+    "xor": "{a} ^ {b}", "srl": "{a} >> ({b} & 31)",
+    "sra": "((({a} ^ 0x80000000) - 0x80000000) >> ({b} & 31)) & 0xffffffff",
+    "or": "{a} | {b}", "and": "{a} & {b}",
+    "slti": "1 if {a} ^ 0x80000000 < {i} else 0",
+    "sltiu": "1 if {a} < {i} else 0", "xori": "{a} ^ {i}", "ori": "{a} | {i}", "andi": "{a} & {i}",
+    "slli": "({a} << {i}) & 0xffffffff", "srli": "{a} >> {i}",
+    "srai": "((({a} ^ 0x80000000) - 0x80000000) >> {i}) & 0xffffffff",
+}
+
+_LOADS = frozenset(("lb", "lh", "lw", "lbu", "lhu"))
+
+def ends_block(name: str) -> bool:
+    """¿Termina 'name' un bloque básico?"""
+    return SPEC[name].itype in ("B", "J", "SYS") or name in ("jalr", "fence.i")
+
+def _imm_operand(d: Decoded, pc: int) -> int:
+    """Inmediato tal como lo usa la expresión de _ALU_EXPR (o el valor de U)."""
+    name, imm = d.mnemonic, d.imm
+    if name == "slti":
+        return (imm & M32) ^ SIGN
+    if name == "lui":
+        return imm & M32
+    if name == "auipc":
+        return (pc + imm) & M32
+    return imm if name in SHIFT_MNEMS else imm & M32
+
+def _signed(imm: int) -> str:
+    return f"- {-imm}" if imm < 0 else f"+ {imm}"
+
+def block_source(entry: int, insns: List[Decoded], *, text: Tuple[int, int] = (0, 0),
+                 trace: Optional[Tuple[int, int]] = None) -> str:
+    """Fuente de la función 'blk' del bloque 'insns' que empieza en 'entry'.
+    'text' es [inicio, fin) de .text, para detectar los almacenes que lo tocan.
+    Con 'trace' = (id del bloque, capacidad del anillo), cada ejecución del
+    bloque deja una entrada en el anillo de la traza (ver trace.py)."""
+    n = len(insns)
+    last = insns[-1]
+    term = last if ends_block(last.mnemonic) else None
+    tpc = entry + 4 * (n - 1)
+    target = (tpc + last.imm) & M32
+    loop = term is not None and (SPEC[term.mnemonic].itype == "B" or term.mnemonic == "jal") \
+        and target == entry
+    used: Dict[int, None] = {}      # registros a cargar en locales (en orden)
+    written: Dict[int, None] = {}   # registros a devolver a x
+    names = {"x"}
+    code: List[Tuple[int, str]] = []  # (sangría relativa, línea); "@WB" = devolver registros
+    guarded = False                   # ¿hay accesos a memoria (que pueden fallar)?
+    vals: List[Optional[str]] = [None] * n   # para la traza: valor y dirección de cada
+    addrs: List[Optional[str]] = [None] * n  # instrucción (None: no tiene)
+    last_write: Dict[int, int] = {}  # registro -> última instrucción del bloque que lo escribe
+    for j, d in enumerate(insns):
+        if d.rd and SPEC[d.mnemonic].itype in ("R", "I", "U", "J"):
+            last_write[d.rd] = j
+
+    def rd_(r: int) -> str:
+        if not r:
+            return "0"
+        used[r] = None
+        return f"r{r}"
+
+    def wr(r: int) -> str:
+        used[r] = written[r] = None
+        return f"r{r}"
+
+    def done(j: str) -> str:
+        return f"k * {n} + {j}" if loop else j
+
+    def tval(j: int, r: int) -> str:
+        """Valor de la instrucción j (que escribe r) para la traza: el propio
+        registro si nada lo vuelve a escribir en el bloque; si no, una copia."""
+        if not trace:
+            return ""
+        if last_write[r] == j:
+            vals[j] = f"r{r}"
+            return ""
+        vals[j] = f"v{j}"
+        return f"v{j} = "
+
+    for j, d in enumerate(insns if term is None else insns[:-1]):
+        pc = entry + 4 * j
+        name = d.mnemonic
+        if name == "fence":
+            continue
+        if name in _LOADS or SPEC[name].itype == "S":
+            names.update((name, "SimError", "sim"))
+            guarded = True
+            base = rd_(d.rs1)
+            addr = base if not d.imm else f"({base} {_signed(d.imm)}) & 0xffffffff"
+            code.append((0, f"i = {j}"))
+            lo, hi = text
+            is_store = name not in _LOADS
+            if trace and addr == base and last_write.get(d.rs1, -1) <= j:
+                addrs[j] = addr  # la base sigue valiendo lo mismo al registrar
+            elif trace or (is_store and lo < hi and addr != base):
+                var = f"a{j}" if trace else "a"
+                code.append((0, f"{var} = {addr}"))
+                addr = addrs[j] = var
+            if not is_store:
+                if d.rd:
+                    code.append((0, f"{wr(d.rd)} = {tval(j, d.rd)}{name}({addr})"))
+                else:
+                    code.append((0, f"{name}({addr})"))
+                continue
+            if trace:
+                vals[j] = rd_(d.rs2)
+                if d.rs2 and last_write.get(d.rs2, -1) > j:
+                    vals[j] = f"v{j}"
+                    code.append((0, f"v{j} = {rd_(d.rs2)}"))
+            code.append((0, f"{name}({addr}, {rd_(d.rs2)})"))
+            if lo < hi:
+                size = {"sb": 1, "sh": 2, "sw": 4}[name]
+                names.add("invalidate")
+                hit = f"{addr} < {hi}" + (f" and {addr} + {size} > {lo}" if lo > 0 else "")
+                code += [(0, f"if {hit}:"), (1, f"invalidate({addr}, {size})"), (1, f"@REC {j + 1}"),
+                         (1, "@WB"), (1, f"return {pc + 4}, {done(str(j + 1))}")]
+            continue
+        if not d.rd:
+            continue  # escritura a x0 sin efectos
+        if name in ("lui", "auipc"):
+            expr = str(_imm_operand(d, pc))
+        elif name == "addi" and not d.rs1:
+            expr = str(d.imm & M32)
+        elif name == "addi" and not d.imm:
+            expr = rd_(d.rs1)
+        elif name == "addi":
+            expr = f"({rd_(d.rs1)} {_signed(d.imm)}) & 0xffffffff"
+        else:
+            b = rd_(d.rs2) if SPEC[name].itype == "R" else ""
+            expr = _ALU_EXPR[name].format(a=rd_(d.rs1), b=b, i=_imm_operand(d, pc))
+        code.append((0, f"{wr(d.rd)} = {tval(j, d.rd)}{expr}"))
+
+    tail: List[Tuple[int, str]] = []  # tras el cuerpo (fuera del try)
+    nxt = None
+    if term is not None and term.mnemonic in ("jal", "jalr") and term.rd:
+        vals[n - 1] = str(tpc + 4)
+    if term is None:
+        nxt = str(entry + 4 * n)
+    elif term.mnemonic in _BRANCH_COND:
+        cond = _BRANCH_COND[term.mnemonic].format(a=rd_(term.rs1), b=rd_(term.rs2))
+        if loop:
+            code += [(0, f"@RECL {n}"), (0, "k += 1"), (0, f"if not ({cond}):"),
+                     (1, f"nxt = {tpc + 4}"), (1, "break"),
+                     (0, "if k >= kmax:"), (1, f"nxt = {entry}"), (1, "break")]
+        else:
+            tail.append((0, f"nxt = {target} if {cond} else {tpc + 4}"))
+            nxt = "nxt"
+    elif term.mnemonic == "jal":
+        link = [(0, f"{wr(term.rd)} = {tpc + 4}")] if term.rd else []
+        if loop:
+            code += link + [(0, f"@RECL {n}"), (0, "k += 1"), (0, "if k >= kmax:"),
+                            (1, f"nxt = {entry}"), (1, "break")]
+        else:
+            tail += link
+            nxt = str(target)
+    elif term.mnemonic == "jalr":
+        base = rd_(term.rs1)
+        tail.append((0, f"nxt = ({base} {_signed(term.imm)}) & 0xfffffffe" if term.imm
+                     else f"nxt = {base} & 0xfffffffe"))
+        if term.rd:
+            tail.append((0, f"{wr(term.rd)} = {tpc + 4}"))
+        nxt = "nxt"
+    elif term.mnemonic == "ecall":
+        names.update(("sim", "SimError"))
+        tail += [(0, "@WB"), (0, f"sim.pc = {tpc}"), (0, "try:"), (1, "sim.on_ecall(sim)"),
+                 (0, "except SimError:"), (1, f"sim._fault = ({tpc}, {n - 1})"), (1, "raise"),
+                 (0, f"return {tpc + 4}, {n}")]
+    elif term.mnemonic == "ebreak":
+        names.add("_Halt")
+        tail += [(0, "@WB"), (0, f"raise _Halt('ebreak', {tpc + 4})")]
+    else:  # fence.i
+        names.add("flush")
+        tail += [(0, "@WB"), (0, "flush()"), (0, f"return {tpc + 4}, {n}")]
+    if nxt is not None:
+        tail += [(0, "@WB"), (0, f"return {nxt}, {n}")]
+    elif loop:
+        tail += [(0, "@TCHK"), (0, "@WB"), (0, f"return nxt, k * {n}")]
+    if not loop:
+        tail.insert(0, (0, f"@REC {n}"))
+
+    if loop:
+        code = [(0, "while True:")] + [(ind + 1, line) for ind, line in code]
+    if guarded:
+        code = ([(0, "try:")] + [(ind + 1, line) for ind, line in code]
+                + [(0, "except SimError:"), (1, "@REC i"), (1, "@WB"),
+                   (1, f"sim._fault = ({entry} + 4 * i, {done('i')})"), (1, "raise")])
+    head = [(0, f"r{r} = x[{r}]") for r in used]
+    if trace:
+        fields = [f for pair in zip(vals, addrs) for f in pair if f is not None]
+    if loop:
+        # con traza, cada vuelta añade una entrada sin mirar si cabe: se
+        # limitan las vueltas al hueco que queda, redondeando hacia arriba
+        # (siempre hay al menos una palabra libre)
+        kmax = f"budget // {n}"
+        if trace:
+            room, width = f"{trace[1]} - len(tslots)", 1 + len(fields)
+            kmax = f"min({kmax}, {room})" if width == 1 else \
+                f"min({kmax}, ({room} + {width - 1}) // {width})"
+        head += [(0, "k = 0"), (0, f"kmax = {kmax}")]
+    if trace:
+        names.update(("tappend", "textend", "tslots", "twrap", "len"))
+        dyn = [f for f in fields if f[0] in "av"]
+        if dyn and guarded:  # un fallo a mitad de bloque registra también las que no llegaron
+            head.append((0, " = ".join(dyn) + " = 0"))
+        from .trace import COUNT_SHIFT
+        tid = trace[0]
+        record = [f"textend(({', '.join(['{}'] + fields)}))" if fields else "tappend({})"]
+        check = [f"if len(tslots) >= {trace[1]}:", "    twrap()"]
+
+        def rec_head(count: str) -> str:  # primera palabra: id y completadas
+            return str(int(count) << COUNT_SHIFT | tid) if count.isdigit() \
+                else f"{count} << {COUNT_SHIFT} | {tid}"
+
+    params = ", ".join(["budget"] + [f"{v}={v}" for v in sorted(names)])
+    out = [f"def blk({params}):"]
+    for ind, line in head + code + tail:
+        pad = "    " * (ind + 1)
+        if line == "@WB":
+            out += [f"{pad}x[{r}] = r{r}" for r in written]
+        elif line.startswith("@REC"):  # "@REC n": registra y vacía si está lleno
+            if trace:                   # "@RECL n": sólo registra (vuelta de un bucle)
+                count = line.split()[1]
+                out += [pad + rec.format(rec_head(count)) for rec in record]
+                if line[4] != "L":
+                    out += [pad + c for c in check]
+        elif line == "@TCHK":
+            if trace:
+                out += [pad + c for c in check]
+        else:
+            out.append(pad + line)
+    return "\n".join(out) + "\n"
+
+# ---------------- Memoria ----------------
+#
+# Espacio de 32 bits disperso, por páginas de 4 KiB. map() sólo declara qué
+# rangos son válidos (a granularidad de página); cada página se reserva la
+# primera vez que se toca, así que mapear una pila o un montón grandes no
+# cuesta nada hasta usarlos. Un rango puede respaldarse con un mmap anónimo
+# o de archivo (backing=...); entonces las páginas son vistas del mmap.
+#
+# De cada página tocada se guardan tres vistas: bytes, medias palabras
+# (cast('H')) y palabras (cast('I')), en tres dicts por número de página.
+# lb/lh/lw/lbu/lhu/sb/sh/sw son clausuras que, si el acceso está alineado y
+# la página existe, hacen una búsqueda en un dict y un índice; el resto
+# (primer toque, accesos desalineados o que cruzan página, fallos) va por
+# load()/store(). Las vistas nativas sólo se usan en máquinas little-endian.
+
+PAGE_BITS = 12
+PAGE_SIZE = 1 << PAGE_BITS
+_OFF = PAGE_SIZE - 1
+_FAST = sys.byteorder == "little" and array('I').itemsize == 4 and array('H').itemsize == 2
+
+Backing = Union[None, str, BinaryIO]
+
+class Memory:
+    """Memoria paginada y dispersa. Fuera de los rangos mapeados todo acceso
+    es un SimError.
+
+    Con 'mmap_threshold', los rangos de al menos ese tamaño que se mapeen
+    sin 'backing' usan un mmap anónimo en vez de páginas sueltas.
+    """
+
+    def __init__(self, *, mmap_threshold: Optional[int] = None) -> None:
+        self.mmap_threshold = mmap_threshold
+        # (primera página, página tras la última, vista del mmap o None), ordenadas
+        self.regions: List[Tuple[int, int, Optional[memoryview]]] = []
+        self._starts: List[int] = []
+        self._mmaps: list = []
+        self._b: Dict[int, memoryview] = {}   # página -> bytes
+        self._h: Dict[int, memoryview] = {}   # página -> medias palabras
+        self._w: Dict[int, memoryview] = {}   # página -> palabras
+        self._make_access()
+
+    # --- mapeo ---
+
+    def map(self, base: int, size: int, *, backing: Backing = None,
+            exist_ok: bool = False) -> None:
+        """Declara válido [base, base+size), redondeado a páginas enteras.
+
+        'backing' es None (páginas al primer toque), "anon" (mmap anónimo)
+        o un archivo binario abierto (mmap compartido: lo escrito llega al
+        archivo, que se alarga si hace falta). Con exist_ok, las páginas ya
+        mapeadas se respetan y sólo se añade el resto; si no, solapar es un
+        ValueError."""
+        end = base + size
+        if base < 0 or end > 1 << 32:
+            raise ValueError(f"región fuera del espacio de 32 bits: 0x{base:x}+{size}")
+        lo, hi = base >> PAGE_BITS, (end + _OFF) >> PAGE_BITS
+        if lo >= hi:
+            return
+        spans = [(lo, hi)]
+        for b, e, _ in self.regions:
+            if b < hi and lo < e:
+                if not exist_ok:
+                    raise ValueError(f"la región 0x{base:08x}-0x{end:08x} solapa con "
+                                     f"0x{b << PAGE_BITS:08x}-0x{e << PAGE_BITS:08x}")
+                if backing is not None:
+                    raise ValueError("una región con mmap no puede solapar con otra")
+                spans = [piece for s, t in spans
+                         for piece in ((s, min(t, b)), (max(s, e), t)) if piece[0] < piece[1]]
+        if backing is None and self.mmap_threshold is not None and size >= self.mmap_threshold:
+            backing = "anon"
+        for s, t in spans:
+            self.regions.append((s, t, self._mmap(backing, (t - s) << PAGE_BITS)))
+        self.regions.sort(key=lambda r: r[0])
+        self._starts = [r[0] for r in self.regions]
+
+    def _mmap(self, backing: Backing, size: int) -> Optional[memoryview]:
+        if backing is None:
+            return None
+        import mmap
+        if backing == "anon":
+            m = mmap.mmap(-1, size)
+        else:
+            fd = backing.fileno()
+            if os.fstat(fd).st_size < size:
+                os.ftruncate(fd, size)
+            m = mmap.mmap(fd, size)
+        self._mmaps.append(m)
+        return memoryview(m)
+
+    def close(self) -> None:
+        """Suelta las páginas y cierra los mmap (la memoria queda vacía)."""
+        for d in (self._b, self._h, self._w):
+            for v in d.values():
+                v.release()
+            d.clear()
+        for _, _, view in self.regions:
+            if view is not None:
+                view.release()
+        for m in self._mmaps:
+            m.close()
+        self._mmaps.clear()
+        self.regions.clear()
+        self._starts = []
+
+    def _page(self, pn: int, addr: int, size: int) -> memoryview:
+        """Vista de bytes de la página 'pn'; la crea en el primer toque."""
+        b = self._b.get(pn)
+        if b is not None:
+            return b
+        i = bisect_right(self._starts, pn) - 1
+        if i < 0 or pn >= self.regions[i][1]:
+            raise SimError(f"acceso a memoria no mapeada: 0x{addr & M32:08x} ({size} bytes)")
+        first, _, view = self.regions[i]
+        if view is None:
+            b = memoryview(bytearray(PAGE_SIZE))
+        else:
+            off = (pn - first) << PAGE_BITS
+            b = view[off:off + PAGE_SIZE]
+        self._b[pn] = b
+        if _FAST:
+            self._h[pn] = b.cast("H")
+            self._w[pn] = b.cast("I")
+        return b
+
+    @property
+    def resident(self) -> int:
+        """Páginas reservadas hasta ahora."""
+        return len(self._b)
+
+    # --- acceso general ---
+
+    def load(self, addr: int, size: int, signed: bool = False) -> int:
+        """Lee 'size' bytes little-endian; con signed, extendido a 32 bits."""
+        off = addr & _OFF
+        if off + size <= PAGE_SIZE:
+            data = self._page(addr >> PAGE_BITS, addr, size)[off:off + size]
+        else:
+            data = self.read(addr, size)
+        return int.from_bytes(data, "little", signed=signed) & M32
+
+    def store(self, addr: int, size: int, value: int) -> None:
+        self.write(addr, (value & ((1 << 8 * size) - 1)).to_bytes(size, "little"))
+
+    def views(self, addr: int, n: int) -> List[memoryview]:
+        """[addr, addr+n) como memoryview sobre la propia memoria (sin copiar),
+        un trozo por página. Comprueba todo el rango antes de devolver nada."""
+        out = []
+        end = addr + n
+        while addr < end:
+            off = addr & _OFF
+            k = min(PAGE_SIZE - off, end - addr)
+            out.append(self._page(addr >> PAGE_BITS, addr, n)[off:off + k])
+            addr += k
+        return out
+
+    def read(self, addr: int, n: int) -> bytes:
+        return b"".join(self.views(addr, n))
+
+    def write(self, addr: int, data: bytes) -> None:
+        pos = 0
+        for v in self.views(addr, len(data)):
+            v[:] = data[pos:pos + len(v)]
+            pos += len(v)
+
+    def read_cstring(self, addr: int, limit: int = 4096) -> bytes:
+        """Cadena terminada en NUL que empieza en 'addr' (sin el NUL)."""
+        out = bytearray()
+        pos = addr
+        while len(out) < limit:
+            off = pos & _OFF
+            chunk = self._page(pos >> PAGE_BITS, pos, 1)[off:off + min(PAGE_SIZE - off,
+                                                                        limit - len(out))]
+            nul = bytes(chunk).find(0)
+            if nul >= 0:
+                return bytes(out + chunk[:nul])
+            out += chunk
+            pos += len(chunk)
+        raise SimError(f"cadena sin terminar en 0x{addr:08x}")
+
+    # --- accesos de las instrucciones (tiempo constante) ---
+
+    def _make_access(self) -> None:
+        b_get, h_get, w_get = self._b.get, self._h.get, self._w.get
+        load, store = self.load, self.store
+
+        def lb(addr):
+            b = b_get(addr >> 12)
+            if b is None:
+                return load(addr, 1, True)
+            return ((b[addr & 0xFFF] ^ 0x80) - 0x80) & 0xFFFF_FFFF
+        def lbu(addr):
+            b = b_get(addr >> 12)
+            if b is None:
+                return load(addr, 1)
+            return b[addr & 0xFFF]
+        def lh(addr):
+            h = h_get(addr >> 12)
+            if h is None or addr & 1:
+                return load(addr, 2, True)
+            return ((h[(addr & 0xFFF) >> 1] ^ 0x8000) - 0x8000) & 0xFFFF_FFFF
+        def lhu(addr):
+            h = h_get(addr >> 12)
+            if h is None or addr & 1:
+                return load(addr, 2)
+            return h[(addr & 0xFFF) >> 1]
+        def lw(addr):
+            w = w_get(addr >> 12)
+            if w is None or addr & 3:
+                return load(addr, 4)
+            return w[(addr & 0xFFF) >> 2]
+        def sb(addr, v):
+            b = b_get(addr >> 12)
+            if b is None:
+                store(addr, 1, v)
+            else:
+                b[addr & 0xFFF] = v & 0xFF
+        def sh(addr, v):
+            h = h_get(addr >> 12)
+            if h is None or addr & 1:
+                store(addr, 2, v)
+            else:
+                h[(addr & 0xFFF) >> 1] = v & 0xFFFF
+        def sw(addr, v):
+            w = w_get(addr >> 12)
+            if w is None or addr & 3:
+                store(addr, 4, v)
+            else:
+                w[(addr & 0xFFF) >> 2] = v & 0xFFFF_FFFF
+
+        self.lb, self.lbu, self.lh, self.lhu, self.lw = lb, lbu, lh, lhu, lw
+        self.sb, self.sh, self.sw = sb, sh, sw
+
+# ---------------- Máquina ----------------
+
+@dataclass(frozen=True)
+class RunResult:
+    """Resultado de Simulator.run()."""
+    reason: str                # 'exit', 'ebreak' o 'limit'
+    steps: int                 # instrucciones ejecutadas en esta llamada
+    seconds: float
+    exit_code: Optional[int] = None
+
+    @property
+    def ips(self) -> float:
+        """Instrucciones por segundo."""
+        return self.steps / self.seconds if self.seconds > 0 else 0.0
+
+EcallHandler = Callable[["Simulator"], None]
+
+def default_ecall(sim: "Simulator") -> None:
+    """Sólo exit (a7 = 93, código en a0); cualquier otra llamada es un error."""
+    if sim.x[17] == 93:
+        sim.exit(sim.x[10])
+    raise SimError(f"ecall no soportada (a7={sim.x[17]})")
+
+class Simulator:
+    """Máquina RV32I sobre un programa ya ensamblado.
+
+    'words' es .text (p.ej. EncodeResult.buffer) cargado en text_base;
+    'image' la imagen de .data y 'bss_base'/'bss_size' la reserva de .bss
+    (cero). La pila ocupa [stack_top - stack_size, stack_top) y sp empieza
+    en stack_top (sus páginas se reservan al tocarlas); el montón (brk) empieza en heap_start, la primera página
+    tras .text, .data y .bss. 'ecall' atiende las llamadas al sistema (por defecto sólo
+    exit). 'mode' es uno de MODES y 'mmap_threshold' pasa a Memory. Con
+    'trace' (una trace.Trace) se registra cada instrucción ejecutada.
+    """
+
+    def __init__(self, words: Iterable[int], *, text_base: int = 0,
+                 image: Optional[DataImage] = None, bss_base: int = 0, bss_size: int = 0,
+                 entry: Optional[int] = None, stack_top: int = STACK_TOP,
+                 stack_size: int = STACK_SIZE, ecall: Optional[EcallHandler] = None,
+                 mode: str = "blocks", mmap_threshold: Optional[int] = None,
+                 trace: Optional[Trace] = None) -> None:
+        if mode not in MODES:
+            raise ValueError(f"modo de simulación desconocido: {mode!r} (válidos: {', '.join(MODES)})")
+        text = array('I', words)
+        if sys.byteorder == "big":
+            text.byteswap()
+        self.mem = mem = Memory(mmap_threshold=mmap_threshold)
+        self.text_base = text_base
+        self.text_end = text_base + 4 * len(text)
+        if text:
+            mem.map(text_base, 4 * len(text))
+            mem.write(text_base, text.tobytes())
+        data_end = image.base + image.size if image is not None else 0
+        bss_end = bss_base + bss_size if bss_size else 0
+        if image is not None and max(data_end, bss_end) > image.base:
+            mem.map(image.base, max(data_end, bss_end) - image.base, exist_ok=True)
+            for off, seg in image.segments:
+                mem.write(image.base + off, seg)
+        elif bss_size:
+            mem.map(bss_base, bss_size, exist_ok=True)
+        if stack_size:
+            mem.map(stack_top - stack_size, stack_size, exist_ok=True)
+        self.heap_start = (max(self.text_end, data_end, bss_end) + 0xFFF) & ~0xFFF
+        self.x: List[int] = [0] * 33
+        self.x[2] = stack_top & M32
+        self.pc = text_base if entry is None else entry
+        self.instret = 0
+        self.exit_code: Optional[int] = None
+        self.on_ecall: EcallHandler = ecall or default_ecall
+        self.mode = mode
+        self._cache: Dict[int, tuple] = {}  # pc -> (manejador, a, b, c)
+        self._handlers = self._make_handlers()
+        self._blocks: Dict[int, Tuple[Callable[[int], Tuple[int, int]], int]] = {}  # entrada -> (blk, n)
+        self._block_words: Dict[int, List[int]] = {}  # palabra de .text -> entradas que la cubren
+        self._block_env: Optional[dict] = None
+        self._fault: Optional[Tuple[int, int]] = None  # (pc, completadas) del último fallo en un bloque
+        self.trace: Optional[Trace] = trace
+        self._trace_ops: Dict[int, tuple] = {}  # pc -> operandos de la traza del intérprete
+
+    @classmethod
+    def from_build(cls, words: Iterable[int], link: LinkResult, image: Optional[DataImage] = None,
+                   **kwargs) -> "Simulator":
+        """Máquina para el resultado de assemble_text(); entra por '_start' si existe."""
+        kwargs.setdefault("entry", link.symtab.get("_start", link.text_base))
+        return cls(words, text_base=link.text_base, image=image,
+                   bss_base=link.bss_base, bss_size=link.bss_size, **kwargs)
+
+    @classmethod
+    def from_text(cls, text: str, *, filename: Optional[str] = None, **kwargs) -> "Simulator":
+        """Ensambla 'text' y devuelve la máquina (SimError si hay errores)."""
+        from .assembler import assemble_text
+        from .data import build_data_image
+        _, diags, link, enc = assemble_text(text, filename=filename)
+        image = build_data_image(link)
+        errors = [d for d in diags if d.severity == "error"]
+        if errors:
+            raise SimError("\n".join(str(d) for d in errors))
+        return cls.from_build(enc.buffer, link, image, **kwargs)
+
+    def exit(self, code: int) -> None:
+        """Termina el programa (desde un manejador de ecall)."""
+        self.exit_code = code & 0xFF
+        raise _Halt("exit", self.pc)
+
+    # --- caché de predecodificación y de bloques ---
+
+    def invalidate(self, addr: int, size: int = 4) -> None:
+        """Olvida las instrucciones predecodificadas y los bloques traducidos
+        que solapan [addr, addr+size)."""
+        cache, blocks, words = self._cache, self._blocks, self._block_words
+        for a in range(addr & ~3, addr + size, 4):
+            cache.pop(a, None)
+            self._trace_ops.pop(a, None)
+            for entry in words.pop(a, ()):
+                blocks.pop(entry, None)
+
+    def flush(self) -> None:
+        """Olvida todo lo predecodificado y traducido (lo que hace fence.i)."""
+        self._cache.clear()
+        self._trace_ops.clear()
+        self._blocks.clear()
+        self._block_words.clear()
+
+    def set_trace(self, trace: Optional[Trace]) -> None:
+        """Activa (o con None, desactiva) la traza. Los bloques ya traducidos
+        se descartan: la traza se genera dentro de su código."""
+        self.flush()
+        self._block_env = None
+        self.trace = trace
+
+    def _predecode(self, pc: int) -> tuple:
+        if pc & 3 or not self.text_base <= pc < self.text_end:
+            raise SimError(f"pc fuera de .text o desalineado: 0x{pc:08x}")
+        word = self.mem.load(pc, 4)
+        try:
+            d = decode(word)
+        except SimError as ex:
+            raise SimError(f"{ex} en pc=0x{pc:08x}") from None
+        name, rd, imm = d.mnemonic, d.rd or SINK, d.imm
+        itype = SPEC[name].itype
+        if itype == "B":
+            ops = (d.rs1, d.rs2, (pc + imm) & M32)
+        elif itype == "S":
+            ops = (d.rs1, d.rs2, imm)
+        elif name == "jal":
+            ops = (rd, (pc + imm) & M32, pc + 4)
+        elif name == "lui":
+            ops = (rd, imm & M32, 0)
+        elif name == "auipc":
+            ops = (rd, (pc + imm) & M32, 0)
+        elif itype == "R":
+            ops = (rd, d.rs1, d.rs2)
+        elif name == "slti":
+            ops = (rd, d.rs1, (imm & M32) ^ SIGN)
+        elif name in ("sltiu", "xori", "ori", "andi"):
+            ops = (rd, d.rs1, imm & M32)
+        else:  # addi, desplazamientos, cargas, jalr, sistema, fence
+            ops = (rd, d.rs1, imm)
+        fn = self._handlers[name]
+        if rd == SINK and (itype in ("R", "U") or (itype == "I" and name in self._pure)):
+            fn = self._handlers["nop"]  # escritura a x0 sin efectos: no hace nada
+        entry = (fn,) + ops
+        self._cache[pc] = entry
+        return entry
+
+    _pure = frozenset(("addi", "slti", "sltiu", "xori", "ori", "andi", "slli", "srli", "srai"))
+
+    def _make_handlers(self) -> Dict[str, Callable[[int, int, int, int], int]]:
+        """Manejadores de cada mnemónico: reciben (pc, a, b, c) y devuelven el
+        siguiente pc. Son clausuras sobre los registros y la memoria."""
+        x, mem = self.x, self.mem
+        lb_, lh_, lw_, lbu_, lhu_ = mem.lb, mem.lh, mem.lw, mem.lbu, mem.lhu
+        sb_, sh_, sw_ = mem.sb, mem.sh, mem.sw
+        text_lo, text_hi = self.text_base, self.text_end
+        invalidate, flush = self.invalidate, self.flush
+
+        def nop(pc, a, b, c):
+            return pc + 4
+        # tipo R
+        def add(pc, d, a, b):
+            x[d] = (x[a] + x[b]) & M32
+            return pc + 4
+        def sub(pc, d, a, b):
+            x[d] = (x[a] - x[b]) & M32
+            return pc + 4
+        def sll(pc, d, a, b):
+            x[d] = (x[a] << (x[b] & 31)) & M32
+            return pc + 4
+        def slt(pc, d, a, b):
+            x[d] = 1 if x[a] ^ SIGN < x[b] ^ SIGN else 0
+            return pc + 4
+        def sltu(pc, d, a, b):
+            x[d] = 1 if x[a] < x[b] else 0
+            return pc + 4
+        def xor(pc, d, a, b):
+            x[d] = x[a] ^ x[b]
+            return pc + 4
+        def srl(pc, d, a, b):
+            x[d] = x[a] >> (x[b] & 31)
+            return pc + 4
+        def sra(pc, d, a, b):
+            x[d] = (((x[a] ^ SIGN) - SIGN) >> (x[b] & 31)) & M32
+            return pc + 4
+        def or_(pc, d, a, b):
+            x[d] = x[a] | x[b]
+            return pc + 4
+        def and_(pc, d, a, b):
+            x[d] = x[a] & x[b]
+            return pc + 4
+        # tipo I
+        def addi(pc, d, a, imm):
+            x[d] = (x[a] + imm) & M32
+            return pc + 4
+        def slti(pc, d, a, key):
+            x[d] = 1 if x[a] ^ SIGN < key else 0
+            return pc + 4
+        def sltiu(pc, d, a, imm):
+            x[d] = 1 if x[a] < imm else 0
+            return pc + 4
+        def xori(pc, d, a, imm):
+            x[d] = x[a] ^ imm
+            return pc + 4
+        def ori(pc, d, a, imm):
+            x[d] = x[a] | imm
+            return pc + 4
+        def andi(pc, d, a, imm):
+            x[d] = x[a] & imm
+            return pc + 4
+        def slli(pc, d, a, sh):
+            x[d] = (x[a] << sh) & M32
+            return pc + 4
+        def srli(pc, d, a, sh):
+            x[d] = x[a] >> sh
+            return pc + 4
+        def srai(pc, d, a, sh):
+            x[d] = (((x[a] ^ SIGN) - SIGN) >> sh) & M32
+            return pc + 4
+        # cargas
+        def lb(pc, d, a, imm):
+            x[d] = lb_((x[a] + imm) & M32)
+            return pc + 4
+        def lh(pc, d, a, imm):
+            x[d] = lh_((x[a] + imm) & M32)
+            return pc + 4
+        def lw(pc, d, a, imm):
+            x[d] = lw_((x[a] + imm) & M32)
+            return pc + 4
+        def lbu(pc, d, a, imm):
+            x[d] = lbu_((x[a] + imm) & M32)
+            return pc + 4
+        def lhu(pc, d, a, imm):
+            x[d] = lhu_((x[a] + imm) & M32)
+            return pc + 4
+        # almacenes: si tocan .text invalidan lo predecodificado
+        def sb(pc, a, b, imm):
+            addr = (x[a] + imm) & M32
+            sb_(addr, x[b])
+            if text_lo <= addr < text_hi:
+                invalidate(addr, 1)
+            return pc + 4
+        def sh(pc, a, b, imm):
+            addr = (x[a] + imm) & M32
+            sh_(addr, x[b])
+            if addr < text_hi and addr + 2 > text_lo:
+                invalidate(addr, 2)
+            return pc + 4
+        def sw(pc, a, b, imm):
+            addr = (x[a] + imm) & M32
+            sw_(addr, x[b])
+            if addr < text_hi and addr + 4 > text_lo:
+                invalidate(addr, 4)
+            return pc + 4
+        # saltos (destino ya absoluto)
+        def beq(pc, a, b, t):
+            return t if x[a] == x[b] else pc + 4
+        def bne(pc, a, b, t):
+            return t if x[a] != x[b] else pc + 4
+        def blt(pc, a, b, t):
+            return t if x[a] ^ SIGN < x[b] ^ SIGN else pc + 4
+        def bge(pc, a, b, t):
+            return t if x[a] ^ SIGN >= x[b] ^ SIGN else pc + 4
+        def bltu(pc, a, b, t):
+            return t if x[a] < x[b] else pc + 4
+        def bgeu(pc, a, b, t):
+            return t if x[a] >= x[b] else pc + 4
+        def jal(pc, d, t, link):
+            x[d] = link
+            return t
+        def jalr(pc, d, a, imm):
+            t = (x[a] + imm) & 0xFFFF_FFFE
+            x[d] = pc + 4
+            return t
+        # tipo U (valor ya calculado)
+        def lui(pc, d, v, _):
+            x[d] = v
+            return pc + 4
+        # sistema
+        def ecall(pc, a, b, c):
+            self.pc = pc
+            self.on_ecall(self)
+            return pc + 4
+        def ebreak(pc, a, b, c):
+            raise _Halt("ebreak", pc + 4)
+        def fence_i(pc, a, b, c):
+            flush()
+            return pc + 4
+
+        return {
+            "nop": nop, "add": add, "sub": sub, "sll": sll, "slt": slt, "sltu": sltu,
+            "xor": xor, "srl": srl, "sra": sra, "or": or_, "and": and_,
+            "addi": addi, "slti": slti, "sltiu": sltiu, "xori": xori, "ori": ori,
+            "andi": andi, "slli": slli, "srli": srli, "srai": srai,
+            "lb": lb, "lh": lh, "lw": lw, "lbu": lbu, "lhu": lhu,
+            "sb": sb, "sh": sh, "sw": sw,
+            "beq": beq, "bne": bne, "blt": blt, "bge": bge, "bltu": bltu, "bgeu": bgeu,
+            "jal": jal, "jalr": jalr, "lui": lui, "auipc": lui,
+            "ecall": ecall, "ebreak": ebreak, "fence": nop, "fence.i": fence_i,
+        }
+
+    def _translate(self, pc: int) -> Tuple[Callable[[int], Tuple[int, int]], int]:
+        """Traduce y guarda el bloque básico que empieza en 'pc'."""
+        if pc & 3 or not self.text_base <= pc < self.text_end:
+            raise SimError(f"pc fuera de .text o desalineado: 0x{pc:08x}")
+        insns: List[Decoded] = []
+        words: List[int] = []
+        a = pc
+        while a < self.text_end and len(insns) < MAX_BLOCK:
+            word = self.mem.load(a, 4)
+            try:
+                d = decode(word)
+            except SimError as ex:
+                if insns:
+                    break  # el bloque acaba antes; fallará al llegar ahí
+                raise SimError(f"{ex} en pc=0x{pc:08x}") from None
+            insns.append(d)
+            words.append(word)
+            a += 4
+            if ends_block(d.mnemonic):
+                break
+        env = self._block_env
+        if env is None:
+            env = self._block_env = self._make_block_env()
+        trace = self.trace
+        tinfo = (trace.define(pc, words), trace.capacity) if trace is not None else None
+        src = block_source(pc, insns, text=(self.text_base, self.text_end), trace=tinfo)
+        exec(compile(src, f"<bloque 0x{pc:08x}>", "exec"), env)
+        blk = (env.pop("blk"), len(insns))
+        self._blocks[pc] = blk
+        covers = self._block_words
+        for w in range(pc, a, 4):
+            covers.setdefault(w, []).append(pc)
+        return blk
+
+    def _make_block_env(self) -> dict:
+        """Globales de las funciones de bloque: registros, memoria y máquina."""
+        mem = self.mem
+        env = {"x": self.x, "sim": self, "SimError": SimError, "_Halt": _Halt,
+               "flush": self.flush, "invalidate": self.invalidate,
+               "lb": mem.lb, "lh": mem.lh, "lw": mem.lw, "lbu": mem.lbu, "lhu": mem.lhu,
+               "sb": mem.sb, "sh": mem.sh, "sw": mem.sw}
+        if self.trace is not None:
+            slots = self.trace.slots
+            env.update(tslots=slots, tappend=slots.append, textend=slots.extend,
+                       twrap=self.trace.wrap)
+        return env
+
+    def _trace_op(self, pc: int) -> tuple:
+        """(cabecera, clase, base, desplazamiento, registro) de la instrucción en
+        'pc' para la traza del intérprete, con los campos de trace.layout().
+        Clase "W": escribe 'registro' (rd); "L"/"S": carga en / almacena
+        desde 'registro' en base+desplazamiento; "A": carga a x0 (sólo la
+        dirección); "": nada que registrar."""
+        word = self.mem.load(pc, 4)
+        d = decode(word)  # _predecode ya la ha validado
+        itype = SPEC[d.mnemonic].itype
+        if d.mnemonic in _LOADS:
+            op = ("L" if d.rd else "A", d.rs1, d.imm, d.rd)
+        elif itype == "S":
+            op = ("S", d.rs1, d.imm, d.rs2)
+        elif itype in ("R", "I", "U", "J") and d.rd:
+            op = ("W", 0, 0, d.rd)
+        else:  # saltos condicionales, sistema, fence y escrituras a x0
+            op = ("", 0, 0, 0)
+        from .trace import COUNT_SHIFT
+        entry = (self.trace.single(pc, word) | 1 << COUNT_SHIFT,) + op
+        if self.mode != "naive":
+            self._trace_ops[pc] = entry
+        return entry
+
+    # --- ejecución ---
+
+    def step(self) -> RunResult:
+        """Ejecuta una sola instrucción."""
+        return self.run(1)
+
+    def run(self, max_steps: Optional[int] = None) -> RunResult:
+        """Ejecuta hasta exit, ebreak o 'max_steps' instrucciones. Un SimError
+        deja pc en la instrucción que falló."""
+        if self.exit_code is not None:
+            return RunResult("exit", 0, 0.0, self.exit_code)
+        limit = sys.maxsize if max_steps is None else max_steps
+        start = self.instret
+        t0 = time.perf_counter()
+        if self.mode == "blocks":
+            reason = self._run_blocks(limit)
+        else:
+            reason = self._run_steps(limit)
+        return RunResult(reason, self.instret - start, time.perf_counter() - t0, self.exit_code)
+
+    def _run_steps(self, limit: int) -> str:
+        """Intérprete: una instrucción por vuelta (modos predecode y naive)."""
+        if self.trace is not None:
+            return self._run_steps_traced(limit)
+        get = self._cache.get if self.mode != "naive" else {}.get
+        predecode = self._predecode
+        pc = self.pc
+        steps = 0
+        reason = "limit"
+        try:
+            for steps in range(1, limit + 1):
+                fn, a, b, c = get(pc) or predecode(pc)
+                pc = fn(pc, a, b, c)
+        except _Halt as h:
+            reason, pc = h.reason, h.pc
+        except BaseException:
+            steps -= 1  # la instrucción que falló no cuenta
+            raise
+        finally:
+            self.pc = pc
+            self.instret += steps
+        return reason
+
+    def _run_steps_traced(self, limit: int) -> str:
+        """_run_steps registrando cada instrucción en la traza. La dirección
+        (y el dato de un almacén) se toman antes de ejecutarla; ecall y ebreak
+        se registran antes porque pueden no volver."""
+        get = self._cache.get if self.mode != "naive" else {}.get
+        tget = self._trace_ops.get
+        predecode, trace_op = self._predecode, self._trace_op
+        slots, wrap, cap = self.trace.slots, self.trace.wrap, self.trace.capacity
+        append, extend = slots.append, slots.extend
+        x = self.x
+        pc = self.pc
+        steps = 0
+        reason = "limit"
+        try:
+            for steps in range(1, limit + 1):
+                fn, a, b, c = get(pc) or predecode(pc)
+                head, kind, base, imm, r = tget(pc) or trace_op(pc)
+                if kind == "W":
+                    pc2 = fn(pc, a, b, c)
+                    extend((head, x[r]))
+                elif kind == "L":
+                    addr = (x[base] + imm) & M32
+                    pc2 = fn(pc, a, b, c)
+                    extend((head, x[r], addr))
+                elif kind == "S":
+                    addr, v = (x[base] + imm) & M32, x[r]
+                    pc2 = fn(pc, a, b, c)
+                    extend((head, v, addr))
+                elif kind == "A":
+                    addr = (x[base] + imm) & M32
+                    pc2 = fn(pc, a, b, c)
+                    extend((head, addr))
+                else:
+                    append(head)
+                    if len(slots) >= cap:
+                        wrap()  # antes: ecall y ebreak pueden no volver
+                    pc2 = fn(pc, a, b, c)
+                if len(slots) >= cap:
+                    wrap()
+                pc = pc2
+        except _Halt as h:
+            reason, pc = h.reason, h.pc
+        except BaseException:
+            steps -= 1
+            raise
+        finally:
+            self.pc = pc
+            self.instret += steps
+        return reason
+
+    def _run_blocks(self, limit: int) -> str:
+        """Despacho por bloques traducidos. Si el siguiente bloque no cabe en
+        lo que queda de 'limit', el resto va instrucción a instrucción."""
+        get, translate = self._blocks.get, self._translate
+        pc = self.pc
+        steps = n = 0
+        try:
+            while True:
+                blk, n = get(pc) or translate(pc)
+                left = limit - steps
+                if n > left:
+                    break
+                pc, done = blk(left)
+                steps += done
+        except _Halt as h:
+            steps += n  # ecall y ebreak siempre cierran su bloque
+            pc = h.pc
+            return h.reason
+        except SimError:
+            if self._fault is not None:
+                pc, done = self._fault
+                steps += done
+                self._fault = None
+            raise
+        finally:
+            self.pc = pc
+            self.instret += steps
+        return self._run_steps(limit - steps)
+
+    def reg(self, name: str) -> int:
+        """Valor de un registro por nombre ABI o 'xN'."""
+        from .regs import reg_num
+        return self.x[reg_num(name)]
+
+# ---------------- CLI ----------------
+
+def main(argv=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m rv32i_asm.sim",
+                                 description="RV32I: ensambla y ejecuta un programa "
+                                             "(llamadas al sistema de Linux RISC-V)")
+    ap.add_argument("source", help="archivo .asm/.s de entrada")
+    ap.add_argument("--max-steps", type=int, default=None,
+                    help="límite de instrucciones (por defecto, sin límite)")
+    ap.add_argument("--stats", action="store_true",
+                    help="instrucciones ejecutadas, tiempo e instrucciones por segundo (en stderr)")
+    ap.add_argument("--mode", choices=MODES, default="blocks",
+                    help="bloques traducidos (por defecto), intérprete con caché o sin ella")
+    ap.add_argument("--trace", metavar="ARCHIVO", default=None,
+                    help="vuelca la traza de ejecución a ARCHIVO (leer con python -m rv32i_asm.trace)")
+    ap.add_argument("--trace-capacity", type=int, default=None, metavar="N",
+                    help="palabras de 32 bits en el anillo antes de cada volcado")
+    args = ap.parse_args(argv)
+    try:
+        with open(args.source, "r", encoding="utf-8") as f:
+            text = f.read()
+    except (OSError, UnicodeDecodeError) as ex:
+        print(f"ERROR: no pude leer {args.source}: {ex}", file=sys.stderr)
+        return 2
+    from contextlib import ExitStack
+    from .syscalls import LinuxSyscalls
+    sys.stdout.flush()  # la salida del programa va directa al descriptor 1
+    with ExitStack() as stack:
+        trace = None
+        if args.trace:
+            from .trace import DEFAULT_CAPACITY, Trace
+            try:
+                trace = stack.enter_context(Trace(args.trace_capacity or DEFAULT_CAPACITY,
+                                                  stream=args.trace))
+            except (OSError, ValueError) as ex:
+                print(f"ERROR: no pude crear la traza {args.trace}: {ex}", file=sys.stderr)
+                return 2
+        syscalls = stack.enter_context(LinuxSyscalls())
+        try:
+            sim = Simulator.from_text(text, filename=args.source, mode=args.mode, ecall=syscalls,
+                                      trace=trace)
+        except SimError as ex:
+            print(ex, file=sys.stderr)
+            return 1
+        try:
+            res = sim.run(args.max_steps)
+        except SimError as ex:
+            syscalls.flush()
+            print(f"ERROR de simulación: {ex} (tras {sim.instret} instrucciones)", file=sys.stderr)
+            return 2
+    if args.stats:
+        print(f"{res.steps} instrucciones en {res.seconds * 1e3:.1f} ms "
+              f"({res.ips / 1e6:.2f} M instr/s)", file=sys.stderr)
+    if res.reason == "limit":
+        print(f"ERROR: límite de {args.max_steps} instrucciones alcanzado en pc=0x{sim.pc:08x}",
+              file=sys.stderr)
+        return 2
+    if res.reason == "ebreak":
+        print(f"ebreak en pc=0x{sim.pc - 4:08x}", file=sys.stderr)
+        return 0
+    return res.exit_code
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,172 @@
+# src/rv32i_asm/stats.py
+from __future__ import annotations
+import os, time
+from _thread import allocate_lock
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Callable, ContextManager, Dict, Iterator, Optional
+
+# ---------------- Estadísticas de ensamblado (--stats) ----------------
+#
+# Un Stats se pasa a assemble_text(stats=...) y se rellena durante el
+# ensamblado: tiempo de pared y de CPU por fase, contadores (líneas, nodos,
+# instrucciones antes y después de expandir pseudos, símbolos, palabras),
+# bytes de cada salida y, si se pide, el pico de memoria de tracemalloc.
+# Sin Stats cada fase cuesta un nullcontext: el coste es despreciable.
+#
+# 'hook' recibe cada métrica en cuanto se conoce, como hook(nombre, valor):
+#   phase.<fase>.wall_s / phase.<fase>.cpu_s   (float, segundos)
+#   count.<contador>                           (int)
+#   output.<ruta>                              (int, bytes)
+#   memory.peak_bytes, total.wall_s, total.cpu_s
+# para volcarlas a un sistema de métricas propio.
+#
+# El ensamblador importa este módulo siempre (no_phase), así que json y
+# tracemalloc se importan sólo cuando se usan.
+#
+# tracemalloc es global al proceso y el servidor ejecuta run() en varios
+# hilos: las medidas de memoria van de una en una (start() toma
+# _MEMORY_LOCK y finish() lo suelta). El pico es el del proceso, así que
+# incluye lo que asignen a la vez los ensamblados sin --stats-memory.
+_MEMORY_LOCK = allocate_lock()
+
+Hook = Callable[[str, float], None]
+
+@dataclass(frozen=True)
+class PhaseTime:
+    wall: float  # segundos de reloj
+    cpu: float   # segundos de CPU del proceso
+
+def no_phase(name: str) -> ContextManager[None]:
+    """Sustituto de Stats.phase cuando no se recogen estadísticas."""
+    return nullcontext()
+
+class Stats:
+    """Tiempos por fase y contadores de un ensamblado."""
+
+    def __init__(self, *, memory: bool = False, hook: Optional[Hook] = None) -> None:
+        self.memory = memory
+        self.hook = hook
+        self.phases: Dict[str, PhaseTime] = {}  # en orden de ejecución
+        self.counts: Dict[str, int] = {}
+        self.outputs: Dict[str, int] = {}
+        self.peak_memory: Optional[int] = None
+        self.total: Optional[PhaseTime] = None
+        self._t0 = (0.0, 0.0)
+        self._tracing = False
+        self._locked = False
+
+    def _emit(self, name: str, value: float) -> None:
+        if self.hook is not None:
+            self.hook(name, value)
+
+    def start(self) -> None:
+        """Empieza a medir el total (y la memoria, con memory=True; entonces
+        espera a que termine otra medida de memoria en curso)."""
+        if self.memory:
+            import tracemalloc
+            _MEMORY_LOCK.acquire()
+            self._locked = True
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                self._tracing = True
+        self._t0 = (time.perf_counter(), time.process_time())
+
+    def finish(self) -> None:
+        w0, c0 = self._t0
+        self.total = PhaseTime(time.perf_counter() - w0, time.process_time() - c0)
+        self._emit("total.wall_s", self.total.wall)
+        self._emit("total.cpu_s", self.total.cpu)
+        if not self.memory:
+            return
+        import tracemalloc
+        try:
+            if tracemalloc.is_tracing():
+                self.peak_memory = tracemalloc.get_traced_memory()[1]
+                if self._tracing:
+                    tracemalloc.stop()
+                    self._tracing = False
+        finally:
+            if self._locked:
+                self._locked = False
+                _MEMORY_LOCK.release()
+        if self.peak_memory is not None:
+            self._emit("memory.peak_bytes", self.peak_memory)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Mide el bloque como la fase 'name' (se acumula si se repite)."""
+        w0, c0 = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - w0, time.process_time() - c0
+            prev = self.phases.get(name)
+            if prev is not None:
+                wall, cpu = wall + prev.wall, cpu + prev.cpu
+            self.phases[name] = PhaseTime(wall, cpu)
+            self._emit(f"phase.{name}.wall_s", wall)
+            self._emit(f"phase.{name}.cpu_s", cpu)
+
+    def count(self, name: str, value: int) -> None:
+        self.counts[name] = value
+        self._emit(f"count.{name}", value)
+
+    def output(self, path: str, nbytes: int) -> None:
+        self.outputs[path] = nbytes
+        self._emit(f"output.{path}", nbytes)
+
+    # --- derivadas y formatos ---
+
+    def pseudo_ratio(self) -> Optional[float]:
+        """Instrucciones tras expandir pseudos por instrucción del fuente."""
+        n = self.counts.get("instructions")
+        return self.counts.get("expanded_instructions", 0) / n if n else None
+
+    def symbols_per_second(self) -> Optional[float]:
+        """Símbolos definidos por segundo de pasada 1."""
+        ph = self.phases.get("first_pass")
+        return self.counts.get("symbols", 0) / ph.wall if ph and ph.wall > 0 else None
+
+    def as_dict(self) -> dict:
+        return {
+            "phases": {k: {"wall_s": v.wall, "cpu_s": v.cpu} for k, v in self.phases.items()},
+            "total": {"wall_s": self.total.wall, "cpu_s": self.total.cpu} if self.total else None,
+            "counts": dict(self.counts),
+            "pseudo_ratio": self.pseudo_ratio(),
+            "symbols_per_s": self.symbols_per_second(),
+            "peak_memory_bytes": self.peak_memory,
+            "output_bytes": dict(self.outputs),
+        }
+
+    def to_json(self) -> str:
+        import json
+        return json.dumps(self.as_dict(), indent=2)
+
+    def format_text(self) -> str:
+        rows = [f"{'fase':<12}{'pared (ms)':>12}{'CPU (ms)':>12}"]
+        for name, t in list(self.phases.items()) + ([("total", self.total)] if self.total else []):
+            rows.append(f"{name:<12}{t.wall * 1e3:>12.1f}{t.cpu * 1e3:>12.1f}")
+        c = self.counts
+        if "lines" in c:
+            rows.append(f"líneas {c['lines']}, nodos {c.get('nodes', 0)}")
+        if "instructions" in c:
+            ratio = self.pseudo_ratio()
+            rows.append(f"instrucciones {c['instructions']} → {c.get('expanded_instructions', 0)} "
+                        f"tras expandir pseudos" + (f" (x{ratio:.2f})" if ratio is not None else ""))
+        if "symbols" in c:
+            sps = self.symbols_per_second()
+            rows.append(f"símbolos {c['symbols']}" + (f" ({sps:,.0f}/s en pasada 1)" if sps else ""))
+        if "words" in c:
+            rows.append(f"palabras {c['words']}, .data {c.get('data_bytes', 0)} B, "
+                        f".bss {c.get('bss_bytes', 0)} B")
+        if self.peak_memory is not None:
+            peak = self.peak_memory
+            rows.append("memoria pico (tracemalloc): " + (f"{peak / (1 << 20):.1f} MiB" if peak >= 1 << 20
+                                                          else f"{peak / 1024:.1f} KiB"))
+        if self.outputs:
+            rows.append("salidas: " + ", ".join(f"{os.path.basename(p)} {n} B"
+                                                 for p, n in self.outputs.items()))
+        return "\n".join(rows)
@@ -0,0 +1,250 @@
+# src/rv32i_asm/syscalls.py
+from __future__ import annotations
+import errno, io, os, struct
+from typing import BinaryIO, Callable, Dict, Optional, Union
+
+from .sim import M32, SimError, Simulator
+
+# ---------------- Llamadas al sistema Linux (RISC-V) ----------------
+#
+# LinuxSyscalls es un manejador de ecall para Simulator (ecall=...) con la
+# ABI de Linux: número en a7, argumentos en a0..a5 y resultado en a0 (un
+# error es -errno). Atiende read, write, openat, close, fstat, brk y
+# exit/exit_group; cualquier otra llamada es un SimError.
+#
+# Los descriptores del programa se traducen a flujos del anfitrión con
+# búfer: miles de write pequeños se juntan en el búfer y sólo llegan al
+# sistema cuando se llena, en flush() o al salir. Los datos pasan entre la
+# memoria simulada y el flujo como memoryview sobre la propia memoria, sin
+# copias intermedias. stderr se vacía en cada write (tras vaciar stdout,
+# para conservar el orden), como en C.
+#
+# Las rutas de openat son del anfitrión, relativas al directorio actual.
+
+SYS_OPENAT = 56
+SYS_CLOSE = 57
+SYS_READ = 63
+SYS_WRITE = 64
+SYS_FSTAT = 80
+SYS_EXIT = 93
+SYS_EXIT_GROUP = 94
+SYS_BRK = 214
+
+AT_FDCWD = -100
+# banderas de open en RISC-V (las genéricas de Linux)
+O_ACCMODE, O_WRONLY, O_RDWR = 0o3, 0o1, 0o2
+O_CREAT, O_EXCL, O_TRUNC, O_APPEND = 0o100, 0o200, 0o1000, 0o2000
+
+DEFAULT_BUFFER = 64 * 1024
+PAGE = 4096
+STAT_SIZE = 80   # struct stat de asm-generic con long de 32 bits
+_STAT = struct.Struct("<IIIIIIIIiiiiiIiIiIII")
+_S_IFCHR = 0o020000
+
+def _pack_stat(fields) -> bytes:
+    """Empaqueta los campos truncados a 32 bits (con signo donde _STAT usa 'i')."""
+    return _STAT.pack(*(((v & M32) ^ 0x8000_0000) - 0x8000_0000 if code == "i" else v & M32
+                        for code, v in zip(_STAT.format[1:], fields)))
+
+Stream = Union[int, BinaryIO]
+
+def _buffered(stream: Stream, mode: str, buffer_size: int) -> BinaryIO:
+    """Un descriptor del anfitrión (int) o un flujo sin búfer (RawIOBase) se
+    envuelven con búfer; cualquier otro flujo binario se usa tal cual."""
+    if isinstance(stream, int):
+        stream = io.FileIO(stream, mode, closefd=False)
+    if not isinstance(stream, io.RawIOBase):
+        return stream
+    if mode == "rb":
+        return io.BufferedReader(stream, buffer_size)
+    if mode == "wb":
+        return io.BufferedWriter(stream, buffer_size)
+    return io.BufferedRandom(stream, buffer_size)
+
+class LinuxSyscalls:
+    """Tabla de ecall con la ABI de Linux RISC-V.
+
+    stdin/stdout/stderr son los descriptores 0/1/2 del programa: un
+    descriptor del anfitrión o un flujo binario. Al terminar hay que llamar
+    a flush() (o usarlo como gestor de contexto) para vaciar los búferes.
+    """
+
+    def __init__(self, *, stdin: Stream = 0, stdout: Stream = 1, stderr: Stream = 2,
+                 buffer_size: int = DEFAULT_BUFFER) -> None:
+        self.buffer_size = buffer_size
+        self.files: Dict[int, BinaryIO] = {
+            0: _buffered(stdin, "rb", buffer_size),
+            1: _buffered(stdout, "wb", buffer_size),
+            2: _buffered(stderr, "wb", buffer_size),
+        }
+        self._own: Dict[int, bool] = {0: False, 1: False, 2: False}  # ¿lo cerramos nosotros?
+        self.brk: Optional[int] = None      # fin actual del montón (None: sin empezar)
+        self._heap_end = 0                  # fin de lo ya mapeado para el montón
+        self.table: Dict[int, Callable[[Simulator], int]] = {
+            SYS_OPENAT: self.sys_openat, SYS_CLOSE: self.sys_close, SYS_READ: self.sys_read,
+            SYS_WRITE: self.sys_write, SYS_FSTAT: self.sys_fstat, SYS_BRK: self.sys_brk,
+            SYS_EXIT: self.sys_exit, SYS_EXIT_GROUP: self.sys_exit,
+        }
+
+    def __call__(self, sim: Simulator) -> None:
+        fn = self.table.get(sim.x[17])
+        if fn is None:
+            raise SimError(f"ecall no soportada (a7={sim.x[17]})")
+        sim.x[10] = fn(sim) & M32
+
+    def __enter__(self) -> "LinuxSyscalls":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def flush(self) -> None:
+        """Vacía los búferes de salida."""
+        for f in self.files.values():
+            if f.writable():
+                f.flush()
+
+    def close(self) -> None:
+        """Vacía todo y cierra los archivos abiertos por el programa."""
+        for fd in list(self.files):
+            self._close(fd)
+
+    def _close(self, fd: int) -> None:
+        f = self.files.pop(fd)
+        if self._own.pop(fd):
+            f.close()
+        elif f.writable():
+            f.flush()
+
+    # --- llamadas ---
+
+    def sys_exit(self, sim: Simulator) -> int:
+        self.flush()
+        sim.exit(sim.x[10])
+        return 0  # no se llega: exit lanza la parada
+
+    def sys_write(self, sim: Simulator) -> int:
+        fd, addr, n = sim.x[10], sim.x[11], sim.x[12]
+        f = self.files.get(fd)
+        if f is None:
+            return -errno.EBADF
+        try:
+            views = sim.mem.views(addr, n)
+        except SimError:
+            return -errno.EFAULT
+        try:
+            if fd == 2 and 1 in self.files:
+                self.files[1].flush()
+            for v in views:
+                f.write(v)
+            if fd == 2:
+                f.flush()
+        except io.UnsupportedOperation:
+            return -errno.EBADF
+        except OSError as ex:
+            return -(ex.errno or errno.EIO)
+        return n
+
+    def sys_read(self, sim: Simulator) -> int:
+        fd, addr, n = sim.x[10], sim.x[11], sim.x[12]
+        f = self.files.get(fd)
+        if f is None:
+            return -errno.EBADF
+        try:
+            views = sim.mem.views(addr, n)
+        except SimError:
+            return -errno.EFAULT
+        if fd == 0:
+            self.flush()  # lo escrito antes de pedir datos, como stdio con una terminal
+        got = 0
+        try:
+            for v in views:
+                k = (f.readinto1 if hasattr(f, "readinto1") else f.readinto)(v) or 0
+                got += k
+                if k < len(v):
+                    break
+        except io.UnsupportedOperation:
+            return -errno.EBADF
+        except OSError as ex:
+            return -(ex.errno or errno.EIO)
+        if got and addr < sim.text_end and addr + got > sim.text_base:
+            sim.invalidate(addr, got)
+        return got
+
+    def sys_openat(self, sim: Simulator) -> int:
+        dirfd, addr, flags, mode = sim.x[10], sim.x[11], sim.x[12], sim.x[13]
+        try:
+            path = sim.mem.read_cstring(addr).decode("utf-8", "surrogateescape")
+        except SimError:
+            return -errno.EFAULT
+        if dirfd != AT_FDCWD & M32 and not os.path.isabs(path):
+            return -errno.EBADF  # sólo rutas absolutas o relativas al directorio actual
+        access = flags & O_ACCMODE
+        host = {0: os.O_RDONLY, O_WRONLY: os.O_WRONLY, O_RDWR: os.O_RDWR}.get(access)
+        if host is None:
+            return -errno.EINVAL
+        for bit, hbit in ((O_CREAT, os.O_CREAT), (O_EXCL, os.O_EXCL), (O_TRUNC, os.O_TRUNC),
+                          (O_APPEND, os.O_APPEND)):
+            if flags & bit:
+                host |= hbit
+        try:
+            hfd = os.open(path, host | getattr(os, "O_BINARY", 0), mode & 0o7777)
+        except OSError as ex:
+            return -(ex.errno or errno.EIO)
+        fmode = {0: "rb", O_WRONLY: "wb", O_RDWR: "r+b"}[access]
+        fd = 3
+        while fd in self.files:
+            fd += 1
+        self.files[fd] = _buffered(io.FileIO(hfd, fmode, closefd=True), fmode, self.buffer_size)
+        self._own[fd] = True
+        return fd
+
+    def sys_close(self, sim: Simulator) -> int:
+        fd = sim.x[10]
+        if fd not in self.files:
+            return -errno.EBADF
+        try:
+            self._close(fd)
+        except OSError as ex:
+            return -(ex.errno or errno.EIO)
+        return 0
+
+    def sys_fstat(self, sim: Simulator) -> int:
+        fd, addr = sim.x[10], sim.x[11]
+        f = self.files.get(fd)
+        if f is None:
+            return -errno.EBADF
+        try:
+            if f.writable():
+                f.flush()  # el tamaño incluye lo que aún está en el búfer
+            st = os.fstat(f.fileno())
+            fields = (st.st_dev, st.st_ino, st.st_mode, st.st_nlink, st.st_uid, st.st_gid,
+                      st.st_rdev, 0, st.st_size, st.st_blksize, 0, st.st_blocks,
+                      int(st.st_atime), st.st_atime_ns % 10**9, int(st.st_mtime),
+                      st.st_mtime_ns % 10**9, int(st.st_ctime), st.st_ctime_ns % 10**9, 0, 0)
+        except (OSError, io.UnsupportedOperation, AttributeError):
+            # flujo sin descriptor (BytesIO...): un dispositivo de caracteres
+            fields = (0, 0, _S_IFCHR | 0o620, 1) + (0,) * 5 + (PAGE,) + (0,) * 10
+        try:
+            sim.mem.write(addr, _pack_stat(fields))
+        except SimError:
+            return -errno.EFAULT
+        return 0
+
+    def sys_brk(self, sim: Simulator) -> int:
+        """brk(addr): mueve el fin del montón y devuelve el nuevo (el actual si
+        addr es 0 o no se puede). El montón empieza en sim.heap_start."""
+        if self.brk is None:
+            self.brk = self._heap_end = sim.heap_start
+        want = sim.x[10]
+        if want < sim.heap_start:
+            return self.brk
+        if want > self._heap_end:
+            end = (want + PAGE - 1) & -PAGE
+            try:
+                sim.mem.map(self._heap_end, end - self._heap_end)
+            except ValueError:
+                return self.brk  # choca con otra región (la pila...)
+            self._heap_end = end
+        self.brk = want
+        return want
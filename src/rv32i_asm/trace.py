@@ -0,0 +1,384 @@
+# src/rv32i_asm/trace.py
+from __future__ import annotations
+import os, sys
+from array import array
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# ---------------- Traza de ejecución del simulador ----------------
+#
+# Trace registra, por cada instrucción ejecutada, (pc, palabra, rd, valor,
+# dirección de memoria) en un anillo de tamaño fijo. Para que la traza
+# cueste poco, el anillo no guarda instrucciones sueltas sino
+# ejecuciones de bloque: cada bloque traducido (o cada instrucción suelta
+# del intérprete) se define una vez con su pc de entrada y sus palabras, y
+# cada ejecución deja seguidas en 'slots' las palabras
+#
+#     id | completadas << COUNT_SHIFT, valor0, dir0, valor1, dir1, ...
+#
+# que el código generado añade de una vez con extend (el número de
+# instrucciones completadas es casi siempre una constante del punto de
+# registro, así que la primera palabra también lo es). Una lista plana de
+# enteros no crea por ejecución un objeto que el recolector de ciclos tenga
+# que recorrer: en un bucle corto (addi/addi/bnez) una tupla por vuelta
+# costaba más que el propio bucle. pc, palabra y rd se
+# deducen de la definición. 'valor' es lo escrito en rd (en un almacén, el
+# dato guardado; en jal/jalr, el enlace) y 'dir' la dirección de una carga
+# o un almacén; sólo aparecen los campos que la instrucción tiene (ver
+# layout()), así que un salto no ocupa nada y una suma, un valor.
+#
+# 'capacity' cuenta palabras: cuando 'slots' llega a ella (la última
+# ejecución puede pasarse un poco), con 'stream' se vuelca entero al archivo
+# (y se vacía el búfer del archivo), así que el disco recibe la ejecución
+# completa en trozos; sin archivo, el trozo lleno pasa a ser el anterior y
+# entries() da las ejecuciones más recientes que cubren 'capacity'
+# palabras. Añadir al final cuesta la mitad que escribir en un hueco con
+# índice propio, y un bloque que es un bucle registra cada vuelta sin
+# comprobar si cabe porque limita sus vueltas al hueco que queda. dump()
+# escribe lo que hay en memoria con el mismo formato.
+#
+# Formato (palabras u32 little-endian tras la cabecera MAGIC):
+#     DEF:  0xFFFFFFFF, id, pc de entrada, n, palabra0 .. palabra(n-1)
+#     EXEC: id | completadas << 25, campos de layout(palabras)
+# Un DEF precede siempre a la primera ejecución de su id.
+
+MAGIC = b"RV32TRC\x01"
+TAG_DEF = 0xFFFF_FFFF       # 'completadas' = 127 no se da nunca (MAX_BLOCK = 64)
+COUNT_SHIFT = 25
+ID_MASK = (1 << COUNT_SHIFT) - 1
+DEFAULT_CAPACITY = 1 << 18   # palabras
+
+@dataclass(frozen=True)
+class TraceRecord:
+    """Una instrucción ejecutada. rd es None si no escribe registro y addr
+    None si no accede a memoria."""
+    index: int
+    pc: int
+    word: int
+    rd: Optional[int]
+    value: int
+    addr: Optional[int]
+
+class Trace:
+    """Anillo de ejecuciones para Simulator(trace=...).
+
+    'stream' (ruta o archivo binario abierto) activa el volcado continuo;
+    hay que llamar a close() (o usarla como gestor de contexto) al acabar.
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, *,
+                 stream: Union[None, str, BinaryIO] = None) -> None:
+        if capacity < 1:
+            raise ValueError("la capacidad de la traza debe ser positiva")
+        self.capacity = capacity
+        self.slots: List[int] = []    # trozo actual (lo comparte el código generado)
+        self._prev: List[int] = []    # sin archivo: el trozo lleno anterior
+        self.wrapped = False          # ¿se ha llenado alguna vez sin archivo?
+        self.blocks: List[Tuple[int, Tuple[int, ...]]] = []  # id -> (pc de entrada, palabras)
+        self.widths: List[int] = []   # id -> palabras de cada ejecución
+        self._singles: Dict[Tuple[int, int], int] = {}
+        self.out: Optional[BinaryIO] = None
+        self._own = False
+        self._defined = 0       # bloques con DEF ya escrito en 'out'
+        if stream is not None:
+            if isinstance(stream, (str, os.PathLike)):
+                stream = open(stream, "wb")
+                self._own = True
+            self.out = stream
+            stream.write(MAGIC)
+
+    def __enter__(self) -> "Trace":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    # --- registro (lo usa el simulador) ---
+
+    def define(self, entry: int, words: Sequence[int]) -> int:
+        """Da de alta un bloque (pc de entrada y palabras) y devuelve su id."""
+        tid = len(self.blocks)
+        if tid > ID_MASK:
+            raise ValueError("la traza no admite más bloques")
+        self.blocks.append((entry, tuple(words)))
+        self.widths.append(_width(words))
+        return tid
+
+    def single(self, pc: int, word: int) -> int:
+        """Id de una instrucción suelta (camino del intérprete)."""
+        key = (pc, word)
+        tid = self._singles.get(key)
+        if tid is None:
+            tid = self._singles[key] = self.define(pc, (word,))
+        return tid
+
+    def wrap(self) -> None:
+        """El trozo está lleno: se vuelca (con archivo) o pasa a ser el anterior."""
+        if self.out is not None:
+            self._write(self.slots)
+        else:
+            self._prev = self.slots.copy()
+            self.wrapped = True
+        self.slots.clear()
+
+    # --- salida ---
+
+    def _tail(self) -> List[int]:
+        """Palabras de las ejecuciones más recientes que cubren 'capacity'
+        palabras (o todas, si no hay tantas)."""
+        prev, need = self._prev, self.capacity - len(self.slots)
+        start, cut, widths = 0, len(prev) - need, self.widths
+        while start < cut:
+            step = widths[prev[start] & ID_MASK]
+            if start + step > cut:
+                break
+            start += step
+        return prev[start:] + self.slots if need > 0 else self.slots.copy()
+
+    def entries(self) -> List[tuple]:
+        """Ejecuciones aún en memoria, de la más antigua a la más reciente."""
+        return list(_split(self._tail(), self.widths))
+
+    def records(self) -> Iterator[TraceRecord]:
+        """Las instrucciones de entries(), ya desplegadas."""
+        return _expand(self.entries(), self.blocks.__getitem__)
+
+    def _encode(self, entries: List[int], defined: int) -> array:
+        """DEF de los bloques [defined, len(blocks)) y luego las entradas.
+        Van todos los bloques definidos, se hayan ejecutado o no: así el
+        volcado no tiene que mirar las entradas una a una."""
+        buf = array('I')
+        for tid in range(defined, len(self.blocks)):
+            entry, words = self.blocks[tid]
+            buf.extend((TAG_DEF, tid, entry, len(words)))
+            buf.extend(words)
+        buf.fromlist(entries)
+        if sys.byteorder == "big":
+            buf.byteswap()
+        return buf
+
+    def _write(self, entries: List[int]) -> None:
+        self._encode(entries, self._defined).tofile(self.out)
+        self._defined = len(self.blocks)
+        self.out.flush()
+
+    def flush(self) -> None:
+        """Con archivo: vuelca lo pendiente del anillo."""
+        if self.out is not None and self.slots:
+            self._write(self.slots)
+            self.slots.clear()
+
+    def dump(self, path: Union[str, BinaryIO]) -> None:
+        """Escribe el contenido actual del anillo como archivo de traza."""
+        f = open(path, "wb") if isinstance(path, (str, os.PathLike)) else path
+        try:
+            f.write(MAGIC)
+            self._encode(self._tail(), 0).tofile(f)
+        finally:
+            if f is not path:
+                f.close()
+
+    def close(self) -> None:
+        if self.out is None:
+            return
+        self.flush()
+        if self._own:
+            self.out.close()
+        self.out = None
+
+# ---------------- Lectura ----------------
+
+def _writes_rd(word: int) -> bool:
+    # tipos que no escriben rd: B, S, SYSTEM y MISC-MEM
+    return word & 0x7F not in (0x63, 0x23, 0x73, 0x0F)
+
+def layout(word: int) -> Tuple[bool, bool]:
+    """(¿tiene valor?, ¿tiene dirección?) de una instrucción en las entradas.
+    Tienen valor los almacenes y lo que escribe un rd distinto de x0; tienen
+    dirección las cargas y los almacenes."""
+    op = word & 0x7F
+    return op == 0x23 or (_writes_rd(word) and (word >> 7) & 31 != 0), op in (0x03, 0x23)
+
+def _width(words: Sequence[int]) -> int:
+    """Palabras que ocupa una ejecución de un bloque con estas instrucciones."""
+    return 1 + sum(sum(layout(w)) for w in words)
+
+def _split(words: Sequence[int], widths: Sequence[int]) -> Iterator[tuple]:
+    """Parte una secuencia plana de ejecuciones (sin DEF) en tuplas."""
+    i, n_words = 0, len(words)
+    while i < n_words:
+        size = widths[words[i] & ID_MASK]
+        yield tuple(words[i:i + size])
+        i += size
+
+def _expand(entries: Iterable[tuple], block) -> Iterator[TraceRecord]:
+    index = 0
+    for e in entries:
+        entry, words = block(e[0] & ID_MASK)
+        k = 1
+        for j in range(e[0] >> COUNT_SHIFT):
+            w = words[j]
+            has_value, has_addr = layout(w)
+            value = addr = None
+            if has_value:
+                value, k = e[k], k + 1
+            if has_addr:
+                addr, k = e[k], k + 1
+            yield TraceRecord(index, entry + 4 * j, w, (w >> 7) & 31 if _writes_rd(w) else None,
+                              value or 0, addr)
+            index += 1
+
+def read_trace(path: Union[str, BinaryIO]) -> Iterator[TraceRecord]:
+    """Registros de un archivo de Trace (volcado continuo o dump())."""
+    if isinstance(path, (str, os.PathLike)):
+        with open(path, "rb") as f:
+            data = f.read()
+    else:
+        data = path.read()
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("no es un archivo de traza RV32I")
+    words = array('I')
+    words.frombytes(data[len(MAGIC):len(data) - (len(data) - len(MAGIC)) % 4])
+    if sys.byteorder == "big":
+        words.byteswap()
+    blocks: Dict[int, Tuple[int, Tuple[int, ...]]] = {}
+    widths: Dict[int, int] = {}
+
+    def entries() -> Iterator[tuple]:
+        i, n_words = 0, len(words)
+        while i < n_words:
+            if words[i] == TAG_DEF:
+                tid, entry, n = words[i + 1], words[i + 2], words[i + 3]
+                blocks[tid] = (entry, tuple(words[i + 4:i + 4 + n]))
+                widths[tid] = _width(blocks[tid][1])
+                i += 4 + n
+                continue
+            tid = words[i] & ID_MASK
+            if tid not in blocks:
+                raise ValueError(f"traza corrupta: bloque {tid} sin definir (palabra {i})")
+            size = widths[tid]
+            if i + size > n_words:
+                break  # volcado cortado a medias
+            yield tuple(words[i:i + size])
+            i += size
+
+    return _expand(entries(), blocks.__getitem__)
+
+# ---------------- Texto ----------------
+
+_X_TO_ABI = ["zero", "ra", "sp", "gp", "tp", "t0", "t1", "t2", "s0", "s1"] + \
+    [f"a{i}" for i in range(8)] + [f"s{i}" for i in range(2, 12)] + [f"t{i}" for i in range(3, 7)]
+
+class Symbolizer:
+    """pc -> '<etiqueta+desp>' con LinkResult.symtab y pc -> línea de
+    fuente con la tabla de líneas del codificador (EncodeResult.lines)."""
+
+    def __init__(self, symtab: Dict[str, int], lines=None, text_base: int = 0,
+                 source: Optional[Sequence[str]] = None, filename: str = "") -> None:
+        from bisect import bisect_right
+        self._bisect = bisect_right
+        syms = sorted((addr, name) for name, addr in symtab.items())
+        self._addrs = [a for a, _ in syms]
+        self._names = [n for _, n in syms]
+        self.lines = lines
+        self.text_base = text_base
+        self.source = source
+        self.filename = filename
+
+    def symbol(self, pc: int) -> str:
+        k = self._bisect(self._addrs, pc) - 1
+        if k < 0:
+            return ""
+        off = pc - self._addrs[k]
+        return f"<{self._names[k]}+{off}>" if off else f"<{self._names[k]}>"
+
+    def line(self, pc: int) -> str:
+        if self.lines is None or pc < self.text_base:
+            return ""
+        try:
+            line, _ = self.lines.lookup((pc - self.text_base) // 4)
+        except IndexError:
+            return ""
+        text = self.source[line - 1].strip() if self.source and 0 < line <= len(self.source) else ""
+        return f"{self.filename}:{line}: {text}" if text else f"{self.filename}:{line}"
+
+def disassemble(word: int, pc: int) -> str:
+    """Texto de una instrucción (nombres ABI, destinos de salto absolutos)."""
+    from .isa import SPEC
+    from .sim import SimError, decode
+    try:
+        d = decode(word)
+    except SimError:
+        return f".word 0x{word:08x}"
+    m, it = d.mnemonic, SPEC[d.mnemonic].itype
+    rd, rs1, rs2 = _X_TO_ABI[d.rd], _X_TO_ABI[d.rs1], _X_TO_ABI[d.rs2]
+    if it == "R":
+        return f"{m} {rd}, {rs1}, {rs2}"
+    if m in ("lb", "lh", "lw", "lbu", "lhu", "jalr"):
+        return f"{m} {rd}, {d.imm}({rs1})"
+    if it == "I":
+        return f"{m} {rd}, {rs1}, {d.imm}"
+    if it == "S":
+        return f"{m} {rs2}, {d.imm}({rs1})"
+    if it == "B":
+        return f"{m} {rs1}, {rs2}, 0x{(pc + d.imm) & 0xFFFF_FFFF:x}"
+    if it == "U":
+        return f"{m} {rd}, 0x{(d.imm >> 12) & 0xFFFFF:x}"
+    if it == "J":
+        return f"{m} {rd}, 0x{(pc + d.imm) & 0xFFFF_FFFF:x}"
+    return m
+
+def format_record(r: TraceRecord, sym: Optional[Symbolizer] = None) -> str:
+    where = sym.symbol(r.pc) if sym else ""
+    text = disassemble(r.word, r.pc)
+    effects = []
+    if r.rd:
+        effects.append(f"{_X_TO_ABI[r.rd]}=0x{r.value:08x}")
+    if r.addr is not None:
+        effects.append(f"[0x{r.addr:08x}]" + ("" if r.rd is not None else f"←0x{r.value:08x}"))
+    line = f"{r.index:>9}  0x{r.pc:08x} {where:<18} {text:<26} {' '.join(effects):<32}"
+    src = sym.line(r.pc) if sym else ""
+    return (line + "  ; " + src if src else line).rstrip()
+
+# ---------------- CLI ----------------
+
+def main(argv=None) -> int:
+    import argparse
+    from collections import deque
+    ap = argparse.ArgumentParser(prog="python -m rv32i_asm.trace",
+                                 description="RV32I: muestra como texto una traza del simulador")
+    ap.add_argument("trace", help="archivo de traza (sim --trace)")
+    ap.add_argument("--source", default=None,
+                    help="fuente .s del programa: añade etiquetas y líneas de fuente")
+    ap.add_argument("--tail", type=int, default=None, help="sólo las últimas N instrucciones")
+    args = ap.parse_args(argv)
+    sym = None
+    if args.source:
+        from .assembler import assemble_text
+        try:
+            with open(args.source, "r", encoding="utf-8") as f:
+                text = f.read()
+        except (OSError, UnicodeDecodeError) as ex:
+            print(f"ERROR: no pude leer {args.source}: {ex}", file=sys.stderr)
+            return 2
+        _, _, link, enc = assemble_text(text, filename=args.source)
+        sym = Symbolizer(link.symtab, enc.lines, enc.text_base, text.splitlines(),
+                         os.path.basename(args.source))
+    try:
+        records: Iterable[TraceRecord] = read_trace(args.trace)
+        if args.tail is not None:
+            records = deque(records, maxlen=args.tail)
+        for r in records:
+            print(format_record(r, sym))
+    except BrokenPipeError:  # antes que OSError, de la que es subclase
+        # salida cortada (p.ej. '| head'): stdout a /dev/null para que el
+        # flush al salir no vuelva a fallar
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except (OSError, ValueError) as ex:
+        print(f"ERROR: {ex}", file=sys.stderr)
+        return 2
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,6 +3,7 @@
 '''
 
 from __future__ import annotations
+import re
 from typing import Tuple
 
 # Máscara para 32 bits sin signo
@@ -54,3 +55,17 @@ def split_bits(value: int, positions: Tuple[Tuple[int, int], ...]) -> tuple[int,
         field = (value >> lo) & ((1 << width) - 1)
         out.append(field)
     return tuple(out)
+
+class LazyRegex:
+    """re.compile diferido: la regex se compila en el primer uso de uno de
+    sus métodos (match, fullmatch, split...), que después queda guardado en
+    la instancia. Para patrones que muchas entradas nunca llegan a usar."""
+
+    def __init__(self, pattern: str, flags: int = 0) -> None:
+        self.pattern = pattern
+        self.flags = flags
+
+    def __getattr__(self, name: str):
+        value = getattr(re.compile(self.pattern, self.flags), name)
+        setattr(self, name, value)
+        return value
@@ -0,0 +1,510 @@
+# src/rv32i_asm/watch.py
+from __future__ import annotations
+import argparse, os, sys, time
+from array import array
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import accumulate, chain, groupby
+from operator import attrgetter
+from typing import Dict, Iterable, List, Optional, TextIO, Tuple, Union
+
+from .ast import Label, Directive, Instruction, Sym, SECTION_NAMES
+from .parser import parse_iter
+from .pseudo import expand_iter
+from .linker import LinkResult, first_pass
+from .encoding import TEMPLATES, encode, _base_sym
+from .data import DataImage, build_data_image
+from .writers import _bin_text, _hex_text, _raw_bytes, write_image_hex, write_image_raw
+from .elf import write_elf
+from .cache import CachedBuild
+from .assembler import write_outputs
+from .diagnostics import Diagnostic
+
+# ---------------- Modo vigilancia (--watch) ----------------
+#
+# IncrementalAssembler guarda en memoria los nodos expandidos de cada línea
+# del fuente, el resultado de la pasada 1 y las palabras de .text. Al
+# cambiar el texto:
+#   1. se localiza el tramo de líneas modificado (prefijo y sufijo comunes,
+#      comparando bloques de caracteres) y sólo ese tramo se vuelve a parsear;
+#   2. si el tramo sólo tiene instrucciones de .text y ocupa lo mismo que
+#      antes, ninguna dirección se mueve: se recodifican sus palabras y nada
+#      más ('palabras');
+#   3. si no, se rehace la pasada 1 sobre los nodos guardados y, si la
+#      symtab y el tamaño de .text no cambian, se recodifica igualmente sólo
+#      el tramo; en otro caso, toda la pasada 2 ('layout').
+# Los nodos de las líneas no tocadas conservan su número de línea aunque se
+# inserten o borren líneas por encima (renumerarlos costaría más que todo lo
+# demás). Por eso cualquier diagnóstico con números desfasados, o cualquier
+# cambio partiendo de un estado con diagnósticos, pasa por un ensamblado
+# completo ('completo'), que los deja exactos.
+
+Node = Union[Label, Directive, Instruction]
+Line = Tuple[Node, ...]
+
+_EMPTY: Line = ()
+_BLOCK = 1 << 14  # caracteres (o palabras) por comparación al buscar diferencias
+
+def _prefix_len(a, b) -> int:
+    """Longitud del prefijo común de dos secuencias (str, array...)."""
+    n = min(len(a), len(b))
+    i = 0
+    while i < n:
+        j = min(i + _BLOCK, n)
+        if a[i:j] == b[i:j]:
+            i = j
+            continue
+        lo, hi = i, j  # iguales hasta lo; la primera diferencia está en [lo, hi)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if a[lo:mid] == b[lo:mid]:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+    return n
+
+def _suffix_len(a, b, limit: int) -> int:
+    """Longitud del sufijo común (como mucho 'limit')."""
+    la, lb = len(a), len(b)
+    i = 0
+    while i < limit:
+        j = min(i + _BLOCK, limit)
+        if a[la - j:la - i] == b[lb - j:lb - i]:
+            i = j
+            continue
+        lo, hi = i, j
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if a[la - mid:la - lo] == b[lb - mid:lb - lo]:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+    return limit
+
+def _diff_range(old: array, new: array) -> Optional[Tuple[int, int]]:
+    """Rango [lo, hi) de 'new' que difiere de 'old' (None si son iguales)."""
+    if old == new:
+        return None
+    lo = _prefix_len(old, new)
+    if len(old) != len(new):
+        return lo, len(new)
+    return lo, len(new) - _suffix_len(old, new, len(new) - lo)
+
+def _by_line(nodes: Iterable[Node], first: int, count: int) -> List[Line]:
+    """Agrupa los nodos en una tupla por línea (first es el número de la primera)."""
+    lines: List[Line] = [_EMPTY] * count
+    for line, grp in groupby(nodes, key=attrgetter("line")):
+        lines[line - first] = tuple(grp)
+    return lines
+
+def _has_section(nodes: Iterable[Node]) -> bool:
+    return any(type(n) is Directive and n.name in SECTION_NAMES for n in nodes)
+
+def _text_words(ns: Line) -> Tuple[int, bool]:
+    """(instrucciones, alguna con operando simbólico) de una línea de .text."""
+    c, symbolic = 0, False
+    for n in ns:
+        if type(n) is Instruction:
+            c += 1
+            symbolic = symbolic or any(type(op) is Sym for op in n.operands)
+    return c, symbolic
+
+def _pcrel_closed(nodes: Iterable[Node]) -> bool:
+    """True si cada sym@pcrel_lo del tramo tiene su auipc en el propio tramo y
+    viceversa (como en la expansión de 'la' o 'call'): sólo entonces el tramo
+    se puede recodificar aislado."""
+    pending: Dict[str, int] = {}
+    for n in nodes:
+        if type(n) is not Instruction:
+            continue
+        for op in n.operands:
+            if isinstance(op, Sym):
+                base, part = _base_sym(op.name)
+                if part == "hi":
+                    pending[base] = pending.get(base, 0) + 1
+                elif part == "lo":
+                    if not pending.get(base):
+                        return False
+                    pending[base] -= 1
+    return not any(pending.values())
+
+@dataclass(frozen=True)
+class Rebuild:
+    """Resultado de IncrementalAssembler.update()."""
+    kind: str                             # 'nada', 'palabras', 'layout' o 'completo'
+    text_range: Optional[Tuple[int, int]] # palabras de .text que cambiaron [lo, hi)
+    text_resized: bool                    # cambió el número de palabras
+    data_changed: bool
+    symbols_changed: bool
+    diagnostics: List[Diagnostic]
+
+    @property
+    def changed(self) -> bool:
+        return self.text_range is not None or self.data_changed or self.symbols_changed
+
+class IncrementalAssembler:
+    """Ensamblado de un fuente que se mantiene al día con update(texto).
+
+    Tras cada llamada, 'words' (array('I') de .text), 'image', 'link' y
+    'diagnostics' equivalen a los de assemble_text() sobre el texto actual.
+    'layout' son las opciones de first_pass."""
+
+    def __init__(self, text: str, *, filename: Optional[str] = None, **layout: int) -> None:
+        self.filename = filename
+        self.layout = layout
+        self._full(text)
+
+    @property
+    def ok(self) -> bool:
+        return not any(d.severity == "error" for d in self.diagnostics)
+
+    def build(self) -> CachedBuild:
+        return CachedBuild(words=self.words, image=self.image, link=self.link,
+                           diagnostics=self.diagnostics)
+
+    # --- estado completo ---
+
+    def _full(self, text: str) -> None:
+        diags: List[Diagnostic] = []
+        # se parte por '\n' (no splitlines) para que los números de línea
+        # coincidan con los que usa update() al localizar los cambios
+        nodes = list(expand_iter(parse_iter(text.split("\n"), filename=self.filename, diags=diags)))
+        self.text = text
+        self.lines = _by_line(nodes, 1, text.count("\n") + 1)
+        self.link = first_pass(nodes, **self.layout)
+        enc = encode(nodes, self.link.symtab, text_base=self.link.text_base)
+        self.words = enc.buffer
+        self.image = build_data_image(self.link)
+        self.diagnostics = (diags + list(self.link.diagnostics) + list(self.image.diagnostics)
+                            + list(enc.diagnostics))
+        self._stale = False  # hay nodos con número de línea desfasado
+        self._index()
+
+    def _index(self) -> None:
+        """Palabras de .text por línea, líneas con directiva de sección y líneas
+        con instrucciones que dependen de la symtab."""
+        counts = array('I', [0]) * len(self.lines)
+        sec_lines: List[int] = []
+        sec_names: List[str] = []
+        sym_lines: List[int] = []
+        section: Optional[str] = None
+        for i, ns in enumerate(self.lines):
+            if not ns:
+                continue
+            if _has_section(ns):
+                for n in ns:
+                    if type(n) is Directive and n.name in SECTION_NAMES:
+                        section = n.name
+                sec_lines.append(i)
+                sec_names.append(section)
+                continue
+            if section == ".text":
+                c, symbolic = _text_words(ns)
+                if c:
+                    counts[i] = c
+                if symbolic:
+                    sym_lines.append(i)
+        self.counts = counts
+        self._sec_lines, self._sec_names, self._sym_lines = sec_lines, sec_names, sym_lines
+
+    def _section_at(self, i: int) -> Optional[str]:
+        k = bisect_left(self._sec_lines, i)
+        return self._sec_names[k - 1] if k else None
+
+    def _splice(self, a: int, b: int, new_lines: List[Line], section: Optional[str]) -> None:
+        """Sustituye las líneas [a, b) por 'new_lines' actualizando el índice;
+        ni las viejas ni las nuevas tienen directivas de sección, así que el
+        resto del índice sólo se desplaza."""
+        counts = array('I', [0]) * len(new_lines)
+        new_sym: List[int] = []
+        if section == ".text":
+            for k, ns in enumerate(new_lines):
+                if ns:
+                    counts[k], symbolic = _text_words(ns)
+                    if symbolic:
+                        new_sym.append(a + k)
+        self.lines[a:b] = new_lines
+        self.counts[a:b] = counts
+        delta = len(new_lines) - (b - a)
+        k = bisect_left(self._sec_lines, b)
+        if delta:
+            self._sec_lines[k:] = [i + delta for i in self._sec_lines[k:]]
+            self._stale = True
+        sym = self._sym_lines
+        k1, k2 = bisect_left(sym, a), bisect_left(sym, b)
+        sym[k1:] = new_sym + ([i + delta for i in sym[k2:]] if delta else sym[k2:])
+
+    def _encode_range(self, section: Optional[str], nodes: List[Node], first_word: int):
+        head = [Directive(section, [], 0, 0)] if section else []
+        return encode(head + nodes, self.link.symtab,
+                      text_base=self.link.text_base + 4 * first_word)
+
+    def _reencode_symbolic(self, words: array, skip: range) -> bool:
+        """Recodifica en 'words' las líneas con operandos simbólicos (fuera de
+        'skip'): son las únicas cuya palabra puede cambiar al moverse las
+        direcciones; el resto no depende ni del PC ni de la symtab.
+        Devuelve False si alguna da diagnósticos (hay que codificar todo)."""
+        starts = list(accumulate(self.counts, initial=0))
+        base, symtab, templates = self.link.text_base, self.link.symtab, TEMPLATES
+        for i in self._sym_lines:
+            if i in skip:
+                continue
+            w = j = starts[i]
+            for n in self.lines[i]:
+                if type(n) is not Instruction:
+                    continue
+                tpl = templates.get(n.mnemonic)
+                word = tpl.fast_ops(tpl.base, n.operands, base + 4 * j, symtab) if tpl else None
+                if word is None:
+                    break
+                words[j] = word
+                j += 1
+            else:
+                continue
+            enc = self._encode_range(".text", list(self.lines[i]), w)
+            if enc.diagnostics or len(enc.buffer) != self.counts[i]:
+                return False
+            words[w:w + len(enc.buffer)] = enc.buffer
+        return True
+
+    # --- actualización ---
+
+    def update(self, text: str) -> Rebuild:
+        old = self.text
+        if text == old:
+            return Rebuild("nada", None, False, False, False, self.diagnostics)
+        if self.diagnostics:
+            return self._rebuild_full(text)
+
+        # tramo de líneas cambiado: [a, b_old) en el texto viejo, [a, b_new) en el nuevo
+        p = _prefix_len(old, text)
+        s = _suffix_len(old, text, min(len(old), len(text)) - p)
+        a = old.count("\n", 0, p)
+        b_old = a + old.count("\n", p, len(old) - s) + 1
+        b_new = a + text.count("\n", p, len(text) - s) + 1
+        start = text.rfind("\n", 0, p) + 1
+        end = text.find("\n", len(text) - s)
+        chunk = text[start:end if end >= 0 else len(text)].split("\n")
+
+        section = self._section_at(a)
+        pdiags: List[Diagnostic] = []
+        new_flat = list(expand_iter(parse_iter(chunk, filename=self.filename, diags=pdiags,
+                                               first_line=a + 1, section=section)))
+        new_lines = _by_line(new_flat, a + 1, b_new - a)
+        old_flat = list(chain.from_iterable(self.lines[a:b_old]))
+        first_word = sum(self.counts[:a])
+        n_old = sum(self.counts[a:b_old])
+        n_new = sum(1 for n in new_flat if type(n) is Instruction) if section == ".text" else 0
+        isolated = (not pdiags and _pcrel_closed(old_flat) and _pcrel_closed(new_flat)
+                    and not _has_section(old_flat) and not _has_section(new_flat))
+
+        # 2. sólo instrucciones, mismo tamaño: no se mueve ninguna dirección
+        if (isolated and section == ".text" and n_new == n_old
+                and all(type(n) is Instruction for n in old_flat)
+                and all(type(n) is Instruction for n in new_flat)):
+            enc = self._encode_range(section, new_flat, first_word)
+            if not enc.diagnostics:
+                hi = first_word + n_old
+                rng = _diff_range(self.words[first_word:hi], enc.buffer)
+                self.words[first_word:hi] = enc.buffer
+                self._splice(a, b_old, new_lines, section)
+                self.text = text
+                return Rebuild("palabras", rng and (first_word + rng[0], first_word + rng[1]),
+                               False, False, False, self.diagnostics)
+
+        # 3. pasada 1 sobre todos los nodos guardados
+        old_words, old_image, old_link = self.words, self.image, self.link
+        if isolated:
+            self._splice(a, b_old, new_lines, section)
+        else:
+            self.lines[a:b_old] = new_lines
+            self._stale |= b_new != b_old
+            self._index()
+        nodes = list(chain.from_iterable(self.lines))
+        self.link = link = first_pass(nodes, **self.layout)
+        image = build_data_image(link)
+        enc = None
+        if isolated:
+            # las palabras fuera del tramo se reutilizan (desplazadas si cambió
+            # su tamaño); sólo las simbólicas pueden necesitar recodificarse
+            enc = self._encode_range(section, new_flat, first_word)
+            words = old_words[:first_word] + enc.buffer + old_words[first_word + n_old:]
+            if enc.diagnostics or len(enc.buffer) != n_new:
+                enc = None
+            elif (link.symtab != old_link.symtab or n_new != n_old) and \
+                    not self._reencode_symbolic(words, range(a, a + len(new_lines))):
+                enc = None
+        if enc is None:
+            enc = encode(nodes, link.symtab, text_base=link.text_base)
+            words = enc.buffer
+        self.words, self.image, self.text = words, image, text
+        self.diagnostics = (pdiags + list(link.diagnostics) + list(image.diagnostics)
+                            + list(enc.diagnostics))
+        if self.diagnostics and self._stale:
+            return self._rebuild_full(text, old_words, old_image, old_link)
+        return self._changes("layout", old_words, old_image, old_link)
+
+    def _rebuild_full(self, text: str, old_words: Optional[array] = None,
+                      old_image: Optional[DataImage] = None,
+                      old_link: Optional[LinkResult] = None) -> Rebuild:
+        old_words = self.words if old_words is None else old_words
+        old_image = self.image if old_image is None else old_image
+        old_link = self.link if old_link is None else old_link
+        self._full(text)
+        return self._changes("completo", old_words, old_image, old_link)
+
+    def _changes(self, kind: str, old_words: array, old_image: DataImage,
+                 old_link: LinkResult) -> Rebuild:
+        rng = _diff_range(old_words, self.words)
+        img, lk = self.image, self.link
+        return Rebuild(kind, rng, len(old_words) != len(self.words),
+                       (img.base, img.size, img.segments) != (old_image.base, old_image.size,
+                                                              old_image.segments),
+                       (lk.symtab, lk.sections, lk.global_symbols, lk.bss_size)
+                       != (old_link.symtab, old_link.sections, old_link.global_symbols,
+                           old_link.bss_size),
+                       self.diagnostics)
+
+# ---------------- Salidas ----------------
+
+# .hex, .bin y la imagen cruda tienen tamaño fijo por palabra: si el número
+# de palabras no cambia, las que cambiaron se reescriben en su sitio.
+_HEX_WIDTH, _BIN_WIDTH, _RAW_WIDTH = 11, 33, 4
+
+def _patch(path: str, offset: int, data: bytes) -> None:
+    with open(path, "r+b") as f:
+        f.seek(offset)
+        f.write(data)
+
+class WatchOutputs:
+    """Salidas de la CLI mantenidas al día: sólo se escribe lo que cambió."""
+
+    def __init__(self, out_hex: str, out_bin: str, *, out_raw: Optional[str] = None,
+                 out_elf: Optional[str] = None,
+                 out_data_raw: Optional[str] = None, out_data_hex: Optional[str] = None) -> None:
+        self.out_hex, self.out_bin, self.out_raw = out_hex, out_bin, out_raw
+        self.out_elf = out_elf
+        self.out_data_raw, self.out_data_hex = out_data_raw, out_data_hex
+        self._current = False  # los archivos reflejan el último ensamblado sin errores
+
+    def write_all(self, asm: IncrementalAssembler) -> List[str]:
+        write_outputs(asm.build(), self.out_hex, self.out_bin, out_raw=self.out_raw,
+                      out_elf=self.out_elf,
+                      out_data_raw=self.out_data_raw, out_data_hex=self.out_data_hex)
+        self._current = True
+        return [p for p in (self.out_hex, self.out_bin, self.out_raw, self.out_elf,
+                            self.out_data_raw, self.out_data_hex) if p]
+
+    def update(self, asm: IncrementalAssembler, r: Rebuild) -> List[str]:
+        """Aplica el cambio 'r' a los archivos; devuelve las rutas tocadas.
+        Con errores no se escribe nada (y el siguiente ensamblado correcto
+        reescribe todo)."""
+        if not asm.ok:
+            self._current = False
+            return []
+        if not self._current or r.text_resized:
+            return self.write_all(asm)
+        written: List[str] = []
+        if r.text_range is not None:
+            lo, hi = r.text_range
+            chunk = asm.words[lo:hi]
+            _patch(self.out_hex, lo * _HEX_WIDTH, _hex_text(chunk).encode("ascii"))
+            _patch(self.out_bin, lo * _BIN_WIDTH, _bin_text(chunk).encode("ascii"))
+            written += [self.out_hex, self.out_bin]
+            if self.out_raw:
+                _patch(self.out_raw, lo * _RAW_WIDTH, _raw_bytes(chunk))
+                written.append(self.out_raw)
+        if self.out_elf and r.changed:
+            tmp = self.out_elf + ".tmp"
+            write_elf(tmp, asm.words, asm.link, data=asm.image)
+            os.replace(tmp, self.out_elf)
+            written.append(self.out_elf)
+        if r.data_changed:
+            for path, write in ((self.out_data_raw, write_image_raw),
+                                (self.out_data_hex, write_image_hex)):
+                if path:
+                    write(asm.image, path + ".tmp")
+                    os.replace(path + ".tmp", path)
+                    written.append(path)
+        return written
+
+# ---------------- Bucle de la CLI ----------------
+
+def watch(args: argparse.Namespace, *, interval: float = 0.1,
+          max_rebuilds: Optional[int] = None, stdout: Optional[TextIO] = None,
+          stderr: Optional[TextIO] = None) -> int:
+    """--watch: ensambla args.source y vuelve a hacerlo (incrementalmente)
+    cada vez que cambia su mtime o su tamaño. Termina con Ctrl-C, o tras
+    'max_rebuilds' reensamblados (para pruebas)."""
+    out = stdout or sys.stdout
+    err = stderr or sys.stderr
+    if args.elf and args.elf_type == "rel":
+        # el ensamblado incremental mantiene el .text ya enlazado, no un objeto
+        print("ERROR: --elf-type rel no se admite con --watch", file=err)
+        return 2
+    outputs = WatchOutputs(args.out_hex, args.out_bin, out_raw=args.raw, out_elf=args.elf,
+                           out_data_raw=args.data_raw, out_data_hex=args.data_hex)
+
+    def stamp() -> Tuple[int, int]:
+        st = os.stat(args.source)
+        return st.st_mtime_ns, st.st_size
+
+    def read() -> str:
+        with open(args.source, "rb") as f:
+            return f.read().decode("utf-8")
+
+    def report(kind: str, diags: List[Diagnostic], written: List[str], t0: float) -> None:
+        for d in diags:
+            print(d, file=err)
+        ms = (time.perf_counter() - t0) * 1e3
+        if any(d.severity == "error" for d in diags):
+            print(f"[{time.strftime('%H:%M:%S')}] {kind}: con errores, salidas sin tocar ({ms:.1f} ms)",
+                  file=err)
+        else:
+            print(f"[{time.strftime('%H:%M:%S')}] {kind}: {len(asm.words)} instrucciones, "
+                  f"{len(written)} salidas actualizadas ({ms:.1f} ms)", file=out)
+
+    try:
+        last = stamp()
+        text = read()
+    except (OSError, UnicodeDecodeError) as ex:
+        print(f"ERROR: no pude leer {args.source}: {ex}", file=err)
+        return 2
+    t0 = time.perf_counter()
+    asm = IncrementalAssembler(text, filename=args.source)
+    try:
+        written = outputs.write_all(asm) if asm.ok else []
+    except OSError as ex:
+        print(f"ERROR al escribir salidas: {ex}", file=err)
+        return 3
+    report("completo", asm.diagnostics, written, t0)
+    print(f"Vigilando {args.source} (Ctrl-C para salir)", file=out)
+
+    rebuilds = 0
+    try:
+        while max_rebuilds is None or rebuilds < max_rebuilds:
+            time.sleep(interval)
+            try:
+                now = stamp()
+                if now == last:
+                    continue
+                last = now
+                text = read()
+            except (OSError, UnicodeDecodeError):
+                continue  # p.ej. el editor está reemplazando el archivo
+            t0 = time.perf_counter()
+            r = asm.update(text)
+            rebuilds += 1
+            if r.kind == "nada":
+                continue
+            try:
+                written = outputs.update(asm, r)
+            except OSError as ex:
+                print(f"ERROR al escribir salidas: {ex}", file=err)
+                return 3
+            report(r.kind, r.diagnostics, written, t0)
+    except KeyboardInterrupt:
+        pass
+    return 0
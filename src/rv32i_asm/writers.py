@@ -1,22 +1,142 @@
 from __future__ import annotations
-from typing import Iterable, List
+import sys
+from array import array
+from itertools import islice
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Union
 from .utils import to_hex32, to_bin32
-from .encoding import Encoded
+from .encoding import Encoded, EncodedWords, EncodeResult
+from .data import DataImage
 
-def to_hex_lines(words: Iterable[Encoded]) -> List[str]:
-    return [to_hex32(w.word) for w in words]
+# Fuente de palabras: resultado de encode(), su buffer/memoryview o cualquier
+# iterable de Encoded (p.ej. encode_iter en streaming)
+Words = Union[EncodeResult, EncodedWords, array, memoryview, Iterable[Encoded]]
 
-def to_bin_lines(words: Iterable[Encoded]) -> List[str]:
-    return [to_bin32(w.word) for w in words]
+CHUNK_WORDS = 1 << 16  # palabras por bloque en las salidas de texto
 
-def write_hex(words: Iterable[Encoded], path: str) -> None:
-    lines = to_hex_lines(words)
+def _values(words: Words) -> Iterable[int]:
+    """Enteros u32 de 'words'; los buffers se recorren sin crear Encoded."""
+    if isinstance(words, (EncodeResult, EncodedWords)):
+        return words.buffer
+    if isinstance(words, (array, memoryview)):
+        return words
+    return (w.word for w in words)
+
+def _as_array(words: Words) -> array:
+    """array('I') con las palabras (sin copia si ya hay un buffer)."""
+    if isinstance(words, (EncodeResult, EncodedWords)):
+        return words.buffer
+    if isinstance(words, array):
+        return words
+    if isinstance(words, memoryview):
+        return array('I', words.cast('B').tobytes())
+    return array('I', _values(words))
+
+def _chunks(words: Words) -> Iterator[array]:
+    """Bloques de hasta CHUNK_WORDS palabras; cada bloque es una copia propia."""
+    size = CHUNK_WORDS
+    if isinstance(words, (EncodeResult, EncodedWords, array, memoryview)):
+        buf = _as_array(words)
+        for i in range(0, len(buf), size):
+            yield buf[i:i + size]
+        return
+    it = iter(_values(words))
+    while True:
+        chunk = array('I', islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+def _raw_bytes(chunk: array) -> memoryview:
+    """Bytes little-endian del bloque (en hosts big-endian se invierte una copia)."""
+    if sys.byteorder == "big":
+        chunk = array('I', chunk)
+        chunk.byteswap()
+    return memoryview(chunk).cast('B')
+
+def _hex_text(chunk: array) -> str:
+    # bytes big-endian -> 8 dígitos hex por palabra, separados por '\n'
+    if sys.byteorder == "little":
+        chunk.byteswap()
+    text = "0x" + chunk.tobytes().hex("\n", 4).replace("\n", "\n0x") + "\n"
+    if sys.byteorder == "little":
+        chunk.byteswap()
+    return text
+
+def _bin_text(chunk: array) -> str:
+    return ("{:032b}\n" * len(chunk)).format(*chunk)
+
+def to_hex_lines(words: Words) -> List[str]:
+    return [to_hex32(w) for w in _values(words)]
+
+def to_bin_lines(words: Words) -> List[str]:
+    return [to_bin32(w) for w in _values(words)]
+
+def write_hex(words: Words, path: str) -> None:
+    """Una palabra por línea ('0x%08x'), escrita por bloques."""
+    with open(path, "w", encoding="utf-8") as f:
+        for chunk in _chunks(words):
+            f.write(_hex_text(chunk))
+
+def write_bin(words: Words, path: str) -> None:
+    """Una palabra por línea en binario ASCII (32 caracteres '0'/'1'), por bloques."""
     with open(path, "w", encoding="utf-8") as f:
-        for line in lines:
-            f.write(line + "\n")
+        for chunk in _chunks(words):
+            f.write(_bin_text(chunk))
+
+def write_raw(words: Words, path: str) -> int:
+    """Imagen binaria cruda: 4 bytes little-endian por palabra, en un solo write().
+    Devuelve el número de bytes escritos."""
+    buf = _as_array(words)
+    with open(path, "wb") as f:
+        return f.write(_raw_bytes(buf))
+
+def write_hex_bin(words: Words, hex_path: str, bin_path: str,
+                  raw_path: Optional[str] = None) -> int:
+    """Escribe .hex y .bin (y opcionalmente la imagen cruda) a la vez
+    consumiendo 'words' en streaming, por bloques.
+    Devuelve el número de palabras escritas."""
+    n = 0
+    fr: Optional[BinaryIO] = None
+    with open(hex_path, "w", encoding="utf-8") as fh, open(bin_path, "w", encoding="utf-8") as fb:
+        try:
+            if raw_path is not None:
+                fr = open(raw_path, "wb")
+            for chunk in _chunks(words):
+                if fr is not None:
+                    fr.write(_raw_bytes(chunk))
+                fh.write(_hex_text(chunk))
+                fb.write(_bin_text(chunk))
+                n += len(chunk)
+        finally:
+            if fr is not None:
+                fr.close()
+    return n
+
+# ---------------- Imágenes de datos dispersas ----------------
+
+def write_image_raw(image: DataImage, path: str) -> int:
+    """Imagen cruda de .data: los huecos se saltan con seek (archivo disperso
+    en sistemas que lo soportan). Devuelve el tamaño lógico en bytes."""
+    with open(path, "wb") as f:
+        for off, seg in image.segments:
+            f.seek(off)
+            f.write(seg)
+        f.truncate(image.size)
+    return image.size
 
-def write_bin(words: Iterable[Encoded], path: str) -> None:
-    lines = to_bin_lines(words)
+def write_image_hex(image: DataImage, path: str) -> None:
+    """Imagen de .data en texto: una palabra little-endian por línea ('0x%08x')
+    y una línea '@AAAAAAAA' (dirección absoluta en bytes) al inicio de cada
+    tramo, de modo que los huecos no generan líneas."""
     with open(path, "w", encoding="utf-8") as f:
-        for line in lines:
-            f.write(line + "\n")
+        for off, seg in image.segments:
+            start, end = off & ~3, (off + len(seg) + 3) & ~3
+            f.write(f"@{image.base + start:08x}\n")
+            for i in range(start, end, 4 * CHUNK_WORDS):
+                lo, hi = max(i, off), min(i + 4 * CHUNK_WORDS, end, off + len(seg))
+                raw = bytes(lo - i) + seg[lo - off:hi - off]
+                raw += bytes(-len(raw) % 4)
+                chunk = array('I', raw)
+                if sys.byteorder == "big":
+                    chunk.byteswap()
+                f.write(_hex_text(chunk))
@@ -0,0 +1,32 @@
+from src.rv32i_asm.ast import REGS, REG_TABLE, Reg, Imm, Sym, imm, sym, Instruction
+from src.rv32i_asm.parser import parse
+from src.rv32i_asm.pseudo import expand
+
+def test_reg_table_aliases_share_instances():
+    assert len(REGS) == 32 and REGS[10] == Reg("x10", 10)
+    assert REG_TABLE["a0"] is REG_TABLE["x10"] is REGS[10]
+    assert REG_TABLE["fp"] is REG_TABLE["s0"] is REGS[8]
+
+def test_imm_and_sym_are_interned():
+    assert imm(5) is imm(5) and imm(5) == Imm(5)
+    assert imm(1 << 20) == Imm(1 << 20)
+    assert sym("loop") is sym("loop")
+
+def test_parser_and_pseudo_reuse_operands():
+    nodes, diags = parse(".text\n addi A0, x10, 0\n lw a0, 0(a0)\n mv a1, a0\n nop\n")
+    assert not diags
+    ins = [n for n in expand(nodes) if isinstance(n, Instruction)]
+    assert ins[0].operands[0] is ins[0].operands[1] is REGS[10]
+    assert ins[1].operands[1].base is REGS[10]
+    assert ins[2].operands[2] is ins[0].operands[2] is imm(0)
+    assert ins[3].operands[0] is REGS[0]
+
+def test_sym_cache_is_bounded(monkeypatch):
+    from src.rv32i_asm import ast
+    monkeypatch.setattr(ast, "SYM_CACHE_MAX", 8)
+    monkeypatch.setattr(ast, "_SYM_CACHE", {})
+    first = sym("etiqueta_0")
+    for i in range(100):
+        assert sym(f"etiqueta_{i}") == Sym(f"etiqueta_{i}")
+    assert len(ast._SYM_CACHE) <= 8
+    assert sym("etiqueta_0") == first  # igual aunque ya no sea el mismo objeto
@@ -0,0 +1,81 @@
+import os
+
+from src.rv32i_asm.assembler import main, batch_jobs, _run_argv
+from src.rv32i_asm.cli import build_batch_parser
+
+GOOD = ".text\n_start:\n  addi a0, a0, {n}\n  beq a0, zero, _start\n"
+BAD = ".text\n  addi a0, a0, 5000\n"
+
+def _write(tmp_path, name, text):
+    p = tmp_path / name
+    p.write_text(text)
+    return str(p)
+
+def test_batch_pool_reports_in_order(tmp_path, capsys):
+    srcs = [_write(tmp_path, "a.s", GOOD.format(n=1)),
+            _write(tmp_path, "b.s", BAD),
+            _write(tmp_path, "c.s", ".text\n" + "  addi a0, a0, 3\n" * 200),  # el mayor, primero al pool
+            _write(tmp_path, "d.s", BAD.replace("5000", "6000"))]
+    assert main(["--batch", "-j", "3", *srcs]) == 1
+    out, err = capsys.readouterr()
+    assert [l.split(" → ")[1].split(",")[0] for l in out.splitlines()] == \
+        [str(tmp_path / "a.hex"), str(tmp_path / "c.hex")]
+    assert err.splitlines() == [
+        "2:1: ERROR: Inmediato de 12 bits con signo fuera de rango (−2048..2047)",
+        "2:1: ERROR: Inmediato de 12 bits con signo fuera de rango (−2048..2047)",
+        "Lote: 4 archivos, 2 con errores"]
+    assert (tmp_path / "a.hex").read_text().split()[0] == "0x00150513"
+    assert not (tmp_path / "b.hex").exists()
+
+def test_manifest_out_dir_and_formats(tmp_path, capsys):
+    a = _write(tmp_path, "a.s", GOOD.format(n=1))
+    b = _write(tmp_path, "b.s", GOOD.format(n=2))
+    man = _write(tmp_path, "build.txt",
+                 f"# firmware\n{a}\n{b} {tmp_path / 'x.hex'} {tmp_path / 'x.bin'}  # explícito\n\n")
+    out_dir = tmp_path / "out"
+    assert main(["--batch", "--manifest", man, "--out-dir", str(out_dir),
+                 "--formats", "hex,bin,elf", "-j", "1"]) == 0
+    assert sorted(os.listdir(out_dir)) == ["a.bin", "a.elf", "a.hex", "b.elf"]
+    assert (tmp_path / "x.hex").read_text() == "0x00250513\n0xfe050ee3\n"
+    assert capsys.readouterr().out.endswith("Lote: 2 archivos, 0 con errores\n")
+
+def test_batch_jobs_argv(tmp_path):
+    args = build_batch_parser().parse_args(["--batch", "src/x.s", "--formats", "hex,bin,raw,data-hex",
+                                            "--cache-dir", "cc"])
+    assert batch_jobs(args) == [["--raw=src/x.raw", "--data-hex=src/x.data.hex", "--cache-dir=cc",
+                                 "--", "src/x.s", "src/x.hex", "src/x.bin"]]
+
+def test_batch_errors(tmp_path, capsys):
+    assert main(["--batch", "--formats", "hex,pdf", "a.s"]) == 2
+    assert "pdf" in capsys.readouterr().err
+    assert main(["--batch"]) == 2
+    assert main(["--batch", str(tmp_path / "missing.s"), "-j", "1"]) == 2
+
+def test_out_dir_keeps_paths_of_sources_sharing_a_basename(tmp_path, capsys):
+    (tmp_path / "drv" / "a").mkdir(parents=True)
+    (tmp_path / "drv" / "b").mkdir()
+    a = _write(tmp_path, "drv/a/main.s", GOOD.format(n=1))
+    b = _write(tmp_path, "drv/b/main.s", GOOD.format(n=2))
+    out_dir = tmp_path / "out"
+    assert main(["--batch", a, b, "--out-dir", str(out_dir), "--formats", "hex,bin,elf", "-j", "2"]) == 0
+    assert sorted(os.listdir(out_dir / "a")) == ["main.bin", "main.elf", "main.hex"]
+    assert (out_dir / "a" / "main.hex").read_text().split()[0] == "0x00150513"
+    assert (out_dir / "b" / "main.hex").read_text().split()[0] == "0x00250513"
+    capsys.readouterr()
+    man = _write(tmp_path, "build.txt", f"{a}\n{b} {out_dir / 'a' / 'main.hex'} {tmp_path / 'x.bin'}\n")
+    assert main(["--batch", "--manifest", man, "--out-dir", str(out_dir)]) == 2
+    assert "escribirían la misma salida" in capsys.readouterr().err
+
+def test_batch_names_starting_with_dash_and_bad_argv(tmp_path, capsys, monkeypatch):
+    ok = _write(tmp_path, "ok.s", GOOD.format(n=1))
+    _write(tmp_path, "-neg.s", GOOD.format(n=2))
+    _write(tmp_path, "ok2.s", GOOD.format(n=3))
+    monkeypatch.chdir(tmp_path)
+    man = _write(tmp_path, "build.txt", "ok.s\n-neg.s\nok2.s\n")
+    assert main(["--batch", "--manifest", man, "--formats", "hex,bin,raw", "-j", "2"]) == 0
+    out = capsys.readouterr().out
+    assert out.count("OK:") == 3 and out.endswith("Lote: 3 archivos, 0 con errores\n")
+    assert (tmp_path / "-neg.raw").exists() and (tmp_path / "ok2.hex").exists()
+    # argumentos que argparse rechaza: error del trabajo, no SystemExit en el lote
+    code, out, err = _run_argv(["--no-existe", "--", ok, "o.hex", "o.bin"])
+    assert code == 2 and out == "" and "unrecognized arguments" in err
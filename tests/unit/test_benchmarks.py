@@ -0,0 +1,71 @@
+import io
+
+import pytest
+
+from benchmarks import bench
+from benchmarks.__main__ import main
+from benchmarks.generator import generate, write_program
+from src.rv32i_asm.assembler import assemble_text
+from src.rv32i_asm.ast import Instruction
+from src.rv32i_asm.isa import SPEC
+
+def test_generator_is_exact_and_reproducible():
+    for n in (1, 7, 64, 1500):
+        assert generate(n, seed=1).count("\n") == n
+    assert generate(500, seed=3) == generate(500, seed=3)
+    assert generate(500, seed=3) != generate(500, seed=4)
+    f = io.StringIO()
+    assert write_program(f, 500, seed=3) == 500
+    assert f.getvalue() == generate(500, seed=3)
+
+def test_generated_program_covers_the_isa():
+    text = generate(5000, seed=0)
+    nodes, diags, link, enc = assemble_text(text)
+    assert diags == []
+    used = {n.mnemonic for n in nodes if isinstance(n, Instruction)}
+    assert used >= set(SPEC)
+    for pseudo in ("li", "la", "call", "mv", "beqz", "bgt"):
+        assert f"    {pseudo} " in text
+    assert link.data_size > 1000 and link.bss_size > 0
+
+def test_measure_and_compare(tmp_path):
+    doc = bench.run([300], repeat=1)
+    phases = doc["sizes"]["300"]["phases"]
+    assert set(phases) == set(bench.STAGES)
+    assert doc["sizes"]["300"]["counts"]["lines"] == 300
+
+    slow = {"sizes": {"300": {"phases": {k: {"wall_s": v["wall_s"] * 2 + 0.01, "cpu_s": 0}
+                                         for k, v in phases.items()}}}}
+    rows = bench.compare(doc, slow, threshold=0.10)
+    assert rows and all(r["regression"] for r in rows)
+    assert not any(r["regression"] for r in bench.compare(doc, doc))
+    # el umbral absoluto evita falsos positivos en fases de microsegundos
+    tiny = {"sizes": {"300": {"phases": {"parse": {"wall_s": 1e-6}}}}}
+    tiny2 = {"sizes": {"300": {"phases": {"parse": {"wall_s": 3e-6}}}}}
+    assert not bench.compare(tiny, tiny2)[0]["regression"]
+
+    base, cur = str(tmp_path / "base.json"), str(tmp_path / "cur.json")
+    bench.save(doc, base)
+    bench.save(slow, cur)
+    assert main(["compare", cur, "--baseline", base]) == 1
+    assert main(["compare", base, "--baseline", base]) == 0
+    with pytest.raises(SystemExit) as ex:  # no hay línea base por defecto en el repositorio
+        main(["compare", cur])
+    assert ex.value.code == 2
+
+def test_parse_size():
+    assert bench.parse_size("1k") == 1000
+    assert bench.parse_size("10M") == 10_000_000
+    assert bench.parse_size("2500") == 2500
+
+def test_sim_loop_reports_instructions_per_second(capsys):
+    r = bench.measure_sim(100, repeat=1)
+    assert r["instructions"] == 3 + 7 * 100 + 3 and r["ips"] > 0
+    rows = bench.measure_sim_modes(100, repeat=1)
+    assert {(r["kernel"], r["mode"]) for r in rows} == \
+        {(k, m) for k in bench.SIM_KERNELS for m in ("blocks", "predecode", "naive")}
+    assert len({r["instructions"] for r in rows if r["kernel"] == "alu"}) == 1
+    assert main(["sim", "--iterations", "50", "--repeat", "1", "--modes", "blocks,naive"]) == 0
+    out = capsys.readouterr().out
+    assert "M instr/s" in out and "sobre naive" in out
+    assert main(["sim", "--modes", "jit"]) == 2
@@ -0,0 +1,94 @@
+import os
+
+from src.rv32i_asm import assembler
+from src.rv32i_asm.assembler import assemble_cached, main
+from src.rv32i_asm.cache import BuildCache
+
+SRC = """
+    .data
+msg: .asciz "Hola"
+     .align 2
+tab: .word msg, 3
+     .space 8192
+    .bss
+buf: .space 64
+    .text
+_start:
+    la   a1, msg
+    beq  a1, zero, _start
+    addi a0, a0, 4096
+"""
+
+def test_hit_skips_assembly(tmp_path, monkeypatch):
+    cache = BuildCache(str(tmp_path))
+    first, hit = assemble_cached(SRC, cache, filename="p.s")
+    assert not hit and cache.misses == 1
+    assert [d.message for d in first.diagnostics] == \
+        ["Inmediato de 12 bits con signo fuera de rango (−2048..2047)"]
+
+    def boom(*a, **k):
+        raise AssertionError("no debería ensamblar")
+    monkeypatch.setattr(assembler, "assemble_text", boom)
+    again, hit = assemble_cached(SRC, cache, filename="p.s")
+    assert hit and cache.hits == 1
+    assert list(again.words) == list(first.words)
+    assert again.image.segments == first.image.segments and again.image.size == first.image.size
+    assert again.link.symtab == first.link.symtab and again.link.bss_size == first.link.bss_size
+    assert again.diagnostics == first.diagnostics
+
+def test_key_covers_inputs(tmp_path):
+    cache = BuildCache(str(tmp_path))
+    inc = tmp_path / "defs.inc"
+    inc.write_text(".equ N, 1\n")
+    k = cache.key(b"nop", includes=[str(inc)], options={"base_text": 0})
+    assert k == cache.key(b"nop", includes=[str(inc)], options={"base_text": 0})
+    assert k != cache.key(b"nop ", includes=[str(inc)], options={"base_text": 0})
+    assert k != cache.key(b"nop", includes=[str(inc)], options={"base_text": 4})
+    inc.write_text(".equ N, 2\n")
+    assert k != cache.key(b"nop", includes=[str(inc)], options={"base_text": 0})
+
+def test_layout_options_miss(tmp_path):
+    cache = BuildCache(str(tmp_path))
+    a, _ = assemble_cached(SRC, cache)
+    b, hit = assemble_cached(SRC, cache, base_text=0x400)
+    assert not hit and b.link.text_base == 0x400 and a.link.text_base == 0
+
+def test_lru_eviction(tmp_path):
+    cache = BuildCache(str(tmp_path), max_bytes=1 << 30)
+    build, _ = assemble_cached(SRC, BuildCache(str(tmp_path / "other")))
+    keys = [cache.key(bytes([i])) for i in range(3)]
+    for age, k in enumerate(keys):
+        assert cache.put(k, build)
+        os.utime(cache._path(k), (1000 + age, 1000 + age))
+    one = os.path.getsize(cache._path(keys[0]))
+    assert cache.get(keys[0]) is not None  # el más antiguo pasa a ser el más reciente
+    cache.max_bytes = 2 * one + one // 2
+    assert cache.evict() == one
+    assert [cache.get(k) is not None for k in keys] == [True, False, True]
+    assert cache.size() <= cache.max_bytes
+
+def test_corrupt_entry_is_a_miss(tmp_path):
+    cache = BuildCache(str(tmp_path))
+    assemble_cached(SRC, cache)
+    for r, _, fs in os.walk(tmp_path):
+        for f in fs:
+            with open(os.path.join(r, f), "r+b") as fh:
+                fh.truncate(12)
+    _, hit = assemble_cached(SRC, cache)
+    assert not hit
+
+def test_cli_cache(tmp_path, capsys):
+    src = tmp_path / "p.s"
+    src.write_text(SRC.replace("4096", "16"))
+    outs = [str(tmp_path / n) for n in ("a.hex", "a.bin")]
+    ref = [str(tmp_path / n) for n in ("r.hex", "r.bin")]
+    assert main([str(src), *ref, "--elf", str(tmp_path / "r.elf")]) == 0
+    cache_args = ["--cache-dir", str(tmp_path / "cache"), "--elf", str(tmp_path / "a.elf")]
+    assert main([str(src), *outs, *cache_args]) == 0
+    assert "caché" not in capsys.readouterr().out
+    for p in outs + [str(tmp_path / "a.elf")]:
+        os.remove(p)
+    assert main([str(src), *outs, *cache_args]) == 0
+    assert "(desde caché)" in capsys.readouterr().out
+    for a, r in zip(outs + [str(tmp_path / "a.elf")], ref + [str(tmp_path / "r.elf")]):
+        assert open(a, "rb").read() == open(r, "rb").read()
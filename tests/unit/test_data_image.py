@@ -0,0 +1,59 @@
+import struct
+
+from src.rv32i_asm.assembler import assemble_text
+from src.rv32i_asm.data import build_data_image
+from src.rv32i_asm.linker import first_pass
+from src.rv32i_asm.parser import parse
+
+SRC = r"""
+.data
+a: .byte 1, 2, 200, -1
+b: .half 0x1234
+   .word 7, -2
+s: .asciz "hi, there\n"
+   .align 3
+d: .dword 0xFFFFFFFFFFFFFFFF
+   .space 3
+e: .ascii "x", 10
+.text
+   nop
+"""
+
+def test_data_image_bytes():
+    _, diags, link, _ = assemble_text(SRC)
+    assert not diags
+    img = build_data_image(link)
+    assert not img.diagnostics
+    assert len(img.data) == link.data_size
+    expected = (bytes([1, 2, 200, 0xFF]) + struct.pack("<H", 0x1234) + b"\0\0"
+                + struct.pack("<Ii", 7, -2) + b"hi, there\n\0" + bytes(5)
+                + b"\xff" * 8 + bytes(3) + b"x\n")
+    assert bytes(img.data[:len(expected)]) == expected
+    assert not any(img.data[len(expected):])
+
+def test_items_parsed_once_in_pass1():
+    nodes, _ = parse(".data\nt: .word 1, 2, 3\n.word 4,\n")
+    link = first_pass(nodes)
+    assert [bytes(c.payload) for c in link.data_chunks] == [struct.pack("<3I", 1, 2, 3), struct.pack("<I", 4)]
+    assert link.data_chunks[1].offset == 12
+
+def test_symbolic_words_are_resolved():
+    src = ".data\ntab: .word f, g, tab\n.text\nf: nop\ng: nop\n"
+    _, diags, link, _ = assemble_text(src)
+    assert not diags
+    img = build_data_image(link)
+    assert struct.unpack("<3I", img.data[:12]) == (link.symtab["f"], link.symtab["g"], link.symtab["tab"])
+
+def test_undefined_symbol_in_data_is_reported():
+    _, diags, _, _ = assemble_text(".data\n.word nowhere\n")
+    assert [d.message for d in diags] == ["Símbolo no definido en datos: nowhere"]
+    assert diags[0].line == 2
+
+def test_sized_values_out_of_range_are_errors():
+    src = ".data\n.byte 300, -200, 255, -128\n.half 70000\n.word 0x1FFFFFFFF, 0xFFFFFFFF, f\n.text\nf: nop\n"
+    _, diags, _, _ = assemble_text(src)
+    assert [(d.severity, d.line, d.message) for d in diags] == [
+        ("error", 2, ".byte valor fuera de rango (-128..255): 300"),
+        ("error", 2, ".byte valor fuera de rango (-128..255): -200"),
+        ("error", 3, ".half valor fuera de rango (-32768..65535): 70000"),
+        ("error", 4, ".word valor fuera de rango (-2147483648..4294967295): 0x1FFFFFFFF")]
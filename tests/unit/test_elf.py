@@ -0,0 +1,118 @@
+import struct
+
+from src.rv32i_asm.assembler import assemble_text, main
+from src.rv32i_asm.elf import (write_elf, EHDR, SHDR, SYM, RELA, ET_EXEC, ET_REL, EM_RISCV,
+                               SHT_NOBITS, SHT_RELA, SHN_UNDEF)
+from src.rv32i_asm.objfile import (R_RISCV_32, R_RISCV_BRANCH, R_RISCV_PCREL_HI20,
+                                   R_RISCV_PCREL_LO12_I)
+
+SRC = """
+    .data
+msg: .asciz "Hola"
+    .text
+_start:
+    la   a1, msg
+loop:
+    beq  a1, zero, loop
+    ecall
+"""
+
+def _read(path):
+    raw = path.read_bytes()
+    eh = EHDR.unpack_from(raw, 0)
+    shoff, shnum, shstrndx = eh[6], eh[12], eh[13]
+    shdrs = [SHDR.unpack_from(raw, shoff + i * SHDR.size) for i in range(shnum)]
+    shstr = shdrs[shstrndx]
+    def name(off, tab):
+        return raw[tab[4] + off: raw.index(b"\0", tab[4] + off)].decode()
+    secs = {name(sh[0], shstr): sh for sh in shdrs[1:]}
+    symtab, strtab = secs[".symtab"], secs[".strtab"]
+    syms = {}
+    for i in range(1, symtab[5] // SYM.size):
+        st_name, value, _size, _info, _other, shndx = SYM.unpack_from(raw, symtab[4] + i * SYM.size)
+        if st_name:
+            syms[name(st_name, strtab)] = (value, shndx)
+    return raw, eh, secs, syms
+
+def test_elf_exec_layout(tmp_path):
+    _, diags, link, enc = assemble_text(SRC)
+    assert not diags
+    p = tmp_path / "a.elf"
+    size = write_elf(str(p), enc, link, bss_size=64)
+    raw, eh, secs, syms = _read(p)
+    assert size == len(raw)
+    assert raw[:6] == b"\x7fELF\x01\x01"
+    assert eh[1] == ET_EXEC and eh[2] == EM_RISCV and eh[4] == link.symtab["_start"]
+    text = secs[".text"]
+    assert text[3] == link.text_base
+    assert raw[text[4]:text[4] + text[5]] == struct.pack(f"<{len(enc)}I", *enc.buffer)
+    assert text[4] % 0x1000 == link.text_base % 0x1000
+    assert secs[".data"][3] == link.data_base and secs[".data"][5] == link.data_size
+    assert raw[secs[".data"][4]:secs[".data"][4] + 5] == b"Hola\0"
+    assert secs[".bss"][1] == SHT_NOBITS and secs[".bss"][5] == 64
+    assert syms["msg"] == (link.symtab["msg"], 2)
+    assert syms["loop"] == (link.symtab["loop"], 1)
+
+REL_SRC = """
+    .data
+msg: .asciz "Hola"
+     .align 2
+ptr: .word f, msg
+    .text
+    .globl _start
+_start:
+    la   a0, msg
+    call f
+    beq  a0, zero, g
+"""
+
+def test_cli_elf_rel_writes_relocations_and_undefined_symbols(tmp_path):
+    src = tmp_path / "r.s"
+    src.write_text(REL_SRC)
+    out = [str(tmp_path / n) for n in ("r.hex", "r.bin", "r.o")]
+    assert main([str(src), out[0], out[1], "--elf", out[2], "--elf-type", "rel"]) == 0
+    raw, eh, secs, syms = _read(tmp_path / "r.o")
+    assert eh[1] == ET_REL and eh[10] == 0  # sin cabeceras de programa
+    assert all(secs[n][3] == 0 for n in (".text", ".data", ".bss"))
+    text = secs[".text"]
+    assert struct.unpack_from("<I", raw, text[4])[0] == 0x00000517  # auipc a0, 0: campo a cero
+    assert syms["msg"] == (0, 2) and syms["_start"] == (0, 1)
+    assert syms["f"] == (0, SHN_UNDEF) and syms["g"] == (0, SHN_UNDEF)
+    symtab, strtab = secs[".symtab"], secs[".strtab"]
+    names = []
+    for i in range(symtab[5] // SYM.size):
+        off = SYM.unpack_from(raw, symtab[4] + i * SYM.size)[0]
+        names.append(raw[strtab[4] + off: raw.index(b"\0", strtab[4] + off)].decode())
+
+    def relocs(sec):
+        sh = secs[sec]
+        assert sh[1] == SHT_RELA and sh[6] == list(secs).index(".symtab") + 1
+        return [(off, info & 0xFF, names[info >> 8])
+                for off, info, _ in RELA.iter_unpack(raw[sh[4]:sh[4] + sh[5]])]
+    assert relocs(".rela.text") == [
+        (0, R_RISCV_PCREL_HI20, "msg"), (4, R_RISCV_PCREL_LO12_I, ".Lpcrel_hi0"),
+        (8, R_RISCV_PCREL_HI20, "f"), (12, R_RISCV_PCREL_LO12_I, ".Lpcrel_hi1"),
+        (16, R_RISCV_BRANCH, "g")]
+    assert syms[".Lpcrel_hi1"] == (8, 1)
+    assert relocs(".rela.data") == [(8, R_RISCV_32, "f"), (12, R_RISCV_32, "msg")]
+
+def test_cli_elf(tmp_path):
+    src = tmp_path / "p.s"
+    src.write_text(SRC)
+    out = [str(tmp_path / n) for n in ("o.hex", "o.bin", "o.elf")]
+    assert main([str(src), out[0], out[1], "--elf", out[2]]) == 0
+    _, eh, secs, _ = _read(tmp_path / "o.elf")
+    assert eh[1] == ET_EXEC and secs[".text"][5] == 16
+
+def test_elf_rel_skips_data_holes(tmp_path, monkeypatch):
+    from src.rv32i_asm.data import DataImage
+    monkeypatch.setattr(DataImage, "data", property(lambda self: 1 / 0))  # no se materializa
+    src = tmp_path / "big.s"
+    src.write_text("    .data\nw: .word 1\n   .space 1 << 28\nz: .word w\n    .text\n    la a0, z\n")
+    out = [str(tmp_path / n) for n in ("b.hex", "b.bin", "b.o")]
+    assert main([str(src), out[0], out[1], "--elf", out[2], "--elf-type", "rel"]) == 0
+    raw, _, secs, syms = _read(tmp_path / "b.o")
+    data = secs[".data"]
+    assert data[5] == 8 + (1 << 28) and syms["z"] == (4 + (1 << 28), 2)
+    assert raw[data[4]:data[4] + 4] == b"\1\0\0\0"
+    assert raw[data[4] + syms["z"][0]:data[4] + data[5]] == bytes(4)  # campo a reubicar
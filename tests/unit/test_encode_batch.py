@@ -0,0 +1,78 @@
+import sys
+
+from src.rv32i_asm.parser import parse
+from src.rv32i_asm.pseudo import expand
+from src.rv32i_asm.linker import first_pass
+from src.rv32i_asm.encoding import encode, encode_batch
+from src.rv32i_asm.ast import InstructionTable
+
+PROG = """
+.data
+buf: .word 1, 2, 3
+.text
+start:
+  add  a0, a1, a2
+  sub  t0, t1, t2
+  addi sp, sp, -16
+  slli a0, a0, 3
+  srai a1, a1, 31
+  lw   a2, 8(sp)
+  sw   a2, -4(sp)
+  lui  a3, 0x12345
+  la   a4, buf
+  li   a5, 0x12345678
+  beq  a0, a1, start
+  bne  a0, zero, end
+  jal  ra, start
+  jalr zero, 0(ra)
+  fence
+  ecall
+  ebreak
+end:
+  ret
+"""
+
+BAD = """
+.text
+L1:
+  addi a0, a0, 2048
+  slli a0, a0, 32
+  beq  a0, a0, 3
+  lui  a1, 0x80000
+  jal  ra, 2000001
+"""
+
+def _link(src):
+    nodes, diags = parse(src)
+    assert not diags
+    nodes = expand(nodes)
+    return nodes, first_pass(nodes)
+
+def _same(a, b):
+    assert [(w.word, w.pc, w.line, w.col, w.mnemonic) for w in a.words] == \
+           [(w.word, w.pc, w.line, w.col, w.mnemonic) for w in b.words]
+    assert [(d.severity, d.message, d.line, d.col) for d in a.diagnostics] == \
+           [(d.severity, d.message, d.line, d.col) for d in b.diagnostics]
+
+def test_batch_matches_scalar():
+    nodes, link = _link(PROG)
+    ref = encode(nodes, link.symtab, text_base=link.text_base)
+    assert not ref.diagnostics
+    _same(encode_batch(nodes, link.symtab, text_base=link.text_base), ref)
+    _same(encode_batch(InstructionTable.from_nodes(nodes), link.symtab), ref)
+
+def test_batch_range_errors_map_to_lines():
+    nodes, link = _link(BAD)
+    ref = encode(nodes, link.symtab)
+    res = encode_batch(nodes, link.symtab)
+    _same(res, ref)
+    assert [d.line for d in res.diagnostics] == [4, 5, 6, 7, 8, 8]
+
+def test_batch_falls_back_for_general_forms():
+    nodes, link = _link(".text\n  beq a0, a1, nowhere\n  addi a0, a0, nowhere\n")
+    _same(encode_batch(nodes, link.symtab), encode(nodes, link.symtab))
+
+def test_batch_without_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)  # import numpy -> ImportError
+    nodes, link = _link(PROG)
+    _same(encode_batch(nodes, link.symtab), encode(nodes, link.symtab))
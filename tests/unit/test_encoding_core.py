@@ -52,3 +52,50 @@ def test_la_pcrel_and_li_large():
     enc = _pipe(src)
     # la -> auipc+addi ; li grande -> lui+addi
     assert len(enc.words) == 4
+
+def test_templates_precombine_fixed_fields():
+    from src.rv32i_asm.encoding import TEMPLATES
+    assert TEMPLATES["add"].base == 0x00000033
+    assert TEMPLATES["sub"].base == 0x40000033
+    assert TEMPLATES["srai"].base == 0x40005013
+    assert TEMPLATES["ebreak"].base == 0x00100073
+    assert TEMPLATES["lw"].kind == "LD" and TEMPLATES["jalr"].kind == "JALR"
+
+def test_fast_path_falls_back_for_diagnostics():
+    src = """
+    .text
+      addi a0, a0, 2048
+      slli a0, a0, 32
+      beq  a0, a0, 3
+    """
+    nodes, _ = parse(src)
+    link = first_pass(expand(nodes))
+    enc = encode(expand(nodes), link.symtab)
+    msgs = [d.message for d in enc.diagnostics]
+    assert any("12 bits" in m for m in msgs)
+    assert any("shamt" in m for m in msgs)
+    assert any("múltiplo de 2" in m for m in msgs)
+
+def test_result_buffer_and_line_table():
+    from src.rv32i_asm.encoding import encode_iter
+    src = """
+    .text
+    start:
+      li   a0, 0x12345678
+      addi a1, a1, 1
+      beq  a0, a1, start
+    """
+    nodes, _ = parse(src)
+    nodes = expand(nodes)
+    link = first_pass(nodes)
+    enc = encode(nodes, link.symtab, text_base=0x100)
+    assert enc.buffer.typecode == "I" and len(enc) == 4
+    assert enc.view.tolist() == [w.word for w in encode_iter(nodes, link.symtab, text_base=0x100)]
+    # li se expande a lui+addi en la misma línea: un único tramo
+    assert len(enc.lines) == 3
+    assert enc.lines.lookup(1) == (4, 1) and enc.lines.lookup(2) == (5, 1)
+    # las vistas Encoded se construyen bajo demanda y coinciden con encode_iter
+    assert list(enc.words) == list(encode_iter(nodes, link.symtab, text_base=0x100))
+    assert enc.words[-1].pc == 0x10C and enc.words[-1].mnemonic == "beq"
+    from src.rv32i_asm.writers import to_hex_lines
+    assert to_hex_lines(enc) == to_hex_lines(enc.view) == [to_hex32(w.word) for w in enc.words]
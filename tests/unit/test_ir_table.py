@@ -0,0 +1,56 @@
+from src.rv32i_asm.parser import parse
+from src.rv32i_asm.pseudo import expand
+from src.rv32i_asm.linker import first_pass
+from src.rv32i_asm.encoding import encode
+from src.rv32i_asm.ast import InstructionTable, Instruction, Reg, Imm, ROW_INSTR, ROW_OPAQUE
+
+SRC = """
+    .data
+tbl: .word 1, 2, 3
+msg: .asciz "hi"
+    .text
+_start:
+    li   a0, 0x12345
+    la   a1, tbl
+    lw   a2, 4(a1)
+    sw   a2, -8(sp)
+    beq  a0, a1, _start
+    call _start
+    srai t0, t1, 3
+    ecall
+"""
+
+def _nodes():
+    nodes, diags = parse(SRC)
+    assert not diags
+    return expand(nodes)
+
+def test_table_roundtrip_view():
+    nodes = _nodes()
+    t = InstructionTable.from_nodes(nodes)
+    assert len(t) == len(nodes)
+    assert list(t) == nodes
+    assert all(k != ROW_OPAQUE for k in t.kind)
+    # columnas compactas: muy por debajo de un objeto por instrucción
+    assert t.nbytes <= 32 * len(t)
+
+def test_store_and_branch_roles():
+    t = InstructionTable.from_nodes(_nodes())
+    rows = [i for i in range(len(t)) if t.kind[i] == ROW_INSTR]
+    sw = next(i for i in rows if t.mnemonics[t.mnem[i]] == "sw")
+    assert (t.rs2[sw], t.rs1[sw], t.imm[sw]) == (12, 2, -8)
+    beq = next(i for i in rows if t.mnemonics[t.mnem[i]] == "beq")
+    assert (t.rs1[beq], t.rs2[beq], t.symbols[t.sym[beq]]) == (10, 11, "_start")
+
+def test_odd_operands_kept_as_objects():
+    odd = Instruction("add", [Reg("x1", 1), Imm(1), Imm(2)], line=1, col=1, section=".text")
+    t = InstructionTable.from_nodes([odd])
+    assert t.kind[0] == ROW_OPAQUE and t.node(0) is odd
+
+def test_first_pass_and_encode_on_table():
+    nodes = _nodes()
+    t = InstructionTable.from_nodes(nodes)
+    ref = first_pass(nodes)
+    got = first_pass(t)
+    assert got == ref
+    assert encode(t, got.symtab) == encode(nodes, ref.symtab)
@@ -1,7 +1,8 @@
 import pytest
 from src.rv32i_asm.lexer import (
     strip_comment, split_label, is_directive,
-    split_mnemonic_operands, split_operands
+    split_mnemonic_operands, split_operands,
+    fast_split_operands, tokenize, tokenize_line,
 )
 
 # --- strip_comment ---
@@ -59,3 +60,47 @@ def test_split_mnemonic_operands(src, mn, tail):
 ])
 def test_split_operands(src, expected):
     assert split_operands(src) == expected
+
+# --- tokenizador de una pasada ---
+@pytest.mark.parametrize("src, expected", [
+    ("loop: add x1,x2,x3 # cmt", ("loop", "add", ["x1", "x2", "x3"], 1)),
+    ("   LW a0, 8(sp) // c", (None, "lw", ["a0", "8(sp)"], 4)),
+    ("_start:   ", ("_start", "", [], 1)),
+    ("msg: .asciz \"hi\"", ("msg", ".asciz", ['"hi"'], 1)),
+    ("  .word 1, 2,3", (None, ".word", ["1,", "2,3"], 3)),
+    ("notlabel : x", (None, "notlabel", [": x"], 1)),
+    ("ret", (None, "ret", [], 1)),
+    ("# solo comentario", None),
+    ("", None),
+])
+def test_tokenize_line(src, expected):
+    assert tokenize_line(src) == expected
+
+def test_tokenize_numbers_lines_and_skips_empty():
+    toks = list(tokenize(["", "a:", "  nop", "# x"]))
+    assert [(t[0], t[1], t[2]) for t in toks] == [(2, "a", ""), (3, None, "nop")]
+
+@pytest.mark.parametrize("src", [
+    "x1,x2,x3", " x1 , x2 , x3 ", "4(x2), t0", "%pcrel_hi(foo), %lo(bar)(x1)",
+    "a,,b,", "((a,b)), c", "a), (b", "(a, b", "",
+])
+def test_fast_split_operands_matches_reference(src):
+    assert fast_split_operands(src) == split_operands(src)
+
+@pytest.mark.parametrize("line", [
+    "L1: addi a0, a1, -5  # c", "lw t0, 8 (sp)", "sw t1,-4(s0)//x", "a:b: nop",
+    "x / y, z", "  .equ N, 4", "jal  x0, +8", "beq a0,zero,L0,", ".L1: nop",
+])
+def test_tokenize_line_matches_helper_chain(line):
+    core = strip_comment(line)
+    label, rest = split_label(core)
+    if label:
+        core = rest
+    if core.startswith('.'):
+        parts = core.split()
+        ref = (parts[0].lower(), parts[1:])
+    else:
+        mn, tail = split_mnemonic_operands(core)
+        ref = (mn, split_operands(tail))
+    got = tokenize_line(line)
+    assert got[0] == label and (got[1], got[2]) == ref
@@ -59,3 +59,45 @@ def test_equ_and_duplicate_label():
     assert r.symtab["CONST"] == 0x1234
     # debe reportar error por redefinición
     assert any("redefinida" in d.message for d in r.diagnostics)
+
+def test_space_size_is_a_constant_expression():
+    src = """
+    .equ N, 16
+    .data
+    big:   .space 64*1024*1024
+    after: .space N * 4 + (1 << 2)
+    last:  .word 0
+    .bss
+    tab:   .skip -(-N) % 5
+    end:   .space 1
+    .text
+    addi x0, x0, 0
+    """
+    nodes, diags = parse(src)
+    assert not diags
+    r = first_pass(expand(nodes), base_text=0x0, base_data=0x10000000)
+    assert not r.diagnostics
+    assert r.symtab["after"] == 0x10000000 + 64 * 1024 * 1024
+    assert r.symtab["last"] == r.symtab["after"] + 68
+    assert r.symtab["end"] == r.symtab["tab"] + 1
+
+def test_space_invalid_size_is_a_diagnostic():
+    src = """
+    .data
+    a: .word 0
+    .space 4*
+    .space a
+    .space FOO + 1
+    .space 8 / (2 - 2)
+    .space 3 $ 4
+    .text
+    addi x0, x0, 0
+    """
+    nodes, diags = parse(src)
+    r = first_pass(expand(nodes))
+    msgs = [d.message for d in r.diagnostics]
+    assert msgs == [".space tamaño inválido: expresión incompleta",
+                    ".space tamaño inválido: 'a' es una etiqueta, no una constante .equ",
+                    ".space tamaño inválido: símbolo no definido: FOO",
+                    ".space tamaño inválido: división por cero",
+                    ".space tamaño inválido: carácter inesperado '$'"]
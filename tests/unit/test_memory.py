@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+from src.rv32i_asm.sim import PAGE_SIZE, Memory, Simulator, SimError
+
+def test_pages_are_allocated_on_first_touch():
+    mem = Memory()
+    mem.map(0, 1 << 32)  # todo el espacio: no reserva nada todavía
+    assert mem.resident == 0
+    mem.sw(0x1000_0000, 7)
+    mem.sb(0xFFFF_FFFF, 1)
+    assert mem.lw(0x1000_0000) == 7 and mem.lbu(0xFFFF_FFFF) == 1
+    assert mem.lw(0x8000_0000) == 0
+    assert mem.resident == 3
+
+def test_unmapped_and_overlapping_regions():
+    mem = Memory()
+    mem.map(0x2000, 10)  # se redondea a la página entera
+    mem.sw(0x2FFC, 1)
+    for fn in (mem.lw, mem.lb, mem.lhu):
+        with pytest.raises(SimError, match="no mapeada: 0x00003000"):
+            fn(0x3000)
+    with pytest.raises(SimError, match="no mapeada"):
+        mem.sw(0x2FFE, 1)  # cruza a una página sin mapear
+    with pytest.raises(ValueError, match="solapa"):
+        mem.map(0x2800, 0x1000)
+    mem.map(0x1000, 0x3000, exist_ok=True)  # añade 0x1000 y 0x3000
+    mem.sw(0x3000, 2)
+    assert mem.lw(0x2FFC) == 1 and mem.lw(0x3000) == 2
+    with pytest.raises(ValueError):
+        mem.map(1 << 32, 4)
+
+def test_fast_and_slow_paths_agree_with_a_flat_model():
+    rng = random.Random(1)
+    mem = Memory()
+    mem.map(0x7000, 3 * PAGE_SIZE)
+    flat = bytearray(3 * PAGE_SIZE)
+    for _ in range(3000):
+        size = rng.choice((1, 2, 4))
+        off = rng.choice((rng.randrange(len(flat) - 3), PAGE_SIZE - 1, PAGE_SIZE - 2, 2 * PAGE_SIZE - 3))
+        addr = 0x7000 + off
+        if rng.random() < 0.5:
+            v = rng.getrandbits(32)
+            {1: mem.sb, 2: mem.sh, 4: mem.sw}[size](addr, v)
+            flat[off:off + size] = (v & ((1 << 8 * size) - 1)).to_bytes(size, "little")
+        else:
+            raw = flat[off:off + size]
+            u = int.from_bytes(raw, "little")
+            s = int.from_bytes(raw, "little", signed=True) & 0xFFFFFFFF
+            got = {1: (mem.lbu, mem.lb), 2: (mem.lhu, mem.lh), 4: (mem.lw, mem.lw)}[size]
+            assert (got[0](addr), got[1](addr)) == (u, s if size < 4 else u), (hex(addr), size)
+    assert mem.read(0x7000, len(flat)) == bytes(flat)
+
+def test_views_split_per_page_and_cstrings_cross_pages():
+    mem = Memory()
+    mem.map(0, 2 * PAGE_SIZE)
+    mem.write(PAGE_SIZE - 3, b"hola\0")
+    views = mem.views(PAGE_SIZE - 3, 5)
+    assert [len(v) for v in views] == [3, 2]
+    views[1][0] = ord("L")  # las vistas son la memoria, no copias
+    assert mem.read_cstring(PAGE_SIZE - 3) == b"holL"
+    mem.write(0, b"x" * 32)
+    with pytest.raises(SimError, match="sin terminar"):
+        mem.read_cstring(0, limit=16)
+
+def test_mmap_backed_regions(tmp_path):
+    mem = Memory(mmap_threshold=1 << 20)
+    mem.map(0x4000_0000, 64 << 20)  # mmap anónimo por tamaño
+    mem.sw(0x4000_0000 + (32 << 20), 0xCAFEBABE)
+    assert mem.lw(0x4000_0000 + (32 << 20)) == 0xCAFEBABE
+    path = tmp_path / "mem.bin"
+    with open(path, "w+b") as f:
+        mem.map(0x1000_0000, 2 * PAGE_SIZE, backing=f)
+        mem.write(0x1000_0000 + PAGE_SIZE, b"persistente")
+        mem.sh(0x1000_0002, 0x4142)
+        mem.close()
+    data = path.read_bytes()
+    assert len(data) == 2 * PAGE_SIZE
+    assert data[PAGE_SIZE:PAGE_SIZE + 11] == b"persistente" and data[2:4] == b"BA"
+    assert mem.resident == 0
+
+def test_simulator_runs_with_mmap_backed_stack():
+    sim = Simulator.from_text("""    .text
+    addi sp, sp, -8
+    li   t0, 1234
+    sw   t0, 4(sp)
+    lw   a0, 4(sp)
+    andi a0, a0, 0xff
+    li   a7, 93
+    ecall
+""", stack_size=16 << 20, mmap_threshold=1 << 20)
+    assert sim.run().exit_code == 1234 & 0xFF
+    assert sim.mem.resident <= 2  # .text y una página de pila
@@ -0,0 +1,95 @@
+from src.rv32i_asm.assembler import assemble_text
+from src.rv32i_asm.data import build_data_image
+from src.rv32i_asm.objfile import (link_objects, save_object, load_object, main, SECTION_ALIGN,
+                                   R_RISCV_BRANCH, R_RISCV_JAL, R_RISCV_PCREL_HI20,
+                                   R_RISCV_PCREL_LO12_I, R_RISCV_32)
+
+MAIN = """
+    .text
+    .globl _start
+_start:
+    la   a0, msg
+    call puts
+    bne  a0, zero, _start
+    beq  a0, zero, fin
+    j    fin
+"""
+
+LIB = """
+    .data
+    .globl msg
+msg:  .asciz "hola"
+      .align 2
+tab:  .word msg, puts, 3
+    .text
+    .globl puts, fin
+puts:
+    lw   t0, tab
+    ret
+fin:
+    j    fin
+"""
+
+def _obj(src, name):
+    _, diags, _, obj = assemble_text(src, filename=name, relocatable=True)
+    assert not [d for d in diags if d.severity == "error"]
+    return obj
+
+def test_object_records_relocations():
+    obj = _obj(MAIN, "main.s")
+    kinds = [(r.offset, r.type, r.symbol) for r in obj.relocations]
+    assert kinds == [(0, R_RISCV_PCREL_HI20, "msg"), (4, R_RISCV_PCREL_LO12_I, "msg"),
+                     (8, R_RISCV_PCREL_HI20, "puts"), (12, R_RISCV_PCREL_LO12_I, "puts"),
+                     (20, R_RISCV_BRANCH, "fin"), (24, R_RISCV_JAL, "fin")]
+    assert obj.relocations[1].pair == 0 and obj.relocations[3].pair == 8
+    assert obj.undefined == ["msg", "puts", "fin"]
+    assert obj.symbols["_start"].binding == "global"
+    assert obj.text[0] == 0x00000517                  # auipc a0, 0 (campo a rellenar)
+    _, _, _, enc = assemble_text(MAIN + LIB)
+    assert obj.text[4] == enc.buffer[4]               # bne local: ya codificado
+
+def test_link_matches_single_assembly():
+    prog = link_objects([_obj(MAIN, "main.s"), _obj(LIB, "lib.s")])
+    assert not prog.diagnostics
+    _, diags, link, enc = assemble_text(MAIN + LIB)
+    assert not diags
+    assert list(prog.text) == list(enc.buffer)
+    ref = build_data_image(link).data
+    assert prog.data.data == ref + bytes(-len(ref) % SECTION_ALIGN)
+    assert prog.link.symtab == {k: link.symtab[k] for k in ("_start", "msg", "puts", "fin")}
+    assert link.global_symbols == {"_start", "msg", "puts", "fin"}
+
+def test_link_errors():
+    main_obj = _obj(MAIN, "main.s")
+    lib_local = _obj(LIB.replace(".globl puts, fin", ".globl fin"), "lib.s")
+    prog = link_objects([main_obj, lib_local])
+    assert [(d.message, d.file, d.line) for d in prog.diagnostics] == \
+        [("Símbolo no definido: puts", "main.s", 6), ("Símbolo no definido: puts", "main.s", 6)]
+    assert "lib.s" in prog.diagnostics[0].hint
+    prog = link_objects([_obj(LIB, "a.s"), _obj(LIB, "b.s")])
+    assert {d.message for d in prog.diagnostics} == {
+        "Símbolo global definido en varios objetos: msg",
+        "Símbolo global definido en varios objetos: puts",
+        "Símbolo global definido en varios objetos: fin"}
+
+def test_save_load_roundtrip(tmp_path):
+    obj = _obj(LIB, "lib.s")
+    p = tmp_path / "lib.o"
+    save_object(obj, str(p))
+    back = load_object(str(p))
+    assert list(back.text) == list(obj.text)
+    assert back.symbols == obj.symbols and back.relocations == obj.relocations
+    assert back.data.size == obj.data.size and back.data.data == obj.data.data
+    assert any(r.type == R_RISCV_32 and r.symbol == "puts" for r in back.relocations)
+
+def test_cli_compile_and_link(tmp_path):
+    (tmp_path / "main.s").write_text(MAIN)
+    (tmp_path / "lib.s").write_text(LIB)
+    for name in ("main", "lib"):
+        assert main(["compile", str(tmp_path / f"{name}.s"), "-o", str(tmp_path / f"{name}.o")]) == 0
+    out = tmp_path / "prog.hex"
+    assert main(["link", str(tmp_path / "main.o"), str(tmp_path / "lib.o"),
+                 "--hex", str(out), "--elf", str(tmp_path / "prog.elf")]) == 0
+    _, _, _, enc = assemble_text(MAIN + LIB)
+    assert out.read_text().split() == [f"0x{w:08x}" for w in enc.buffer]
+    assert main(["link", str(tmp_path / "main.o")]) == 1
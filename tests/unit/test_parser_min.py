@@ -121,3 +121,15 @@ def test_parse_program_min():
 
 
 
+
+def test_parse_restores_gc_state():
+    import gc
+    assert gc.isenabled()
+    parse(".text\nadd x1, x2, x3\n")
+    assert gc.isenabled()
+    gc.disable()
+    try:
+        parse(".text\nadd x1, x2, x3\n")
+        assert not gc.isenabled()
+    finally:
+        gc.enable()
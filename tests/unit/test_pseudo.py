@@ -74,3 +74,28 @@ def test_load_store_with_symbol():
     assert m == ["auipc","addi","lw","auipc","addi","sw"]
     lw2 = [n for n in out if isinstance(n, Instruction)][2]
     assert isinstance(lw2.operands[1], Mem) and lw2.operands[1].base.name == "x10"
+
+def test_register_custom_pseudo():
+    import pytest
+    from src.rv32i_asm.pseudo import register_pseudo, unregister_pseudo, _copy, _as_reg
+
+    @register_pseudo("inc", 1)
+    def _inc(n):
+        rd = _as_reg(n.operands[0])
+        return [_copy(n, "addi", [rd, rd, Imm(1)])]
+    try:
+        with pytest.raises(ValueError):
+            register_pseudo("inc", 1, _inc)
+        nodes, _ = parse(".text\n  inc a0\n  inc a0, a1\n")
+        out = [n for n in expand(nodes) if isinstance(n, Instruction)]
+        assert [i.mnemonic for i in out] == ["addi", "inc"]
+        assert out[0].operands[2] == Imm(1)
+    finally:
+        unregister_pseudo("inc", 1)
+    nodes, _ = parse(".text\n  inc a0\n")
+    assert _mnems(expand(nodes)) == ["inc"]
+
+def test_real_isa_instructions_pass_through_unchanged():
+    nodes, _ = parse(".text\n  add a0, a1, a2\n  lw a0, 4(sp)\n  jal ra, 8\n")
+    out = expand(nodes)
+    assert all(a is b for a, b in zip(out, nodes)) and len(out) == len(nodes)
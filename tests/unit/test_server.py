@@ -0,0 +1,107 @@
+import os
+import stat
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.rv32i_asm.assembler import build_arg_parser, main as cli_main
+from src.rv32i_asm.client import client_main, default_socket, request
+from src.rv32i_asm.server import AssemblerServer
+
+SRC = """
+    .data
+msg: .asciz "Hola"
+    .text
+_start:
+    la   a1, msg
+    beq  a1, zero, _start
+"""
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "asm.sock")
+    srv = AssemblerServer(path, workers=4)
+    t = threading.Thread(target=srv.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    t.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    t.join()
+    assert not os.path.exists(path)
+
+def _args(tmp_path, tag):
+    return [str(tmp_path / "p.s"), str(tmp_path / f"{tag}.hex"), str(tmp_path / f"{tag}.bin"),
+            "--elf", str(tmp_path / f"{tag}.elf")]
+
+def test_client_is_drop_in(tmp_path, server, capsys):
+    (tmp_path / "p.s").write_text(SRC)
+    assert cli_main(_args(tmp_path, "ref")) == 0
+    ref_out = capsys.readouterr().out
+    assert client_main(_args(tmp_path, "srv"), socket_path=server.server_address) == 0
+    assert capsys.readouterr().out == ref_out.replace("ref.", "srv.")
+    for ext in ("hex", "bin", "elf"):
+        assert (tmp_path / f"srv.{ext}").read_bytes() == (tmp_path / f"ref.{ext}").read_bytes()
+    # segunda petición: resultado caliente en memoria
+    assert client_main(_args(tmp_path, "srv"), socket_path=server.server_address) == 0
+    assert "(desde caché)" in capsys.readouterr().out
+
+def test_errors_and_relative_paths(tmp_path, server):
+    (tmp_path / "bad.s").write_text(".text\n  addi a0, a0, 5000\n")
+    args = vars(build_arg_parser().parse_args(["bad.s", "o.hex", "o.bin"]))
+    reply = request({"args": args, "cwd": str(tmp_path)}, server.server_address)
+    assert reply["code"] == 1
+    assert reply["stderr"].startswith("2:1: ERROR: Inmediato de 12 bits")
+    assert reply["diagnostics"][0]["line"] == 2 and reply["diagnostics"][0]["severity"] == "error"
+    (tmp_path / "bad.s").write_text(".text\n  addi a0, a0, 5\n")
+    reply = request({"args": args, "cwd": str(tmp_path)}, server.server_address)
+    assert reply["code"] == 0 and (tmp_path / "o.hex").read_text() == "0x00550513\n"
+    reply = request({"args": args, "cwd": str(tmp_path), "text": "  nop\n"}, server.server_address)
+    assert reply["code"] == 1  # 'nop' sin .text
+
+def test_concurrent_requests(tmp_path, server):
+    jobs = []
+    for i in range(16):
+        (tmp_path / f"p{i}.s").write_text(SRC + f"  addi a0, a0, {i}\n")
+        args = build_arg_parser().parse_args([f"p{i}.s", f"p{i}.hex", f"p{i}.bin"])
+        jobs.append({"args": vars(args), "cwd": str(tmp_path)})
+    with ThreadPoolExecutor(8) as ex:
+        replies = list(ex.map(lambda j: request(j, server.server_address), jobs))
+    assert [r["code"] for r in replies] == [0] * 16
+    for i in range(16):
+        last = (tmp_path / f"p{i}.hex").read_text().split()[-1]
+        assert int(last, 16) >> 20 == i
+
+def test_client_falls_back_without_server(tmp_path, capsys):
+    (tmp_path / "p.s").write_text(SRC)
+    assert client_main(_args(tmp_path, "x"), socket_path=str(tmp_path / "none.sock")) == 0
+    assert (tmp_path / "x.hex").exists()
+
+def test_default_socket_is_private(tmp_path, monkeypatch):
+    monkeypatch.delenv("RV32I_ASM_SOCKET", raising=False)
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path / "run"))
+    assert default_socket() == str(tmp_path / "run" / "rv32i_asm.sock")
+    monkeypatch.delenv("XDG_RUNTIME_DIR")
+    monkeypatch.setattr(tempfile, "tempdir", str(tmp_path))
+    path = default_socket()
+    assert os.path.dirname(path) == str(tmp_path / f"rv32i_asm-{os.getuid()}")
+    srv = AssemblerServer(path, workers=1)
+    try:
+        assert stat.S_IMODE(os.stat(os.path.dirname(path)).st_mode) == 0o700
+        assert os.stat(path).st_mode & 0o077 == 0  # creado con umask 077
+    finally:
+        srv.server_close()
+    os.chmod(os.path.dirname(path), 0o755)  # otros pueden entrar: se rechaza
+    with pytest.raises(OSError, match="directorio privado"):
+        AssemblerServer(path, workers=1)
+
+def test_client_ignores_socket_of_another_user(tmp_path, server, monkeypatch, capsys):
+    (tmp_path / "p.s").write_text(SRC)
+    jobs = []
+    monkeypatch.setattr(server, "handle_job", jobs.append)
+    uid = os.getuid()
+    monkeypatch.setattr(os, "getuid", lambda: uid + 1)
+    assert client_main(_args(tmp_path, "x"), socket_path=server.server_address) == 0
+    assert "no es del usuario actual" in capsys.readouterr().err
+    assert not jobs and (tmp_path / "x.hex").exists()  # ensamblado en el propio proceso
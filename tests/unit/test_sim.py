@@ -0,0 +1,252 @@
+import pytest
+
+from src.rv32i_asm.assembler import assemble_text
+from src.rv32i_asm.isa import SPEC
+from src.rv32i_asm.sim import MODES, Simulator, SimError, block_source, decode
+
+def word(line):
+    return assemble_text(f"    .text\n    {line}\n")[3].buffer[0]
+
+def load(text):
+    return Simulator.from_text("    .text\n" + text)
+
+def run(text, **kw):
+    sim = load(text)
+    return sim, sim.run(**kw)
+
+EXIT = "    li a7, 93\n    ecall\n"
+
+def test_decode_roundtrips_every_mnemonic():
+    samples = {
+        "R": "{m} a0, a1, a2", "B": "{m} a0, a1, 8", "U": "{m} a0, 0x12345",
+        "S": "{m} a1, -4(a0)", "J": "{m} ra, -8", "SYS": "{m}",
+    }
+    for m, sp in SPEC.items():
+        if m in ("slli", "srli", "srai"):
+            line = f"{m} a0, a1, 31"
+        elif m in ("lb", "lh", "lw", "lbu", "lhu", "jalr"):
+            line = f"{m} a0, -4(a1)"
+        elif m == "fence":
+            line = "fence"
+        elif m == "fence.i":
+            line = "fence.i"
+        elif sp.itype == "I":
+            line = f"{m} a0, a1, -5"
+        else:
+            line = samples[sp.itype].format(m=m)
+        d = decode(word(line))
+        assert d.mnemonic == m, line
+    d = decode(word("sw a1, -4(a0)"))
+    assert (d.rs1, d.rs2, d.imm) == (10, 11, -4)
+    assert decode(word("jal ra, -8")).imm == -8
+    assert decode(word("lui a0, 0xfffff")).imm == -4096
+    with pytest.raises(SimError):
+        decode(0xFFFFFFFF)
+
+def test_alu_semantics():
+    sim, res = run("""
+    li   a0, -5
+    li   a1, 3
+    slt  s0, a0, a1
+    sltu s1, a0, a1
+    sra  s2, a0, a1
+    srl  s3, a0, a1
+    sltiu s4, a1, -1
+    slti s5, a0, -4
+    lui  s6, -1
+    auipc s7, 1
+    addi zero, zero, 7
+    add  s8, a0, a0
+    mv   a0, zero
+""" + EXIT)
+    assert res.reason == "exit" and res.exit_code == 0
+    assert [sim.reg(r) for r in ("s0", "s1", "s2", "s3", "s4", "s5")] == \
+        [1, 0, 0xFFFFFFFF, 0x1FFFFFFF, 1, 1]
+    assert sim.reg("s6") == 0xFFFFF000 and sim.reg("s7") == 9 * 4 + 0x1000
+    assert sim.reg("zero") == 0 and sim.reg("s8") == (-10) & 0xFFFFFFFF
+
+def test_loads_stores_and_data_image():
+    sim, res = run("""
+    .data
+tab: .word 0x80402010
+buf: .space 8
+    .text
+_start:
+    la   t0, tab
+    lb   s0, 3(t0)
+    lbu  s1, 3(t0)
+    lh   s2, 2(t0)
+    lhu  s3, 2(t0)
+    addi sp, sp, -16
+    sw   s0, 0(sp)
+    lw   s4, 0(sp)
+    la   t1, buf
+    sh   s3, 6(t1)
+    lw   s5, 4(t1)
+    li   a0, 3
+""" + EXIT)
+    assert res.exit_code == 3
+    assert [sim.reg(r) for r in ("s0", "s1", "s2", "s3", "s4", "s5")] == \
+        [0xFFFFFF80, 0x80, 0xFFFF8040, 0x8040, 0xFFFFFF80, 0x80400000]
+
+def test_loop_calls_and_instruction_count():
+    sim, res = run("""
+_start:
+    li   a0, 0
+    li   t0, 10
+loop:
+    jal  ra, inc
+    addi t0, t0, -1
+    bnez t0, loop
+""" + EXIT + """
+inc:
+    addi a0, a0, 2
+    ret
+""")
+    assert res.exit_code == 20
+    assert res.steps == sim.instret == 2 + 10 * 5 + 2
+
+def test_store_into_text_invalidates_predecoded_word():
+    new = word("addi a0, zero, 7")
+    sim, res = run(f"""
+_start:
+    li   s0, 2
+patch:
+    addi a0, zero, 1
+    addi s0, s0, -1
+    beqz s0, done
+    la   t0, patch
+    li   t1, {new}
+    sw   t1, 0(t0)
+    j    patch
+done:
+""" + EXIT)
+    assert res.exit_code == 7
+
+def test_fence_i_drops_cache_after_host_patch():
+    sim = load("""
+_start:
+    li   s0, 2
+patch:
+    addi a0, zero, 1
+    addi s0, s0, -1
+    beqz s0, done
+    ebreak
+    fence.i
+    j    patch
+done:
+""" + EXIT)
+    assert sim.run().reason == "ebreak"
+    sim.mem.store(sim.text_base + 4, 4, word("addi a0, zero, 7"))  # sin invalidar
+    assert sim.run().exit_code == 7
+
+def test_limits_and_faults():
+    sim = load("loop: j loop\n")
+    res = sim.run(max_steps=1000)
+    assert res.reason == "limit" and res.steps == 1000 and sim.pc == 0
+    sim = load("    li t0, 0x12345678\n    lw a0, 0(t0)\n")
+    with pytest.raises(SimError, match="no mapeada"):
+        sim.run()
+    assert sim.pc == 4 * 2 and sim.instret == 2  # li son dos palabras
+    sim = load("    li t0, 6\n    jr t0\n")
+    with pytest.raises(SimError, match="desalineado"):
+        sim.run()
+    with pytest.raises(SimError, match="ecall no soportada"):
+        load("    li a7, 64\n    ecall\n").run()
+
+KERNEL = """
+    .data
+arr: .word 5, -3, 8, 1, 0, 12, -7, 4
+    .text
+_start:
+    la   s0, arr
+    li   s1, 8
+    li   a0, 0
+sum:
+    lw   t0, 0(s0)
+    bge  t0, zero, pos
+    sub  t0, zero, t0
+pos:
+    add  a0, a0, t0
+    sb   t0, 0(s0)
+    lbu  t1, 0(s0)
+    sh   t1, 2(s0)
+    addi s0, s0, 4
+    addi s1, s1, -1
+    bnez s1, sum
+    li   t2, 200
+spin:
+    srai t3, t2, 1
+    sltu t4, t3, t2
+    addi t2, t2, -1
+    bgtz t2, spin
+    jal  ra, twice
+    andi a0, a0, 0xff
+""" + EXIT + """
+twice:
+    slli a0, a0, 1
+    jalr zero, 0(ra)
+"""
+
+def state(sim):
+    return list(sim.x[:32]), sim.pc, sim.instret, sim.exit_code
+
+def test_blocks_match_interpreter():
+    results = {}
+    for mode in MODES:
+        sim = Simulator.from_text("    .text\n" + KERNEL, mode=mode)
+        assert sim.run().reason == "exit"
+        results[mode] = state(sim) + (sim.mem.read(0x1000_0000, 32),)
+    assert results["blocks"] == results["predecode"] == results["naive"]
+    assert results["blocks"][3] == (2 * 40) & 0xFF
+
+def test_block_loop_stops_at_exact_step_limit():
+    for limit in (1, 2, 7, 1000, 1001):
+        states = []
+        for mode in ("blocks", "predecode"):
+            sim = load("    li a0, 0\nloop:\n    addi a0, a0, 1\n    addi a1, a0, 2\n    j loop\n")
+            sim.mode = mode
+            res = sim.run(max_steps=limit)
+            assert res.reason == "limit" and res.steps == limit
+            states.append(state(sim))
+        assert states[0] == states[1], limit
+
+def test_fault_inside_translated_loop_is_precise():
+    src = """
+    addi t0, sp, -24
+loop:
+    addi t1, t1, 1
+    sw   t1, 0(t0)
+    addi t0, t0, 8
+    j    loop
+"""
+    states = []
+    for mode in ("blocks", "predecode"):
+        sim = load(src)
+        sim.mode = mode
+        with pytest.raises(SimError, match="no mapeada"):
+            sim.run()
+        states.append(state(sim))
+    assert states[0] == states[1]
+    assert states[0][1] == 4 * 2 and states[0][0][6] == 4  # el 4.º sw cae fuera de la pila
+
+def test_store_into_running_block_leaves_it():
+    new = word("addi a0, a0, 100")
+    sim, res = run(f"""
+_start:
+    la   t0, target
+    li   t1, {new}
+    sw   t1, 0(t0)
+target:
+    addi a0, zero, 1
+""" + EXIT)
+    assert res.exit_code == 100
+
+def test_block_source_keeps_registers_in_locals():
+    body = [decode(word(line)) for line in ("addi zero, a0, 1", "add a0, a0, a1", "lw zero, 0(sp)")]
+    src = block_source(0x100, body + [decode(word("bnez a0, 8"))])
+    assert "x[0]" not in src and "r0" not in src  # escrituras a x0 eliminadas
+    assert "lw(r2)" in src and "r10 = (r10 + r11) & 0xffffffff" in src
+    assert "while True:" not in src and "x[11] = " not in src  # a1 sólo se lee
+    loop = block_source(0x100, body + [decode(word("bnez a0, -12"))])  # vuelve a 0x100
+    assert "while True:" in loop
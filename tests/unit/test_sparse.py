@@ -0,0 +1,66 @@
+from src.rv32i_asm.assembler import assemble_text
+from src.rv32i_asm.data import build_data_image, SPARSE_MIN
+from src.rv32i_asm.writers import write_image_raw, write_image_hex
+
+BIG = 64 * 1024 * 1024
+
+SRC = f"""
+.data
+tab:  .word 1, 2
+      .space {BIG}
+tail: .word 0xdeadbeef
+small: .space 8
+      .byte 7
+.bss
+buf:  .space {2 * BIG}
+buf2: .space 16
+.text
+_start:
+      la a0, buf2
+"""
+
+def _link():
+    _, diags, link, enc = assemble_text(SRC)
+    assert not diags
+    return link, enc
+
+def test_space_is_an_extent_and_bss_follows_data():
+    link, _ = _link()
+    assert link.data_holes == [(8, BIG), (BIG + 12, 8)]
+    assert link.data_size == BIG + 24
+    assert link.bss_base == link.data_base + link.data_size
+    assert link.bss_size == 2 * BIG + 16
+    assert link.symtab["buf"] == link.bss_base
+    assert link.symtab["buf2"] == link.bss_base + 2 * BIG
+    assert link.sections["buf2"] == ".bss"
+
+def test_data_image_does_not_materialize_reservations():
+    link, _ = _link()
+    img = build_data_image(link)
+    assert img.size == link.data_size
+    assert img.materialized() < 2 * SPARSE_MIN  # sólo los tramos con datos
+    assert [off for off, _ in img.segments] == [0, BIG + 8]
+    assert bytes(img.segments[1][1][:4]) == (0xdeadbeef).to_bytes(4, "little")
+    assert img.segments[1][1][12] == 7  # la reserva pequeña se materializa
+
+def test_sparse_writers(tmp_path):
+    link, _ = _link()
+    img = build_data_image(link)
+    raw = tmp_path / "d.raw"
+    assert write_image_raw(img, str(raw)) == link.data_size
+    assert raw.stat().st_size == link.data_size
+    with open(raw, "rb") as f:
+        assert f.read(8) == b"\x01\0\0\0\x02\0\0\0"
+        f.seek(BIG + 8)
+        assert f.read(4) == b"\xef\xbe\xad\xde"
+    hx = tmp_path / "d.hex"
+    write_image_hex(img, str(hx))
+    lines = hx.read_text().splitlines()
+    assert lines[:3] == ["@10000000", "0x00000001", "0x00000002"]
+    assert lines[3] == f"@{0x10000000 + BIG + 8:08x}" and lines[4] == "0xdeadbeef"
+    assert lines[5:] == ["0x00000000", "0x00000000", "0x00000007"]
+
+def test_instructions_in_bss_are_rejected():
+    _, diags, _, enc = assemble_text(".bss\n  nop\n")
+    assert any("fuera" in d.message for d in diags)
+    assert len(enc) == 0
@@ -0,0 +1,35 @@
+import os
+import subprocess
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "src")
+
+# Presupuesto de 'python -X importtime' para rv32i_asm.assembler (µs
+# acumulados, con los .pyc ya generados). En la máquina de referencia ronda
+# los 50 ms; el margen es para máquinas de CI lentas, no para crecer.
+IMPORT_BUDGET_US = 150_000
+
+# Sólo hacen falta cuando se usan: ni argparse al importar, ni el
+# codificador, writers, ELF, objetos, caché o estadísticas.
+LAZY = ("argparse", "json", "tracemalloc", "hashlib", "tempfile",
+        "rv32i_asm.encoding", "rv32i_asm.writers", "rv32i_asm.elf",
+        "rv32i_asm.objfile", "rv32i_asm.cache", "rv32i_asm.data")
+
+def importtime(pycache):
+    env = dict(os.environ, PYTHONPYCACHEPREFIX=str(pycache))
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import rv32i_asm.assembler"],
+                         cwd=SRC_DIR, env=env, capture_output=True, text=True, check=True).stderr
+    times = {}
+    for line in err.splitlines():
+        if line.startswith("import time:") and "|" in line and "self [us]" not in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            times[name.strip()] = int(cumulative)
+    return times
+
+def test_import_is_within_budget_and_lazy(tmp_path):
+    importtime(tmp_path)  # genera los .pyc: se mide el arranque normal, no la compilación
+    runs = [importtime(tmp_path) for _ in range(3)]
+    assert min(t["rv32i_asm.assembler"] for t in runs) < IMPORT_BUDGET_US
+    loaded = runs[-1]
+    assert [m for m in LAZY if m in loaded] == []
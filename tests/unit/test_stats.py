@@ -0,0 +1,85 @@
+import json
+import threading
+
+from src.rv32i_asm.assembler import assemble_text, main
+from src.rv32i_asm.stats import Stats, _MEMORY_LOCK
+
+SRC = """    .data
+msg: .word 1, 2
+    .bss
+buf: .space 32
+    .text
+_start:
+    la   a0, msg
+    li   a1, 0x12345
+    addi a2, zero, 3
+fin:
+    j    fin
+"""
+
+def test_assemble_text_fills_stats():
+    stats = Stats()
+    stats.start()
+    nodes, diags, link, enc = assemble_text(SRC, stats=stats)
+    stats.finish()
+    assert list(stats.phases) == ["parse", "expand", "first_pass", "encode", "data"]
+    assert all(t.wall >= 0 and t.cpu >= 0 for t in stats.phases.values())
+    c = stats.counts
+    assert c["lines"] == 11 and c["instructions"] == 4
+    assert c["expanded_instructions"] == 6  # la y li se expanden a 2
+    assert stats.pseudo_ratio() == 6 / 4
+    assert c["symbols"] == len(link.symtab) and c["words"] == len(enc.buffer)
+    assert c["data_bytes"] == 8 and c["bss_bytes"] == 32
+    assert stats.total is not None and stats.peak_memory is None
+    # con y sin estadísticas el resultado es el mismo
+    assert list(assemble_text(SRC)[3].buffer) == list(enc.buffer)
+
+def test_hook_receives_metrics():
+    seen = {}
+    stats = Stats(memory=True, hook=lambda name, value: seen.__setitem__(name, value))
+    stats.start()
+    assemble_text(SRC, stats=stats)
+    stats.finish()
+    assert seen["count.expanded_instructions"] == 6
+    assert seen["phase.encode.wall_s"] == stats.phases["encode"].wall
+    assert seen["memory.peak_bytes"] == stats.peak_memory > 0
+    assert "total.wall_s" in seen
+
+def test_cli_stats_text_and_json(tmp_path, capsys):
+    src = tmp_path / "p.s"
+    src.write_text(SRC)
+    out_hex, out_bin, js = (str(tmp_path / n) for n in ("p.hex", "p.bin", "p.json"))
+    assert main([str(src), out_hex, out_bin, "--stats", "--stats-json", js]) == 0
+    err = capsys.readouterr().err
+    assert "Estadísticas de" in err and "encode" in err and "write" in err
+    data = json.load(open(js))
+    assert set(data["phases"]) >= {"parse", "first_pass", "encode", "write"}
+    assert data["output_bytes"] == {out_hex: 6 * 11, out_bin: 6 * 33}
+    assert data["pseudo_ratio"] == 1.5 and data["peak_memory_bytes"] is None
+
+def test_cli_stats_json_to_stdout(tmp_path, capsys):
+    src = tmp_path / "p.s"
+    src.write_text(SRC)
+    assert main([str(src), str(tmp_path / "p.hex"), str(tmp_path / "p.bin"),
+                 "--stats-json", "-", "--stats-memory"]) == 0
+    captured = capsys.readouterr()
+    data = json.loads(captured.out)  # stdout sólo lleva el JSON
+    assert data["peak_memory_bytes"] > 0
+    assert "OK:" in captured.err
+
+def test_memory_stats_run_one_at_a_time(tmp_path):
+    first, second = Stats(memory=True), Stats(memory=True)
+    first.start()
+    t = threading.Thread(target=lambda: (second.start(), second.finish()))
+    t.start()
+    t.join(timeout=0.2)
+    assert t.is_alive()  # espera a que termine la medida en curso
+    first.finish()
+    t.join(timeout=10)
+    assert not t.is_alive()
+    assert first.peak_memory is not None and second.peak_memory is not None
+    assert not _MEMORY_LOCK.locked()
+    # una ejecución fallida (código 2) también suelta el cerrojo
+    assert main([str(tmp_path / "no.s"), str(tmp_path / "o.hex"), str(tmp_path / "o.bin"),
+                 "--stats", "--stats-memory"]) == 2
+    assert not _MEMORY_LOCK.locked()
@@ -0,0 +1,43 @@
+import io
+from src.rv32i_asm.assembler import assemble_text, assemble_stream
+from src.rv32i_asm.parser import parse, parse_iter
+from src.rv32i_asm.pseudo import expand, expand_iter
+from src.rv32i_asm.writers import to_hex_lines, to_bin_lines
+
+SRC = """
+    .data
+msg: .asciz "Hola"
+    .text
+_start:
+    li  a0, 1
+    la  a1, msg
+    lw  a2, msg
+loop:
+    bnez a2, loop
+    ret
+"""
+
+def test_parse_iter_and_expand_iter_match_list_versions():
+    nodes, diags = parse(SRC)
+    sdiags = []
+    snodes = list(expand_iter(parse_iter(io.StringIO(SRC), diags=sdiags)))
+    assert snodes == expand(nodes)
+    assert sdiags == diags
+
+def test_assemble_stream_matches_assemble_text(tmp_path):
+    _, diags, _, enc = assemble_text(SRC)
+    assert not diags
+    out_hex, out_bin = tmp_path / "o.hex", tmp_path / "o.bin"
+    sdiags, link, n = assemble_stream(io.StringIO(SRC), str(out_hex), str(out_bin))
+    assert not sdiags
+    assert n == len(enc.words)
+    assert out_hex.read_text().splitlines() == to_hex_lines(enc.words)
+    assert out_bin.read_text().splitlines() == to_bin_lines(enc.words)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["o.bin", "o.hex"]
+
+def test_assemble_stream_with_errors_writes_nothing(tmp_path):
+    out_hex, out_bin = tmp_path / "o.hex", tmp_path / "o.bin"
+    diags, _, n = assemble_stream(io.StringIO(".text\n beq a0, a1, nowhere\n"), str(out_hex), str(out_bin))
+    assert n == 0
+    assert any("no definida" in d.message for d in diags)
+    assert list(tmp_path.iterdir()) == []
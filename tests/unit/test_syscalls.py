@@ -0,0 +1,209 @@
+import io
+import os
+
+import pytest
+
+from src.rv32i_asm.sim import Simulator, SimError, main
+from src.rv32i_asm.syscalls import LinuxSyscalls
+
+HELLO = os.path.join(os.path.dirname(__file__), "..", "..", "examples", "hello.s")
+
+def run(text, **streams):
+    syscalls = LinuxSyscalls(**{"stdin": io.BytesIO(), "stdout": io.BytesIO(),
+                                "stderr": io.BytesIO(), **streams})
+    sim = Simulator.from_text(text, ecall=syscalls)
+    with syscalls:
+        res = sim.run()
+    return sim, res, syscalls
+
+class CountingRaw(io.RawIOBase):
+    """Destino sin búfer que cuenta las escrituras que le llegan."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.calls = 0
+
+    def writable(self):
+        return True
+
+    def write(self, b):
+        self.calls += 1
+        self.data += b
+        return len(b)
+
+def test_hello_example_runs():
+    with open(HELLO, encoding="utf-8") as f:
+        text = f.read()
+    out = io.BytesIO()
+    sim, res, _ = run(text, stdout=out)
+    assert res.reason == "exit" and res.exit_code == 0
+    assert out.getvalue() == b"Hello, RV32I!\n"
+
+def test_cli_runs_hello(capfd):
+    assert main([HELLO]) == 0
+    assert capfd.readouterr().out == "Hello, RV32I!\n"
+
+def test_small_writes_are_buffered():
+    raw = CountingRaw()
+    sim, res, _ = run("""
+    .data
+c:  .byte 120
+    .text
+_start:
+    li   s0, 2000
+loop:
+    li   a0, 1
+    la   a1, c
+    li   a2, 1
+    li   a7, 64
+    ecall
+    addi s0, s0, -1
+    bnez s0, loop
+    li   a0, 0
+    li   a7, 93
+    ecall
+""", stdout=raw)
+    assert res.exit_code == 0
+    assert bytes(raw.data) == b"x" * 2000
+    assert raw.calls <= 2
+
+def test_write_passes_views_of_simulated_memory():
+    seen = []
+
+    class Sink(io.BytesIO):
+        def write(self, b):
+            seen.append(type(b))
+            return super().write(b)
+
+    sink = Sink()
+    run("""
+    .data
+m:  .ascii "abc"
+    .text
+    li a0, 1
+    la a1, m
+    li a2, 3
+    li a7, 64
+    ecall
+    li a7, 93
+    ecall
+""", stdout=sink)
+    assert seen == [memoryview] and sink.getvalue() == b"abc"
+
+def test_read_echo_and_errors():
+    out = io.BytesIO()
+    sim, res, _ = run("""
+    .data
+buf: .space 16
+    .text
+    li   a0, 0
+    la   a1, buf
+    li   a2, 16
+    li   a7, 63
+    ecall
+    mv   a2, a0
+    li   a0, 1
+    la   a1, buf
+    li   a7, 64
+    ecall
+    li   a0, 9          # descriptor inexistente
+    li   a7, 64
+    ecall
+    mv   s0, a0
+    li   a0, 1
+    li   a1, 0x7000     # sin mapear
+    li   a2, 4
+    li   a7, 64
+    ecall
+    mv   s1, a0
+    li   a0, 0
+    li   a7, 93
+    ecall
+""", stdin=io.BytesIO(b"eco\n"), stdout=out)
+    assert out.getvalue() == b"eco\n"
+    assert sim.reg("s0") == -9 & 0xFFFFFFFF      # EBADF
+    assert sim.reg("s1") == -14 & 0xFFFFFFFF     # EFAULT
+
+def test_brk_grows_heap():
+    sim, res, sc = run("""
+    .text
+    li   a0, 0
+    li   a7, 214
+    ecall
+    mv   s0, a0          # fin inicial del montón
+    li   t0, 10000
+    add  a0, s0, t0
+    li   a7, 214
+    ecall
+    mv   s1, a0
+    li   t1, 0x1234
+    sw   t1, -4(s1)
+    lw   s2, -4(s1)
+    li   a0, 0
+    li   a7, 93
+    ecall
+""")
+    assert sim.reg("s0") == sim.heap_start and sim.heap_start % 4096 == 0
+    assert sim.reg("s1") == sim.heap_start + 10000 and sim.reg("s2") == 0x1234
+
+def test_openat_write_fstat_read(tmp_path):
+    path = tmp_path / "f.txt"
+    sim, res, _ = run(f"""
+    .data
+name: .asciz "{path}"
+msg:  .ascii "datos"
+st:   .space 80
+buf:  .space 8
+    .text
+    li   a0, -100
+    la   a1, name
+    li   a2, 0x241        # O_WRONLY | O_CREAT | O_TRUNC
+    li   a3, 0x1a4        # 0644
+    li   a7, 56
+    ecall
+    mv   s0, a0
+    la   a1, msg
+    li   a2, 5
+    li   a7, 64
+    ecall
+    mv   a0, s0
+    la   a1, st
+    li   a7, 80
+    ecall
+    la   t0, st
+    lw   s5, 32(t0)       # st_size
+    mv   a0, s0
+    li   a7, 57
+    ecall
+    li   a0, -100
+    la   a1, name
+    li   a2, 0
+    li   a7, 56
+    ecall
+    mv   s1, a0
+    la   a1, buf
+    li   a2, 8
+    li   a7, 63
+    ecall
+    mv   s2, a0
+    mv   a0, s1
+    li   a7, 57
+    ecall
+    mv   s3, a0
+    mv   a0, s1
+    li   a7, 57
+    ecall
+    mv   s4, a0
+    li   a0, 0
+    li   a7, 93
+    ecall
+""")
+    assert path.read_bytes() == b"datos"
+    assert sim.reg("s0") == 3 and sim.reg("s1") == 3
+    assert sim.reg("s5") == 5                            # st_size, con el búfer ya vaciado
+    assert sim.reg("s2") == 5 and sim.reg("s3") == 0
+    assert sim.reg("s4") == -9 & 0xFFFFFFFF              # cerrar dos veces: EBADF
+
+def test_unknown_syscall_is_an_error():
+    with pytest.raises(SimError, match="a7=999"):
+        run("    .text\n    li a7, 999\n    ecall\n")
@@ -0,0 +1,159 @@
+import io
+
+import pytest
+
+from src.rv32i_asm.sim import MODES, Simulator, SimError, main as sim_main
+from src.rv32i_asm.trace import Trace, disassemble, main, read_trace
+
+EXIT = "    li a7, 93\n    ecall\n"
+
+KERNEL = """
+    .data
+arr: .word 5, -3, 8, 1
+    .text
+_start:
+    la   s0, arr
+    li   s1, 4
+    li   a0, 0
+sum:
+    lw   t0, 0(s0)
+    bge  t0, zero, pos
+    sub  t0, zero, t0
+pos:
+    add  a0, a0, t0
+    sb   t0, 0(s0)
+    lbu  t1, 0(s0)
+    addi s0, s0, 4
+    addi s1, s1, -1
+    bnez s1, sum
+    li   t2, 20
+spin:
+    srai t3, t2, 1
+    addi t2, t2, -1
+    bgtz t2, spin
+    jal  ra, twice
+    andi a0, a0, 0xff
+""" + EXIT + """
+twice:
+    slli a0, a0, 1
+    jalr zero, 0(ra)
+"""
+
+def state(sim):
+    return list(sim.x[:32]), sim.pc, sim.instret, sim.exit_code
+
+def traced(text, mode="blocks", capacity=1 << 16, **kw):
+    trace = Trace(capacity, **kw)
+    sim = Simulator.from_text(text, mode=mode, trace=trace)
+    return sim, trace
+
+def rows(records):
+    return [(r.pc, r.word, r.rd, r.value, r.addr) for r in records]
+
+def test_every_mode_records_the_same_trace():
+    got = {}
+    for mode in MODES:
+        sim, trace = traced(KERNEL, mode)
+        assert sim.run().reason == "exit"
+        got[mode] = rows(trace.records())
+        plain = Simulator.from_text(KERNEL, mode=mode)
+        plain.run()
+        assert state(sim) == state(plain)  # la traza no cambia la ejecución
+        assert len(got[mode]) == sim.instret
+    assert got["blocks"] == got["predecode"] == got["naive"]
+    lw = next(r for r in got["blocks"] if disassemble(r[1], r[0]).startswith("lw"))
+    assert lw[3:] == (5, 0x1000_0000)      # primer elemento de arr y su dirección
+    sb = next(r for r in got["blocks"] if disassemble(r[1], r[0]).startswith("sb"))
+    assert sb[2] is None and sb[4] == 0x1000_0000
+
+def test_step_limit_splits_blocks_consistently():
+    for limit in (1, 5, 13, 60):
+        got = []
+        for mode in ("blocks", "predecode"):
+            sim, trace = traced(KERNEL, mode)
+            assert sim.run(max_steps=limit).steps == limit
+            sim.run()
+            got.append(rows(trace.records()))
+        assert got[0] == got[1], limit
+
+def test_ring_keeps_the_most_recent_executions():
+    sim, full = traced(KERNEL)
+    sim.run()
+    sim, ring = traced(KERNEL, capacity=5)
+    sim.run()
+    kept = [len(e) for e in ring.entries()]
+    assert ring.wrapped and sum(kept) >= 5 > sum(kept[1:])  # 5 palabras, no ejecuciones
+    tail = rows(ring.records())
+    assert tail == rows(full.records())[-len(tail):]
+
+def test_stream_and_dump_decode_to_the_full_trace(tmp_path):
+    sim, full = traced(KERNEL)
+    sim.run()
+    path = tmp_path / "k.trc"
+    with Trace(3, stream=str(path)) as trace:  # se vuelca muchas veces
+        Simulator.from_text(KERNEL, trace=trace).run()
+    assert rows(read_trace(str(path))) == rows(full.records())
+    buf = io.BytesIO()
+    full.dump(buf)
+    buf.seek(0)
+    assert rows(read_trace(buf)) == rows(full.records())
+    with pytest.raises(ValueError, match="no es un archivo"):
+        list(read_trace(io.BytesIO(b"otra cosa")))
+
+def test_fault_records_only_completed_instructions():
+    text = """    .text
+    li   s0, 3
+    li   t0, 0x1000
+loop:
+    addi s0, s0, -1
+    lw   t1, 0(t0)
+    bnez s0, loop
+"""
+    for mode in MODES:
+        sim, trace = traced(text, mode)
+        with pytest.raises(SimError, match="no mapeada"):
+            sim.run()
+        got = rows(trace.records())
+        assert len(got) == sim.instret
+        assert got[-1][0] == sim.pc - 4 and got[-1][2:] == (8, 2, None)  # addi s0, antes del lw
+
+def test_store_into_running_block_is_traced():
+    sim, trace = traced("""    .text
+    la   t0, patch
+    li   t1, 0x00100513      # addi a0, zero, 1
+    sw   t1, 0(t0)
+patch:
+    addi a0, zero, 7
+""" + EXIT)
+    assert sim.run().exit_code == 1
+    got = rows(trace.records())
+    assert got[-3][2:] == (10, 1, None)       # la instrucción ya parcheada
+    assert [g[0] for g in got] == [4 * i for i in range(len(got))]
+
+def test_cli_streams_and_decodes_with_symbols_and_lines(tmp_path, capsys):
+    src = tmp_path / "k.s"
+    src.write_text(KERNEL, encoding="utf-8")
+    trc = tmp_path / "k.trc"
+    assert sim_main([str(src), "--trace", str(trc), "--trace-capacity", "4"]) == 34
+    capsys.readouterr()
+    assert main([str(trc), "--source", str(src), "--tail", "4"]) == 0
+    out = capsys.readouterr().out.splitlines()
+    assert len(out) == 4
+    assert "<twice+4>" in out[0] and "jalr zero, 0(ra)" in out[0] and "k.s:32:" in out[0]
+    assert "a0=0x00000022" in out[1] and "andi a0, a0, 255" in out[1]
+    assert "a7=0x0000005d" in out[2] and out[3].endswith("k.s:28: ecall")
+    assert main([str(tmp_path / "nada.trc")]) == 2
+
+def test_cli_closed_pipe_is_not_an_error(tmp_path):
+    import subprocess, sys
+    trc = tmp_path / "l.trc"
+    with Trace(1 << 16) as trace:
+        Simulator.from_text("    .text\n    li t0, 50000\nl:  addi t0, t0, -1\n    bnez t0, l\n" + EXIT,
+                            trace=trace).run()
+        trace.dump(str(trc))
+    p = subprocess.Popen([sys.executable, "-m", "src.rv32i_asm.trace", str(trc)],
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    assert p.stdout.readline()
+    p.stdout.close()  # como '| head -1'
+    assert p.wait(timeout=60) == 0
+    assert p.stderr.read() == b""
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+
+from src.rv32i_asm.assembler import assemble_text, main, write_outputs
+from src.rv32i_asm.cache import CachedBuild
+from src.rv32i_asm.cli import build_arg_parser
+from src.rv32i_asm.data import build_data_image
+from src.rv32i_asm.watch import IncrementalAssembler, WatchOutputs, watch
+
+SRC = """    .data
+msg: .word 7
+    .text
+_start:
+    la   a0, msg
+    addi a1, zero, 1
+loop:
+    beq  a1, zero, loop
+    jal  ra, fin
+fin:
+    addi a2, zero, 2
+"""
+
+def same_as_full(asm, text):
+    _, diags, link, enc = assemble_text(text)
+    image = build_data_image(link)
+    assert list(asm.words) == list(enc.buffer)
+    assert asm.link.symtab == link.symtab
+    assert (asm.image.size, asm.image.segments) == (image.size, image.segments)
+    assert [str(d) for d in asm.diagnostics] == [str(d) for d in diags]
+
+def test_same_size_edit_only_reencodes_words():
+    asm = IncrementalAssembler(SRC)
+    text = SRC.replace("addi a1, zero, 1", "addi a1, zero, 5")
+    r = asm.update(text)
+    assert r.kind == "palabras"
+    assert r.text_range == (2, 3) and not r.text_resized
+    assert not r.data_changed and not r.symbols_changed
+    same_as_full(asm, text)
+    assert asm.update(text).kind == "nada"
+
+def test_comment_only_edit_changes_nothing():
+    asm = IncrementalAssembler(SRC)
+    r = asm.update(SRC.replace("_start:", "_start:   # entrada"))
+    assert not r.changed
+
+def test_insert_moves_labels_and_branches():
+    asm = IncrementalAssembler(SRC)
+    text = SRC.replace("loop:\n", "    addi a3, zero, 3\nloop:\n")
+    r = asm.update(text)
+    assert r.kind == "layout" and r.text_resized and r.symbols_changed
+    same_as_full(asm, text)
+    # una edición posterior sobre el estado ya desplazado
+    text2 = text.replace("addi a2, zero, 2", "addi a2, zero, 9")
+    assert asm.update(text2).kind == "palabras"
+    same_as_full(asm, text2)
+
+def test_data_edit():
+    asm = IncrementalAssembler(SRC)
+    text = SRC.replace(".word 7", ".word 8")
+    r = asm.update(text)
+    assert r.data_changed and r.text_range is None
+    same_as_full(asm, text)
+
+def test_diagnostics_have_exact_lines_after_shift():
+    asm = IncrementalAssembler(SRC)
+    text = "# cabecera\n\n" + SRC
+    asm.update(text)
+    bad = text.replace("jal  ra, fin", "jal  ra, nada")
+    r = asm.update(bad)
+    assert not asm.ok
+    assert [str(d) for d in r.diagnostics] == [str(d) for d in assemble_text(bad)[1]]
+    r = asm.update(text)  # corregido
+    assert asm.ok and r.text_range is not None
+    same_as_full(asm, text)
+
+def test_outputs_patched_in_place(tmp_path):
+    paths = {k: str(tmp_path / f"o.{k}") for k in ("hex", "bin", "raw", "elf", "dhex")}
+    outs = WatchOutputs(paths["hex"], paths["bin"], out_raw=paths["raw"], out_elf=paths["elf"],
+                        out_data_hex=paths["dhex"])
+    asm = IncrementalAssembler(SRC)
+    outs.write_all(asm)
+    data_mtime = os.stat(paths["dhex"]).st_mtime_ns
+
+    text = SRC.replace("addi a1, zero, 1", "addi a1, zero, -7")
+    written = outs.update(asm, asm.update(text))
+    assert sorted(written) == sorted([paths["hex"], paths["bin"], paths["raw"], paths["elf"]])
+    assert os.stat(paths["dhex"]).st_mtime_ns == data_mtime
+
+    ref = {k: str(tmp_path / f"r.{k}") for k in paths}
+    write_outputs(CachedBuild(asm.words, asm.image, asm.link, []), ref["hex"], ref["bin"],
+                  out_raw=ref["raw"], out_elf=ref["elf"], out_data_hex=ref["dhex"])
+    for k in paths:
+        with open(paths[k], "rb") as a, open(ref[k], "rb") as b:
+            assert a.read() == b.read(), k
+
+def test_watch_loop_rebuilds_on_save(tmp_path, capsys):
+    src = tmp_path / "p.s"
+    src.write_text(SRC)
+    out_hex = str(tmp_path / "p.hex")
+    args = build_arg_parser().parse_args([str(src), out_hex, str(tmp_path / "p.bin"), "--watch"])
+    t = threading.Thread(target=watch, args=(args,), kwargs={"interval": 0.01, "max_rebuilds": 1})
+    t.start()
+    while not os.path.exists(out_hex):
+        time.sleep(0.01)
+    text = SRC.replace("addi a2, zero, 2", "addi a2, zero, 3")
+    src.write_text(text)
+    st = os.stat(src)
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))  # mtime distinta aunque el reloj sea grueso
+    t.join(timeout=10)
+    assert not t.is_alive()
+    words = assemble_text(text)[3].buffer
+    assert open(out_hex).read().split() == [f"0x{w:08x}" for w in words]
+    out = capsys.readouterr().out
+    assert "Vigilando" in out and "palabras:" in out
+
+def test_watch_flag_reports_unreadable_source(tmp_path, capsys):
+    code = main([str(tmp_path / "no.s"), str(tmp_path / "o.hex"), str(tmp_path / "o.bin"), "--watch"])
+    assert code == 2
+    assert "no pude leer" in capsys.readouterr().err
+
+def test_watch_rejects_relocatable_elf(tmp_path, capsys):
+    src = tmp_path / "p.s"
+    src.write_text(SRC)
+    code = main([str(src), str(tmp_path / "o.hex"), str(tmp_path / "o.bin"), "--watch",
+                 "--elf", str(tmp_path / "o.o"), "--elf-type", "rel"])
+    assert code == 2
+    assert "--elf-type rel" in capsys.readouterr().err
+    assert not (tmp_path / "o.hex").exists()
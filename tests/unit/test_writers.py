@@ -0,0 +1,48 @@
+import struct
+from array import array
+
+import src.rv32i_asm.writers as writers
+from src.rv32i_asm.assembler import assemble_text, main
+from src.rv32i_asm.utils import to_hex32, to_bin32
+
+SRC = """
+.text
+  li   a0, 0x12345678
+  addi a1, a0, -1
+  beq  a0, a1, 8
+  ecall
+"""
+
+def _enc():
+    _, diags, _, enc = assemble_text(SRC)
+    assert not diags
+    return enc
+
+def test_text_writers_accept_buffers_and_iterables(tmp_path, monkeypatch):
+    enc = _enc()
+    values = list(enc.buffer)
+    monkeypatch.setattr(writers, "CHUNK_WORDS", 2)  # fuerza varios bloques
+    for make in (lambda: enc, lambda: enc.words, lambda: enc.buffer, lambda: enc.view,
+                 lambda: iter(list(enc.words))):
+        writers.write_hex(make(), str(tmp_path / "o.hex"))
+        writers.write_bin(make(), str(tmp_path / "o.bin"))
+        assert (tmp_path / "o.hex").read_text().splitlines() == [to_hex32(v) for v in values]
+        assert (tmp_path / "o.bin").read_text().splitlines() == [to_bin32(v) for v in values]
+    assert list(enc.buffer) == values  # los bloques no alteran el buffer original
+
+def test_write_raw_little_endian(tmp_path):
+    enc = _enc()
+    n = writers.write_raw(enc, str(tmp_path / "o.raw"))
+    data = (tmp_path / "o.raw").read_bytes()
+    assert n == len(data) == 4 * len(enc)
+    assert data == struct.pack(f"<{len(enc)}I", *enc.buffer)
+    writers.write_raw(array('I', [0x00000013]), str(tmp_path / "nop.raw"))
+    assert (tmp_path / "nop.raw").read_bytes() == b"\x13\x00\x00\x00"
+
+def test_cli_raw_output(tmp_path):
+    src = tmp_path / "p.s"
+    src.write_text(SRC)
+    out_hex, out_bin, out_raw = tmp_path / "o.hex", tmp_path / "o.bin", tmp_path / "o.raw"
+    assert main([str(src), str(out_hex), str(out_bin), "--raw", str(out_raw)]) == 0
+    assert out_raw.read_bytes() == struct.pack(f"<{len(_enc())}I", *_enc().buffer)
+    assert out_hex.read_text().splitlines() == writers.to_hex_lines(_enc())